@@ -0,0 +1,150 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from collections import Counter, deque
+
+Text = Union[str, bytes]
+
+
+class AhoCorasick:
+    """Every occurrence of many literal patterns in one pass over the text.
+
+    The patterns are compiled into a deterministic automaton: a trie whose
+    failure links are folded into a full transition table, so each input
+    byte is one table lookup whatever the number of patterns, instead of
+    one search per pattern. Bytes that occur in no pattern share one
+    input class, which keeps the table rows short; the translation to
+    classes (with ASCII case folding unless `ignore_case` is off) is done
+    by bytes.translate in C before the scan loop.
+
+    Matching is on UTF-8 bytes and overlapping matches are all reported.
+    Case folding only applies to ASCII letters of the input; patterns are
+    lower-cased with str.lower. The automaton is read-only once built and
+    can be shared between threads; `scanner()` gives the per-stream state.
+    """
+
+    def __init__(self, patterns: Iterable[str], ignore_case: bool = True):
+        self.patterns: List[str] = []
+        self.ignore_case = ignore_case
+        encoded = []
+        for pattern in patterns:
+            if not pattern:
+                raise ValueError("patterns must not be empty")
+            self.patterns.append(pattern)
+            encoded.append((pattern.lower() if ignore_case else pattern).encode("utf-8"))
+
+        alphabet = sorted(set(b"".join(encoded)))
+        table = bytearray(256)
+        for index, byte in enumerate(alphabet, 1):
+            table[byte] = index
+        if ignore_case:
+            for byte in range(ord("A"), ord("Z") + 1):
+                table[byte] = table[byte + 32]
+        self._table = bytes(table)
+        width = len(alphabet) + 1
+
+        # Trie over input classes
+        children: List[Dict[int, int]] = [{}]
+        outputs: List[Tuple[int, ...]] = [()]
+        for index, pattern in enumerate(encoded):
+            state = 0
+            for symbol in pattern.translate(self._table):
+                following = children[state].get(symbol)
+                if following is None:
+                    following = len(children)
+                    children[state][symbol] = following
+                    children.append({})
+                    outputs.append(())
+                state = following
+            outputs[state] += (index,)
+
+        # Breadth-first, so a state's failure target is always complete before the state
+        rows: List[Optional[Tuple[int, ...]]] = [None] * len(children)
+        fail = [0] * len(children)
+        root = [0] * width
+        for symbol, following in children[0].items():
+            root[symbol] = following
+        rows[0] = tuple(root)
+        queue = deque(children[0].values())
+        while queue:
+            state = queue.popleft()
+            row = list(rows[fail[state]])
+            for symbol, following in children[state].items():
+                fail[following] = rows[fail[state]][symbol]
+                outputs[following] += outputs[fail[following]]
+                row[symbol] = following
+                queue.append(following)
+            rows[state] = tuple(row)
+
+        self._rows: List[Tuple[int, ...]] = rows
+        self._outputs = outputs
+        self._accepting = [bool(output) for output in outputs]
+        self.states = len(rows)
+
+    def _encode(self, data: Text) -> bytes:
+        if isinstance(data, str):
+            data = data.encode("utf-8", "replace")
+        return data.translate(self._table)
+
+    def _run(self, data: Text, state: int, hits: List[int]) -> int:
+        rows, accepting = self._rows, self._accepting
+        for symbol in self._encode(data):
+            state = rows[state][symbol]
+            if accepting[state]:
+                hits.append(state)
+        return state
+
+    def _count(self, hits: List[int]) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for state, times in Counter(hits).items():
+            for index in self._outputs[state]:
+                counts[index] = counts.get(index, 0) + times
+        return counts
+
+    def counts(self, data: Text) -> Dict[int, int]:
+        """Occurrences of each pattern found, by pattern index"""
+        hits: List[int] = []
+        self._run(data, 0, hits)
+        return self._count(hits)
+
+    def finditer(self, data: Text) -> Iterator[Tuple[int, int]]:
+        """(start offset, pattern index) of every occurrence, in order of where they end"""
+        rows, accepting, outputs = self._rows, self._accepting, self._outputs
+        lengths = [len(pattern.encode("utf-8")) for pattern in self.patterns]
+        state = 0
+        for position, symbol in enumerate(self._encode(data), 1):
+            state = rows[state][symbol]
+            if accepting[state]:
+                for index in outputs[state]:
+                    yield position - lengths[index], index
+
+    def search(self, data: Text) -> Optional[int]:
+        """Index of the pattern that ends first in the text, or None"""
+        rows, accepting = self._rows, self._accepting
+        state = 0
+        for symbol in self._encode(data):
+            state = rows[state][symbol]
+            if accepting[state]:
+                return self._outputs[state][0]
+        return None
+
+    def scanner(self) -> "StreamScanner":
+        return StreamScanner(self)
+
+
+class StreamScanner:
+    """Scan state for one stream: feed chunks as they arrive, matches spanning chunks included"""
+
+    __slots__ = ("automaton", "state", "hits", "bytes")
+
+    def __init__(self, automaton: AhoCorasick):
+        self.automaton = automaton
+        self.state = 0
+        self.hits: List[int] = []
+        self.bytes = 0
+
+    def feed(self, chunk: Text):
+        self.bytes += len(chunk)
+        self.state = self.automaton._run(chunk, self.state, self.hits)
+
+    def counts(self) -> Dict[int, int]:
+        """Occurrences of each pattern so far, by pattern index"""
+        return self.automaton._count(self.hits)
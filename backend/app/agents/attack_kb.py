@@ -0,0 +1,437 @@
+"""
+Offline MITRE ATT&CK knowledge base.
+
+The enterprise ATT&CK STIX bundle (enterprise-attack.json from
+https://github.com/mitre-attack/attack-stix-data) is converted once into a
+compact binary index that is memory-mapped at runtime, so API workers
+start without parsing tens of megabytes of JSON and share the pages of
+one file. Records are fixed-size and sorted by ID, so lookups are a
+binary search over the mapping.
+
+Build or inspect the index from the backend directory:
+    python -m app.agents.attack_kb build --stix enterprise-attack.json
+    python -m app.agents.attack_kb lookup T1021.004
+"""
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from collections import defaultdict
+from pathlib import Path
+import argparse
+import copy
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent / "data"
+DEFAULT_STIX_PATH = DATA_DIR / "enterprise-attack.json"
+DEFAULT_INDEX_PATH = DATA_DIR / "attack-index.bin"
+
+MAGIC = b"ATTACKX1"
+INDEX_VERSION = 1
+
+# Header: magic, version, record counts (techniques, mitigations, tactics,
+# pool entries), then the byte offset of each section
+_HEADER = struct.Struct("<8sIIIII5Q")
+# String references are (offset, length) into the string section
+# Technique: id, name, tactics, url, description, mitigation pool (start, count)
+_TECHNIQUE = struct.Struct("<10I2I")
+# Mitigation: id, name, url, description, technique pool (start, count)
+_MITIGATION = struct.Struct("<8I2I")
+# Tactic: shortname, name, technique pool (start, count)
+_TACTIC = struct.Struct("<4I2I")
+_POOL = struct.Struct("<I")
+
+
+def _external_id(obj: Dict[str, Any]) -> Tuple[Optional[str], str]:
+    for reference in obj.get("external_references", []):
+        if reference.get("source_name") == "mitre-attack" and reference.get("external_id"):
+            return reference["external_id"], reference.get("url", "")
+    return None, ""
+
+
+def _active(obj: Dict[str, Any]) -> bool:
+    return not obj.get("revoked") and not obj.get("x_mitre_deprecated")
+
+
+def parse_stix_bundle(bundle: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract techniques, tactics, mitigations and their links from a STIX 2.x bundle"""
+    techniques: Dict[str, Dict[str, Any]] = {}
+    mitigations: Dict[str, Dict[str, Any]] = {}
+    tactics: Dict[str, Dict[str, Any]] = {}
+    stix_ids: Dict[str, str] = {}
+    relationships = []
+
+    for obj in bundle.get("objects", []):
+        kind = obj.get("type")
+        if kind == "relationship":
+            if obj.get("relationship_type") == "mitigates" and _active(obj):
+                relationships.append((obj["source_ref"], obj["target_ref"]))
+            continue
+        if kind not in ("attack-pattern", "course-of-action", "x-mitre-tactic") or not _active(obj):
+            continue
+        external_id, url = _external_id(obj)
+        if not external_id:
+            continue
+
+        record = {"id": external_id, "name": obj.get("name", ""), "url": url,
+                  "description": obj.get("description", "")}
+        if kind == "attack-pattern":
+            record["tactics"] = [
+                phase["phase_name"] for phase in obj.get("kill_chain_phases", [])
+                if phase.get("kill_chain_name") == "mitre-attack"
+            ]
+            record["mitigations"] = set()
+            techniques[external_id] = record
+        elif kind == "course-of-action":
+            record["techniques"] = set()
+            mitigations[external_id] = record
+        else:
+            record["shortname"] = obj.get("x_mitre_shortname", record["name"].lower().replace(" ", "-"))
+            tactics[record["shortname"]] = record
+        stix_ids[obj["id"]] = external_id
+
+    for source, target in relationships:
+        mitigation_id, technique_id = stix_ids.get(source), stix_ids.get(target)
+        if mitigation_id in mitigations and technique_id in techniques:
+            mitigations[mitigation_id]["techniques"].add(technique_id)
+            techniques[technique_id]["mitigations"].add(mitigation_id)
+
+    return {"techniques": techniques, "mitigations": mitigations, "tactics": tactics}
+
+
+def build_index(stix_path: Path, index_path: Path) -> Dict[str, int]:
+    """Convert a STIX bundle into the binary index, replacing any existing index atomically"""
+    with open(stix_path, encoding="utf-8") as handle:
+        parsed = parse_stix_bundle(json.load(handle))
+
+    techniques = sorted(parsed["techniques"].values(), key=lambda record: record["id"].encode())
+    mitigations = sorted(parsed["mitigations"].values(), key=lambda record: record["id"].encode())
+    tactics = sorted(parsed["tactics"].values(), key=lambda record: record["shortname"].encode())
+    technique_slot = {record["id"]: index for index, record in enumerate(techniques)}
+    mitigation_slot = {record["id"]: index for index, record in enumerate(mitigations)}
+
+    strings = bytearray()
+    interned: Dict[str, Tuple[int, int]] = {}
+
+    def ref(text: str) -> Tuple[int, int]:
+        if text not in interned:
+            data = text.encode("utf-8")
+            interned[text] = (len(strings), len(data))
+            strings.extend(data)
+        return interned[text]
+
+    pool: List[int] = []
+
+    def pool_ref(slots: List[int]) -> Tuple[int, int]:
+        start = len(pool)
+        pool.extend(sorted(slots))
+        return start, len(slots)
+
+    tactic_members = defaultdict(list)
+    technique_rows = bytearray()
+    for slot, record in enumerate(techniques):
+        for tactic in record["tactics"]:
+            tactic_members[tactic].append(slot)
+        technique_rows += _TECHNIQUE.pack(
+            *ref(record["id"]), *ref(record["name"]), *ref(",".join(record["tactics"])),
+            *ref(record["url"]), *ref(record["description"]),
+            *pool_ref([mitigation_slot[mitigation] for mitigation in record["mitigations"]])
+        )
+
+    mitigation_rows = bytearray()
+    for record in mitigations:
+        mitigation_rows += _MITIGATION.pack(
+            *ref(record["id"]), *ref(record["name"]), *ref(record["url"]), *ref(record["description"]),
+            *pool_ref([technique_slot[technique] for technique in record["techniques"]])
+        )
+
+    tactic_rows = bytearray()
+    for record in tactics:
+        tactic_rows += _TACTIC.pack(
+            *ref(record["shortname"]), *ref(record["name"]), *pool_ref(tactic_members.get(record["shortname"], []))
+        )
+
+    pool_bytes = b"".join(_POOL.pack(slot) for slot in pool)
+    offsets = []
+    position = _HEADER.size
+    for section in (technique_rows, mitigation_rows, tactic_rows, pool_bytes, strings):
+        offsets.append(position)
+        position += len(section)
+    header = _HEADER.pack(MAGIC, INDEX_VERSION, len(techniques), len(mitigations), len(tactics), len(pool), *offsets)
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    # Concurrent builders (several workers starting at once) each write a
+    # private file and the last rename wins; readers never see a partial index
+    descriptor, temp_path = tempfile.mkstemp(dir=index_path.parent, prefix=".attack-index-")
+    try:
+        with os.fdopen(descriptor, "wb") as handle:
+            for section in (header, technique_rows, mitigation_rows, tactic_rows, pool_bytes, strings):
+                handle.write(section)
+        os.replace(temp_path, index_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    return {"techniques": len(techniques), "mitigations": len(mitigations), "tactics": len(tactics),
+            "bytes": position}
+
+
+class AttackIndex:
+    """Read-only view of a memory-mapped index file"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, *rest = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != INDEX_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {INDEX_VERSION} ATT&CK index")
+        self.counts = dict(zip(("techniques", "mitigations", "tactics", "pool"), rest[:4]))
+        self._techniques, self._mitigations, self._tactics, self._pool, self._strings = rest[4:]
+
+    def close(self):
+        self._map.close()
+
+    def _text(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def _key(self, section: int, record: struct.Struct, slot: int) -> bytes:
+        offset, length = struct.unpack_from("<II", self._map, section + slot * record.size)
+        start = self._strings + offset
+        return self._map[start:start + length]
+
+    def _search(self, section: int, record: struct.Struct, count: int, key: str) -> Optional[int]:
+        wanted = key.encode("utf-8")
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(section, record, middle) < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        if low < count and self._key(section, record, low) == wanted:
+            return low
+        return None
+
+    def _pooled(self, start: int, count: int) -> Iterator[int]:
+        for position in range(start, start + count):
+            yield _POOL.unpack_from(self._map, self._pool + position * _POOL.size)[0]
+
+    def technique_at(self, slot: int, details: bool = True) -> Dict[str, Any]:
+        fields = _TECHNIQUE.unpack_from(self._map, self._techniques + slot * _TECHNIQUE.size)
+        tactics = self._text(*fields[4:6])
+        technique = {
+            "id": self._text(*fields[0:2]),
+            "name": self._text(*fields[2:4]),
+            "tactics": tactics.split(",") if tactics else [],
+            "url": self._text(*fields[6:8])
+        }
+        if details:
+            technique["description"] = self._text(*fields[8:10])
+            technique["mitigations"] = [self.mitigation_at(index, details=False) for index in self._pooled(*fields[10:12])]
+        return technique
+
+    def mitigation_at(self, slot: int, details: bool = True) -> Dict[str, Any]:
+        fields = _MITIGATION.unpack_from(self._map, self._mitigations + slot * _MITIGATION.size)
+        mitigation = {"id": self._text(*fields[0:2]), "name": self._text(*fields[2:4])}
+        if details:
+            mitigation["url"] = self._text(*fields[4:6])
+            mitigation["description"] = self._text(*fields[6:8])
+            mitigation["techniques"] = [
+                self.technique_at(index, details=False)["id"] for index in self._pooled(*fields[8:10])
+            ]
+        return mitigation
+
+    def technique(self, technique_id: str) -> Optional[Dict[str, Any]]:
+        slot = self._search(self._techniques, _TECHNIQUE, self.counts["techniques"], technique_id)
+        return None if slot is None else self.technique_at(slot)
+
+    def mitigation(self, mitigation_id: str) -> Optional[Dict[str, Any]]:
+        slot = self._search(self._mitigations, _MITIGATION, self.counts["mitigations"], mitigation_id)
+        return None if slot is None else self.mitigation_at(slot)
+
+    def tactic_techniques(self, shortname: str) -> List[str]:
+        slot = self._search(self._tactics, _TACTIC, self.counts["tactics"], shortname)
+        if slot is None:
+            return []
+        fields = _TACTIC.unpack_from(self._map, self._tactics + slot * _TACTIC.size)
+        return [self.technique_at(index, details=False)["id"] for index in self._pooled(*fields[4:6])]
+
+    def tactics(self) -> List[Dict[str, str]]:
+        result = []
+        for slot in range(self.counts["tactics"]):
+            fields = _TACTIC.unpack_from(self._map, self._tactics + slot * _TACTIC.size)
+            result.append({"shortname": self._text(*fields[0:2]), "name": self._text(*fields[2:4])})
+        return result
+
+
+class AttackKnowledgeBase:
+    """ATT&CK lookups backed by the memory-mapped index, or by the rule file's technique table.
+
+    The index is opened on first use. If it is missing or older than the
+    STIX bundle next to it, it is rebuilt from the bundle first; with
+    neither available the bundled MITRE rule techniques are used, without
+    mitigations. Lookup results are memoised since scans ask about the
+    same few techniques over and over.
+    """
+
+    def __init__(self, index_path: Path, stix_path: Path, cache_size: int = 4096):
+        self.index_path = Path(index_path)
+        self.stix_path = Path(stix_path)
+        self.cache_size = cache_size
+        self._index: Optional[AttackIndex] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.error: Optional[str] = None
+
+    def _open(self) -> Optional[AttackIndex]:
+        if self._loaded:
+            return self._index
+        with self._lock:
+            if self._loaded:
+                return self._index
+            try:
+                stale = self.stix_path.exists() and (
+                    not self.index_path.exists()
+                    or self.index_path.stat().st_mtime < self.stix_path.stat().st_mtime
+                )
+                if stale:
+                    build_index(self.stix_path, self.index_path)
+                if self.index_path.exists():
+                    self._index = AttackIndex(self.index_path)
+            except (OSError, ValueError, KeyError, struct.error) as e:
+                self.error = str(e)
+                logger.warning("ATT&CK index unavailable, using built-in techniques: %s", e)
+            self._loaded = True
+            return self._index
+
+    @property
+    def source(self) -> str:
+        return "index" if self._open() is not None else "builtin"
+
+    def technique(self, technique_id: str) -> Optional[Dict[str, Any]]:
+        """Full technique record: name, parent-qualified full name, tactics, URL and mitigations"""
+        return copy.deepcopy(self._technique(technique_id))
+
+    def _technique(self, technique_id: str) -> Optional[Dict[str, Any]]:
+        if technique_id in self._cache:
+            return self._cache[technique_id]
+
+        index = self._open()
+        if index is not None:
+            technique = index.technique(technique_id)
+        else:
+            from .mitre_rules import rule_store
+            builtin = rule_store.rules.techniques.get(technique_id)
+            technique = None if builtin is None else {
+                "id": technique_id,
+                "name": builtin["name"],
+                "tactics": [tactic.lower().replace(" ", "-") for tactic in builtin.get("tactics", [])],
+                "url": "",
+                "description": builtin.get("description", ""),
+                "mitigations": []
+            }
+
+        if technique is not None:
+            technique["full_name"] = technique["name"]
+            if "." in technique_id:
+                parent = self._technique(technique_id.split(".", 1)[0])
+                if parent is not None:
+                    technique["full_name"] = f"{parent['name']}: {technique['name']}"
+
+        if len(self._cache) < self.cache_size:
+            self._cache[technique_id] = technique
+        return technique
+
+    def mitigation(self, mitigation_id: str) -> Optional[Dict[str, Any]]:
+        index = self._open()
+        return index.mitigation(mitigation_id) if index is not None else None
+
+    def techniques_for_tactic(self, tactic: str) -> List[str]:
+        """Technique IDs under a tactic, given its shortname ('lateral-movement') or name"""
+        shortname = tactic.strip().lower().replace(" ", "-")
+        index = self._open()
+        if index is not None:
+            return index.tactic_techniques(shortname)
+        from .mitre_rules import rule_store
+        return sorted(
+            technique_id for technique_id, technique in rule_store.rules.techniques.items()
+            if shortname in (name.lower().replace(" ", "-") for name in technique.get("tactics", []))
+        )
+
+    def enrich(self, finding: Dict[str, Any], key: str = "technique_id") -> Dict[str, Any]:
+        """Add full name, tactics, URL and mitigations to a finding that names a technique"""
+        technique = self._technique(finding.get(key, ""))
+        if technique is not None:
+            finding["technique_full_name"] = technique["full_name"]
+            finding["tactics"] = list(technique["tactics"])
+            finding["reference_url"] = technique["url"]
+            finding["mitigations"] = [dict(mitigation) for mitigation in technique["mitigations"]]
+        return finding
+
+    def describe(self, technique_ids: List[str]) -> List[Dict[str, Any]]:
+        """Short records (id, full name, tactics, mitigations) for a list of technique IDs"""
+        described = []
+        for technique_id in technique_ids:
+            technique = self._technique(technique_id)
+            if technique is None:
+                described.append({"id": technique_id, "name": None, "tactics": [], "mitigations": []})
+                continue
+            described.append({
+                "id": technique_id,
+                "name": technique["full_name"],
+                "tactics": list(technique["tactics"]),
+                "mitigations": [dict(mitigation) for mitigation in technique["mitigations"]]
+            })
+        return described
+
+    def get_stats(self) -> Dict[str, Any]:
+        index = self._open()
+        return {
+            "source": "index" if index is not None else "builtin",
+            "index_path": str(self.index_path),
+            "counts": dict(index.counts) if index is not None else {},
+            "cached_lookups": len(self._cache),
+            "error": self.error
+        }
+
+
+attack_kb = AttackKnowledgeBase(
+    Path(settings.ATTACK_INDEX_PATH) if settings.ATTACK_INDEX_PATH else DEFAULT_INDEX_PATH,
+    Path(settings.ATTACK_STIX_PATH) if settings.ATTACK_STIX_PATH else DEFAULT_STIX_PATH
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ATT&CK knowledge base")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Convert a STIX bundle into the binary index")
+    build.add_argument("--stix", default=str(attack_kb.stix_path))
+    build.add_argument("--output", default=str(attack_kb.index_path))
+    lookup = commands.add_parser("lookup", help="Look up a technique (T...), mitigation (M...) or tactic")
+    lookup.add_argument("key")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(json.dumps(build_index(Path(args.stix), Path(args.output))))
+    elif re.match(r"^M\d{4}$", args.key, re.IGNORECASE):
+        print(json.dumps(attack_kb.mitigation(args.key.upper()), indent=2))
+    elif re.match(r"^T\d{4}(\.\d{3})?$", args.key, re.IGNORECASE):
+        print(json.dumps(attack_kb.technique(args.key.upper()), indent=2))
+    else:
+        print(json.dumps(attack_kb.techniques_for_tactic(args.key), indent=2))
+
+
+if __name__ == "__main__":
+    main()
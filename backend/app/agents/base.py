@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Tuple
 from enum import Enum
 import uuid
+import socket
 from datetime import datetime
+from .resolver import resolver
+from .rate_limiter import rate_limiter
 
 class AgentType(Enum):
     WEB_CLASSIFIER = "web_classifier"
@@ -13,6 +16,10 @@ class BaseAgent(ABC):
     def __init__(self, agent_type: AgentType):
         self.agent_type = agent_type
         self.session_id = str(uuid.uuid4())
+        # Outbound probes and requests take tokens from this agent type's budget
+        self.rate_limit = rate_limiter.for_agent(agent_type.value)
+        # Optional async callable(result_type, data) that stores findings as they are made
+        self.result_sink = None
         # Remove engine_type parameter since it's no longer used
         
     @abstractmethod
@@ -25,6 +32,13 @@ class BaseAgent(ABC):
         """Execute the agent against the target"""
         pass
     
+    async def resolve_host(self, hostname: str) -> Dict[str, Any]:
+        """Resolve a hostname through the shared DNS cache"""
+        try:
+            return {"resolved_ip": await resolver.resolve(hostname)}
+        except (socket.gaierror, UnicodeError) as e:
+            return {"dns_error": str(e)}
+    
     def format_results(self, raw_results: Dict[str, Any]) -> Dict[str, Any]:
         """Format results with confidence scores and recommendations"""
         # Determine engine type based on agent type
@@ -42,6 +56,6 @@ class BaseAgent(ABC):
         }
     
     @abstractmethod
-    def _generate_recommendations(self, results: Dict[str, Any]) -> List[str]:
-        """Generate actionable recommendations based on results"""
+    def _generate_recommendations(self, results: Dict[str, Any]) -> Tuple[str, ...]:
+        """Ordered, deduplicated recommendation catalogue IDs for the results"""
         pass
\ No newline at end of file
@@ -0,0 +1,50 @@
+from typing import Dict, Any, Iterable, List, Tuple
+from urllib.parse import urlsplit
+
+# One run to queue: its TestRun id and the request the worker executes
+Run = Tuple[str, Dict[str, Any]]
+
+
+def host_key(target: str) -> str:
+    """The host a run sends its traffic to, so targets naming the same host share its limit"""
+    target = str(target).strip().lower()
+    if "://" in target:
+        target = urlsplit(target).hostname or target
+    elif target.startswith("[") and "]" in target:
+        target = target[1:target.index("]")]
+    elif target.count(":") == 1:
+        # host:port; a bare IPv6 address has several colons and is left whole
+        target = target.partition(":")[0]
+    return target.rstrip(".")
+
+
+def plan_lanes(runs: Iterable[Run], per_target: int = 2) -> List[List[Run]]:
+    """Split a batch into lanes: sequences of runs executed one after another.
+
+    Each host gets at most `per_target` lanes, so no more than that many
+    of its runs are queued or running at once however many targets or
+    agents the batch names for it. Lanes are returned interleaved across
+    hosts (every host's first lane, then every host's second lane), and a
+    lane's next run is queued behind everything already waiting when the
+    one before it finishes: a host with many runs takes its turn with the
+    others instead of filling the workers.
+    """
+    per_target = max(1, per_target)
+    by_host: Dict[str, List[List[Run]]] = {}
+    counts: Dict[str, int] = {}
+    for run in runs:
+        key = host_key(run[1]["target"])
+        lanes = by_host.setdefault(key, [])
+        index = counts.get(key, 0)
+        counts[key] = index + 1
+        # Round robin over the host's lanes, so its different agents start together
+        if len(lanes) < per_target:
+            lanes.append([run])
+        else:
+            lanes[index % per_target].append(run)
+    return [
+        host_lanes[position]
+        for position in range(per_target)
+        for host_lanes in by_host.values()
+        if position < len(host_lanes)
+    ]
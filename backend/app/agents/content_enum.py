@@ -0,0 +1,307 @@
+from typing import Dict, Any, Awaitable, Callable, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+from urllib.parse import quote, urlsplit, urlunsplit
+import asyncio
+import re
+import secrets
+import time
+
+import aiohttp
+
+from ..core.config import settings
+from .http_engine import HttpSession, BulkResponse
+from .run_registry import current_run
+from .web_checks import finding
+
+WORDLIST_DIR = Path(__file__).parent / "data" / "wordlists"
+DEFAULT_WORDLIST = "common.txt"
+
+# Statuses that mean the path exists in some form
+FOUND_STATUSES = frozenset({200, 201, 202, 203, 204, 206, 301, 302, 303, 307, 308, 401, 403, 405})
+# Statuses a target uses to tell clients to slow down
+THROTTLE_STATUSES = frozenset({429, 503})
+
+# Paths whose contents should never be served: VCS metadata, secrets, backups and dumps
+SENSITIVE_PATHS = re.compile("|".join((
+    r"(^|/)\.(git|svn|hg)(/|$)",
+    r"(^|/)\.(env|htpasswd|npmrc|bash_history|ssh|aws)",
+    r"(^|/)(wp-config|config|configuration|settings|local_settings|database)\.\w+",
+    r"(^|/)(phpinfo|info)\.php$",
+    r"(^|/)(server-status|server-info|elmah\.axd|trace\.axd)$",
+    r"(^|/)actuator/env$",
+    r"\.(bak|old|orig|swp|sql|key|pem)$",
+    r"(^|/)id_rsa$",
+    r"\.(zip|tar|tar\.gz|tgz|rar|7z)$",
+)), re.I)
+# Request IDs, timestamps and counters that make otherwise identical error pages differ
+_VOLATILE = re.compile(rb"[0-9a-fA-F]{8,}|\d+")
+# Stands in for the requested word in soft-404 templates
+_PLACEHOLDER = b"\x00"
+DIRECTORY_LISTING = re.compile(rb"<title>\s*(Index of /|Directory listing for /)", re.I)
+
+# Path characters left unescaped when building probe URLs
+_PATH_SAFE = "/:@!$&'()*+,;=-._~"
+
+Sink = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+def resolve_wordlist(name: Optional[str] = None) -> Path:
+    """A wordlist by file name, only ever from the configured wordlist directory"""
+    directory = Path(settings.CONTENT_WORDLIST_DIR) if settings.CONTENT_WORDLIST_DIR else WORDLIST_DIR
+    name = name or DEFAULT_WORDLIST
+    # Runs name a file, never a path, so they cannot read arbitrary server files
+    if Path(name).name != name or name.startswith("."):
+        raise ValueError(f"Invalid wordlist name: {name}")
+    path = directory / name
+    if not path.is_file():
+        raise ValueError(f"Unknown wordlist: {name}")
+    return path
+
+
+def iter_wordlist(path: Path, extensions: Iterable[str] = ()) -> Iterator[str]:
+    """Stream words from a wordlist file, a line at a time.
+
+    Blank lines and comments are skipped. Each extension is also tried on
+    entries that are neither directories nor already have one.
+    """
+    extensions = tuple(extension.lstrip(".") for extension in extensions if extension)
+    with open(path, encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            word = line.strip().lstrip("/")
+            if not word or word.startswith("#"):
+                continue
+            yield word
+            if extensions and not word.endswith("/") and "." not in word.rsplit("/", 1)[-1]:
+                for extension in extensions:
+                    yield f"{word}.{extension}"
+
+
+def wordlist_size(path: Path, extensions: Iterable[str] = ()) -> int:
+    """How many words iter_wordlist yields for the same arguments; one pass over the file"""
+    return sum(1 for _ in iter_wordlist(path, extensions))
+
+
+def shape_of(word: str) -> str:
+    """What a soft-404 baseline must look like to stand in for this word"""
+    if word.endswith("/"):
+        return "/"
+    name = word.rsplit("/", 1)[-1]
+    _, dot, extension = name[1:].rpartition(".")
+    return "." + extension.lower() if dot else ""
+
+
+class SoftNotFound:
+    """How a site answers paths that cannot exist.
+
+    Many sites answer unknown paths with 200, a redirect to a login page
+    or a blanket 403 instead of 404. For every path shape (bare, directory,
+    each extension) two random paths are requested and their answers kept
+    as templates, the random word replaced by a placeholder. A hit is a
+    soft 404 if it equals the template with its own word filled in, once
+    numbers and hex tokens are masked on both sides. Pages that still
+    differ between the two probes fall back to matching status and a body
+    length in the observed range.
+    """
+
+    def __init__(self, session: HttpSession, base_url: str, max_body: int = 65536):
+        self.session = session
+        self.base_url = base_url
+        self.max_body = max_body
+        self._baselines: Dict[str, "asyncio.Future[Optional[Tuple]]"] = {}
+        self.probes = 0
+
+    @staticmethod
+    def _template(response: BulkResponse, word: str) -> Tuple[bytes, bytes]:
+        location = response.headers.get("Location", "").encode()
+        return location.replace(word.encode(), _PLACEHOLDER), response.content.replace(word.encode(), _PLACEHOLDER)
+
+    @staticmethod
+    def _fill(template: bytes, word: str) -> bytes:
+        return _VOLATILE.sub(b"", template.replace(_PLACEHOLDER, word.encode()))
+
+    async def _calibrate(self, shape: str) -> Optional[Tuple]:
+        # Hex words survive quoting unchanged, so the echo is found verbatim
+        words = [secrets.token_hex(8) + shape for _ in range(2)]
+        responses = []
+        for word in words:
+            self.probes += 1
+            responses.append(await self.session.bulk_get(self.base_url + word, self.max_body))
+        first, second = responses
+        if first.status_code not in FOUND_STATUSES or first.status_code != second.status_code:
+            # Real 404s, or nothing stable to compare against
+            return None
+        templates = [self._template(response, word) for response, word in zip(responses, words)]
+        if [_VOLATILE.sub(b"", part) for part in templates[0]] == [_VOLATILE.sub(b"", part) for part in templates[1]]:
+            return ("template", first.status_code) + templates[0]
+        sizes = sorted(len(response.content) for response in responses)
+        tolerance = max(32, (sizes[1] - sizes[0]) * 2)
+        return "length", first.status_code, sizes[0] - tolerance, sizes[1] + tolerance
+
+    async def baseline(self, shape: str) -> Optional[Tuple]:
+        pending = self._baselines.get(shape)
+        if pending is None:
+            # Calibrated once per shape, by whichever worker needs it first
+            pending = self._baselines[shape] = asyncio.ensure_future(self._calibrate(shape))
+        return await asyncio.shield(pending)
+
+    async def matches(self, response: BulkResponse, word: str) -> bool:
+        baseline = await self.baseline(shape_of(word))
+        if baseline is None or response.status_code != baseline[1]:
+            return False
+        if baseline[0] == "length":
+            return baseline[2] <= len(response.content) <= baseline[3]
+        _, _, location, body = baseline
+        actual_location = _VOLATILE.sub(b"", response.headers.get("Location", "").encode())
+        actual_body = _VOLATILE.sub(b"", response.content)
+        # Servers echo the path either as sent or decoded
+        return any(
+            self._fill(location, echo) == actual_location and self._fill(body, echo) == actual_body
+            for echo in {quote(word, safe=_PATH_SAFE), word}
+        )
+
+
+class ContentEnumerator:
+    """Brute-force files and directories under a URL with a bounded worker pool.
+
+    Words are pulled lazily from an iterator shared by `concurrency`
+    workers, so wordlists of any size are never held in memory. Requests
+    go through the session's bulk pool and rate limit. A 429 or 503 makes
+    every worker back off (honouring Retry-After) and retry the word; after
+    `max_throttled` of them, or `max_errors` consecutive failures, the run
+    stops early and says why. Each hit is passed to `sink` as soon as it is
+    confirmed not to be a soft 404.
+    """
+
+    def __init__(self, session: HttpSession, url: str, concurrency: int = 10, max_throttled: int = 10,
+                 max_errors: int = 20, max_results: int = 500, max_body: int = 65536, max_backoff: float = 5.0):
+        parts = urlsplit(url)
+        # Words are resolved against the directory of the target URL
+        directory = parts.path[:parts.path.rfind("/") + 1] or "/"
+        self.base_url = urlunsplit((parts.scheme, parts.netloc, directory, "", ""))
+        self.session = session
+        self.concurrency = concurrency
+        self.max_throttled = max_throttled
+        self.max_errors = max_errors
+        self.max_results = max_results
+        self.max_body = max_body
+        self.max_backoff = max_backoff
+        self.soft_404 = SoftNotFound(session, self.base_url, max_body)
+
+    def _classify(self, response: BulkResponse, word: str, url: str) -> Optional[Dict[str, Any]]:
+        if response.status_code != 200:
+            return None
+        if DIRECTORY_LISTING.search(response.content[:4096]):
+            return finding("directory_listing", "Medium", "A05", "web.directory_listing", url,
+                           "Server returned an automatic directory index")
+        if SENSITIVE_PATHS.search(word):
+            return finding("sensitive_file_exposed", "High", "A05", "web.sensitive_files", url,
+                           f"{word} is publicly readable ({len(response.content)} bytes)")
+        return None
+
+    async def run(self, words: Iterable[str], sink: Optional[Sink] = None) -> Dict[str, Any]:
+        words = iter(words)
+        state = {
+            "requests": 0, "found": 0, "soft_404": 0, "throttled": 0, "errors": 0,
+            "consecutive_errors": 0, "resume_at": 0.0, "stopped": None
+        }
+        discovered: List[Dict[str, Any]] = []
+        reported = set()
+        findings: List[Dict[str, Any]] = []
+        progress = current_run()
+
+        async def fetch(word: str) -> Optional[BulkResponse]:
+            url = self.base_url + quote(word, safe=_PATH_SAFE)
+            while state["stopped"] is None:
+                delay = state["resume_at"] - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                state["requests"] += 1
+                try:
+                    response = await self.session.bulk_get(url, self.max_body)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    state["errors"] += 1
+                    state["consecutive_errors"] += 1
+                    if state["consecutive_errors"] >= self.max_errors:
+                        state["stopped"] = f"{self.max_errors} consecutive request errors"
+                    return None
+                state["consecutive_errors"] = 0
+                if response.status_code not in THROTTLE_STATUSES:
+                    return response
+                state["throttled"] += 1
+                if state["throttled"] >= self.max_throttled:
+                    state["stopped"] = f"rate limited by the target (HTTP {response.status_code})"
+                    return None
+                try:
+                    backoff = float(response.headers.get("Retry-After", ""))
+                except ValueError:
+                    backoff = 0.25 * 2 ** min(state["throttled"], 5)
+                state["resume_at"] = max(state["resume_at"], time.monotonic() + min(backoff, self.max_backoff))
+            return None
+
+        async def worker():
+            for word in words:
+                if state["stopped"] is not None:
+                    return
+                if progress.cancelled:
+                    state["stopped"] = "run cancelled"
+                    return
+                response = await fetch(word)
+                progress.advance()
+                if response is None or response.status_code not in FOUND_STATUSES:
+                    continue
+                try:
+                    soft_404 = await self.soft_404.matches(response, word)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    # No baseline for this shape, so the hit cannot be trusted
+                    state["errors"] += 1
+                    continue
+                if soft_404:
+                    state["soft_404"] += 1
+                    continue
+                if word in reported:
+                    # Wordlists often repeat entries; report each path once
+                    continue
+                reported.add(word)
+                state["found"] += 1
+                hit = {
+                    "path": "/" + word,
+                    "url": response.url,
+                    "status": response.status_code,
+                    "length": len(response.content),
+                }
+                if "Location" in response.headers:
+                    hit["location"] = response.headers["Location"]
+                issue = self._classify(response, word, response.url)
+                if issue is not None:
+                    findings.append(issue)
+                if len(discovered) < self.max_results:
+                    discovered.append(hit)
+                if sink is not None:
+                    await sink("content_discovery", hit)
+                    if issue is not None:
+                        await sink("vulnerability", issue)
+
+        started = time.perf_counter()
+        try:
+            await self.soft_404.baseline("")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return {"base_url": self.base_url, "error": f"Baseline request failed: {e or type(e).__name__}",
+                    "discovered": [], "findings": []}
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        return {
+            "base_url": self.base_url,
+            "requests": state["requests"],
+            "baseline_requests": self.soft_404.probes,
+            "found": state["found"],
+            "soft_404_filtered": state["soft_404"],
+            "throttled": state["throttled"],
+            "errors": state["errors"],
+            "stopped_early": state["stopped"],
+            "elapsed": round(elapsed, 3),
+            "requests_per_second": round(state["requests"] / elapsed, 1) if elapsed else 0.0,
+            "discovered": sorted(discovered, key=lambda hit: hit["path"]),
+            "truncated": state["found"] > len(discovered),
+            "findings": findings
+        }
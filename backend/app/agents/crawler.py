@@ -0,0 +1,442 @@
+from typing import Dict, Any, Deque, List, Optional, Tuple
+from collections import deque
+from functools import lru_cache
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode, quote
+import asyncio
+import codecs
+import re
+import time
+
+import aiohttp
+from lxml import etree
+
+from ..core.config import settings
+from .bloom import BloomFilter
+from .http_engine import HttpSession
+from .indicators import IndicatorSet
+from .run_registry import current_run
+from .web_checks import WebChecks
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Query parameters that only say where a visitor came from
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|msclkid|mc_[ce]id|_ga|ref_src)$", re.I)
+# Percent-escapes of unreserved characters are decoded (RFC 3986 section 6.2.2.2)
+_ESCAPE = re.compile(r"%([0-9a-fA-F]{2})")
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+_PATH_SAFE = "/:@!$&'()*+,;=-._~%"
+_UNSAFE_PATH = re.compile(r"[^A-Za-z0-9/:@!$&'()*+,;=\-._~%]")
+_SCHEME = re.compile(r"[a-zA-Z][a-zA-Z0-9+.\-]*:")
+
+# Element attributes that point at other documents
+LINK_ATTRIBUTES = {"a": "href", "area": "href", "link": "href", "iframe": "src", "frame": "src"}
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+CHUNK_SIZE = 16384
+# Per page, what the web checks get to see
+MAX_QUERY_LINKS = 50
+MAX_FORMS = 20
+
+
+def _normalise_escape(match: "re.Match") -> str:
+    character = chr(int(match.group(1), 16))
+    return character if character in _UNRESERVED else "%" + match.group(1).upper()
+
+
+def _remove_dot_segments(path: str) -> str:
+    output: List[str] = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(output) > 1:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+    result = "/".join(output)
+    if path.endswith(("/.", "/..")):
+        result += "/"
+    return result or "/"
+
+
+@lru_cache(maxsize=1024)
+def _origin(base: str) -> str:
+    parts = urlsplit(base)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _join(url: str, base: str) -> str:
+    # Links that are absolute or absolute paths (most of them) skip urljoin
+    if _SCHEME.match(url):
+        return url
+    if url.startswith("//"):
+        return base.split(":", 1)[0] + ":" + url
+    if url.startswith("/"):
+        return _origin(base) + url
+    return urljoin(base, url)
+
+
+def canonicalize(url: str, base: Optional[str] = None) -> Optional[str]:
+    """Normal form of an http(s) URL for deduplication; None for other schemes and malformed URLs.
+
+    Scheme and host are lowercased (IDNs to punycode), default ports,
+    credentials and fragments dropped, dot segments resolved, escapes
+    normalised, tracking parameters removed and the query sorted.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(_join(url, base) if base else url)
+        port = parts.port
+        scheme = parts.scheme.lower()
+        host = parts.hostname
+        if scheme not in DEFAULT_PORTS or not host:
+            return None
+        if not host.isascii():
+            host = host.encode("idna").decode("ascii")
+    except (ValueError, UnicodeError):
+        return None
+    if ":" in host:
+        host = f"[{host}]"
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+    path = parts.path
+    if "%" in path:
+        path = _ESCAPE.sub(_normalise_escape, path)
+    if _UNSAFE_PATH.search(path):
+        path = quote(path, safe=_PATH_SAFE)
+    if "." in path or not path:
+        path = _remove_dot_segments(path)
+    query = parts.query
+    if query:
+        query = urlencode(sorted(
+            (name, value) for name, value in parse_qsl(query, keep_blank_values=True)
+            if not TRACKING_PARAMS.match(name)
+        ))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def netloc_of(url: str) -> str:
+    """Host and port of a canonical URL"""
+    return url.split("/", 3)[2]
+
+
+def host_of(netloc: str) -> str:
+    return netloc[:netloc.index("]") + 1] if netloc.startswith("[") else netloc.rsplit(":", 1)[0]
+
+
+def _pull_parser(charset: Optional[str]) -> etree.HTMLPullParser:
+    """HTML pull parser for a page's declared charset.
+
+    libxml2 knows some charsets only by another alias ("latin-1" as
+    "iso8859-1"), so Python's canonical name is tried too; a charset
+    neither knows is ignored and the parser sniffs the encoding itself.
+    """
+    names = []
+    if charset:
+        names.append(charset)
+        try:
+            names.append(codecs.lookup(charset).name)
+        except LookupError:
+            pass
+    for name in names:
+        try:
+            return etree.HTMLPullParser(events=("start", "end"), encoding=name)
+        except LookupError:
+            continue
+    return etree.HTMLPullParser(events=("start", "end"))
+
+
+class Frontier:
+    """URLs waiting to be fetched: a FIFO per host, served round robin.
+
+    A host is never sent more than `per_host` requests at once, nor a new
+    request within `delay` seconds of the previous one, however many
+    workers are idle. `pop` returns None once nothing is queued or in
+    flight, or after `close`.
+    """
+
+    def __init__(self, per_host: int = 2, delay: float = 0.0):
+        self.per_host = per_host
+        self.delay = delay
+        self.queues: Dict[str, Deque[Tuple[str, int]]] = {}
+        self.hosts: Deque[str] = deque()
+        self.active: Dict[str, int] = {}
+        self.next_at: Dict[str, float] = {}
+        self.queued = 0
+        self.in_flight = 0
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    def push(self, url: str, depth: int, host: str):
+        queue = self.queues.get(host)
+        if queue is None:
+            queue = self.queues[host] = deque()
+            self.hosts.append(host)
+        queue.append((url, depth))
+        self.queued += 1
+        self._changed.set()
+
+    def _take(self, now: float) -> Tuple[Optional[Tuple[str, int, str]], Optional[float]]:
+        wake = None
+        for _ in range(len(self.hosts)):
+            host = self.hosts[0]
+            self.hosts.rotate(-1)
+            if self.active.get(host, 0) >= self.per_host:
+                continue
+            ready = self.next_at.get(host, 0.0)
+            if ready > now:
+                wake = ready if wake is None else min(wake, ready)
+                continue
+            queue = self.queues[host]
+            url, depth = queue.popleft()
+            self.queued -= 1
+            if not queue:
+                del self.queues[host]
+                self.hosts.remove(host)
+            self.active[host] = self.active.get(host, 0) + 1
+            self.next_at[host] = now + self.delay
+            self.in_flight += 1
+            return (url, depth, host), None
+        return None, wake
+
+    async def pop(self) -> Optional[Tuple[str, int, str]]:
+        while not self.closed:
+            now = time.monotonic()
+            item, wake = self._take(now)
+            if item is not None:
+                return item
+            if not self.queued and not self.in_flight:
+                return None
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), None if wake is None else wake - now)
+            except asyncio.TimeoutError:
+                pass
+        return None
+
+    def done(self, host: str):
+        self.active[host] -= 1
+        if not self.active[host]:
+            del self.active[host]
+        self.in_flight -= 1
+        self._changed.set()
+
+    def close(self):
+        self.closed = True
+        self._changed.set()
+
+
+class Crawler:
+    """Breadth-first crawl of a site feeding the web agents.
+
+    Pages are fetched through the session's bulk pool (so the run's rate
+    limit applies) and parsed incrementally with lxml's pull parser as
+    chunks arrive; links are queued while the rest of the page is still
+    downloading, and parsed elements are discarded so memory does not grow
+    with page size. Visited URLs are remembered in a Bloom filter sized
+    for the page budget, and links beyond the budget are dropped rather
+    than queued, so memory stays flat however many links a site has.
+    Redirect targets are followed at the same depth. Given an IndicatorSet,
+    each HTML body is also run through its content automaton chunk by chunk
+    as it is parsed, and the matches kept as the page's content_indicators.
+    """
+
+    def __init__(self, session: HttpSession, max_depth: int = 2, max_pages: int = 100,
+                 max_bytes: int = 20 * 2 ** 20, max_page_bytes: int = 2 * 2 ** 20, concurrency: int = 10,
+                 per_host: int = 2, delay: float = 0.0, include_subdomains: bool = False,
+                 error_rate: float = 1e-4, indicators: Optional[IndicatorSet] = None):
+        self.session = session
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.max_page_bytes = max_page_bytes
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.include_subdomains = include_subdomains
+        self.error_rate = error_rate
+        self.indicators = indicators
+
+    def _in_scope(self, host: str, scope: str) -> bool:
+        return host == scope or (self.include_subdomains and host.endswith("." + scope))
+
+    async def crawl(self, seed: str) -> Dict[str, Any]:
+        start = canonicalize(seed)
+        if start is None:
+            return {"seed": seed, "error": "Seed must be an http or https URL", "pages": []}
+        scope = host_of(netloc_of(start))
+        frontier = Frontier(self.per_host, self.delay)
+        seen = BloomFilter(self.max_pages + 1, self.error_rate)
+        pages: List[Dict[str, Any]] = []
+        stats = {
+            "links": 0, "duplicates": 0, "out_of_scope": 0, "over_budget": 0, "errors": 0,
+            "bytes": 0, "scheduled": 0, "stopped": None
+        }
+
+        def enqueue(url: Optional[str], depth: int):
+            if url is None or depth > self.max_depth:
+                return
+            netloc = netloc_of(url)
+            if not self._in_scope(host_of(netloc), scope):
+                stats["out_of_scope"] += 1
+                return
+            if stats["scheduled"] >= self.max_pages:
+                # Checked before the filter so URLs are only marked seen when they will be fetched
+                stats["over_budget"] += 1
+                return
+            if not seen.add(url):
+                stats["duplicates"] += 1
+                return
+            stats["scheduled"] += 1
+            frontier.push(url, depth, netloc)
+
+        async def fetch(url: str, depth: int) -> Dict[str, Any]:
+            page: Dict[str, Any] = {"url": url, "depth": depth, "bytes": 0}
+            async with self.session.bulk_stream(url) as response:
+                page["status"] = response.status
+                page["content_type"] = response.content_type
+                location = response.headers.get("Location")
+                if location and 300 <= response.status < 400:
+                    page["location"] = location
+                    enqueue(canonicalize(location, url), depth)
+                if response.status != 200 or response.content_type not in HTML_TYPES:
+                    return page
+                await self._parse(response, page, depth, enqueue, stats)
+            if stats["bytes"] >= self.max_bytes:
+                stats["stopped"] = "byte budget exhausted"
+                frontier.close()
+            return page
+
+        async def worker():
+            while True:
+                item = await frontier.pop()
+                if item is None:
+                    return
+                url, depth, host = item
+                try:
+                    pages.append(await fetch(url, depth))
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    stats["errors"] += 1
+                    pages.append({"url": url, "depth": depth, "error": str(e) or type(e).__name__})
+                finally:
+                    frontier.done(host)
+                    progress.advance()
+                if progress.cancelled and not frontier.closed:
+                    stats["stopped"] = "run cancelled"
+                    frontier.close()
+
+        # The page budget is the plan; a crawl that runs out of links settles for fewer pages
+        progress = current_run()
+        progress.add_total(self.max_pages)
+        started = time.perf_counter()
+        enqueue(start, 0)
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        if not progress.cancelled:
+            progress.add_total(len(pages) - self.max_pages)
+        if stats["stopped"] is None and stats["over_budget"]:
+            stats["stopped"] = "page budget exhausted"
+
+        return {
+            "seed": start,
+            "pages": pages,
+            "pages_fetched": len(pages),
+            "max_depth_reached": max((page["depth"] for page in pages), default=0),
+            "links_seen": stats["links"],
+            "duplicates": stats["duplicates"],
+            "out_of_scope": stats["out_of_scope"],
+            "over_budget": stats["over_budget"],
+            "errors": stats["errors"],
+            "bytes": stats["bytes"],
+            "stopped_early": stats["stopped"],
+            "elapsed": round(time.perf_counter() - started, 3),
+            "seen_filter": seen.get_stats()
+        }
+
+    async def _parse(self, response: aiohttp.ClientResponse, page: Dict[str, Any], depth: int, enqueue,
+                     stats: Dict[str, Any]):
+        """Feed the body to a pull parser chunk by chunk, queueing links as they are parsed"""
+        parser = _pull_parser(response.charset)
+        scanner = self.indicators.scanner("content") if self.indicators is not None else None
+        base = page["url"]
+        query_links: List[str] = []
+        forms: List[Dict[str, Any]] = []
+        in_form = 0
+        page["links"] = 0
+
+        def consume():
+            nonlocal base, in_form
+            for event, element in parser.read_events():
+                tag = element.tag
+                if not isinstance(tag, str):
+                    continue
+                if event == "start":
+                    if tag == "base" and element.get("href"):
+                        base = urljoin(page["url"], element.get("href"))
+                    elif tag == "form":
+                        in_form += 1
+                    attribute = LINK_ATTRIBUTES.get(tag)
+                    value = element.get(attribute) if attribute else None
+                    if value:
+                        stats["links"] += 1
+                        page["links"] += 1
+                        url = canonicalize(value, base)
+                        if url and "?" in url and len(query_links) < MAX_QUERY_LINKS:
+                            query_links.append(url)
+                        enqueue(url, depth + 1)
+                    continue
+                if tag == "title" and "title" not in page:
+                    page["title"] = (element.text or "").strip()[:200]
+                elif tag == "form":
+                    in_form -= 1
+                    action = urljoin(base, element.get("action") or "")
+                    if len(forms) < MAX_FORMS:
+                        forms.append({
+                            "method": (element.get("method") or "GET").upper(),
+                            "action": action,
+                            "params": WebChecks.form_fields(element)
+                        })
+                    stats["links"] += 1
+                    page["links"] += 1
+                    enqueue(canonicalize(action), depth + 1)
+                if not in_form:
+                    # Form fields are read when the form ends; everything else can go now
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            room = min(self.max_page_bytes - page["bytes"], self.max_bytes - stats["bytes"])
+            chunk = chunk[:room]
+            page["bytes"] += len(chunk)
+            stats["bytes"] += len(chunk)
+            parser.feed(chunk)
+            if scanner is not None:
+                scanner.feed(chunk)
+            consume()
+            if len(chunk) == room:
+                page["truncated"] = True
+                break
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        consume()
+        page["query_links"] = query_links
+        page["forms"] = forms
+        if scanner is not None:
+            page["content_indicators"] = scanner.matches()
+
+
+def crawler_from_options(session: HttpSession, options: Dict[str, Any],
+                         indicators: Optional[IndicatorSet] = None) -> Crawler:
+    """A Crawler with the budgets a run asked for, falling back to the configured defaults"""
+    try:
+        return Crawler(
+            session,
+            max_depth=max(0, int(options.get("max_depth", settings.CRAWL_MAX_DEPTH))),
+            max_pages=max(1, int(options.get("max_pages", settings.CRAWL_MAX_PAGES))),
+            max_bytes=max(1, int(options.get("max_bytes", settings.CRAWL_MAX_BYTES))),
+            max_page_bytes=max(1, int(options.get("max_page_bytes", settings.CRAWL_MAX_PAGE_BYTES))),
+            concurrency=max(1, int(options.get("crawl_concurrency", settings.CRAWL_CONCURRENCY))),
+            per_host=settings.CRAWL_PER_HOST,
+            delay=settings.CRAWL_DELAY,
+            include_subdomains=bool(options.get("include_subdomains", False)),
+            indicators=indicators
+        )
+    except (TypeError, ValueError):
+        raise ValueError("max_depth, max_pages, max_bytes, max_page_bytes and crawl_concurrency must be integers")
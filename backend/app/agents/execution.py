@@ -0,0 +1,254 @@
+from typing import Dict, Any, List, Optional
+import asyncio
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..core.database import session_scope
+from ..models.test_result import TestRun, TestResult
+from .factory import AgentFactory
+from .run_registry import RunTracker, current_run, run_registry
+
+# Statuses after which a run is never executed again
+FINISHED = ("completed", "failed", "cancelled")
+
+
+def load_previous_port_state(db: Session, target_id: str) -> Optional[Dict[str, Any]]:
+    """Return the port_state recorded by the last completed network scan of a target"""
+    row = (
+        db.query(TestResult.raw_data, TestRun.id)
+        .join(TestRun, TestResult.test_run_id == TestRun.id)
+        .filter(
+            TestRun.target_id == uuid.UUID(str(target_id)),
+            TestRun.agent_type == "network_scanner",
+            TestRun.status == "completed",
+            TestResult.result_type == "port_state"
+        )
+        .order_by(TestRun.completed_at.desc())
+        .first()
+    )
+    if row is None:
+        return None
+    raw_data, test_run_id = row
+    return {**raw_data, "test_run_id": str(test_run_id)}
+
+class ResultWriter:
+    """Buffers a run's TestResult rows and writes them with bulk INSERTs.
+
+    Rows are plain dicts inserted through one executemany per flush, which
+    SQLAlchemy sends as multi-row INSERT ... VALUES batches, instead of one
+    ORM object and round trip per row. Flushing does not commit: the caller
+    decides which flushes share a transaction.
+    """
+
+    def __init__(self, db: Session, test_run_id: str):
+        self.db = db
+        self.test_run_id = uuid.UUID(str(test_run_id))
+        self.rows: List[Dict[str, Any]] = []
+        self.written = 0
+
+    def add(self, result_type: str, severity: str, confidence: float, title: str, description: str,
+            raw_data: Dict[str, Any]):
+        self.rows.append({
+            "id": uuid.uuid4(),
+            "test_run_id": self.test_run_id,
+            "result_type": result_type,
+            "severity": severity,
+            "confidence_score": confidence,
+            "title": title[:255],
+            "description": description,
+            "raw_data": raw_data
+        })
+
+    @property
+    def pending(self) -> int:
+        return len(self.rows)
+
+    def flush(self):
+        if self.rows:
+            self.db.execute(insert(TestResult), self.rows)
+            self.written += len(self.rows)
+            self.rows = []
+
+
+class FindingStream:
+    """Agent result sink that stores findings as TestResult rows while the run is going.
+
+    Rows are bulk inserted and committed in batches of `batch_size`, or
+    once `interval` seconds have passed since the last commit, so long
+    runs show progress without a commit per finding.
+    """
+    
+    def __init__(self, db: Session, test_run_id: str, batch_size: int = 500, interval: float = 1.0):
+        self.writer = ResultWriter(db, test_run_id)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.last_commit = time.monotonic()
+    
+    async def __call__(self, result_type: str, data: Dict[str, Any]):
+        self.writer.add(
+            result_type,
+            severity=str(data.get("severity", "info")).lower(),
+            confidence=data.get("confidence", 0.8),
+            title=f"{result_type.replace('_', ' ').title()}: {data.get('path') or data.get('type', '')}",
+            description=data.get("evidence") or str(data),
+            raw_data=data
+        )
+        if self.writer.pending >= self.batch_size or time.monotonic() - self.last_commit >= self.interval:
+            self.flush()
+    
+    @property
+    def written(self) -> int:
+        return self.writer.written
+    
+    def flush(self):
+        if self.writer.pending:
+            self.writer.flush()
+            self.writer.db.commit()
+        self.last_commit = time.monotonic()
+
+def record_cancellation(writer: ResultWriter, tracker: RunTracker, forced: bool = False):
+    """Note how far a cancelled run got; what it found stays stored with it"""
+    tracker.state = "cancelled"
+    progress = tracker.snapshot()
+    writer.add(
+        "cancellation",
+        severity="info",
+        confidence=1.0,
+        title="Run Cancelled",
+        description=f"Stopped after {progress['done']} of {progress['total']} planned probes"
+                    + (", before it could wind down" if forced else ""),
+        raw_data={**progress, "forced": forced}
+    )
+
+
+async def execute_agent_background(test_run_id: str, agent_request: Dict[str, Any], db: Session):
+    """Execute agent in background"""
+    
+    # Progress and cancellation of this run (untracked outside run_agent)
+    tracker = current_run()
+    findings = None
+    try:
+        # Create agent (engine_type parameter removed since it's handled in factory)
+        agent = AgentFactory.create_agent(agent_request["agent_type"])
+        
+        if not agent:
+            raise Exception("Failed to create agent")
+        
+        # Findings made during the run are stored as they appear
+        findings = agent.result_sink = FindingStream(db, test_run_id)
+        
+        options = dict(agent_request.get("options", {}))
+        if agent_request["agent_type"] == "network_scanner":
+            # Baseline for incremental rescans and the port diff
+            options["previous_port_state"] = load_previous_port_state(db, agent_request["target_id"])
+        
+        # Execute agent
+        results = await agent.execute(
+            agent_request["target"],
+            options
+        )
+        
+        # Update test run; a cancelled run keeps the partial results its agent returned
+        test_run = db.query(TestRun).filter(TestRun.id == uuid.UUID(str(test_run_id))).first()
+        if test_run:
+            test_run.status = "cancelled" if tracker.cancelled else "completed"
+            test_run.completed_at = datetime.utcnow()
+            test_run.duration_seconds = int((test_run.completed_at - test_run.started_at).total_seconds())
+            
+            # Findings still buffered, the results and the status go in one transaction
+            writer = findings.writer
+            for result_type, result_data in results.get("results", {}).items():
+                # Scalars and lists (target, open_ports, ...) are stored wrapped
+                if not isinstance(result_data, dict):
+                    result_data = {"value": result_data}
+                writer.add(
+                    result_type,
+                    severity=result_data.get("severity", "info"),
+                    confidence=results.get("confidence_score", 0.0),
+                    title=f"{result_type.replace('_', ' ').title()} Result",
+                    description=str(result_data),
+                    raw_data=result_data
+                )
+            
+            # Recommendations are stored as catalogue IDs and rendered when read
+            recommendation_ids = list(results.get("recommendations", ()))
+            if recommendation_ids:
+                writer.add(
+                    "recommendations",
+                    severity="info",
+                    confidence=results.get("confidence_score", 0.0),
+                    title="Recommendations",
+                    description=f"{len(recommendation_ids)} recommendations",
+                    raw_data={"ids": recommendation_ids}
+                )
+            
+            if tracker.cancelled:
+                record_cancellation(writer, tracker)
+            
+            writer.flush()
+            db.commit()
+            tracker.state = test_run.status
+    
+    except asyncio.CancelledError:
+        # Stopped where it stood after the cancel grace period; any other cancellation propagates
+        if not tracker.cancelled:
+            raise
+        db.rollback()
+        test_run = db.query(TestRun).filter(TestRun.id == uuid.UUID(str(test_run_id))).first()
+        if test_run:
+            test_run.status = "cancelled"
+            test_run.completed_at = datetime.utcnow()
+            test_run.duration_seconds = int((test_run.completed_at - test_run.started_at).total_seconds())
+            # Findings streamed but not yet written are kept too
+            writer = findings.writer if findings is not None else ResultWriter(db, test_run_id)
+            record_cancellation(writer, tracker, forced=True)
+            writer.flush()
+            db.commit()
+            tracker.state = "cancelled"
+       
+    except Exception as e:
+        # Whatever was not committed is dropped, including a failed write
+        db.rollback()
+        test_run = db.query(TestRun).filter(TestRun.id == uuid.UUID(str(test_run_id))).first()
+        if test_run:
+            test_run.status = "failed"
+            test_run.completed_at = datetime.utcnow()
+            
+            # Create error result
+            error_result = TestResult(
+                test_run_id=test_run.id,
+                result_type="error",
+                severity="high",
+                confidence_score=1.0,
+                title="Agent Execution Error",
+                description=str(e),
+                raw_data={"error": str(e)}
+            )
+            db.add(error_result)
+            db.commit()
+            tracker.state = "failed"
+
+
+async def run_agent(test_run_id: str, agent_request: Dict[str, Any]):
+    """Execute a queued run with a database session of its own; what job queue workers call.
+
+    Queued jobs are acknowledged only once they finish, so a job whose
+    worker died is delivered again: a run already finished (or cancelled)
+    is skipped, and one left running has its partial findings cleared
+    before it starts over. The run registry publishes its progress and
+    passes on cancel requests while it executes.
+    """
+    with session_scope() as db:
+        test_run = db.query(TestRun).filter(TestRun.id == uuid.UUID(str(test_run_id))).first()
+        if test_run is None or test_run.status in FINISHED:
+            return
+        if test_run.status == "running":
+            db.query(TestResult).filter(TestResult.test_run_id == test_run.id).delete()
+        test_run.status = "running"
+        db.commit()
+        tracker = run_registry.track(str(test_run_id), agent_request["agent_type"])
+        await run_registry.supervise(tracker, execute_agent_background(test_run_id, agent_request, db))
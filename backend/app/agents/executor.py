@@ -0,0 +1,195 @@
+from typing import Dict, Any, Awaitable, Callable, Deque, List, Optional
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+# Wait and run times kept per pool for the percentiles in get_stats
+_TIMING_SAMPLES = 512
+
+
+class QueueFull(Exception):
+    """An agent type's pool already has as many runs waiting as it accepts"""
+
+
+class AgentPool:
+    """Runs of one agent type on a fixed number of worker threads, fed first come first served.
+
+    Each worker thread keeps its own event loop for the runs it executes,
+    so anything a run does that blocks (a synchronous database commit, a
+    long parse) holds up that one run only: not the API's loop and not the
+    other runs. HTTP connection pools, which belong to a loop, are reused
+    by the later runs on the same thread, and `on_close` (e.g. closing
+    those pools) is run on each thread's loop when the pool shuts down.
+    At most `max_queued` runs wait for a worker; past that submit raises
+    QueueFull.
+    """
+
+    def __init__(self, name: str, workers: int, max_queued: int = 1000,
+                 on_close: Optional[Callable[[], Awaitable[Any]]] = None):
+        self.name = name
+        self.workers = workers
+        self.max_queued = max_queued
+        self.on_close = on_close
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"agent-{name}")
+        self._local = threading.local()
+        self._loops: List[asyncio.AbstractEventLoop] = []
+        self._lock = threading.Lock()
+        # Run id -> (state, time it entered that state) while the run is queued or running
+        self._runs: Dict[str, Any] = {}
+        self._waits: Deque[float] = deque(maxlen=_TIMING_SAMPLES)
+        self._durations: Deque[float] = deque(maxlen=_TIMING_SAMPLES)
+        self.stats = {"queued": 0, "running": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def submit(self, run_id: str, run: Callable[[], Awaitable[Any]], admitted: bool = False) -> Future:
+        """Queue a run; `run` is called on a worker thread and its coroutine driven there.
+
+        An `admitted` run skips the queue limit: it was counted when the
+        batch it belongs to was accepted.
+        """
+        with self._lock:
+            if self.stats["queued"] >= self.max_queued and not admitted:
+                self.stats["rejected"] += 1
+                raise QueueFull(f"{self.stats['queued']} {self.name} runs are already waiting")
+            self.stats["queued"] += 1
+            self._runs[run_id] = ("queued", time.monotonic())
+        return self._executor.submit(self._work, run_id, run)
+
+    def _work(self, run_id: str, run: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.monotonic()
+        with self._lock:
+            _, queued_at = self._runs[run_id]
+            self._runs[run_id] = ("running", started)
+            self._waits.append(started - queued_at)
+            self.stats["queued"] -= 1
+            self.stats["running"] += 1
+        loop = getattr(self._local, "loop", None)
+        if loop is None:
+            loop = self._local.loop = asyncio.new_event_loop()
+            with self._lock:
+                self._loops.append(loop)
+        outcome = "failed"
+        try:
+            result = loop.run_until_complete(run())
+            outcome = "completed"
+            return result
+        finally:
+            with self._lock:
+                del self._runs[run_id]
+                self._durations.append(time.monotonic() - started)
+                self.stats["running"] -= 1
+                self.stats[outcome] += 1
+
+    @property
+    def room(self) -> int:
+        """Runs the pool accepts before submit raises QueueFull"""
+        with self._lock:
+            return max(0, self.max_queued - self.stats["queued"])
+
+    def run_info(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """State of a queued or running run and how long it has been in it; None once it is done"""
+        with self._lock:
+            entry = self._runs.get(run_id)
+            if entry is None:
+                return None
+            state, since = entry
+            info = {"pool": self.name, "state": state, "seconds": round(time.monotonic() - since, 3)}
+            if state == "queued":
+                info["ahead"] = sum(
+                    1 for other_state, other_since in self._runs.values()
+                    if other_state == "queued" and other_since < since
+                )
+            return info
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits, durations = np.array(self._waits), np.array(self._durations)
+            oldest = min((since for state, since in self._runs.values() if state == "queued"), default=None)
+            return {
+                "workers": self.workers,
+                **self.stats,
+                "max_queued": self.max_queued,
+                "oldest_queued_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+                "wait_p50": round(float(np.percentile(waits, 50)), 3) if len(waits) else 0.0,
+                "wait_p95": round(float(np.percentile(waits, 95)), 3) if len(waits) else 0.0,
+                "run_p50": round(float(np.percentile(durations, 50)), 3) if len(durations) else 0.0
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Drop queued runs and stop the workers; with `wait`, finish the running ones and close their loops"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        if not wait:
+            return
+        # The worker threads are gone, so their loops can be driven from here
+        with self._lock:
+            loops, self._loops = self._loops, []
+        for loop in loops:
+            try:
+                if self.on_close is not None:
+                    loop.run_until_complete(self.on_close())
+            finally:
+                loop.close()
+
+
+class AgentExecutor:
+    """One AgentPool per agent type, so a backlog of one kind of run never delays another.
+
+    Pools are created on first use with the worker count configured for
+    their agent type, or `default_workers`.
+    """
+
+    def __init__(self, workers: Dict[str, int], default_workers: int = 4, max_queued: int = 1000,
+                 on_close: Optional[Callable[[], Awaitable[Any]]] = None):
+        self.workers = workers
+        self.default_workers = default_workers
+        self.max_queued = max_queued
+        self.on_close = on_close
+        self._pools: Dict[str, AgentPool] = {}
+        self._pending: set = set()
+        self._lock = threading.Lock()
+
+    def pool(self, agent_type: str) -> AgentPool:
+        with self._lock:
+            pool = self._pools.get(agent_type)
+            if pool is None:
+                pool = self._pools[agent_type] = AgentPool(
+                    agent_type, self.workers.get(agent_type, self.default_workers), self.max_queued, self.on_close
+                )
+            return pool
+
+    def submit(self, agent_type: str, run_id: str, run: Callable[[], Awaitable[Any]],
+               admitted: bool = False) -> Future:
+        future = self.pool(agent_type).submit(run_id, run, admitted)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def run_info(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            pools = list(self._pools.values())
+        return next((info for info in (pool.run_info(run_id) for pool in pools) if info is not None), None)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted run is done; False if the timeout came first"""
+        with self._lock:
+            pending = list(self._pending)
+        return not wait(pending, timeout).not_done
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.shutdown(wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pools = dict(self._pools)
+        return {name: pool.get_stats() for name, pool in pools.items()}
@@ -0,0 +1,314 @@
+from typing import Dict, Any, AsyncIterator, Hashable, Optional, Tuple
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import asyncio
+import contextlib
+import importlib.util
+import time
+import weakref
+
+import aiohttp
+import httpx
+
+from ..core.config import settings
+from .rate_limiter import AgentRateLimit
+
+# HTTP/2 needs the optional h2 package (httpx[http2]); without it the pool speaks HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Methods whose responses a run may reuse
+_CACHEABLE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class BulkResponse:
+    """Status, headers and (possibly truncated) body of a bulk request"""
+
+    __slots__ = ("url", "status_code", "headers", "content")
+
+    def __init__(self, url: str, status_code: int, headers, content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+class _HostLimit:
+    """A host's request semaphore and how many requests hold or wait for it"""
+
+    __slots__ = ("semaphore", "users")
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0
+
+
+class HttpEngine:
+    """Shared async HTTP client for every web agent.
+
+    One httpx client per event loop holds keep-alive connection pools per
+    origin, negotiating HTTP/2 over TLS when h2 is installed, so checks
+    against the same site reuse connections instead of handshaking for
+    every request. A semaphore per host caps how many requests any one
+    site sees at once; they are kept in a bounded LRU, and past `max_hosts`
+    the least recently used idle ones are dropped. Runs talk to the engine through an HttpSession,
+    which adds rate limiting and a per-run response cache.
+
+    High-volume probing such as content enumeration goes through a
+    separate aiohttp pool instead (`bulk_request`): httpx's pure-Python
+    HTTP/1.1 parser tops out around 500 requests/s on one core, while
+    aiohttp's C parser manages about ten times that. That pool has its
+    own per-host connection limit of the same size.
+
+    Certificates are not verified here: pentests must reach sites with
+    broken TLS, and the TLS check reports certificate problems itself.
+    """
+
+    def __init__(self, max_connections: int = 100, max_per_host: int = 10, timeout: float = 10.0,
+                 keepalive_expiry: float = 30.0, user_agent: str = "Cyber-Agent/1.0", http2: bool = True,
+                 max_hosts: int = 4096):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.max_hosts = max_hosts
+        self.timeout = timeout
+        self.keepalive_expiry = keepalive_expiry
+        self.user_agent = user_agent
+        self.http2 = http2 and HTTP2_AVAILABLE
+        # Clients and semaphores belong to the loop they were created on
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._host_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OrderedDict[str, _HostLimit]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._bulk_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.stats = {"requests": 0, "bulk_requests": 0, "errors": 0, "clients": 0, "http_versions": {}}
+
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._clients[loop] = httpx.AsyncClient(
+                http2=self.http2,
+                verify=False,
+                follow_redirects=False,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                headers={"User-Agent": self.user_agent}
+            )
+            self.stats["clients"] += 1
+        return client
+
+    def bulk_client(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        client = self._bulk_clients.get(loop)
+        if client is None or client.closed:
+            client = self._bulk_clients[loop] = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections, limit_per_host=self.max_per_host, ssl=False,
+                    keepalive_timeout=self.keepalive_expiry
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": self.user_agent}
+            )
+            self.stats["clients"] += 1
+        return client
+
+    @contextlib.asynccontextmanager
+    async def host_limit(self, host: str) -> AsyncIterator[None]:
+        """Hold one of the host's `max_per_host` request slots"""
+        loop = asyncio.get_running_loop()
+        limits = self._host_limits.get(loop)
+        if limits is None:
+            limits = self._host_limits[loop] = OrderedDict()
+        limit = limits.get(host)
+        if limit is None:
+            limit = limits[host] = _HostLimit(self.max_per_host)
+        else:
+            limits.move_to_end(host)
+        limit.users += 1
+        if len(limits) > self.max_hosts:
+            self._evict_idle(limits)
+        try:
+            async with limit.semaphore:
+                yield
+        finally:
+            limit.users -= 1
+
+    def _evict_idle(self, limits: "OrderedDict[str, _HostLimit]"):
+        # Oldest first; busy hosts keep their semaphore, so the table may run over until they finish
+        excess = len(limits) - self.max_hosts
+        idle = []
+        for host, limit in limits.items():
+            if len(idle) == excess:
+                break
+            if not limit.users:
+                idle.append(host)
+        for host in idle:
+            del limits[host]
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send one request through the pool and read its body"""
+        host = urlsplit(url).hostname or ""
+        async with self.host_limit(host):
+            self.stats["requests"] += 1
+            try:
+                response = await self.client().request(method, url, **kwargs)
+            except httpx.HTTPError:
+                self.stats["errors"] += 1
+                raise
+        versions = self.stats["http_versions"]
+        versions[response.http_version] = versions.get(response.http_version, 0) + 1
+        return response
+
+    @contextlib.asynccontextmanager
+    async def bulk_stream(self, method: str, url: str, **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Send one request through the aiohttp pool and hand over the response unread"""
+        self.stats["bulk_requests"] += 1
+        try:
+            async with self.bulk_client().request(method, url, allow_redirects=False, **kwargs) as response:
+                yield response
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.stats["errors"] += 1
+            raise
+
+    async def bulk_request(self, method: str, url: str, max_body: int = 65536, **kwargs) -> BulkResponse:
+        """Send one request through the aiohttp pool, reading at most max_body bytes of the body"""
+        async with self.bulk_stream(method, url, **kwargs) as response:
+            return BulkResponse(url, response.status, response.headers, await response.content.read(max_body))
+
+    def session(self, rate_limit: Optional[AgentRateLimit] = None) -> "HttpSession":
+        return HttpSession(self, rate_limit)
+
+    async def aclose(self):
+        """Close the clients of the running loop, e.g. on application shutdown"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+        bulk_client = self._bulk_clients.pop(loop, None)
+        if bulk_client is not None:
+            await bulk_client.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "http_versions": dict(self.stats["http_versions"]),
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_per_host": self.max_per_host
+        }
+
+
+class HttpSession:
+    """One run's view of the HttpEngine: rate limited, with a response cache.
+
+    GET, HEAD and OPTIONS responses are kept for the whole run, keyed by
+    method, URL and the headers the caller set, so a page that several
+    checks need is fetched once. A request that is already in flight is
+    joined rather than sent again. Failed requests are not cached.
+    """
+
+    def __init__(self, engine: HttpEngine, rate_limit: Optional[AgentRateLimit] = None):
+        self.engine = engine
+        self.rate_limit = rate_limit
+        self._responses: Dict[Hashable, "asyncio.Future[httpx.Response]"] = {}
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "errors": 0, "elapsed": 0.0}
+
+    @staticmethod
+    def _key(method: str, url: str, kwargs: Dict[str, Any]) -> Optional[Tuple]:
+        if method not in _CACHEABLE_METHODS or set(kwargs) - {"headers", "params"}:
+            return None
+        headers = tuple(sorted((name.lower(), value) for name, value in (kwargs.get("headers") or {}).items()))
+        params = tuple(sorted((kwargs.get("params") or {}).items()))
+        return method, url, headers, params
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        method = method.upper()
+        key = self._key(method, url, kwargs)
+        if key is not None:
+            pending = self._responses.get(key)
+            if pending is not None:
+                self.stats["cache_hits" if pending.done() else "coalesced"] += 1
+                return await asyncio.shield(pending)
+            pending = self._responses[key] = asyncio.get_running_loop().create_future()
+
+        try:
+            response = await self._send(method, url, kwargs)
+        except BaseException as e:
+            if key is not None:
+                # Waiters see the failure; the next caller retries
+                del self._responses[key]
+                if isinstance(e, Exception):
+                    pending.set_exception(e)
+                    # Nobody may be waiting, so mark the exception retrieved
+                    pending.exception()
+                else:
+                    pending.cancel()
+            raise
+        if key is not None:
+            pending.set_result(response)
+        return response
+
+    async def _send(self, method: str, url: str, kwargs: Dict[str, Any]) -> httpx.Response:
+        if self.rate_limit is not None:
+            await self.rate_limit.acquire(urlsplit(url).hostname or "")
+        self.stats["requests"] += 1
+        started = time.perf_counter()
+        try:
+            return await self.engine.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["elapsed"] += time.perf_counter() - started
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def bulk_get(self, url: str, max_body: int = 65536) -> BulkResponse:
+        """Rate-limited GET through the bulk pool; never cached, for probing many distinct URLs"""
+        if self.rate_limit is not None:
+            await self.rate_limit.acquire(urlsplit(url).hostname or "")
+        self.stats["requests"] += 1
+        try:
+            return await self.engine.bulk_request("GET", url, max_body)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.stats["errors"] += 1
+            raise
+
+    @contextlib.asynccontextmanager
+    async def bulk_stream(self, url: str) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Rate-limited GET through the bulk pool whose body the caller reads, e.g. chunk by chunk"""
+        if self.rate_limit is not None:
+            await self.rate_limit.acquire(urlsplit(url).hostname or "")
+        self.stats["requests"] += 1
+        try:
+            async with self.engine.bulk_stream("GET", url) as response:
+                yield response
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.stats["errors"] += 1
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "elapsed": round(self.stats["elapsed"], 3)}
+
+
+def engine_from_settings() -> HttpEngine:
+    return HttpEngine(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_per_host=settings.HTTP_MAX_PER_HOST,
+        timeout=settings.HTTP_TIMEOUT,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        user_agent=settings.HTTP_USER_AGENT,
+        http2=settings.HTTP_HTTP2
+    )
+
+
+# Shared by every web agent in the process
+http_engine = engine_from_settings()
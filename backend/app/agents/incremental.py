@@ -0,0 +1,103 @@
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from .port_spec import PortSet, TOP_PORTS
+
+SCAN_MODE_FULL = "full"
+SCAN_MODE_INCREMENTAL = "incremental"
+
+# Defaults sized for hourly monitoring: each incremental cycle probes the
+# previously open ports, the top ports and 1/24th of the remaining range,
+# and a full sweep runs once a day
+DEFAULT_SAMPLE_STRIDE = 24
+DEFAULT_FULL_SCAN_INTERVAL = 24
+
+
+def plan_incremental_scan(ports: PortSet, previous_state: Optional[Dict[str, Any]], incremental: bool = True,
+                          sample_stride: int = DEFAULT_SAMPLE_STRIDE,
+                          full_scan_interval: int = DEFAULT_FULL_SCAN_INTERVAL) -> Tuple[PortSet, Dict[str, Any]]:
+    """Choose the ports to probe this cycle from the last run's port state.
+
+    Falls back to the full port set when there is no usable baseline (no
+    previous run, or one taken over a different port spec) and when the
+    full-scan interval is due. Otherwise the plan is the previously open
+    ports plus the most common ports, plus a rotating slice of the rest:
+    cycle n probes the ports congruent to n modulo `sample_stride`, so
+    every port is revisited within `sample_stride` cycles.
+    """
+    if sample_stride < 1 or full_scan_interval < 1:
+        raise ValueError("sample_stride and full_scan_interval must be positive")
+
+    cycle = previous_state.get("cycle", 0) + 1 if previous_state else 0
+    plan_info = {"cycle": cycle, "baseline_spec": previous_state.get("port_spec") if previous_state else None}
+
+    if not incremental:
+        return ports, {**plan_info, "scan_mode": SCAN_MODE_FULL, "reason": "full scan requested",
+                       "runs_since_full": 0}
+    if not previous_state:
+        return ports, {**plan_info, "scan_mode": SCAN_MODE_FULL, "reason": "no previous port state",
+                       "runs_since_full": 0}
+    if previous_state.get("port_spec") != ports.to_spec():
+        return ports, {**plan_info, "scan_mode": SCAN_MODE_FULL, "reason": "port specification changed",
+                       "runs_since_full": 0}
+
+    runs_since_full = previous_state.get("runs_since_full", 0) + 1
+    if runs_since_full >= full_scan_interval:
+        return ports, {**plan_info, "scan_mode": SCAN_MODE_FULL, "reason": "scheduled full sweep",
+                       "runs_since_full": 0}
+
+    previous_open = {port for host_ports in previous_state.get("hosts", {}).values() for port in host_ports}
+    plan = PortSet(port for port in previous_open if port in ports)
+    for port in TOP_PORTS:
+        if port in ports:
+            plan.add(port)
+    slice_index = cycle % sample_stride
+    for port in ports:
+        if port % sample_stride == slice_index:
+            plan.add(port)
+
+    return plan, {**plan_info, "scan_mode": SCAN_MODE_INCREMENTAL, "reason": "baseline available",
+                  "runs_since_full": runs_since_full, "sample_slice": f"{slice_index}/{sample_stride}"}
+
+
+def diff_port_states(previous_hosts: Dict[str, List[int]], current_hosts: Dict[str, List[int]],
+                     scanned: PortSet) -> Dict[str, Any]:
+    """Compare per-host open ports with the baseline.
+
+    A port only counts as closed if it was probed this cycle; hosts that
+    were not assessed at all (down, or dropped from the target list) are
+    listed separately rather than having all their ports reported closed.
+    """
+    opened: Dict[str, List[int]] = {}
+    closed: Dict[str, List[int]] = {}
+    for host, ports in current_hosts.items():
+        before = set(previous_hosts.get(host, ()))
+        now = set(ports)
+        if now - before:
+            opened[host] = sorted(now - before)
+        gone = [port for port in before - now if port in scanned]
+        if gone:
+            closed[host] = sorted(gone)
+
+    return {
+        "opened": opened,
+        "closed": closed,
+        "new_hosts": sorted(set(current_hosts) - set(previous_hosts)),
+        "missing_hosts": sorted(set(previous_hosts) - set(current_hosts)),
+        "ports_opened": sum(len(ports) for ports in opened.values()),
+        "ports_closed": sum(len(ports) for ports in closed.values())
+    }
+
+
+def build_port_state(port_spec: str, hosts: Dict[str, Iterable[int]], plan_info: Dict[str, Any],
+                     probed: int) -> Dict[str, Any]:
+    """The port_state result persisted with each run and used as the next run's baseline"""
+    return {
+        "severity": "info",
+        "port_spec": port_spec,
+        "hosts": {host: sorted(ports) for host, ports in hosts.items()},
+        "scan_mode": plan_info["scan_mode"],
+        "reason": plan_info["reason"],
+        "cycle": plan_info["cycle"],
+        "runs_since_full": plan_info["runs_since_full"],
+        "ports_probed_per_host": probed
+    }
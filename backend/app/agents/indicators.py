@@ -0,0 +1,123 @@
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from pathlib import Path
+import json
+
+from ..core.config import settings
+from .aho_corasick import AhoCorasick, StreamScanner, Text
+
+# Bundled indicator file; INDICATORS_PATH points the agents at a different one
+DEFAULT_INDICATORS_PATH = Path(__file__).parent / "data" / "indicators.json"
+
+# What a group's patterns are matched against: URLs, fetched page bodies, or
+# finding text such as vulnerability descriptions
+SCOPES = ("url", "content", "text")
+
+# Found indicators: group -> pattern -> occurrences
+Matches = Dict[str, Dict[str, int]]
+
+
+class IndicatorScanner:
+    """Indicator matches over a body that arrives in chunks"""
+
+    __slots__ = ("_scanner", "_groups")
+
+    def __init__(self, scanner: StreamScanner, groups: List[Tuple[str, ...]]):
+        self._scanner = scanner
+        self._groups = groups
+
+    def feed(self, chunk: Text):
+        self._scanner.feed(chunk)
+
+    def matches(self) -> Matches:
+        return _grouped(self._scanner.automaton, self._groups, self._scanner.counts())
+
+
+def _grouped(automaton: AhoCorasick, groups: List[Tuple[str, ...]], counts: Dict[int, int]) -> Matches:
+    found: Matches = {}
+    for index, count in counts.items():
+        for group in groups[index]:
+            found.setdefault(group, {})[automaton.patterns[index]] = count
+    return found
+
+
+class IndicatorSet:
+    """Named groups of indicator strings, compiled into one automaton per scope.
+
+    Every pattern of every group in a scope goes into the same automaton,
+    so a URL or page body is scanned once however many indicators there
+    are; a pattern listed by several groups is matched once and reported
+    under each. Matching ignores ASCII case.
+    """
+
+    def __init__(self, indicators: Dict[str, Any]):
+        self.version = indicators.get("version", 1)
+        self.groups: Dict[str, Tuple[str, ...]] = {}
+        self.weights: Dict[str, float] = {}
+        by_scope: Dict[str, Dict[str, List[str]]] = {scope: {} for scope in SCOPES}
+        for name, group in indicators.get("groups", {}).items():
+            scopes = group.get("scopes", ["text"])
+            unknown = [scope for scope in scopes if scope not in SCOPES]
+            if unknown:
+                raise ValueError(f"Indicator group {name} has unknown scopes {', '.join(unknown)}")
+            patterns = tuple(group.get("patterns", ()))
+            if not all(isinstance(pattern, str) and pattern for pattern in patterns):
+                raise ValueError(f"Indicator group {name} has empty or non-string patterns")
+            self.groups[name] = patterns
+            self.weights[name] = float(group.get("weight", 0.0))
+            for scope in scopes:
+                for pattern in patterns:
+                    owners = by_scope[scope].setdefault(pattern.lower(), [])
+                    if name not in owners:
+                        owners.append(name)
+
+        self._scopes: Dict[str, Tuple[AhoCorasick, List[Tuple[str, ...]]]] = {
+            scope: (AhoCorasick(patterns), [tuple(owners) for owners in patterns.values()])
+            for scope, patterns in by_scope.items() if patterns
+        }
+
+    @classmethod
+    def load(cls, path: Path) -> "IndicatorSet":
+        with open(path, encoding="utf-8") as handle:
+            return cls(json.load(handle))
+
+    def scan(self, text: Text, scope: str) -> Matches:
+        """Every indicator of the scope found in the text, with its number of occurrences"""
+        compiled = self._scopes.get(scope)
+        if compiled is None:
+            return {}
+        automaton, groups = compiled
+        return _grouped(automaton, groups, automaton.counts(text))
+
+    def find(self, text: Text, scope: str) -> Iterator[Tuple[int, str, str]]:
+        """(start byte offset, group, pattern) of every indicator occurrence in the text"""
+        compiled = self._scopes.get(scope)
+        if compiled is None:
+            return
+        automaton, groups = compiled
+        for start, index in automaton.finditer(text):
+            for group in groups[index]:
+                yield start, group, automaton.patterns[index]
+
+    def scanner(self, scope: str) -> Optional[IndicatorScanner]:
+        """A streaming scan of the scope's indicators, or None if the scope has none"""
+        compiled = self._scopes.get(scope)
+        if compiled is None:
+            return None
+        automaton, groups = compiled
+        return IndicatorScanner(automaton.scanner(), groups)
+
+    def score(self, matches: Matches) -> float:
+        """Summed weight of the groups that matched"""
+        return sum(self.weights.get(group, 0.0) for group in matches)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "groups": {name: len(patterns) for name, patterns in self.groups.items()},
+            "automaton_states": {scope: automaton.states for scope, (automaton, _) in self._scopes.items()}
+        }
+
+
+indicators = IndicatorSet.load(
+    Path(settings.INDICATORS_PATH) if settings.INDICATORS_PATH else DEFAULT_INDICATORS_PATH
+)
@@ -0,0 +1,249 @@
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+from collections import Counter
+from concurrent.futures import Future
+import asyncio
+import logging
+import threading
+import time
+
+from celery import Celery, chain
+from celery.signals import worker_process_shutdown, worker_shutdown
+
+from ..core.config import settings
+from .batch import Run
+from .execution import run_agent
+from .executor import AgentExecutor, QueueFull
+from .http_engine import http_engine
+
+logger = logging.getLogger(__name__)
+
+# Executes one run given its TestRun id and the /agents/execute request
+Runner = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+def queue_name(agent_type: str) -> str:
+    """Queue the runs of an agent type go to, so workers can be dedicated to and sized for each type"""
+    return f"agents.{agent_type}"
+
+
+def make_celery(broker_url: str) -> Celery:
+    app = Celery("cyber_agent", broker=broker_url)
+    app.conf.update(
+        # A run is acknowledged when it finishes rather than when a worker takes
+        # it, so the run of a worker that dies goes back on its queue
+        task_acks_late=True,
+        task_reject_on_worker_lost=True,
+        # Scans are long: a worker reserving several would hold them back from idle workers
+        worker_prefetch_multiplier=settings.JOB_PREFETCH,
+        # Runs report through the database, not a result backend
+        task_ignore_result=True,
+        task_serializer="json",
+        accept_content=["json"],
+        task_default_queue=queue_name("default"),
+        broker_transport_options={"visibility_timeout": settings.JOB_VISIBILITY_TIMEOUT},
+        broker_connection_retry_on_startup=True
+    )
+    return app
+
+
+celery_app = make_celery(settings.JOB_BROKER_URL or settings.REDIS_URL)
+
+# Each worker process (or thread, with --pool threads) keeps one event loop across
+# tasks, so the HTTP connection pools and caches bound to it are reused from run to run
+_worker = threading.local()
+_worker_loops: List[asyncio.AbstractEventLoop] = []
+
+
+@celery_app.task(name="agents.run")
+def run_agent_task(test_run_id: str, agent_request: Dict[str, Any]):
+    loop = getattr(_worker, "loop", None)
+    if loop is None:
+        loop = _worker.loop = asyncio.new_event_loop()
+        _worker_loops.append(loop)
+    loop.run_until_complete(run_agent(test_run_id, agent_request))
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_worker_loops(**kwargs):
+    """Close the HTTP pools of each worker loop, then the loop, as the worker stops"""
+    while _worker_loops:
+        loop = _worker_loops.pop()
+        try:
+            loop.run_until_complete(http_engine.aclose())
+        finally:
+            loop.close()
+
+
+class CeleryBackend:
+    """Runs sent to Celery workers through the broker, one queue per agent type.
+
+    Start workers for the queues they should serve, on any node that can
+    reach the broker and the database, e.g.
+        celery -A app.agents.job_queue worker -Q agents.network_scanner --concurrency 4
+    """
+
+    name = "celery"
+
+    def __init__(self, app: Celery):
+        self.app = app
+        self.submitted: Dict[str, int] = {}
+
+    def shutdown(self):
+        # Runs execute in the worker processes, which close their own loops
+        pass
+
+    def submit(self, test_run_id: str, agent_request: Dict[str, Any]) -> str:
+        queue = queue_name(agent_request["agent_type"])
+        run_agent_task.apply_async((test_run_id, agent_request), queue=queue, task_id=test_run_id)
+        self.submitted[queue] = self.submitted.get(queue, 0) + 1
+        return queue
+
+    def submit_lanes(self, lanes: List[List[Run]]) -> Dict[str, int]:
+        """Queue a batch's lanes (see batch.plan_lanes), each as a chain of tasks.
+
+        Only a lane's first run is sent now; the worker finishing a run
+        sends the next, to the back of that run's queue. A run that raises
+        outside its agent (run_agent records agent failures itself) ends
+        its chain, and the lane's later runs stay queued.
+        """
+        queues: Counter = Counter()
+        for lane in lanes:
+            signatures = []
+            for test_run_id, agent_request in lane:
+                queue = queue_name(agent_request["agent_type"])
+                signatures.append(run_agent_task.signature(
+                    (test_run_id, agent_request), queue=queue, task_id=test_run_id, immutable=True
+                ))
+                queues[queue] += 1
+            chain(*signatures).apply_async()
+        for queue, count in queues.items():
+            self.submitted[queue] = self.submitted.get(queue, 0) + count
+        return dict(queues)
+
+    def run_info(self, test_run_id: str) -> Optional[Dict[str, Any]]:
+        # The broker does not say where a message is in its queue
+        return None
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Runs waiting on each queue this process has sent to, as the broker counts them"""
+        depths = {}
+        with self.app.connection_for_read() as connection:
+            connection.ensure_connection(max_retries=0, timeout=1)
+            for queue in self.submitted:
+                depths[queue] = connection.default_channel.queue_declare(queue=queue, passive=True).message_count
+        return depths
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"backend": self.name, "submitted": dict(self.submitted)}
+        try:
+            stats["queued"] = self.queue_depths()
+        except Exception as e:
+            stats["broker_error"] = str(e) or type(e).__name__
+        return stats
+
+
+class LocalBackend:
+    """In-process stand-in for the Celery workers, for development and tests.
+
+    Runs execute on an AgentExecutor: a pool of worker threads per agent
+    type, each thread with its own event loop, so neither the API's loop
+    nor the other runs wait on a run's blocking work. Queued runs are lost
+    if the process exits, which is what the celery backend is for.
+    """
+
+    name = "local"
+
+    def __init__(self, concurrency: Dict[str, int], default_concurrency: int = 4, max_queued: int = 1000,
+                 runner: Optional[Runner] = None):
+        # Each worker thread's loop holds its own HTTP pools, closed with the executor
+        self.executor = AgentExecutor(concurrency, default_concurrency, max_queued, on_close=http_engine.aclose)
+        self.runner = runner or run_agent
+        # Batch lanes with runs still to finish
+        self._open_lanes = 0
+        self._lanes_done = threading.Condition()
+
+    def submit(self, test_run_id: str, agent_request: Dict[str, Any]) -> str:
+        """Queue a run on its agent type's pool; raises QueueFull if too many are already waiting"""
+        agent_type = agent_request["agent_type"]
+        future = self.executor.submit(agent_type, test_run_id, lambda: self.runner(test_run_id, agent_request))
+        future.add_done_callback(lambda done: self._report(test_run_id, agent_type, done))
+        return queue_name(agent_type)
+
+    def submit_lanes(self, lanes: List[List[Run]]) -> Dict[str, int]:
+        """Queue a batch's lanes (see batch.plan_lanes); each lane's next run is queued as one finishes.
+
+        Raises QueueFull, before queueing anything, if a pool has no room
+        for the first runs of the lanes. The runs that follow take the
+        place of a finished one from the same lane and skip the limit.
+        """
+        first_runs = Counter(lane[0][1]["agent_type"] for lane in lanes if lane)
+        for agent_type, count in first_runs.items():
+            room = self.executor.pool(agent_type).room
+            if room < count:
+                raise QueueFull(f"{queue_name(agent_type)} has room for {room} more runs, the batch needs {count}")
+        with self._lanes_done:
+            self._open_lanes += sum(1 for lane in lanes if lane)
+        for lane in lanes:
+            if lane:
+                self._submit_lane(lane, 0)
+        return dict(Counter(queue_name(agent_request["agent_type"]) for lane in lanes for _, agent_request in lane))
+
+    def _submit_lane(self, lane: List[Run], position: int):
+        test_run_id, agent_request = lane[position]
+        agent_type = agent_request["agent_type"]
+        future = self.executor.submit(
+            agent_type, test_run_id, lambda: self.runner(test_run_id, agent_request), admitted=position > 0
+        )
+        future.add_done_callback(lambda done: self._advance(lane, position, done))
+
+    def _advance(self, lane: List[Run], position: int, future: Future):
+        test_run_id, agent_request = lane[position]
+        self._report(test_run_id, agent_request["agent_type"], future)
+        if position + 1 < len(lane) and not future.cancelled():
+            self._submit_lane(lane, position + 1)
+            return
+        with self._lanes_done:
+            self._open_lanes -= 1
+            self._lanes_done.notify_all()
+
+    @staticmethod
+    def _report(test_run_id: str, agent_type: str, future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Run %s on %s failed outside the agent", test_run_id, queue_name(agent_type),
+                         exc_info=future.exception())
+
+    def run_info(self, test_run_id: str) -> Optional[Dict[str, Any]]:
+        return self.executor.run_info(test_run_id)
+
+    def shutdown(self):
+        """Drop the queued runs, wait for the running ones and close the worker threads' loops"""
+        self.executor.shutdown()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted run, batch lanes included, is done; False if the timeout came first"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lanes_done:
+            if not self._lanes_done.wait_for(
+                lambda: not self._open_lanes,
+                deadline - time.monotonic() if deadline is not None else None
+            ):
+                return False
+        return self.executor.wait(deadline - time.monotonic() if deadline is not None else None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "queues": {queue_name(agent_type): stats for agent_type, stats in self.executor.get_stats().items()}
+        }
+
+
+def backend_from_settings():
+    if settings.JOB_BACKEND == "celery":
+        return CeleryBackend(celery_app)
+    if settings.JOB_BACKEND == "local":
+        return LocalBackend(settings.JOB_CONCURRENCY, max_queued=settings.JOB_MAX_QUEUED)
+    raise ValueError(f"JOB_BACKEND must be local or celery, not {settings.JOB_BACKEND}")
+
+
+job_queue = backend_from_settings()
@@ -1,108 +1,260 @@
-from typing import Dict, Any, List
-import socket
-import subprocess
-import platform
-import re
+from typing import Dict, Any, List, Optional, Tuple
+from pathlib import Path
+import json
+import logging
+import os
+import threading
+import time
+
+from ..core.config import settings
+from .service_probes import SERVICE_PORTS
+from .attack_kb import attack_kb
+from .recommendations import dedupe, unknown_ids
+
+logger = logging.getLogger(__name__)
+
+# Bundled rule set; MITRE_RULES_PATH points the engine at a different file
+DEFAULT_RULES_PATH = Path(__file__).parent / "data" / "mitre_rules.json"
+
+_SERVICE_FIELDS = ("service", "common_vulns", "mitre_techniques", "recommendations")
+_DETECTION_FIELDS = ("technique_id", "technique_name", "evidence", "risk_level")
+
+
+# Compiled service rules are (service, common_vulns, mitre_techniques, recommendations) tuples
+ServiceRule = Tuple[str, Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]
+
+# Fallback rules rendered per (port, service) are memoised up to this many entries
+_FALLBACK_CACHE_SIZE = 65536
+
+
+def _freeze(rule: Dict[str, Any]) -> ServiceRule:
+    return (rule["service"], tuple(rule["common_vulns"]), tuple(rule["mitre_techniques"]),
+            tuple(rule["recommendations"]))
+
+
+def _thaw(rule: ServiceRule) -> Dict[str, Any]:
+    """Fresh copy of a compiled rule, so callers can never edit the shared tables"""
+    return {
+        "service": rule[0],
+        "common_vulns": list(rule[1]),
+        "mitre_techniques": list(rule[2]),
+        "recommendations": list(rule[3])
+    }
+
+
+class CompiledRules:
+    """A rule file compiled into lookup tables.
+
+    Service rules are indexed by canonical port, detections by the service
+    ports that trigger them and defenses by technique, so evaluating a host
+    costs a few dict lookups per open port.
+    """
+
+    def __init__(self, rules: Dict[str, Any]):
+        if not isinstance(rules, dict):
+            raise ValueError("A rule file must hold a JSON object")
+        self.version = rules.get("version", 1)
+        self.techniques: Dict[str, Dict[str, Any]] = dict(rules.get("techniques", {}))
+
+        self.services: Dict[int, ServiceRule] = {}
+        for rule in rules.get("services", []):
+            missing = [field for field in ("port",) + _SERVICE_FIELDS if field not in rule]
+            if missing:
+                raise ValueError(f"Service rule {rule.get('port', '?')} is missing {', '.join(missing)}")
+            missing = unknown_ids(rule["recommendations"])
+            if missing:
+                raise ValueError(f"Service rule {rule['port']} uses unknown recommendations: {', '.join(missing)}")
+            self.services[int(rule["port"])] = _freeze(rule)
+
+        self.fallbacks: Dict[str, ServiceRule] = {}
+        self._rendered_fallbacks: Dict[Tuple[int, Optional[str]], ServiceRule] = {}
+        for name in ("identified", "unknown"):
+            rule = rules.get("fallbacks", {}).get(name)
+            if rule is None or any(field not in rule for field in _SERVICE_FIELDS):
+                raise ValueError(f"Fallback rule '{name}' is missing or incomplete")
+            missing = unknown_ids(rule["recommendations"])
+            if missing:
+                raise ValueError(f"Fallback rule '{name}' uses unknown recommendations: {', '.join(missing)}")
+            self.fallbacks[name] = _freeze(rule)
+
+        self.detections: List[Dict[str, Any]] = []
+        self.any_open: List[int] = []
+        self.by_service_port: Dict[int, Tuple[int, ...]] = {}
+        triggers: Dict[int, List[int]] = {}
+        for index, detection in enumerate(rules.get("detections", [])):
+            missing = [field for field in _DETECTION_FIELDS if field not in detection]
+            if missing:
+                raise ValueError(f"Detection {detection.get('technique_id', index)} is missing {', '.join(missing)}")
+            if detection.get("any_open_port"):
+                self.any_open.append(index)
+            elif detection.get("service_ports"):
+                for port in detection["service_ports"]:
+                    triggers.setdefault(int(port), []).append(index)
+            else:
+                raise ValueError(f"Detection {detection['technique_id']} needs service_ports or any_open_port")
+            self.detections.append(detection)
+        self.by_service_port = {port: tuple(indexes) for port, indexes in triggers.items()}
+
+        # Defenses, like service rules, are recommendation catalogue IDs, so rendered text stays in one place
+        self.defenses: Dict[str, Tuple[str, ...]] = {}
+        for technique, recommendations in rules.get("defenses", {}).items():
+            missing = unknown_ids(recommendations)
+            if missing:
+                raise ValueError(f"Defenses for {technique} use unknown recommendations: {', '.join(missing)}")
+            self.defenses[technique] = tuple(recommendations)
+
+    @classmethod
+    def load(cls, path: Path) -> "CompiledRules":
+        with open(path, encoding="utf-8") as handle:
+            return cls(json.load(handle))
+
+    def service_rule(self, port: int, service: Optional[str] = None) -> Dict[str, Any]:
+        lookup_port = SERVICE_PORTS.get(service, port) if service else port
+        rule = self.services.get(lookup_port)
+        if rule is not None:
+            return _thaw(rule)
+
+        rule = self._rendered_fallbacks.get((port, service))
+        if rule is None:
+            template = self.fallbacks["identified" if service else "unknown"]
+            rule = (template[0].format(port=port, SERVICE=(service or "").upper()),) + template[1:]
+            if len(self._rendered_fallbacks) < _FALLBACK_CACHE_SIZE:
+                self._rendered_fallbacks[(port, service)] = rule
+        return _thaw(rule)
+
+    def render(self, detection: Dict[str, Any], ports: List[int]) -> Dict[str, Any]:
+        finding = {
+            "technique_id": detection["technique_id"],
+            "technique_name": detection["technique_name"],
+            "evidence": detection["evidence"].format(
+                count=len(ports), ports=", ".join(map(str, ports)), port_list=ports
+            )
+        }
+        if detection.get("include_ports"):
+            finding["ports"] = list(ports)
+        finding["risk_level"] = detection["risk_level"]
+        if detection.get("description"):
+            finding["description"] = detection["description"]
+        return finding
+
+
+class RuleStore:
+    """Holds the compiled rules and swaps in a new version when the file changes.
+
+    The file's mtime is checked at most every `check_interval` seconds. A
+    new version is compiled completely before it replaces the old one with
+    a single reference assignment, so an evaluation that already holds the
+    old rules finishes on them. A file that fails to parse is reported and
+    the previous rules stay in force.
+    """
+
+    def __init__(self, path: Path, check_interval: float = 2.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._rules = CompiledRules.load(self.path)
+        self._mtime = self._stat()
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {"reloads": 0, "reload_errors": 0, "last_error": None}
+
+    def _stat(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    @property
+    def rules(self) -> CompiledRules:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._check()
+        return self._rules
+
+    def _check(self):
+        # Whoever is already checking will swap in the new rules
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            mtime = self._stat()
+            if mtime is not None and mtime != self._mtime:
+                self._mtime = mtime
+                self.reload()
+        finally:
+            self._lock.release()
+
+    def reload(self) -> bool:
+        """Recompile the rule file now; returns False and keeps the current rules on error"""
+        try:
+            compiled = CompiledRules.load(self.path)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            # AttributeError: a section of the wrong shape, such as a string where a list belongs
+            self.stats["reload_errors"] += 1
+            self.stats["last_error"] = str(e)
+            logger.warning("Keeping previous MITRE rules, %s failed to load: %s", self.path, e)
+            return False
+        self._rules = compiled
+        self.stats["reloads"] += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        rules = self._rules
+        return {
+            **self.stats,
+            "path": str(self.path),
+            "version": rules.version,
+            "service_rules": len(rules.services),
+            "detections": len(rules.detections)
+        }
+
+
+rule_store = RuleStore(
+    Path(settings.MITRE_RULES_PATH) if settings.MITRE_RULES_PATH else DEFAULT_RULES_PATH,
+    check_interval=settings.MITRE_RULES_RELOAD_INTERVAL
+)
+
 
 class MITREFramework:
-    """MITRE ATT&CK Framework rules for cybersecurity assessment"""
+    """MITRE ATT&CK Framework rules for cybersecurity assessment, evaluated from the compiled rule store"""
     
-    # MITRE ATT&CK Techniques relevant to network reconnaissance
-    MITRE_TECHNIQUES = {
-        "T1046": {
-            "name": "Network Service Scanning",
-            "description": "Adversaries may attempt to get a listing of services running on remote hosts",
-            "tactics": ["Discovery"],
-            "detection": "Monitor for port scanning activities"
-        },
-        "T1040": {
-            "name": "Network Sniffing", 
-            "description": "Adversaries may sniff network traffic to capture information",
-            "tactics": ["Discovery", "Credential Access"],
-            "detection": "Monitor for promiscuous mode on network interfaces"
-        },
-        "T1018": {
-            "name": "Remote System Discovery",
-            "description": "Adversaries may attempt to get a listing of other systems",
-            "tactics": ["Discovery"],
-            "detection": "Monitor for network discovery commands"
-        },
-        "T1082": {
-            "name": "System Information Discovery",
-            "description": "Adversaries may attempt to get detailed information about the OS and hardware",
-            "tactics": ["Discovery"],
-            "detection": "Monitor for system information gathering commands"
-        },
-        "T1021.001": {
-            "name": "Remote Desktop Protocol",
-            "description": "Adversaries may use Valid Accounts to log into a computer using RDP",
-            "tactics": ["Lateral Movement"],
-            "detection": "Monitor RDP logon events"
-        },
-        "T1021.004": {
-            "name": "SSH",
-            "description": "Adversaries may use Valid Accounts to log into remote machines using SSH",
-            "tactics": ["Lateral Movement"],
-            "detection": "Monitor SSH connection attempts"
-        },
-        "T1190": {
-            "name": "Exploit Public-Facing Application",
-            "description": "Adversaries may attempt to take advantage of a weakness in an Internet-facing computer",
-            "tactics": ["Initial Access"],
-            "detection": "Monitor for suspicious web requests"
-        }
-    }
+    @staticmethod
+    def techniques() -> Dict[str, Dict[str, Any]]:
+        """MITRE ATT&CK techniques known to the current rule set"""
+        return rule_store.rules.techniques
+    
+    @staticmethod
+    def resolve_service_ports(open_ports: List[int], services: Optional[Dict[int, str]] = None) -> Dict[int, int]:
+        """Map each open port to the canonical port of the service actually running on it"""
+        services = services or {}
+        return {port: SERVICE_PORTS.get(services.get(port), port) for port in open_ports}
     
     @classmethod
-    def check_network_discovery_techniques(cls, target_ip: str, open_ports: List[int]) -> Dict[str, Any]:
+    def check_network_discovery_techniques(cls, target_ip: str, open_ports: List[int],
+                                           services: Optional[Dict[int, str]] = None) -> Dict[str, Any]:
         """Check for MITRE ATT&CK network discovery techniques"""
+        # One snapshot per evaluation, so a reload mid-call cannot mix rule versions
+        rules = rule_store.rules
         mitre_findings = {
             "techniques_detected": [],
             "risk_assessment": {},
             "defensive_recommendations": []
         }
         
-        # T1046 - Network Service Scanning (what we're doing)
+        # Identified services win over port numbers: SSH on 2222 counts as
+        # SSH, and a web server on port 22 does not
+        service_ports = cls.resolve_service_ports(open_ports, services)
+        
+        matched: Dict[int, List[int]] = {}
+        for port in open_ports:
+            for index in rules.by_service_port.get(service_ports[port], ()):
+                matched.setdefault(index, []).append(port)
         if open_ports:
-            mitre_findings["techniques_detected"].append({
-                "technique_id": "T1046",
-                "technique_name": "Network Service Scanning",
-                "evidence": f"Detected {len(open_ports)} open ports on target",
-                "ports": open_ports,
-                "risk_level": "Medium"
-            })
-            
-        # T1021.001 - RDP Detection
-        if 3389 in open_ports:
-            mitre_findings["techniques_detected"].append({
-                "technique_id": "T1021.001", 
-                "technique_name": "Remote Desktop Protocol",
-                "evidence": "RDP service detected on port 3389",
-                "risk_level": "High",
-                "description": "RDP can be used for lateral movement if compromised"
-            })
-            
-        # T1021.004 - SSH Detection  
-        if 22 in open_ports:
-            mitre_findings["techniques_detected"].append({
-                "technique_id": "T1021.004",
-                "technique_name": "SSH",
-                "evidence": "SSH service detected on port 22", 
-                "risk_level": "Medium",
-                "description": "SSH can be used for lateral movement with valid credentials"
-            })
-            
-        # T1190 - Public-Facing Applications
-        web_ports = [80, 443, 8080, 8443]
-        detected_web_ports = [port for port in open_ports if port in web_ports]
-        if detected_web_ports:
-            mitre_findings["techniques_detected"].append({
-                "technique_id": "T1190",
-                "technique_name": "Exploit Public-Facing Application",
-                "evidence": f"Web services detected on ports: {detected_web_ports}",
-                "risk_level": "High",
-                "description": "Web applications may contain exploitable vulnerabilities"
-            })
+            for index in rules.any_open:
+                matched[index] = list(open_ports)
+        
+        # Findings keep the order of the rule file, enriched from the ATT&CK knowledge base
+        for index in sorted(matched):
+            finding = rules.render(rules.detections[index], matched[index])
+            mitre_findings["techniques_detected"].append(attack_kb.enrich(finding))
             
         # Generate risk assessment
         high_risk_count = len([t for t in mitre_findings["techniques_detected"] if t.get("risk_level") == "High"])
@@ -116,107 +268,25 @@ class MITREFramework:
         }
         
         # Generate defensive recommendations based on MITRE
-        mitre_findings["defensive_recommendations"] = cls._generate_mitre_defenses(mitre_findings["techniques_detected"])
+        mitre_findings["defensive_recommendations"] = cls._generate_mitre_defenses(
+            mitre_findings["techniques_detected"], rules
+        )
         
         return mitre_findings
     
     @classmethod
-    def _generate_mitre_defenses(cls, detected_techniques: List[Dict[str, Any]]) -> List[str]:
-        """Generate defensive recommendations based on detected MITRE techniques"""
-        recommendations = []
-        
-        technique_ids = [t["technique_id"] for t in detected_techniques]
-        
-        if "T1046" in technique_ids:
-            recommendations.extend([
-                "Implement network segmentation to limit scanning scope",
-                "Deploy intrusion detection systems to monitor for port scans",
-                "Use firewalls to restrict unnecessary port access"
-            ])
-            
-        if "T1021.001" in technique_ids:
-            recommendations.extend([
-                "Disable RDP if not required, or restrict access via VPN",
-                "Enable Network Level Authentication for RDP",
-                "Monitor RDP connections and failed authentication attempts",
-                "Implement multi-factor authentication for RDP access"
-            ])
-            
-        if "T1021.004" in technique_ids:
-            recommendations.extend([
-                "Use key-based authentication instead of passwords",
-                "Disable root login and use sudo for administrative access",
-                "Monitor SSH connections and implement fail2ban",
-                "Regular SSH configuration audits"
-            ])
-            
-        if "T1190" in technique_ids:
-            recommendations.extend([
-                "Regular web application security testing",
-                "Implement Web Application Firewall (WAF)",
-                "Keep web applications and frameworks updated",
-                "Use HTTPS with proper TLS configuration"
-            ])
-            
-        return recommendations
+    def _generate_mitre_defenses(cls, detected_techniques: List[Dict[str, Any]],
+                                 rules: Optional[CompiledRules] = None) -> List[str]:
+        """Recommendation IDs for the detected MITRE techniques, in detection order without repeats"""
+        defenses = (rules or rule_store.rules).defenses
+        return list(dedupe(*(defenses.get(technique["technique_id"], ()) for technique in detected_techniques)))
     
     @classmethod
-    def check_service_vulnerabilities(cls, port: int) -> Dict[str, Any]:
-        """Check for known vulnerabilities in common services"""
-        service_vulns = {
-            21: {
-                "service": "FTP",
-                "common_vulns": ["Anonymous login", "Cleartext credentials", "Directory traversal"],
-                "mitre_techniques": ["T1078", "T1552.001"],
-                "recommendations": ["Use SFTP/FTPS", "Disable anonymous access", "Regular updates"]
-            },
-            22: {
-                "service": "SSH", 
-                "common_vulns": ["Weak passwords", "Outdated versions", "Default credentials"],
-                "mitre_techniques": ["T1021.004", "T1110"],
-                "recommendations": ["Key-based auth", "Disable password auth", "Update SSH"]
-            },
-            23: {
-                "service": "Telnet",
-                "common_vulns": ["Cleartext transmission", "No encryption", "Legacy protocol"],
-                "mitre_techniques": ["T1021.002", "T1040"],
-                "recommendations": ["Replace with SSH", "Disable Telnet", "Use encrypted alternatives"]
-            },
-            80: {
-                "service": "HTTP",
-                "common_vulns": ["Unencrypted data", "Missing security headers", "Information disclosure"],
-                "mitre_techniques": ["T1190", "T1040"],
-                "recommendations": ["Migrate to HTTPS", "Security headers", "Regular security scans"]
-            },
-            443: {
-                "service": "HTTPS",
-                "common_vulns": ["Weak TLS config", "Certificate issues", "Mixed content"],
-                "mitre_techniques": ["T1190", "T1040"],
-                "recommendations": ["Strong TLS config", "Certificate monitoring", "Security headers"]
-            },
-            1433: {
-                "service": "SQL Server",
-                "common_vulns": ["Default credentials", "SQL injection", "Unencrypted connections"],
-                "mitre_techniques": ["T1190", "T1078"],
-                "recommendations": ["Change defaults", "Network isolation", "Encryption"]
-            },
-            3306: {
-                "service": "MySQL", 
-                "common_vulns": ["Default credentials", "Remote root access", "Privilege escalation"],
-                "mitre_techniques": ["T1190", "T1078"],
-                "recommendations": ["Secure installation", "Limit remote access", "Regular updates"]
-            },
-            3389: {
-                "service": "RDP",
-                "common_vulns": ["Weak passwords", "BlueKeep vulnerability", "No NLA"],
-                "mitre_techniques": ["T1021.001", "T1110"],
-                "recommendations": ["Strong passwords", "Enable NLA", "Regular patches"]
-            }
-        }
-        
-        return service_vulns.get(port, {
-            "service": f"Unknown service on port {port}",
-            "common_vulns": ["Unknown service risks"],
-            "mitre_techniques": ["T1046"],
-            "recommendations": ["Identify service", "Close if unnecessary", "Security assessment"]
-        })
\ No newline at end of file
+    def check_service_vulnerabilities(cls, port: int, service: Optional[str] = None) -> Dict[str, Any]:
+        """Check for known vulnerabilities in common services, preferring the identified service.
+
+        Returns a fresh copy of the rule, so callers may modify it.
+        """
+        rule = rule_store.rules.service_rule(port, service)
+        rule["technique_details"] = attack_kb.describe(rule["mitre_techniques"])
+        return rule
@@ -1,8 +1,20 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import socket
-import ipaddress
 from .base import BaseAgent, AgentType
 from .rule_engine import RuleBasedEngine
+from .port_spec import parse_port_spec
+from .port_scanner import DISCOVERY_PORTS
+from .target_spec import parse_target_spec
+from .timing import TIMING_TEMPLATES, DEFAULT_TIMING_TEMPLATE
+from .resolver import resolver
+from .scan_cache import scan_cache
+from .run_registry import RunCancelled, current_run
+from .sharding import DEFAULT_SHARD_SIZE
+from .recommendations import HIGH_RISK_PORT_RECOMMENDATIONS, OS_RECOMMENDATIONS, network_recommendations
+from .incremental import (
+    SCAN_MODE_FULL, SCAN_MODE_INCREMENTAL, DEFAULT_SAMPLE_STRIDE, DEFAULT_FULL_SCAN_INTERVAL,
+    plan_incremental_scan, diff_port_states, build_port_state
+)
 
 class NetworkScannerAgent(BaseAgent):
     """Network security scanning agent with MITRE ATT&CK framework integration"""
@@ -11,18 +23,22 @@ class NetworkScannerAgent(BaseAgent):
         super().__init__(AgentType.NETWORK_SCANNER)
     
     async def validate_target(self, target: str) -> bool:
-        """Validate if target is a valid IP address or hostname"""
+        """Validate if target is a valid IP address, hostname, CIDR block, range or list"""
         try:
-            # Try to resolve as IP address
-            ipaddress.ip_address(target)
-            return True
+            targets = parse_target_spec(target)
         except ValueError:
-            # Try to resolve as hostname
-            try:
-                socket.gethostbyname(target)
-                return True
-            except socket.gaierror:
-                return False
+            return False
+        
+        # Sweeps resolve their hostnames later, concurrently, and skip failures
+        if not targets.is_single_host:
+            return True
+        
+        # IP literals short-circuit inside the resolver; hostnames must resolve
+        try:
+            await resolver.resolve(next(iter(targets)))
+            return True
+        except (socket.gaierror, UnicodeError):
+            return False
     
     async def execute(self, target: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
         """Execute network security scanning"""
@@ -33,83 +49,172 @@ class NetworkScannerAgent(BaseAgent):
         if options is None:
             options = {}
         
-        port_range = options.get("port_range", "1-1000")
+        try:
+            ports = parse_port_spec(options.get("port_range", "1-1000"))
+        except ValueError as e:
+            return {"error": f"Invalid port specification: {e}"}
+        concurrency = int(options.get("concurrency", 1000))
+        # Process pool sharding for large plans; like concurrency it only changes speed
+        processes = int(options.get("processes", 1))
+        shard_size = int(options.get("shard_size", DEFAULT_SHARD_SIZE))
+        if processes < 1 or shard_size < 1:
+            return {"error": "processes and shard_size must be positive"}
+        timeout = float(options["timeout"]) if options.get("timeout") else None
+        timing_template = options.get("timing", DEFAULT_TIMING_TEMPLATE)
+        if timing_template not in TIMING_TEMPLATES:
+            return {"error": f"Invalid timing template: {timing_template}"}
+        
+        # Incremental mode probes a subset planned from the previous run's port state,
+        # which the caller passes in as previous_port_state
+        scan_mode = options.get("scan_mode", SCAN_MODE_FULL)
+        if scan_mode not in (SCAN_MODE_FULL, SCAN_MODE_INCREMENTAL):
+            return {"error": f"Invalid scan mode: {scan_mode}"}
+        previous_state = options.get("previous_port_state")
+        try:
+            scan_ports, plan_info = plan_incremental_scan(
+                ports, previous_state, incremental=scan_mode == SCAN_MODE_INCREMENTAL,
+                sample_stride=int(options.get("sample_stride", DEFAULT_SAMPLE_STRIDE)),
+                full_scan_interval=int(options.get("full_scan_interval", DEFAULT_FULL_SCAN_INTERVAL))
+            )
+        except ValueError as e:
+            return {"error": f"Invalid incremental scan options: {e}"}
+        options = {key: value for key, value in options.items() if key != "previous_port_state"}
+        
+        service_detection = bool(options.get("service_detection", True))
+        banner_timeout = float(options.get("banner_timeout", 1.0))
+        # Everything that changes what a scan finds; concurrency only changes how fast
+        profile = (timing_template, timeout, service_detection, banner_timeout)
+        
+        targets = parse_target_spec(target)
+        if not targets.is_single_host:
+            return await self._execute_sweep(target, targets, ports, (scan_ports, plan_info, previous_state),
+                                             concurrency, processes, shard_size, timeout, timing_template,
+                                             profile, options)
         
         # Resolve hostname to IP if needed
+        # (validate_target already resolved it, so this is a cache hit)
+        host = next(iter(targets))
         try:
-            resolved_ip = socket.gethostbyname(target)
-        except socket.gaierror:
-            resolved_ip = target
+            resolved_ip = await resolver.resolve(host)
+        except (socket.gaierror, UnicodeError):
+            resolved_ip = host
         
-        # Execute rule-based network scanning
-        results = RuleBasedEngine.check_network_security(resolved_ip, port_range)
+        # Execute rule-based network scanning, reusing an identical recent or running scan
+        results = await self._cached_scan(
+            (resolved_ip, scan_ports.to_spec(), profile),
+            lambda: RuleBasedEngine.check_network_security(
+                resolved_ip, scan_ports, concurrency=concurrency, timeout=timeout, timing_template=timing_template,
+                service_detection=service_detection, banner_timeout=banner_timeout,
+                processes=processes, shard_size=shard_size
+            ),
+            options
+        )
         
         # Add agent-specific metadata
         results.update({
             "original_target": target,
             "resolved_ip": resolved_ip,
-            "scan_options": options,
+            "scan_options": {**options, "port_range": ports.to_spec(), "timing": timing_template},
+            "agent_version": "1.0",
+            "scan_methodology": "Rule-based with MITRE ATT&CK framework"
+        })
+        self._track_port_state(results, ports, scan_ports, {resolved_ip: results["open_ports"]}, plan_info,
+                               previous_state)
+        
+        return self.format_results(results)
+    
+    @staticmethod
+    def _track_port_state(results: Dict[str, Any], ports, scan_ports, current_hosts: Dict[str, List[int]],
+                          plan_info: Dict[str, Any], previous_state: Optional[Dict[str, Any]]):
+        """Record this run's port state as the next baseline and diff it against the previous one"""
+        results["port_state"] = build_port_state(ports.to_spec(), current_hosts, plan_info, len(scan_ports))
+        results["scan_plan"] = {
+            **plan_info,
+            "ports_requested": len(ports),
+            "ports_probed": len(scan_ports),
+            "probe_reduction": round(1 - len(scan_ports) / len(ports), 4) if len(ports) else 0.0
+        }
+        if previous_state:
+            changes = diff_port_states(previous_state.get("hosts", {}), current_hosts, scan_ports)
+            results["port_changes"] = {
+                "severity": "medium" if changes["ports_opened"] else "info",
+                "baseline_run": previous_state.get("test_run_id"),
+                **changes
+            }
+    
+    async def _execute_sweep(self, target: str, targets, ports, scan_plan: tuple, concurrency: int,
+                             processes: int, shard_size: int, timeout: Optional[float],
+                             timing_template: str, profile: tuple, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Scan a CIDR block, range or list: host discovery first, then live hosts in parallel"""
+        _, _, service_detection, banner_timeout = profile
+        scan_ports, plan_info, previous_state = scan_plan
+        discovery = bool(options.get("host_discovery", True))
+        discovery_ports = tuple(options.get("discovery_ports", DISCOVERY_PORTS))
+        results = await self._cached_scan(
+            (str(targets), scan_ports.to_spec(), profile + (discovery, discovery_ports)),
+            lambda: RuleBasedEngine.check_network_range_security(
+                targets,
+                scan_ports,
+                concurrency=concurrency,
+                timeout=timeout,
+                host_concurrency=int(options.get("host_concurrency", 16)),
+                discovery=discovery,
+                discovery_ports=discovery_ports,
+                timing_template=timing_template,
+                service_detection=service_detection,
+                banner_timeout=banner_timeout,
+                processes=processes,
+                shard_size=shard_size
+            ),
+            options
+        )
+        
+        results.update({
+            "original_target": target,
+            "scan_options": {**options, "port_range": ports.to_spec(), "timing": timing_template},
             "agent_version": "1.0",
             "scan_methodology": "Rule-based with MITRE ATT&CK framework"
         })
         
+        current_hosts = {host["target"]: host["open_ports"] for host in results["hosts"] if "error" not in host}
+        self._track_port_state(results, ports, scan_ports, current_hosts, plan_info, previous_state)
+        
         return self.format_results(results)
     
-    def _generate_recommendations(self, results: Dict[str, Any]) -> List[str]:
-        """Generate network security recommendations"""
-        recommendations = []
+    @staticmethod
+    async def _cached_scan(key: tuple, run, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a scan through the shared result cache unless the caller opted out"""
+        if not options.get("use_cache", True):
+            results = await run()
+            results["cache"] = {"hit": False, "coalesced": False, "age": 0.0, "enabled": False}
+            return results
         
-        # Get MITRE-based recommendations
-        mitre_recommendations = results.get("mitre_analysis", {}).get("defensive_recommendations", [])
-        recommendations.extend(mitre_recommendations)
+        async def complete_run():
+            results = await run()
+            # A scan stopped by cancelling its run is partial: never cached or shared
+            if current_run().cancelled:
+                raise RunCancelled(results)
+            return results
         
-        # Port-specific recommendations
+        try:
+            results, cache_info = await scan_cache.get_or_run(
+                key, complete_run, force_refresh=bool(options.get("force_refresh"))
+            )
+        except RunCancelled as e:
+            results, cache_info = e.partial, {"hit": False, "coalesced": False, "age": 0.0}
+        results["cache"] = {**cache_info, "enabled": True}
+        return results
+    
+    def _generate_recommendations(self, results: Dict[str, Any]) -> Tuple[str, ...]:
+        """Recommendation IDs: MITRE defenses, exposed high-risk services, general and OS-specific advice"""
         open_ports = results.get("open_ports", [])
-        if open_ports:
-            recommendations.append(f"Review {len(open_ports)} open ports and close unnecessary services")
-        
-        # High-risk service recommendations
-        high_risk_ports = {
-            21: "Replace FTP with SFTP or secure alternatives",
-            23: "Replace Telnet with SSH immediately", 
-            135: "Disable RPC if not required, use firewall restrictions",
-            139: "Disable NetBIOS or restrict access via firewall",
-            445: "Secure SMB configuration, disable SMBv1",
-            1433: "Secure SQL Server configuration, network isolation",
-            3306: "Secure MySQL installation, restrict remote access",
-            3389: "Secure RDP configuration, enable Network Level Authentication"
-        }
+        defenses = results.get("mitre_analysis", {}).get("defensive_recommendations", ())
+        
+        # Only high-risk services change the set, so similar hosts share one cache entry
+        service_ports = RuleBasedEngine._service_ports(results)
+        high_risk = tuple(service_ports[port] for port in open_ports if service_ports[port] in HIGH_RISK_PORT_RECOMMENDATIONS)
+        
+        detected_os = results.get("os_detection", {}).get("detected_os", "Unknown")
+        os_family = next((family for family in OS_RECOMMENDATIONS if family in detected_os), None)
         
-        for port in open_ports:
-            if port in high_risk_ports:
-                recommendations.append(high_risk_ports[port])
-        
-        # General security recommendations
-        recommendations.extend([
-            "Implement network segmentation and micro-segmentation",
-            "Deploy intrusion detection/prevention systems (IDS/IPS)",
-            "Regular vulnerability assessments and penetration testing",
-            "Monitor network traffic for anomalous behavior",
-            "Implement zero-trust network architecture principles",
-            "Regular security patches and updates for all systems",
-            "Use strong authentication and access controls"
-        ])
-        
-        # OS-specific recommendations
-        os_info = results.get("os_detection", {})
-        detected_os = os_info.get("detected_os", "Unknown")
-        
-        if "Windows" in detected_os:
-            recommendations.extend([
-                "Enable Windows Defender and keep definitions updated",
-                "Regular Windows Updates and security patches",
-                "Implement PowerShell execution policies"
-            ])
-        elif "Linux" in detected_os:
-            recommendations.extend([
-                "Keep Linux kernel and packages updated",
-                "Configure iptables or other firewall solutions",
-                "Implement SELinux or AppArmor policies"
-            ])
-        
-        return recommendations
\ No newline at end of file
+        return network_recommendations(tuple(defenses), high_risk, bool(open_ports), os_family)
\ No newline at end of file
@@ -0,0 +1,275 @@
+from typing import Dict, Any, List, Iterable, Iterator, AsyncIterator, Optional, Tuple, Callable, Awaitable
+from collections import deque
+import asyncio
+import socket
+import struct
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .timing import HostTiming
+from .rate_limiter import AgentRateLimit
+from .run_registry import current_run
+
+PORT_OPEN = "open"
+PORT_CLOSED = "closed"
+PORT_FILTERED = "filtered"
+
+# Ports used for the TCP-ping liveness sweep: an accept or a reset from any
+# of them proves the host is up
+DISCOVERY_PORTS = (80, 443, 22, 445, 3389, 139, 135, 21, 25, 8080)
+
+# Linger with a zero timeout so closing an open probe sends RST instead of
+# leaving thousands of sockets in TIME_WAIT
+_LINGER_RST = struct.pack("ii", 1, 0)
+
+
+def _fd_budget(requested: int) -> int:
+    """Clamp probe concurrency to what the process file descriptor limit allows"""
+    if resource is None:
+        return requested
+    try:
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ValueError, OSError):
+        return requested
+    if soft == resource.RLIM_INFINITY:
+        return requested
+    # Leave headroom for the database pool, log files and API sockets
+    return max(1, min(requested, soft - 64))
+
+
+class AsyncPortScanner:
+    """Concurrent non-blocking TCP connect scanner built on asyncio"""
+
+    def __init__(self, concurrency: int = 1000, timeout: float = 1.0,
+                 connector: Optional[Callable[[socket.socket, Tuple], Awaitable[None]]] = None,
+                 rate_limit: Optional[AgentRateLimit] = None):
+        self.concurrency = _fd_budget(concurrency)
+        self.timeout = timeout
+        # Probes take a token before taking a socket, so throttled probes hold no descriptors
+        self.rate_limit = rate_limit
+        # Shared by every scan run through this instance, so sweeping many
+        # hosts at once never holds more than `concurrency` sockets
+        self._slots = asyncio.Semaphore(self.concurrency)
+        # Pluggable so tests can inject latency and loss without netem
+        self._connect = connector or self._sock_connect
+        # Scans count their probes towards the run's progress and stop taking ports once it is cancelled
+        self.progress = current_run()
+        self.stats = {PORT_OPEN: 0, PORT_CLOSED: 0, PORT_FILTERED: 0, "probes": 0, "retries": 0, "elapsed": 0.0}
+
+    @staticmethod
+    async def _sock_connect(sock: socket.socket, address: Tuple):
+        await asyncio.get_running_loop().sock_connect(sock, address)
+
+    async def _throttle(self, ip: str):
+        if self.rate_limit is not None:
+            delay = self.rate_limit.reserve(ip)
+            if delay:
+                await self.rate_limit.wait(delay)
+
+    async def _probe(self, ip: str, port: int, timeout: float) -> Tuple[str, float, bool]:
+        """Connect once and return (state, round-trip seconds, timed_out)"""
+        # _throttle inlined: an extra coroutine per probe shows up at tens of thousands of probes/s
+        if self.rate_limit is not None:
+            delay = self.rate_limit.reserve(ip)
+            if delay:
+                await self.rate_limit.wait(delay)
+        family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+        async with self._slots:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._connect(sock, (ip, port)), timeout)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_RST)
+                return PORT_OPEN, time.perf_counter() - started, False
+            except ConnectionRefusedError:
+                return PORT_CLOSED, time.perf_counter() - started, False
+            except asyncio.TimeoutError:
+                return PORT_FILTERED, timeout, True
+            except OSError:
+                # Unreachable and similar ICMP errors are definitive answers
+                return PORT_FILTERED, time.perf_counter() - started, False
+            finally:
+                sock.close()
+
+    async def probe(self, ip: str, port: int) -> str:
+        """Attempt a single TCP connect and classify the port state"""
+        state, _, _ = await self._probe(ip, port, self.timeout)
+        return state
+
+    def _count(self, state: str):
+        self.stats[state] += 1
+        self.stats["probes"] += 1
+        self.progress.done += 1
+
+    async def scan(self, ip: str, ports: Iterable[int], workers: Optional[int] = None,
+                   timing: Optional[HostTiming] = None) -> List[int]:
+        """Scan ports on a single host and return the sorted list of open ports.
+
+        With a HostTiming the scan adapts its timeout and window to the
+        host; without one every probe uses the fixed scanner timeout.
+        """
+        started = time.perf_counter()
+        if timing is not None:
+            open_ports = await self._scan_adaptive(ip, ports, timing)
+        else:
+            open_ports = await self._scan_fixed(ip, ports, workers or self.concurrency)
+        self.stats["elapsed"] += time.perf_counter() - started
+
+        open_ports.sort()
+        return open_ports
+
+    async def _scan_fixed(self, ip: str, ports: Iterable[int], workers: int) -> List[int]:
+        open_ports: List[int] = []
+        port_iter: Iterator[int] = iter(ports)
+
+        async def worker():
+            # Workers share one iterator, so the plan is never materialised
+            for port in port_iter:
+                if self.progress.cancelled:
+                    return
+                state = await self.probe(ip, port)
+                self._count(state)
+                if state == PORT_OPEN:
+                    open_ports.append(port)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return open_ports
+
+    async def _scan_adaptive(self, ip: str, ports: Iterable[int], timing: HostTiming) -> List[int]:
+        open_ports: List[int] = []
+        port_iter: Iterator[int] = iter(ports)
+        # Ports whose probe timed out, queued ahead of fresh ports
+        retry_queue: deque = deque()
+        in_flight = set()
+
+        def next_probe() -> Optional[Tuple[int, int]]:
+            if self.progress.cancelled:
+                return None
+            if retry_queue:
+                return retry_queue.popleft()
+            port = next(port_iter, None)
+            return None if port is None else (port, 0)
+
+        async def send(port: int, attempt: int):
+            state, rtt, timed_out = await self._probe(ip, port, timing.timeout)
+            return port, attempt, state, rtt, timed_out
+
+        while True:
+            while len(in_flight) < timing.window:
+                probe = next_probe()
+                if probe is None:
+                    break
+                in_flight.add(asyncio.ensure_future(send(*probe)))
+                if timing.scan_delay:
+                    await asyncio.sleep(timing.scan_delay)
+
+            if not in_flight:
+                break
+
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                port, attempt, state, rtt, timed_out = task.result()
+
+                if timed_out:
+                    timing.on_timeout()
+                    if attempt < timing.allowed_retries:
+                        timing.on_retry()
+                        self.stats["retries"] += 1
+                        retry_queue.append((port, attempt + 1))
+                        continue
+                else:
+                    timing.record_rtt(rtt)
+                    if attempt:
+                        timing.on_drop()
+                    else:
+                        timing.on_response()
+
+                self._count(state)
+                if state == PORT_OPEN:
+                    open_ports.append(port)
+
+        return open_ports
+
+    async def exchange(self, ip: str, port: int, payload: bytes, timeout: float,
+                       read_size: int = 2048) -> bytes:
+        """Connect, optionally send a payload, and return the first chunk the service answers with"""
+        await self._throttle(ip)
+        async with self._slots:
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+            except (asyncio.TimeoutError, OSError):
+                return b""
+            try:
+                if payload:
+                    writer.write(payload)
+                    await writer.drain()
+                return await asyncio.wait_for(reader.read(read_size), timeout)
+            except (asyncio.TimeoutError, OSError):
+                return b""
+            finally:
+                writer.close()
+
+    async def measure_rtt(self, ip: str, ports: Iterable[int] = DISCOVERY_PORTS) -> Optional[float]:
+        """TCP ping: return the first answer's round-trip time, or None if nothing answers"""
+        probes = [asyncio.ensure_future(self._probe(ip, port, self.timeout)) for port in ports]
+        try:
+            for probe in asyncio.as_completed(probes):
+                state, rtt, timed_out = await probe
+                if state != PORT_FILTERED:
+                    return rtt
+            return None
+        finally:
+            for probe in probes:
+                probe.cancel()
+
+    async def is_alive(self, ip: str, ports: Iterable[int] = DISCOVERY_PORTS) -> bool:
+        """TCP ping: the host is up as soon as any probe is accepted or reset"""
+        return await self.measure_rtt(ip, ports) is not None
+
+    async def discover_hosts(self, hosts: Iterable[str], ports: Iterable[int] = DISCOVERY_PORTS,
+                             concurrency: int = 256) -> AsyncIterator[Tuple[str, Optional[float]]]:
+        """Run a concurrent liveness sweep, yielding (host, rtt) as each host settles.
+
+        The rtt is None for hosts that did not answer. Hosts are pulled
+        lazily from the iterable, so only `concurrency` hosts are ever
+        held in flight.
+        """
+        ports = tuple(ports)
+        host_iter = iter(hosts)
+        settled: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+        async def worker():
+            for host in host_iter:
+                await settled.put((host, await self.measure_rtt(host, ports)))
+
+        async def run_workers():
+            try:
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+            finally:
+                await settled.put(None)
+
+        runner = asyncio.ensure_future(run_workers())
+        try:
+            while True:
+                item = await settled.get()
+                if item is None:
+                    break
+                yield item
+            await runner
+        finally:
+            runner.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return probe counters and throughput for the scans run so far"""
+        elapsed = self.stats["elapsed"]
+        return {
+            **self.stats,
+            "concurrency": self.concurrency,
+            "timeout": self.timeout,
+            "ports_per_second": round(self.stats["probes"] / elapsed, 1) if elapsed else 0.0
+        }
@@ -0,0 +1,199 @@
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+MIN_PORT = 1
+MAX_PORT = 65535
+
+# nmap's 100 most frequently open TCP ports, most common first
+TOP_PORTS = (
+    80, 23, 443, 21, 22, 25, 3389, 110, 445, 139, 143, 53, 135, 3306, 8080, 1723,
+    111, 995, 993, 5900, 1025, 587, 8888, 199, 1720, 465, 548, 113, 81, 6001, 10000,
+    514, 5060, 179, 1026, 2000, 8443, 8000, 32768, 554, 26, 1433, 49152, 2001, 515,
+    8008, 49154, 1027, 5666, 646, 5000, 5631, 631, 49153, 8081, 2049, 88, 79, 5800,
+    106, 2121, 1110, 49155, 6000, 513, 990, 5357, 427, 49156, 543, 544, 5101, 144, 7,
+    389, 8009, 3128, 444, 9999, 5009, 7070, 5190, 3000, 5432, 1900, 3986, 13, 1029, 9,
+    5051, 6646, 49157, 1028, 873, 1755, 2717, 4899, 9100, 119, 37
+)
+
+
+class PortSet:
+    """Compact set of TCP ports stored as a 65536-bit bitmap (8 KiB regardless of size)"""
+
+    __slots__ = ("_bits",)
+
+    def __init__(self, ports: Optional[Iterable[int]] = None):
+        self._bits = bytearray((MAX_PORT + 1) // 8)
+        if ports is not None:
+            for port in ports:
+                self.add(port)
+
+    @classmethod
+    def from_range(cls, start: int, end: int) -> "PortSet":
+        """Build a set holding every port in the inclusive range"""
+        ports = cls()
+        ports.add_range(start, end)
+        return ports
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PortSet":
+        """Rebuild a set from the output of to_bytes"""
+        ports = cls()
+        ports._bits[:len(data)] = data
+        return ports
+
+    def to_bytes(self) -> bytes:
+        """Serialise the bitmap, e.g. to ship a plan to a worker process"""
+        return bytes(self._bits)
+
+    @staticmethod
+    def _check(port: int):
+        if not MIN_PORT <= port <= MAX_PORT:
+            raise ValueError(f"Port {port} out of range {MIN_PORT}-{MAX_PORT}")
+
+    def add(self, port: int):
+        self._check(port)
+        self._bits[port >> 3] |= 1 << (port & 7)
+
+    def discard(self, port: int):
+        if MIN_PORT <= port <= MAX_PORT:
+            self._bits[port >> 3] &= ~(1 << (port & 7)) & 0xFF
+
+    def add_range(self, start: int, end: int):
+        """Add every port in the inclusive range, filling whole bytes at once"""
+        self._check(start)
+        self._check(end)
+        if start > end:
+            raise ValueError(f"Invalid port range {start}-{end}")
+
+        # Set bits one at a time up to the first byte boundary, then whole bytes
+        while start <= end and start & 7:
+            self.add(start)
+            start += 1
+        full_bytes = (end - start + 1) >> 3
+        if full_bytes > 0:
+            first = start >> 3
+            self._bits[first:first + full_bytes] = b"\xff" * full_bytes
+            start += full_bytes << 3
+        while start <= end:
+            self.add(start)
+            start += 1
+
+    def __contains__(self, port: int) -> bool:
+        return MIN_PORT <= port <= MAX_PORT and bool(self._bits[port >> 3] & (1 << (port & 7)))
+
+    def __len__(self) -> int:
+        return int.from_bytes(self._bits, "little").bit_count()
+
+    def __bool__(self) -> bool:
+        return any(self._bits)
+
+    def __iter__(self) -> Iterator[int]:
+        for index, byte in enumerate(self._bits):
+            if not byte:
+                continue
+            base = index << 3
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield base + bit
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PortSet) and self._bits == other._bits
+
+    def _combine(self, other: "PortSet", op) -> "PortSet":
+        left = int.from_bytes(self._bits, "little")
+        right = int.from_bytes(other._bits, "little")
+        return PortSet.from_bytes(op(left, right).to_bytes(len(self._bits), "little"))
+
+    def __or__(self, other: "PortSet") -> "PortSet":
+        return self._combine(other, lambda a, b: a | b)
+
+    def __and__(self, other: "PortSet") -> "PortSet":
+        return self._combine(other, lambda a, b: a & b)
+
+    def __sub__(self, other: "PortSet") -> "PortSet":
+        return self._combine(other, lambda a, b: a & ~b)
+
+    def ranges(self) -> Iterator[Tuple[int, int]]:
+        """Yield the set as sorted, inclusive (start, end) runs"""
+        start = prev = None
+        for port in self:
+            if start is None:
+                start = prev = port
+            elif port == prev + 1:
+                prev = port
+            else:
+                yield start, prev
+                start = prev = port
+        if start is not None:
+            yield start, prev
+
+    def to_spec(self) -> str:
+        """Render the normalized spec string, e.g. '22,80,443,8000-9000'"""
+        return ",".join(str(start) if start == end else f"{start}-{end}" for start, end in self.ranges())
+
+    def chunks(self, size: int) -> Iterator["PortSet"]:
+        """Split the set into consecutive sub-sets of at most `size` ports"""
+        if size < 1:
+            raise ValueError("Chunk size must be positive")
+        chunk = PortSet()
+        count = 0
+        for port in self:
+            chunk._bits[port >> 3] |= 1 << (port & 7)
+            count += 1
+            if count == size:
+                yield chunk
+                chunk = PortSet()
+                count = 0
+        if count:
+            yield chunk
+
+    def __repr__(self) -> str:
+        spec = self.to_spec()
+        if len(spec) > 60:
+            spec = spec[:57] + "..."
+        return f"PortSet({spec!r}, count={len(self)})"
+
+
+def _parse_port(value: str) -> int:
+    try:
+        port = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid port '{value}'")
+    PortSet._check(port)
+    return port
+
+
+def parse_port_spec(spec: Union[str, PortSet]) -> PortSet:
+    """Parse an nmap-style port specification such as '22,80,443,8000-9000,top-100'.
+
+    Supported terms: single ports, inclusive ranges, open ranges ('-1024',
+    '60000-'), '-' or 'all' for every port, and 'top-N' for the N most
+    common ports.
+    """
+    if isinstance(spec, PortSet):
+        return spec
+
+    ports = PortSet()
+    terms = [term.strip().lower() for term in str(spec).replace(" ", ",").split(",")]
+    terms = [term for term in terms if term]
+    if not terms:
+        raise ValueError("Empty port specification")
+
+    for term in terms:
+        if term in ("-", "all", "*"):
+            ports.add_range(MIN_PORT, MAX_PORT)
+        elif term.startswith("top"):
+            count = term[3:].lstrip("-")
+            if not count.isdigit() or not 0 < int(count) <= len(TOP_PORTS):
+                raise ValueError(f"Invalid top ports term '{term}' (use top-1 to top-{len(TOP_PORTS)})")
+            for port in TOP_PORTS[:int(count)]:
+                ports.add(port)
+        elif "-" in term:
+            start, _, end = term.partition("-")
+            ports.add_range(
+                _parse_port(start) if start else MIN_PORT,
+                _parse_port(end) if end else MAX_PORT
+            )
+        else:
+            ports.add(_parse_port(term))
+
+    return ports
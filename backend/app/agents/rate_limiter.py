@@ -0,0 +1,221 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import asyncio
+import threading
+import time
+
+from ..core.config import settings
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `burst`.
+
+    Callers reserve tokens and are told how long to wait; the balance may
+    go negative, so waiters queue up behind each other in arrival order
+    without a separate queue. A rate of 0 disables the bucket.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "waiting", "granted", "delayed")
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate / 10))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.waiting = 0
+        self.granted = 0
+        self.delayed = 0
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float, count: float = 1.0) -> float:
+        """Take tokens and return the seconds until they are actually available"""
+        if not self.rate:
+            return 0.0
+        self.refill(now)
+        self.tokens -= count
+        self.granted += count
+        if self.tokens >= 0:
+            return 0.0
+        self.delayed += 1
+        return -self.tokens / self.rate
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "waiting": self.waiting,
+            "granted": self.granted,
+            "delayed": self.delayed
+        }
+
+
+class RateLimiter:
+    """Shared limiter for every outbound probe: a global bucket, one per agent type and one per target.
+
+    The per-target buckets are kept in a bounded LRU so a /16 sweep cannot
+    grow the table without limit. Acquiring is a plain method call on the
+    fast path; only callers that are actually throttled await a sleep.
+    """
+
+    def __init__(self, global_rate: float = 0.0, per_target_rate: float = 0.0,
+                 agent_rates: Optional[Dict[str, float]] = None, burst_seconds: float = 0.1,
+                 max_targets: int = 65536):
+        self.burst_seconds = burst_seconds
+        self.max_targets = max_targets
+        self.per_target_rate = per_target_rate
+        self.global_bucket = TokenBucket(global_rate, self._burst(global_rate))
+        self.agent_buckets = {
+            agent: TokenBucket(rate, self._burst(rate)) for agent, rate in (agent_rates or {}).items()
+        }
+        self._targets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _burst(self, rate: float) -> float:
+        return max(1.0, rate * self.burst_seconds)
+
+    def _target_bucket(self, target: str) -> TokenBucket:
+        bucket = self._targets.get(target)
+        if bucket is None:
+            bucket = self._targets[target] = TokenBucket(self.per_target_rate, self._burst(self.per_target_rate))
+            if len(self._targets) > self.max_targets:
+                self._targets.popitem(last=False)
+        else:
+            self._targets.move_to_end(target)
+        return bucket
+
+    def reserve(self, agent: str, target: str, count: float = 1.0) -> float:
+        """Take tokens from every bucket that applies and return the longest wait"""
+        now = time.monotonic()
+        with self._lock:
+            delay = self.global_bucket.reserve(now, count)
+            bucket = self.agent_buckets.get(agent)
+            if bucket is not None:
+                delay = max(delay, bucket.reserve(now, count))
+            if self.per_target_rate:
+                delay = max(delay, self._target_bucket(target).reserve(now, count))
+        return delay
+
+    async def acquire(self, agent: str, target: str, count: float = 1.0):
+        """Wait until a probe to `target` fits inside every budget"""
+        delay = self.reserve(agent, target, count)
+        if delay:
+            await self._wait(agent, delay)
+
+    async def _wait(self, agent: str, delay: float):
+        bucket = self.agent_buckets.get(agent, self.global_bucket)
+        with self._lock:
+            bucket.waiting += 1
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            with self._lock:
+                bucket.waiting -= 1
+
+    def for_agent(self, agent: str) -> "AgentRateLimit":
+        return AgentRateLimit(self, agent)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            # Report the refilled balance, not the one left by the last caller
+            for bucket in [self.global_bucket, *self.agent_buckets.values()]:
+                if bucket.rate:
+                    bucket.refill(now)
+            return {
+                "global": self.global_bucket.get_stats(),
+                "agents": {agent: bucket.get_stats() for agent, bucket in self.agent_buckets.items()},
+                "per_target_rate": self.per_target_rate,
+                "targets_tracked": len(self._targets),
+                "targets_waiting": sum(1 for bucket in self._targets.values() if bucket.tokens < 0)
+            }
+
+
+class AgentRateLimit:
+    """A RateLimiter bound to one agent type, handed to scanners and HTTP clients.
+
+    Single probes are paid for in small batches: the first probe to a
+    target reserves a couple of milliseconds' worth of tokens and the next
+    ones spend that credit without touching the shared buckets. This keeps
+    the per-probe cost to a dict lookup at tens of thousands of probes/s,
+    and slow budgets (a few requests per second) still reserve one token
+    at a time.
+    """
+
+    __slots__ = ("limiter", "agent", "batch", "_credits")
+
+    # Longest stretch of budget a single reservation may cover
+    BATCH_SECONDS = 0.002
+    MAX_BATCH = 64
+
+    def __init__(self, limiter: RateLimiter, agent: str):
+        self.limiter = limiter
+        self.agent = agent
+        agent_bucket = limiter.agent_buckets.get(agent)
+        rates = [rate for rate in (
+            limiter.global_bucket.rate, limiter.per_target_rate, agent_bucket.rate if agent_bucket else 0.0
+        ) if rate]
+        self.batch = max(1, min(self.MAX_BATCH, int(min(rates) * self.BATCH_SECONDS))) if rates else 1
+        self._credits: Dict[str, int] = {}
+
+    def reserve(self, target: str, count: float = 1.0) -> float:
+        if count == 1.0 and self.batch > 1:
+            credit = self._credits.get(target)
+            if credit:
+                # Spent credit is dropped, so only targets mid-batch are held
+                if credit > 1:
+                    self._credits[target] = credit - 1
+                else:
+                    del self._credits[target]
+                return 0.0
+            credits = self._credits
+            credits[target] = self.batch - 1
+            # Targets probed once or twice keep their unspent credit; forget the oldest past the
+            # limiter's own target limit (their tokens were paid for, so this only under-spends)
+            if len(credits) > self.limiter.max_targets:
+                del credits[next(iter(credits))]
+            return self.limiter.reserve(self.agent, target, self.batch)
+        return self.limiter.reserve(self.agent, target, count)
+
+    async def acquire(self, target: str, count: float = 1.0):
+        delay = self.reserve(target, count)
+        if delay:
+            await self.limiter._wait(self.agent, delay)
+
+    async def wait(self, delay: float):
+        """Sleep off a delay returned by reserve, counted as waiting in the metrics"""
+        await self.limiter._wait(self.agent, delay)
+
+    def budget(self, share: float = 1.0) -> Dict[str, Any]:
+        """A picklable `share` of these budgets, for a worker process that cannot share this limiter"""
+        limiter = self.limiter
+        return {
+            "agent": self.agent,
+            "global_rate": limiter.global_bucket.rate * share,
+            "per_target_rate": limiter.per_target_rate * share,
+            "agent_rates": {agent: bucket.rate * share for agent, bucket in limiter.agent_buckets.items()},
+            "burst_seconds": limiter.burst_seconds,
+            "max_targets": limiter.max_targets
+        }
+
+    @classmethod
+    def from_budget(cls, budget: Dict[str, Any]) -> "AgentRateLimit":
+        options = dict(budget)
+        agent = options.pop("agent")
+        return cls(RateLimiter(**options), agent)
+
+
+def limiter_from_settings() -> RateLimiter:
+    return RateLimiter(
+        global_rate=settings.RATE_LIMIT_GLOBAL,
+        per_target_rate=settings.RATE_LIMIT_PER_TARGET,
+        agent_rates=settings.RATE_LIMIT_AGENTS,
+        burst_seconds=settings.RATE_LIMIT_BURST_SECONDS
+    )
+
+
+# Shared by every agent in the process
+rate_limiter = limiter_from_settings()
@@ -0,0 +1,180 @@
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+from functools import lru_cache
+
+# Every recommendation an agent can make, by stable ID. Agents and the MITRE
+# rule file emit IDs; text is only looked up when results are rendered, so
+# IDs must never be reused for different advice.
+CATALOGUE: Dict[str, str] = {
+    # Network hardening
+    "net.segmentation": "Implement network segmentation and micro-segmentation",
+    "net.ids": "Deploy intrusion detection/prevention systems (IDS/IPS) to monitor for port scans",
+    "net.firewall": "Use firewalls to restrict unnecessary port access",
+    "net.assessments": "Regular vulnerability assessments and penetration testing",
+    "net.monitoring": "Monitor network traffic for anomalous behavior",
+    "net.zero_trust": "Implement zero-trust network architecture principles",
+    "net.patching": "Regular security patches and updates for all systems",
+    "net.strong_auth": "Use strong authentication and access controls",
+    "ports.review": "Review open ports and close unnecessary services",
+    "ports.identify": "Identify the service listening on the port",
+    "net.encryption": "Use encrypted protocols instead of cleartext ones",
+
+    # Exposed services
+    "ftp.replace": "Replace FTP with SFTP or secure alternatives",
+    "ftp.anonymous": "Disable anonymous FTP access",
+    "telnet.replace": "Replace Telnet with SSH immediately",
+    "telnet.disable": "Disable the Telnet service",
+    "rpc.restrict": "Disable RPC if not required, use firewall restrictions",
+    "netbios.restrict": "Disable NetBIOS or restrict access via firewall",
+    "smb.harden": "Secure SMB configuration, disable SMBv1",
+    "mssql.harden": "Secure SQL Server configuration, network isolation",
+    "db.defaults": "Change default database accounts and passwords",
+    "db.encryption": "Encrypt client connections to the database",
+    "mysql.harden": "Secure MySQL installation, restrict remote access",
+    "rdp.restrict": "Disable RDP if not required, or restrict access via VPN",
+    "rdp.nla": "Enable Network Level Authentication for RDP",
+    "rdp.monitor": "Monitor RDP connections and failed authentication attempts",
+    "rdp.mfa": "Implement multi-factor authentication for RDP access",
+    "ssh.keys": "Use key-based authentication instead of passwords",
+    "ssh.passwords": "Disable password authentication for SSH",
+    "ssh.root_login": "Disable root login and use sudo for administrative access",
+    "ssh.monitor": "Monitor SSH connections and implement fail2ban",
+    "ssh.audit": "Regular SSH configuration audits",
+    "web.testing": "Regular web application security testing",
+    "web.waf": "Implement Web Application Firewall (WAF)",
+    "web.updates": "Keep web applications and frameworks updated",
+    "web.tls": "Use HTTPS with proper TLS configuration",
+    "web.https": "Serve the site over HTTPS only",
+    "web.https_redirect": "Redirect all plain HTTP requests to HTTPS and never back",
+    "web.security_headers": "Send the standard HTTP security headers",
+    "web.hsts": "Send Strict-Transport-Security with a max-age of at least 180 days",
+    "web.csp": "Define a Content-Security-Policy without unsafe-inline or unsafe-eval scripts",
+    "web.frame_options": "Prevent framing with X-Frame-Options or CSP frame-ancestors",
+    "web.nosniff": "Send X-Content-Type-Options: nosniff",
+    "web.referrer_policy": "Set a Referrer-Policy such as strict-origin-when-cross-origin",
+    "web.permissions_policy": "Restrict browser features with a Permissions-Policy header",
+    "web.hide_versions": "Remove software versions from Server and X-Powered-By headers",
+    "web.cookie_flags": "Set Secure, HttpOnly and SameSite on session cookies",
+    "web.cors": "Only allow trusted origins in Access-Control-Allow-Origin",
+    "web.open_redirect": "Only redirect to allow-listed or relative destinations",
+    "web.sqli": "Use parameterised queries for all database access",
+    "web.xss": "Encode user input for its HTML context before rendering it",
+    "web.access_control": "Enforce authorisation in the application, not only in path-based proxy rules",
+    "web.tls_cert": "Use a valid certificate from a trusted CA and renew it before it expires",
+    "web.tls_ciphers": "Disable weak TLS cipher suites",
+    "web.tls_legacy": "Disable TLS 1.0 and TLS 1.1",
+    "web.sensitive_files": "Remove VCS metadata, secrets and backups from the web root and deny access to them",
+    "web.directory_listing": "Disable automatic directory listings",
+
+    # Operating systems
+    "windows.defender": "Enable Windows Defender and keep definitions updated",
+    "windows.updates": "Regular Windows Updates and security patches",
+    "windows.powershell": "Implement PowerShell execution policies",
+    "linux.updates": "Keep Linux kernel and packages updated",
+    "linux.firewall": "Configure iptables or other firewall solutions",
+    "linux.mac": "Implement SELinux or AppArmor policies",
+
+    # Web penetration testing
+    "pentest.pending": "Web penetration testing rules need to be implemented",
+    "pentest.owasp": "Implement OWASP Top 10 vulnerability checks",
+    "pentest.headers": "Add security header validation",
+    "pentest.auth": "Implement authentication and session testing",
+    "pentest.input": "Add input validation testing",
+
+    # Web classification
+    "classifier.pending": "Web classification rules need to be implemented",
+    "classifier.phishing": "Consider implementing phishing detection algorithms",
+    "classifier.reputation": "Add domain reputation checking",
+    "classifier.content": "Implement content analysis for malicious indicators",
+    "classifier.block": "Block the URL at the web proxy, DNS resolver and mail gateway",
+    "classifier.sandbox": "Open suspicious URLs in a sandbox or isolated browser before allowing access",
+    "classifier.awareness": "Train users to spot look-alike domains and credential-harvesting links",
+    "classifier.report": "Report the phishing URL to the impersonated brand and the hosting provider",
+    "classifier.monitor": "Keep monitoring the domain for changes in content and hosting",
+}
+
+# Advice for high-risk services, by canonical service port
+HIGH_RISK_PORT_RECOMMENDATIONS: Dict[int, str] = {
+    21: "ftp.replace",
+    23: "telnet.replace",
+    135: "rpc.restrict",
+    139: "netbios.restrict",
+    445: "smb.harden",
+    1433: "mssql.harden",
+    3306: "mysql.harden",
+    3389: "rdp.nla",
+}
+
+GENERAL_NETWORK_RECOMMENDATIONS: Tuple[str, ...] = (
+    "net.segmentation", "net.ids", "net.assessments", "net.monitoring", "net.zero_trust", "net.patching",
+    "net.strong_auth",
+)
+
+OS_RECOMMENDATIONS: Dict[str, Tuple[str, ...]] = {
+    "Windows": ("windows.defender", "windows.updates", "windows.powershell"),
+    "Linux": ("linux.updates", "linux.firewall", "linux.mac"),
+}
+
+
+def unknown_ids(ids: Iterable[str]) -> List[str]:
+    """IDs missing from the catalogue, for validating rule files"""
+    return [recommendation_id for recommendation_id in ids if recommendation_id not in CATALOGUE]
+
+
+def dedupe(*groups: Iterable[str]) -> Tuple[str, ...]:
+    """Concatenate ID groups, keeping the first occurrence of each ID"""
+    return tuple(dict.fromkeys(recommendation_id for group in groups for recommendation_id in group))
+
+
+def render(ids: Iterable[str]) -> List[Dict[str, Any]]:
+    """Resolve IDs to text; IDs retired from the catalogue render as themselves"""
+    return [
+        {"id": recommendation_id, "text": CATALOGUE.get(recommendation_id, recommendation_id)}
+        for recommendation_id in ids
+    ]
+
+
+def render_services(services: Dict[str, Any]) -> Dict[str, Any]:
+    """A scan's {port: service info} with each service's recommendation IDs rendered"""
+    return {
+        port: {**info, "recommendations": render(info["recommendations"])}
+        if isinstance(info, dict) and "recommendations" in info else info
+        for port, info in services.items()
+    }
+
+
+def render_result(result_type: str, raw_data: Any) -> Any:
+    """Stored result data with the per-service recommendation IDs of network scans rendered"""
+    if result_type == "services" and isinstance(raw_data, dict):
+        return render_services(raw_data)
+    if result_type == "hosts" and isinstance(raw_data, dict) and isinstance(raw_data.get("value"), list):
+        return {**raw_data, "value": [
+            {**host, "services": render_services(host["services"])}
+            if isinstance(host, dict) and isinstance(host.get("services"), dict) else host
+            for host in raw_data["value"]
+        ]}
+    return raw_data
+
+
+# Advice for URL classifications
+CLASSIFICATION_RECOMMENDATIONS: Dict[str, Tuple[str, ...]] = {
+    "phishing": ("classifier.block", "classifier.report", "classifier.awareness"),
+    "suspicious": ("classifier.sandbox", "classifier.monitor", "classifier.awareness"),
+    "benign": ("classifier.monitor",),
+}
+
+
+@lru_cache(maxsize=4096)
+def network_recommendations(defenses: Tuple[str, ...], service_ports: Tuple[int, ...], has_open_ports: bool,
+                            os_family: Optional[str]) -> Tuple[str, ...]:
+    """The recommendation IDs for one network scan.
+
+    Scans of similar hosts share the same inputs, so the deduplicated set
+    is built once per combination and reused as the same immutable tuple.
+    """
+    return dedupe(
+        defenses,
+        ("ports.review",) if has_open_ports else (),
+        (HIGH_RISK_PORT_RECOMMENDATIONS[port] for port in service_ports if port in HIGH_RISK_PORT_RECOMMENDATIONS),
+        GENERAL_NETWORK_RECOMMENDATIONS,
+        OS_RECOMMENDATIONS.get(os_family, ())
+    )
@@ -0,0 +1,718 @@
+"""
+Local domain reputation lists.
+
+The scanning network cannot reach online reputation services, so block-
+and allowlists are kept as local files and compiled into one binary index
+that is memory-mapped at runtime, so workers share its pages and parse
+nothing at startup:
+
+    <list dir>/blocklists/<name>.txt
+    <list dir>/allowlists/<name>.txt
+
+A file holds one domain per line; hosts-file lines ("0.0.0.0 bad.example"),
+"*." prefixes and adblock "||bad.example^" rules are accepted, and # or !
+starts a comment. An entry covers the domain and every subdomain below it.
+
+The index is a bloom filter over every listed domain followed by the
+sorted 64-bit keys of the domains and a bitmask of the lists each one is
+on. A lookup tries the host and each parent domain in turn; the filter
+rules out nearly all of them without touching the key store, and the rest
+are a binary search over the mapping.
+
+Only the bloom probe itself takes about a microsecond or less. An
+unlisted host costs a few microseconds through lookup(), most of it
+Python overhead: the host is normalised, the reload timer is checked
+and a result dict is built. lookup_many spreads the hashing over the
+batch and costs about half as much per host.
+
+Updates between builds are appended to a journal next to the index, which
+every process replays on top of it, so feeds can change without a rebuild;
+`compact` folds the journal into the index. A full build from the list
+files replaces the index and discards the journal, since updated list
+files are expected to carry those changes already.
+
+Build, update or query from the backend directory:
+    python -m app.agents.reputation build
+    python -m app.agents.reputation add phishing login-verify.example
+    python -m app.agents.reputation add --allow partners --file partners.txt
+    python -m app.agents.reputation remove phishing login-verify.example
+    python -m app.agents.reputation compact
+    python -m app.agents.reputation lookup secure.login-verify.example
+"""
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from bisect import bisect_left
+from pathlib import Path
+import argparse
+import hashlib
+import ipaddress
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from ..core.config import settings
+from .bloom import BloomFilter, item_hashes, hash_many
+from .url_features import split_host
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent / "data"
+DEFAULT_LIST_DIR = DATA_DIR / "reputation"
+
+MAGIC = b"REPUTAT1"
+INDEX_VERSION = 1
+# List directory and the kind of list each holds; an allowlist entry wins
+# over a blocklist entry for the same domain
+KINDS = {"blocklists": "block", "allowlists": "allow"}
+MAX_LISTS = 32
+
+# Header: magic, version, list and entry counts, bloom filter capacity,
+# error rate, item count and size in bytes, then offset and length of the
+# list table and the offsets of the bloom bits, keys and masks
+_HEADER = struct.Struct("<8sIIQQdQQQQQQQ")
+# Domains hashed per pass while building
+_CHUNK = 1 << 20
+
+
+def normalize_domain(domain: str) -> str:
+    """Lower-case ASCII form of a domain or host, without wildcard prefix or trailing dot"""
+    domain = domain.strip().lower().rstrip(".")
+    if domain[:1] in ("*", "."):
+        domain = domain[2:] if domain.startswith("*.") else domain.lstrip(".")
+    if not domain.isascii():
+        try:
+            domain = domain.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+    return domain
+
+
+def _is_ip(host: str) -> bool:
+    return ":" in host or host.rpartition(".")[2].isdigit()
+
+
+def parent_domains(host: str) -> List[str]:
+    """The host and each parent domain of at least two labels, most specific first"""
+    if _is_ip(host):
+        # IP addresses are only ever listed as themselves
+        return [host]
+    candidates = [host]
+    start = host.find(".") + 1
+    while start:
+        next_dot = host.find(".", start)
+        if next_dot < 0:
+            break
+        candidates.append(host[start:])
+        start = next_dot + 1
+    return candidates
+
+
+def _apex_start(host: str) -> int:
+    """Position of the dot before the shortest of parent_domains(host), or -1 if that is the host itself"""
+    last = host.rfind(".")
+    if ":" in host or host[last + 1:].isdigit():
+        return -1
+    return host.rfind(".", 0, max(last, 0))
+
+
+def _bloom_items(domains: Iterable[str]) -> List[bytes]:
+    """What the bloom filter holds for listed domains: each domain itself, plus a
+    "*." marker on it and on each of its parent domains saying that something at
+    or below that domain is listed"""
+    items = []
+    for domain in domains:
+        data = domain.encode()
+        items.append(data)
+        items.append(b"*." + data)
+        if _is_ip(domain):
+            continue
+        start = domain.find(".") + 1
+        while start:
+            next_dot = domain.find(".", start)
+            if next_dot < 0:
+                break
+            items.append(b"*." + data[start:])
+            start = next_dot + 1
+    return items
+
+
+def _is_address(text: str) -> bool:
+    try:
+        ipaddress.ip_address(text)
+    except ValueError:
+        return False
+    return True
+
+
+def iter_list_file(path: Path) -> Iterator[str]:
+    """Normalized domains of a list file, skipping comments and anything that is not a domain"""
+    with open(path, encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            line = line.split("#", 1)[0].strip()
+            if not line or line[0] == "!":
+                continue
+            fields = line.split()
+            if len(fields) > 1 and _is_address(fields[0]):
+                # Hosts-file lines put an address before one or more names
+                del fields[0]
+            for field in fields:
+                if field.startswith("||"):
+                    field = field[2:].rstrip("^")
+                domain = normalize_domain(field)
+                if "." in domain:
+                    yield domain
+
+
+def domain_key(data: bytes) -> int:
+    """64-bit store key of an encoded domain"""
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def _keys(items: Sequence[bytes]) -> np.ndarray:
+    return np.frombuffer(b"".join(hashlib.blake2b(item, digest_size=8).digest() for item in items), dtype="<u8")
+
+
+def _chunks(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _merge(keys: np.ndarray, masks: np.ndarray, last_wins: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted unique keys; masks of repeated keys are OR-ed, or the last one kept"""
+    order = np.argsort(keys, kind="stable")
+    keys, masks = keys[order], masks[order]
+    if len(keys) == 0:
+        return keys, masks
+    if last_wins:
+        ends = np.flatnonzero(np.r_[keys[1:] != keys[:-1], True])
+        keys, masks = keys[ends], masks[ends]
+    else:
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        keys, masks = keys[starts], np.bitwise_or.reduceat(masks, starts)
+    listed = masks != 0
+    return keys[listed], masks[listed]
+
+
+def _replay(data: bytes, lists: List[Tuple[str, str]], delta: Dict[str, List[int]]) -> int:
+    """Apply journal lines to `delta` (domain -> [added mask, removed mask]); returns the bytes consumed.
+
+    A trailing line without its newline is still being written and is
+    left for the next read.
+    """
+    end = data.rfind(b"\n") + 1
+    bits = {name: 1 << index for index, (name, _) in enumerate(lists)}
+    for line in data[:end].decode("utf-8", "replace").splitlines():
+        try:
+            op, kind, name, domain = line.split("\t")
+        except ValueError:
+            continue
+        bit = bits.get(name)
+        if bit is None:
+            if len(lists) == MAX_LISTS:
+                continue
+            bit = bits[name] = 1 << len(lists)
+            lists.append((name, kind))
+        change = delta.setdefault(domain, [0, 0])
+        if op == "+":
+            change[0] |= bit
+            change[1] &= ~bit
+        elif op == "-":
+            change[1] |= bit
+            change[0] &= ~bit
+    return end
+
+
+def _write_index(index_path: Path, lists: List[Tuple[str, str]], keys: np.ndarray, masks: np.ndarray,
+                 bloom: BloomFilter) -> int:
+    table = json.dumps(lists).encode("utf-8")
+    sections = [table, bytes(bloom.bits), keys.astype("<u8").tobytes(), masks.astype("<u4").tobytes()]
+    offsets = []
+    position = _HEADER.size
+    for section in sections:
+        # Eight-byte alignment keeps the key array directly usable from the mapping
+        position += -position % 8
+        offsets.append(position)
+        position += len(section)
+    header = _HEADER.pack(MAGIC, INDEX_VERSION, len(lists), len(keys), bloom.capacity, bloom.error_rate,
+                          bloom.count, bloom.nbytes, offsets[0], len(table), *offsets[1:])
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    # Readers keep the old mapping until they notice the rename; they never see a partial index
+    descriptor, temp_path = tempfile.mkstemp(dir=index_path.parent, prefix=".reputation-index-")
+    try:
+        with os.fdopen(descriptor, "wb") as handle:
+            handle.write(header)
+            for offset, section in zip(offsets, sections):
+                handle.write(b"\0" * (offset - handle.tell()))
+                handle.write(section)
+        os.replace(temp_path, index_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return position
+
+
+def list_sources(list_dir: Path) -> List[Tuple[str, str, Path]]:
+    """(name, kind, path) of every list file, blocklists first"""
+    return [
+        (path.stem, kind, path)
+        for directory, kind in KINDS.items()
+        for path in sorted((list_dir / directory).glob("*.txt"))
+    ]
+
+
+def build_index(list_dir: Path, index_path: Path, error_rate: float = 1e-3) -> Dict[str, Any]:
+    """Compile every list file into a new index, replacing the old one and its journal"""
+    sources = list_sources(list_dir)
+    if len(sources) > MAX_LISTS:
+        raise ValueError(f"at most {MAX_LISTS} lists are supported, {list_dir} has {len(sources)}")
+
+    keys, masks, hashes = [], [], []
+    for bit, (_, _, path) in enumerate(sources):
+        for chunk in _chunks(iter_list_file(path), _CHUNK):
+            keys.append(_keys([domain.encode() for domain in chunk]))
+            masks.append(np.full(len(chunk), 1 << bit, dtype=np.uint32))
+            first, second = hash_many(_bloom_items(chunk))
+            # Both hashes are 32 bits wide, so one integer carries them for deduplication
+            hashes.append(np.unique(first << np.uint64(32) | second))
+    keys, masks = _merge(np.concatenate(keys or [np.empty(0, np.uint64)]),
+                         np.concatenate(masks or [np.empty(0, np.uint32)]))
+
+    hashes = np.unique(np.concatenate(hashes or [np.empty(0, np.uint64)]))
+    # Headroom for journal entries that later compactions fold in
+    bloom = BloomFilter(max(1024, len(hashes) + len(hashes) // 4), error_rate)
+    bloom.add_many(hashes >> np.uint64(32), hashes & np.uint64(0xFFFFFFFF))
+    bloom.count = len(hashes)
+
+    lists = [(name, kind) for name, kind, _ in sources]
+    size = _write_index(index_path, lists, keys, masks, bloom)
+    journal = index_path.with_name(index_path.name + ".journal")
+    for path in (journal, journal.with_name(journal.name + ".compacting")):
+        if path.exists():
+            path.unlink()
+    return {"lists": len(lists), "entries": len(keys), "bloom_bytes": bloom.nbytes, "bytes": size}
+
+
+class ReputationIndex:
+    """Read-only view of a memory-mapped reputation index"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self.entries, capacity, error_rate, bloom_count, bloom_bytes,
+         lists_offset, lists_length, bloom_offset, keys_offset, masks_offset) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != INDEX_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {INDEX_VERSION} reputation index")
+        self.lists = [tuple(entry) for entry in json.loads(self._map[lists_offset:lists_offset + lists_length])]
+        view = memoryview(self._map)
+        self.bloom = BloomFilter(capacity, error_rate, bits=view[bloom_offset:bloom_offset + bloom_bytes],
+                                 count=bloom_count)
+        # Typed views for single lookups and arrays for batches, all over the same pages
+        self.keys = view[keys_offset:keys_offset + 8 * self.entries].cast("Q")
+        self.masks = view[masks_offset:masks_offset + 4 * self.entries].cast("I")
+        self.key_array = np.frombuffer(self._map, dtype="<u8", count=self.entries, offset=keys_offset)
+        self.mask_array = np.frombuffer(self._map, dtype="<u4", count=self.entries, offset=masks_offset)
+
+    def mask(self, key: int) -> int:
+        slot = bisect_left(self.keys, key)
+        if slot < self.entries and self.keys[slot] == key:
+            return self.masks[slot]
+        return 0
+
+    def masks_of(self, keys: np.ndarray) -> np.ndarray:
+        if not self.entries:
+            return np.zeros(len(keys), dtype=np.uint32)
+        slots = np.minimum(np.searchsorted(self.key_array, keys), self.entries - 1)
+        return np.where(self.key_array[slots] == keys, self.mask_array[slots], 0).astype(np.uint32)
+
+
+class DomainReputation:
+    """Block- and allowlist verdicts from the memory-mapped index and its journal.
+
+    The index is opened on first use, and built from the list files first
+    if it is missing or older than any of them. At most every
+    `check_interval` seconds a lookup also checks whether the index was
+    rebuilt or the journal grew, e.g. by an update from another process,
+    and picks that up. The most specific listed domain decides the
+    verdict; at the same domain an allowlist beats a blocklist.
+    """
+
+    def __init__(self, list_dir: Path, index_path: Path, error_rate: float = 1e-3, check_interval: float = 5.0):
+        self.list_dir = Path(list_dir)
+        self.index_path = Path(index_path)
+        self.journal_path = self.index_path.with_name(self.index_path.name + ".journal")
+        self.pending_path = self.journal_path.with_name(self.journal_path.name + ".compacting")
+        self.error_rate = error_rate
+        self.check_interval = check_interval
+        self._index: Optional[ReputationIndex] = None
+        self._index_stat: Optional[Tuple[int, int]] = None
+        self._lists: List[Tuple[str, str]] = []
+        self._allow = 0
+        # Journal changes by domain: [added mask, removed mask], and the shortest
+        # parent of each, so hosts outside them skip the journal with one set lookup
+        self._delta: Dict[str, List[int]] = {}
+        self._delta_apexes: Set[str] = set()
+        # (inode, mtime, bytes replayed) of the journal
+        self._journal_stat: Optional[Tuple[int, int, int]] = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.error: Optional[str] = None
+        self.stats = {"lookups": 0, "store_probes": 0, "listed": 0, "reloads": 0}
+
+    @staticmethod
+    def _stat(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _ensure(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+        elif time.monotonic() - self._checked_at >= self.check_interval:
+            # Whoever is already checking will swap in the changes
+            if self._lock.acquire(blocking=False):
+                try:
+                    if self._stat(self.index_path) != self._index_stat:
+                        self._load()
+                        self.stats["reloads"] += 1
+                    else:
+                        self._read_journal()
+                finally:
+                    self._lock.release()
+
+    def _load(self):
+        self._checked_at = time.monotonic()
+        try:
+            index_stat = self._stat(self.index_path)
+            sources = list_sources(self.list_dir)
+            if sources and (index_stat is None or any(
+                    path.stat().st_mtime_ns > index_stat[1] for _, _, path in sources)):
+                build_index(self.list_dir, self.index_path, self.error_rate)
+            self._index_stat = self._stat(self.index_path)
+            self._index = ReputationIndex(self.index_path) if self._index_stat else None
+            self.error = None
+        except (OSError, ValueError, struct.error) as e:
+            self.error = str(e)
+            logger.warning("Reputation index unavailable, using the journal only: %s", e)
+            self._index = None
+        self._journal_stat = None
+        self._read_journal()
+
+    def _read_journal(self):
+        """Replay journal lines not seen yet, or all of them if the journal was replaced"""
+        self._checked_at = time.monotonic()
+        journal_stat = self._stat(self.journal_path)
+        previous = self._journal_stat
+        offset, lists, delta = 0, self._lists, self._delta
+        if previous is not None and journal_stat is not None and journal_stat[0] == previous[0]:
+            offset = previous[2]
+        else:
+            # First read, or compacted (or removed by a build) since the last one: start
+            # over on fresh state, so concurrent lookups never see it half replayed
+            lists = list(self._index.lists) if self._index is not None else []
+            delta = {}
+            if self.pending_path.exists():
+                # A compaction in progress: its entries are not in the index yet
+                with open(self.pending_path, "rb") as handle:
+                    _replay(handle.read(), lists, delta)
+        if journal_stat is not None:
+            with open(self.journal_path, "rb") as handle:
+                handle.seek(offset)
+                offset += _replay(handle.read(), lists, delta)
+            journal_stat = (*journal_stat, offset)
+        self._journal_stat = journal_stat
+        self._delta_apexes = {domain[_apex_start(domain) + 1:] for domain in delta}
+        self._allow = sum(1 << index for index, (_, kind) in enumerate(lists) if kind == "allow")
+        self._lists, self._delta = lists, delta
+
+    def _apply_delta(self, host: str, found: Dict[str, int]):
+        for candidate in parent_domains(host):
+            change = self._delta.get(candidate)
+            if change:
+                mask = (found.get(candidate, 0) & ~change[1]) | change[0]
+                if mask:
+                    found[candidate] = mask
+                else:
+                    found.pop(candidate, None)
+
+    def _describe(self, host: str, found: Dict[str, int]) -> Dict[str, Any]:
+        self.stats["listed"] += 1
+        registered = split_host(host)[1]
+        matches = []
+        # Every match is a suffix of the host, so longer is more specific
+        for candidate in sorted(found, key=len, reverse=True):
+            mask = found[candidate]
+            matches.append({
+                "domain": candidate,
+                "match": "exact" if candidate == host else "registered_domain" if candidate == registered else "suffix",
+                "lists": [name for index, (name, _) in enumerate(self._lists) if mask >> index & 1]
+            })
+        decisive = matches[0]
+        return {
+            "domain": host,
+            "listed": True,
+            "verdict": "allow" if found[decisive["domain"]] & self._allow else "block",
+            "matched": decisive["domain"],
+            "match": decisive["match"],
+            "lists": decisive["lists"],
+            "matches": matches
+        }
+
+    def lookup(self, domain: str) -> Dict[str, Any]:
+        """Verdict for a host or domain: block, allow, or unknown when neither it nor a parent is listed.
+
+        Parent domains are tried shortest first, and the walk stops at the
+        first one whose "*." marker is not in the bloom filter, so an
+        unlisted host usually costs a single probe.
+        """
+        host = normalize_domain(domain)
+        self._ensure()
+        self.stats["lookups"] += 1
+        found: Dict[str, int] = {}
+        start = _apex_start(host)
+        index = self._index
+        if index is not None:
+            bloom = index.bloom
+            position = start
+            while True:
+                candidate = host[position + 1:]
+                data = candidate.encode()
+                if not bloom.contains_hashes(*item_hashes(b"*." + data)):
+                    break
+                if bloom.contains_hashes(*item_hashes(data)):
+                    self.stats["store_probes"] += 1
+                    mask = index.mask(domain_key(data))
+                    if mask:
+                        found[candidate] = mask
+                if position < 0:
+                    break
+                position = host.rfind(".", 0, position)
+        if self._delta and host[start + 1:] in self._delta_apexes:
+            self._apply_delta(host, found)
+        if not found:
+            return {"domain": host, "listed": False, "verdict": "unknown"}
+        return self._describe(host, found)
+
+    def lookup_many(self, domains: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+        """lookup for a whole batch, with None for every domain that is not listed.
+
+        The walk advances one level for all hosts at a time: each level's
+        candidates are hashed and probed in one vectorized pass, and only
+        hosts whose marker passed go on to the next level.
+        """
+        self._ensure()
+        self.stats["lookups"] += len(domains)
+        hosts = [normalize_domain(domain) for domain in domains]
+        found: Dict[int, Dict[str, int]] = {}
+        index = self._index
+        if index is not None:
+            bloom = index.bloom
+            rows = list(range(len(hosts)))
+            positions = [_apex_start(host) for host in hosts]
+            while rows:
+                candidates = [hosts[row][position + 1:] for row, position in zip(rows, positions)]
+                live = np.flatnonzero(bloom.contains_many(*hash_many(
+                    [f"*.{candidate}".encode() for candidate in candidates]
+                ))).tolist()
+                if not live:
+                    break
+                encoded = [candidates[i].encode() for i in live]
+                listed = np.flatnonzero(bloom.contains_many(*hash_many(encoded))).tolist()
+                if listed:
+                    self.stats["store_probes"] += len(listed)
+                    masks = index.masks_of(_keys([encoded[i] for i in listed])).tolist()
+                    for i, mask in zip(listed, masks):
+                        if mask:
+                            found.setdefault(rows[live[i]], {})[candidates[live[i]]] = mask
+                deeper = [i for i in live if positions[i] >= 0]
+                positions = [hosts[rows[i]].rfind(".", 0, positions[i]) for i in deeper]
+                rows = [rows[i] for i in deeper]
+        if self._delta:
+            apexes = self._delta_apexes
+            for row, host in enumerate(hosts):
+                if host[_apex_start(host) + 1:] not in apexes:
+                    continue
+                masks = found.get(row, {})
+                self._apply_delta(host, masks)
+                if masks:
+                    found[row] = masks
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(domains)
+        for row, masks in found.items():
+            if masks:
+                results[row] = self._describe(hosts[row], masks)
+        return results
+
+    def _write_journal(self, op: str, name: str, kind: str, domains: Iterable[str]) -> int:
+        if not name or any(character in name for character in "\t\n/"):
+            raise ValueError(f"invalid list name {name!r}")
+        if kind not in KINDS.values():
+            raise ValueError(f"list kind must be one of {', '.join(KINDS.values())}")
+        lines = []
+        for domain in domains:
+            domain = normalize_domain(domain)
+            if "." in domain:
+                lines.append(f"{op}\t{kind}\t{name}\t{domain}\n")
+        if lines:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            # One O_APPEND write per update, so concurrent writers never interleave lines
+            descriptor = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(descriptor, "".join(lines).encode("utf-8"))
+            finally:
+                os.close(descriptor)
+            self._ensure()
+            with self._lock:
+                self._read_journal()
+        return len(lines)
+
+    def add(self, name: str, domains: Iterable[str], kind: str = "block") -> int:
+        """Put domains on a list (created if new) without rebuilding; returns how many were valid"""
+        return self._write_journal("+", name, kind, domains)
+
+    def remove(self, name: str, domains: Iterable[str]) -> int:
+        """Take domains off a list without rebuilding; returns how many were valid"""
+        self._ensure()
+        kind = dict(self._lists).get(name, "block")
+        return self._write_journal("-", name, kind, domains)
+
+    def build(self) -> Dict[str, Any]:
+        """Rebuild the index from the list files now"""
+        with self._lock:
+            stats = build_index(self.list_dir, self.index_path, self.error_rate)
+            self._load()
+            self._loaded = True
+        return stats
+
+    def compact(self) -> Dict[str, Any]:
+        """Fold the journal into a new index; a full build is only needed once the filter is over capacity"""
+        with self._lock:
+            if self.journal_path.exists():
+                if self.pending_path.exists():
+                    # Left over from an interrupted compaction: keep both, in order
+                    moved = self.journal_path.with_name(self.journal_path.name + ".moving")
+                    os.replace(self.journal_path, moved)
+                    with open(self.pending_path, "ab") as pending, open(moved, "rb") as journal:
+                        pending.write(journal.read())
+                    os.unlink(moved)
+                else:
+                    os.replace(self.journal_path, self.pending_path)
+
+            index = ReputationIndex(self.index_path) if self.index_path.exists() else None
+            lists = list(index.lists) if index is not None else []
+            delta: Dict[str, List[int]] = {}
+            if self.pending_path.exists():
+                with open(self.pending_path, "rb") as handle:
+                    _replay(handle.read(), lists, delta)
+
+            domains = list(delta)
+            encoded = [domain.encode() for domain in domains]
+            changed = _keys(encoded)
+            if index is not None:
+                base_keys, base_masks = np.array(index.key_array), np.array(index.mask_array)
+                bloom = BloomFilter(index.bloom.capacity, index.bloom.error_rate, bytearray(index.bloom.bits),
+                                    index.bloom.count)
+            else:
+                base_keys, base_masks = np.empty(0, np.uint64), np.empty(0, np.uint32)
+                bloom = BloomFilter(max(1024, 3 * len(domains)), self.error_rate)
+            current = (index.masks_of(changed) if index is not None and len(changed)
+                       else np.zeros(len(changed), dtype=np.uint32))
+            added = np.array([change[0] for change in delta.values()], dtype=np.uint32)
+            removed = np.array([change[1] for change in delta.values()], dtype=np.uint32)
+            keys, masks = _merge(np.concatenate([base_keys, changed]),
+                                 np.concatenate([base_masks, (current & ~removed) | added]), last_wins=True)
+
+            fresh = [domain for domain, change in delta.items() if change[0]]
+            if fresh:
+                bloom.add_many(*hash_many(_bloom_items(fresh)))
+            size = _write_index(self.index_path, lists, keys, masks, bloom)
+            if self.pending_path.exists():
+                self.pending_path.unlink()
+            self._load()
+            self._loaded = True
+
+        stats = {"lists": len(lists), "entries": len(keys), "journal_domains": len(domains), "bytes": size,
+                 "bloom_items": bloom.count, "bloom_capacity": bloom.capacity}
+        if bloom.count > bloom.capacity:
+            stats["warning"] = "bloom filter over capacity, rebuild from the list files"
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        index = self._index
+        return {
+            **self.stats,
+            "loaded": self._loaded,
+            "index_path": str(self.index_path),
+            "lists": [{"name": name, "kind": kind} for name, kind in self._lists],
+            "entries": index.entries if index is not None else 0,
+            "journal_domains": len(self._delta),
+            "bloom": index.bloom.get_stats() if index is not None else None,
+            "error": self.error
+        }
+
+
+domain_reputation = DomainReputation(
+    Path(settings.REPUTATION_LIST_DIR) if settings.REPUTATION_LIST_DIR else DEFAULT_LIST_DIR,
+    Path(settings.REPUTATION_INDEX_PATH) if settings.REPUTATION_INDEX_PATH
+    else (Path(settings.REPUTATION_LIST_DIR) if settings.REPUTATION_LIST_DIR else DEFAULT_LIST_DIR)
+    / "reputation-index.bin",
+    error_rate=settings.REPUTATION_ERROR_RATE,
+    check_interval=settings.REPUTATION_RELOAD_INTERVAL
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local domain reputation lists")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="Compile the list files into the index")
+    commands.add_parser("compact", help="Fold the journal into the index")
+    for command, text in (("add", "Put domains on a list"), ("remove", "Take domains off a list")):
+        update = commands.add_parser(command, help=text)
+        update.add_argument("list")
+        update.add_argument("domains", nargs="*")
+        update.add_argument("--file", help="read the domains from a list file as well")
+        if command == "add":
+            update.add_argument("--allow", action="store_true", help="the list is an allowlist")
+    lookup = commands.add_parser("lookup", help="Look up hosts or domains")
+    lookup.add_argument("domains", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(json.dumps(domain_reputation.build()))
+    elif args.command == "compact":
+        print(json.dumps(domain_reputation.compact()))
+    elif args.command in ("add", "remove"):
+        domains = list(args.domains)
+        if args.file:
+            domains.extend(iter_list_file(Path(args.file)))
+        if args.command == "add":
+            count = domain_reputation.add(args.list, domains, "allow" if args.allow else "block")
+        else:
+            count = domain_reputation.remove(args.list, domains)
+        print(json.dumps({args.command: count, "journal": str(domain_reputation.journal_path)}))
+    else:
+        print(json.dumps([domain_reputation.lookup(domain) for domain in args.domains], indent=2))
+
+
+if __name__ == "__main__":
+    main()
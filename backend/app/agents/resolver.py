@@ -0,0 +1,112 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+
+from ..core.config import settings
+
+
+class AsyncResolver:
+    """Non-blocking hostname resolver with in-flight deduplication and a bounded TTL/LRU cache.
+
+    Lookups run getaddrinfo on a dedicated thread pool. Concurrent requests
+    for the same name share one lookup, and answers (including failures,
+    for a shorter time) are cached. The state is guarded by a lock and the
+    in-flight futures are thread-safe, so one resolver can be shared by
+    agents running on different event loops.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 300.0, negative_ttl: float = 30.0,
+                 max_workers: int = 16):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dns")
+        self._cache: "OrderedDict[str, Tuple[float, Optional[List[str]]]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "failures": 0, "evictions": 0}
+
+    @staticmethod
+    def _lookup(hostname: str) -> List[str]:
+        infos = socket.getaddrinfo(hostname, None, type=socket.SOCK_STREAM)
+        # IPv4 first: the scanners and most targets are IPv4
+        addresses = sorted({info[4][0] for info in infos}, key=lambda ip: ":" in ip)
+        if not addresses:
+            raise socket.gaierror(socket.EAI_NONAME, f"No addresses for {hostname}")
+        return addresses
+
+    def _store(self, hostname: str, future: Future):
+        with self._lock:
+            self._in_flight.pop(hostname, None)
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self.stats["failures"] += 1
+                self._cache[hostname] = (time.monotonic() + self.negative_ttl, None)
+            else:
+                self._cache[hostname] = (time.monotonic() + self.ttl, future.result())
+            self._cache.move_to_end(hostname)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    async def resolve_all(self, hostname: str) -> List[str]:
+        """Return every address for a hostname, raising socket.gaierror if it does not resolve"""
+        try:
+            return [str(ipaddress.ip_address(hostname))]
+        except ValueError:
+            pass
+
+        key = hostname.rstrip(".").lower()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                addresses = entry[1]
+                if addresses is None:
+                    raise socket.gaierror(socket.EAI_NONAME, f"Cannot resolve {hostname} (cached)")
+                return list(addresses)
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+            else:
+                self.stats["misses"] += 1
+                future = self._executor.submit(self._lookup, key)
+                self._in_flight[key] = future
+                future.add_done_callback(lambda done: self._store(key, done))
+
+        return list(await asyncio.wrap_future(future))
+
+    async def resolve(self, hostname: str) -> str:
+        """Return the preferred (IPv4 first) address for a hostname"""
+        return (await self.resolve_all(hostname))[0]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+            return {
+                **self.stats,
+                "entries": len(self._cache),
+                "in_flight": len(self._in_flight),
+                "hit_ratio": round((self.stats["hits"] + self.stats["coalesced"]) / lookups, 4) if lookups else 0.0
+            }
+
+
+# Shared by every agent in the process
+resolver = AsyncResolver(
+    max_entries=settings.DNS_CACHE_SIZE,
+    ttl=settings.DNS_CACHE_TTL,
+    negative_ttl=settings.DNS_NEGATIVE_CACHE_TTL,
+    max_workers=settings.DNS_RESOLVER_THREADS
+)
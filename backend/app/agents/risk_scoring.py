@@ -0,0 +1,190 @@
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+from functools import lru_cache
+import numpy as np
+
+from .mitre_rules import CompiledRules, rule_store
+from .indicators import indicators
+from .service_probes import SERVICE_PORTS
+
+# Services whose exposure alone makes a finding high severity
+HIGH_RISK_PORTS = frozenset({21, 23, 135, 139, 445, 1433, 3306, 3389})
+MEDIUM_RISK_PORTS = frozenset({22, 80, 443})
+
+SEVERITIES = ("High", "Medium", "Low")
+RISK_LEVELS = ("Low", "Medium", "High")
+
+# Score added for the host's overall MITRE risk, indexed like RISK_LEVELS
+_MITRE_RISK_POINTS = np.array([0, 15, 25])
+
+# (service port or None, rule kind); kind is "rule" or the fallback name
+ExposureColumn = Tuple[Optional[int], str]
+
+
+def host_services(host: Dict[str, Any]) -> Dict[int, str]:
+    """Identified service names by port, from a batch host or a stored per-host scan result"""
+    services = {}
+    for port, service in (host.get("services") or {}).items():
+        if isinstance(service, dict):
+            service = (service.get("detection") or {}).get("service")
+        if service:
+            services[int(port)] = service
+    return services
+
+
+@lru_cache(maxsize=4096)
+def critical_wording(vulnerability: str) -> bool:
+    """Whether a vulnerability is worded as high severity on any port (the critical_vulnerability indicators)"""
+    return "critical_vulnerability" in indicators.scan(vulnerability, "text")
+
+
+def vulnerability_severity(port: Optional[int], vulnerability: str) -> str:
+    """Severity of one vulnerability on a service port"""
+    if port in HIGH_RISK_PORTS:
+        return "High"
+    if critical_wording(vulnerability):
+        return "High"
+    if port in MEDIUM_RISK_PORTS:
+        return "Medium"
+    return "Low"
+
+
+class BatchRiskScorer:
+    """Risk scores for many hosts at once, identical to the per-host scores.
+
+    Every open port is reduced to an exposure column: its canonical
+    service port and the rule that covers it. Ports that no rule, weight or
+    detection singles out share one column per fallback rule, so the
+    hosts x columns exposure matrix stays a few dozen columns wide however
+    many distinct ports a batch contains. Each column carries its weights
+    (high-risk flag, vulnerability counts per severity, detections it
+    triggers), and scoring the batch is a handful of matrix products.
+
+    A scorer holds one snapshot of the compiled rules; build a new one to
+    pick up a reloaded rule file.
+    """
+
+    def __init__(self, rules: Optional[CompiledRules] = None):
+        self.rules = rules or rule_store.rules
+        self._significant = (set(self.rules.services) | set(self.rules.by_service_port)
+                             | HIGH_RISK_PORTS | MEDIUM_RISK_PORTS)
+        self.columns: List[ExposureColumn] = []
+        self._column_index: Dict[ExposureColumn, int] = {}
+        self._port_columns: Dict[Tuple[int, Optional[str]], int] = {}
+        self._high_risk: List[int] = []
+        self._vulns: List[Tuple[int, int, int]] = []
+        self._triggers: List[Tuple[int, ...]] = []
+
+        detections = self.rules.detections
+        self._detection_risk = np.array([detection["risk_level"] for detection in detections], dtype=object)
+        self._any_open = np.zeros(len(detections), dtype=bool)
+        self._any_open[self.rules.any_open] = True
+
+    def _column(self, port: int, service: Optional[str]) -> int:
+        column = self._port_columns.get((port, service))
+        if column is not None:
+            return column
+
+        service_port = SERVICE_PORTS.get(service, port) if service else port
+        if service_port in self.rules.services:
+            key = (service_port, "rule")
+            rule = self.rules.services[service_port]
+        else:
+            kind = "identified" if service else "unknown"
+            key = (service_port if service_port in self._significant else None, kind)
+            rule = self.rules.fallbacks[kind]
+
+        column = self._column_index.get(key)
+        if column is None:
+            column = self._column_index[key] = len(self.columns)
+            self.columns.append(key)
+            self._high_risk.append(int(key[0] in HIGH_RISK_PORTS))
+            severities = [vulnerability_severity(key[0], vuln) for vuln in rule[1]]
+            self._vulns.append(tuple(severities.count(severity) for severity in SEVERITIES))
+            self._triggers.append(self.rules.by_service_port.get(key[0], ()))
+        self._port_columns[(port, service)] = column
+        return column
+
+    def exposure_matrix(self, hosts: List[Dict[str, Any]]) -> np.ndarray:
+        """Open-port counts per host (rows) and exposure column"""
+        rows: List[int] = []
+        columns: List[int] = []
+        for row, host in enumerate(hosts):
+            services = host_services(host)
+            for port in host.get("open_ports", []):
+                rows.append(row)
+                columns.append(self._column(port, services.get(port)))
+
+        width = len(self.columns)
+        flat = np.asarray(rows, dtype=np.int64) * width + np.asarray(columns, dtype=np.int64)
+        return np.bincount(flat, minlength=len(hosts) * width).reshape(len(hosts), width)
+
+    def score(self, hosts: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Score every host; each hosts dict needs open_ports and optionally services"""
+        exposure = self.exposure_matrix(hosts)
+        width = len(self.columns)
+        high_risk = np.array(self._high_risk, dtype=np.int64).reshape(width)
+        vulns = np.array(self._vulns, dtype=np.int64).reshape(width, len(SEVERITIES))
+        triggers = np.zeros((width, len(self._any_open)), dtype=np.int64)
+        for column, detections in enumerate(self._triggers):
+            triggers[column, list(detections)] = 1
+
+        open_ports = exposure.sum(axis=1)
+        high_risk_ports = exposure @ high_risk
+        severity = exposure @ vulns
+        hits = (exposure @ triggers) > 0
+        hits |= self._any_open & (open_ports > 0)[:, None]
+
+        high_techniques = hits[:, self._detection_risk == "High"].sum(axis=1)
+        medium_techniques = hits[:, self._detection_risk == "Medium"].sum(axis=1)
+        overall_risk = np.where(high_techniques > 0, 2, np.where(medium_techniques > 0, 1, 0))
+
+        risk_score = (np.minimum(open_ports * 5, 30) + high_risk_ports * 15 + _MITRE_RISK_POINTS[overall_risk]
+                      + np.minimum(severity.sum(axis=1) * 3, 20))
+        return {
+            "risk_score": np.minimum(risk_score, 100),
+            "overall_risk": overall_risk,
+            "open_ports": open_ports,
+            "high_risk_ports": high_risk_ports,
+            "vulnerabilities": severity,
+            "technique_hits": hits,
+            "high_risk_techniques": high_techniques,
+            "medium_risk_techniques": medium_techniques
+        }
+
+    def report(self, hosts: List[Dict[str, Any]], labels: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """JSON-ready per-host scores and a project-wide summary"""
+        scores = self.score(hosts)
+        labels = list(labels) if labels is not None else [host.get("target", str(i)) for i, host in enumerate(hosts)]
+        technique_ids = [detection["technique_id"] for detection in self.rules.detections]
+
+        host_reports = [
+            {
+                "target": labels[row],
+                "risk_score": int(scores["risk_score"][row]),
+                "overall_risk": RISK_LEVELS[scores["overall_risk"][row]],
+                "open_ports": int(scores["open_ports"][row]),
+                "high_risk_ports": int(scores["high_risk_ports"][row]),
+                "vulnerabilities": dict(zip(SEVERITIES, scores["vulnerabilities"][row].tolist())),
+                "techniques": [technique_ids[index] for index in np.flatnonzero(scores["technique_hits"][row])]
+            }
+            for row in range(len(hosts))
+        ]
+
+        risk_score = scores["risk_score"]
+        return {
+            "hosts": host_reports,
+            "summary": {
+                "hosts": len(hosts),
+                "max_risk_score": int(risk_score.max()) if len(hosts) else 0,
+                "mean_risk_score": round(float(risk_score.mean()), 2) if len(hosts) else 0.0,
+                "risk_levels": {
+                    level: int((scores["overall_risk"] == index).sum()) for index, level in enumerate(RISK_LEVELS)
+                },
+                "vulnerabilities": dict(zip(SEVERITIES, scores["vulnerabilities"].sum(axis=0).tolist())),
+                "techniques": {
+                    technique_id: int(count)
+                    for technique_id, count in zip(technique_ids, scores["technique_hits"].sum(axis=0)) if count
+                }
+            }
+        }
+
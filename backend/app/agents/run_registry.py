@@ -0,0 +1,291 @@
+from typing import Dict, Any, Awaitable, Iterable, Iterator, Optional, TypeVar
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import json
+import logging
+import threading
+import time
+
+import redis
+
+from ..core.config import settings
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest throughput sample in the smoothed rate the ETA comes from
+_RATE_SMOOTHING = 0.3
+
+
+class RunCancelled(Exception):
+    """Work of a cancelled run stopped early; `partial` holds what it had found by then"""
+
+    def __init__(self, partial: Any = None):
+        super().__init__("run cancelled")
+        self.partial = partial
+
+
+class RegistryUnavailable(Exception):
+    """The shared store holding run progress and cancel requests cannot be reached"""
+
+
+class RunTracker:
+    """Progress and cancellation of one run, as seen by the code doing its work.
+
+    Probe loops add what they plan to do to `total`, call `advance` as
+    probes (or requests) complete and stop taking new work once
+    `cancelled` is set, then return what they found so far. Both are
+    plain attribute updates on the run's own event loop; the registry
+    publishes them and looks for cancel requests on a timer, so the hot
+    loops never touch the shared store.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, agent_type: Optional[str] = None):
+        self.run_id = run_id
+        self.agent_type = agent_type
+        self.state = "running"
+        self.done = 0
+        self.total = 0
+        self.cancelled = False
+        self.started = time.monotonic()
+        self.rate = 0.0
+        self._sampled = (self.started, 0)
+
+    def add_total(self, count: int):
+        self.total += count
+
+    def advance(self, count: int = 1):
+        self.done += count
+
+    def iterate(self, items: Iterable[T]) -> Iterator[T]:
+        """Yield from items until the run is cancelled"""
+        for item in items:
+            if self.cancelled:
+                return
+            yield item
+
+    def _sample(self, now: float):
+        sampled_at, sampled_done = self._sampled
+        if now - sampled_at <= 0:
+            return
+        rate = (self.done - sampled_done) / (now - sampled_at)
+        self.rate = rate if not self.rate else _RATE_SMOOTHING * rate + (1 - _RATE_SMOOTHING) * self.rate
+        self._sampled = (now, self.done)
+
+    def snapshot(self) -> Dict[str, Any]:
+        remaining = max(0, self.total - self.done)
+        finished = self.state not in ("running", "cancelling")
+        return {
+            "state": self.state,
+            "agent_type": self.agent_type,
+            "done": self.done,
+            "total": self.total,
+            "percent": round(min(100.0, 100.0 * self.done / self.total), 1) if self.total else None,
+            "rate": round(self.rate, 1),
+            "eta_seconds": round(remaining / self.rate, 1) if self.rate and self.total and not finished else None,
+            "elapsed": round(time.monotonic() - self.started, 3),
+            "updated_at": time.time()
+        }
+
+
+# Work done outside a registered run (benchmarks, the scan engine called directly) reports here
+_UNTRACKED = RunTracker()
+_current_run: ContextVar[Optional[RunTracker]] = ContextVar("current_run", default=None)
+
+
+def current_run() -> RunTracker:
+    """Tracker of the run the calling code belongs to; tasks started by a run inherit it"""
+    return _current_run.get() or _UNTRACKED
+
+
+class LocalRunStore:
+    """In-process stand-in for the Redis store: progress and cancel requests in dicts.
+
+    Only visible to the process that holds it, which with the local job
+    backend is the API serving the status and cancel endpoints.
+    """
+
+    name = "local"
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._progress: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cancel: set = set()
+        self._lock = threading.Lock()
+
+    def publish(self, run_id: str, snapshot: Dict[str, Any]):
+        with self._lock:
+            self._progress[run_id] = snapshot
+            self._progress.move_to_end(run_id)
+            while len(self._progress) > self.max_entries:
+                evicted, _ = self._progress.popitem(last=False)
+                self._cancel.discard(evicted)
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._progress.get(run_id)
+
+    def request_cancel(self, run_id: str):
+        with self._lock:
+            self._cancel.add(run_id)
+
+    def cancel_requested(self, run_id: str) -> bool:
+        with self._lock:
+            return run_id in self._cancel
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states: Dict[str, int] = {}
+            for snapshot in self._progress.values():
+                states[snapshot["state"]] = states.get(snapshot["state"], 0) + 1
+            return {"backend": self.name, "runs": states, "cancel_requests": len(self._cancel)}
+
+
+@contextmanager
+def _redis_errors():
+    try:
+        yield
+    except redis.RedisError as e:
+        raise RegistryUnavailable(str(e) or type(e).__name__) from e
+
+
+class RedisRunStore:
+    """Progress and cancel requests in Redis, shared by the API and every Celery worker.
+
+    Both expire after `ttl` seconds, so runs whose worker died do not
+    linger.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, ttl: float = 24 * 3600.0):
+        self.client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self.ttl = int(ttl)
+
+    def publish(self, run_id: str, snapshot: Dict[str, Any]):
+        with _redis_errors():
+            self.client.set(f"run:{run_id}:progress", json.dumps(snapshot), ex=self.ttl)
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with _redis_errors():
+            value = self.client.get(f"run:{run_id}:progress")
+        return json.loads(value) if value else None
+
+    def request_cancel(self, run_id: str):
+        with _redis_errors():
+            self.client.set(f"run:{run_id}:cancel", 1, ex=self.ttl)
+
+    def cancel_requested(self, run_id: str) -> bool:
+        with _redis_errors():
+            return bool(self.client.exists(f"run:{run_id}:cancel"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"backend": self.name}
+        try:
+            self.client.ping()
+        except Exception as e:
+            stats["error"] = str(e) or type(e).__name__
+        return stats
+
+
+class RunRegistry:
+    """Live progress of the runs being executed and the way to cancel them.
+
+    A worker wraps each run in `supervise`, which publishes the run's
+    progress (probes done and planned, smoothed throughput and the ETA
+    from it) every `interval` seconds and checks for a cancel request.
+    A cancelled run is told through its tracker and has `grace` seconds
+    to stop and return its partial results; after that its task is
+    cancelled where it stands, keeping only the findings already stored.
+    """
+
+    def __init__(self, store, interval: float = 0.25, grace: float = 0.5):
+        self.store = store
+        self.interval = interval
+        self.grace = grace
+
+    def track(self, run_id: str, agent_type: str) -> RunTracker:
+        tracker = RunTracker(run_id, agent_type)
+        # A cancel sent while the run was still queued takes effect before any work
+        if self._cancel_requested(tracker):
+            tracker.cancelled = True
+            tracker.state = "cancelling"
+        self._publish(tracker)
+        return tracker
+
+    def _publish(self, tracker: RunTracker):
+        try:
+            self.store.publish(tracker.run_id, tracker.snapshot())
+        except Exception as e:
+            logger.warning("Could not publish progress of run %s: %s", tracker.run_id, e)
+
+    def _cancel_requested(self, tracker: RunTracker) -> bool:
+        try:
+            return self.store.cancel_requested(tracker.run_id)
+        except Exception as e:
+            logger.warning("Could not check run %s for cancellation: %s", tracker.run_id, e)
+            return False
+
+    async def supervise(self, tracker: RunTracker, run: Awaitable[T]) -> T:
+        """Run `run` as the tracker's run, publishing its progress until it finishes"""
+        token = _current_run.set(tracker)
+        try:
+            # The task copies the context now, so everything it starts reports to this tracker
+            task = asyncio.ensure_future(run)
+        finally:
+            _current_run.reset(token)
+        cancel_seen = time.monotonic() if tracker.cancelled else None
+        stopping = False
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.interval)
+                if done:
+                    return task.result()
+                now = time.monotonic()
+                tracker._sample(now)
+                if cancel_seen is None and self._cancel_requested(tracker):
+                    tracker.cancelled = True
+                    tracker.state = "cancelling"
+                    cancel_seen = now
+                if cancel_seen is not None and now - cancel_seen >= self.grace and not stopping:
+                    task.cancel()
+                    stopping = True
+                self._publish(tracker)
+        finally:
+            if not task.done():
+                task.cancel()
+            # The run sets its final state itself; this covers runners that do not
+            if tracker.state in ("running", "cancelling"):
+                succeeded = task.done() and not task.cancelled() and task.exception() is None
+                tracker.state = "cancelled" if tracker.cancelled else "completed" if succeeded else "failed"
+            self._publish(tracker)
+
+    def progress(self, run_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.store.get(run_id)
+        except Exception as e:
+            return {"error": str(e) or type(e).__name__}
+
+    def cancel(self, run_id: str):
+        """Ask a run to stop; raises RegistryUnavailable when the request cannot be stored"""
+        self.store.request_cancel(run_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.store.get_stats()
+
+
+def registry_from_settings() -> RunRegistry:
+    backend = settings.RUN_REGISTRY_BACKEND or ("redis" if settings.JOB_BACKEND == "celery" else "local")
+    if backend == "redis":
+        store = RedisRunStore(settings.REDIS_URL, settings.RUN_PROGRESS_TTL)
+    elif backend == "local":
+        store = LocalRunStore()
+    else:
+        raise ValueError(f"RUN_REGISTRY_BACKEND must be local or redis, not {backend}")
+    return RunRegistry(store, settings.RUN_PROGRESS_INTERVAL, settings.RUN_CANCEL_GRACE)
+
+
+run_registry = registry_from_settings()
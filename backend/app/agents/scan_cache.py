@@ -0,0 +1,144 @@
+from typing import Dict, Any, Awaitable, Callable, Hashable, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future
+import asyncio
+import copy
+import threading
+import time
+
+from ..core.config import settings
+from .run_registry import RunCancelled
+
+
+class ScanResultCache:
+    """Bounded TTL/LRU cache of scan results with single-flight coalescing.
+
+    The first caller for a key runs the scan; identical requests arriving
+    while it is in progress wait on the same future instead of probing
+    the target again. Only successful results are cached, and every
+    caller gets its own deep copy so agents can annotate results freely.
+    A scan cut short because its run was cancelled (RunCancelled) is
+    treated like an abandoned one: callers waiting on it scan again.
+    Like the resolver, the in-flight futures are thread-safe, so callers
+    may run on different event loops.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._cache: "OrderedDict[Hashable, Tuple[float, float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, Tuple[float, Future]] = {}
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "failures": 0, "evictions": 0}
+
+    def _lookup(self, key: Hashable) -> Optional[Tuple[float, Dict[str, Any]]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return stored_at, result
+
+    def _store(self, key: Hashable, result: Dict[str, Any]):
+        now = time.monotonic()
+        with self._lock:
+            self._cache[key] = (now, now + self.ttl, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    async def get_or_run(self, key: Hashable, run: Callable[[], Awaitable[Dict[str, Any]]],
+                         force_refresh: bool = False) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return (result, cache_info) for a key, running the scan only if nobody else is.
+
+        With force_refresh the cached entry is ignored, but a scan that is
+        already in flight is still joined since its result is fresh anyway.
+        """
+        while True:
+            with self._lock:
+                if not force_refresh:
+                    cached = self._lookup(key)
+                    if cached is not None:
+                        stored_at, result = cached
+                        self.stats["hits"] += 1
+                        age = time.monotonic() - stored_at
+                        return copy.deepcopy(result), {"hit": True, "coalesced": False, "age": round(age, 3)}
+
+                in_flight = self._in_flight.get(key)
+                if in_flight is None:
+                    future: Future = Future()
+                    self._in_flight[key] = (time.monotonic(), future)
+                    self.stats["refreshes" if force_refresh else "misses"] += 1
+                else:
+                    self.stats["coalesced"] += 1
+
+            if in_flight is None:
+                return await self._lead(key, run, future)
+
+            started_at, future = in_flight
+            try:
+                # Shielded: a waiter being cancelled must not cancel the scan everyone shares
+                result = await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if not future.cancelled() or (task is not None and task.cancelling()):
+                    raise
+                # The leading scan was abandoned; try again, possibly as the new leader
+                with self._lock:
+                    if self._in_flight.get(key) is in_flight:
+                        del self._in_flight[key]
+                continue
+            age = time.monotonic() - started_at
+            return copy.deepcopy(result), {"hit": False, "coalesced": True, "age": round(age, 3)}
+
+    async def _lead(self, key: Hashable, run: Callable[[], Awaitable[Dict[str, Any]]],
+                    future: Future) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        try:
+            result = await run()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+                if isinstance(e, (asyncio.CancelledError, RunCancelled)):
+                    future.cancel()
+                else:
+                    self.stats["failures"] += 1
+                    if not future.done():
+                        future.set_exception(e)
+            raise
+
+        stored = copy.deepcopy(result)
+        self._store(key, stored)
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if not future.done():
+                future.set_result(stored)
+        return result, {"hit": False, "coalesced": False, "age": 0.0}
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+            return {
+                **self.stats,
+                "entries": len(self._cache),
+                "in_flight": len(self._in_flight),
+                "hit_ratio": round((self.stats["hits"] + self.stats["coalesced"]) / lookups, 4) if lookups else 0.0
+            }
+
+
+# Shared by every network scan in the process
+scan_cache = ScanResultCache(
+    max_entries=settings.SCAN_CACHE_SIZE,
+    ttl=settings.SCAN_CACHE_TTL
+)
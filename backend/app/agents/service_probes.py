@@ -0,0 +1,154 @@
+from typing import Dict, Any, List, Optional, Iterable
+import asyncio
+import os
+import re
+import struct
+
+
+def _tls_client_hello() -> bytes:
+    """Minimal TLS 1.2 ClientHello; any TLS server answers with a handshake or an alert"""
+    ciphers = [0xC02F, 0xC030, 0xC02B, 0xC02C, 0x009C, 0x009D, 0x002F, 0x0035, 0x000A]
+    body = b"\x03\x03" + os.urandom(32) + b"\x00"
+    body += struct.pack("!H", len(ciphers) * 2) + b"".join(struct.pack("!H", c) for c in ciphers)
+    body += b"\x01\x00"  # null compression only
+    handshake = b"\x01" + struct.pack("!I", len(body))[1:] + body
+    return b"\x16\x03\x01" + struct.pack("!H", len(handshake)) + handshake
+
+
+# Probes in the order they are tried. The NULL probe just listens for a
+# greeting; the rest are sent first to the ports they are listed for and,
+# for `fallback` probes, to any port that is still unidentified.
+SERVICE_PROBES: List[Dict[str, Any]] = [
+    {"name": "NULL", "payload": b"", "ports": (), "fallback": True},
+    {"name": "TLSSessionReq", "payload": _tls_client_hello(),
+     "ports": (443, 465, 636, 853, 993, 995, 3389, 5061, 8443, 9443), "fallback": False},
+    {"name": "RDPNegReq", "payload": b"\x03\x00\x00\x13\x0e\xe0\x00\x00\x00\x00\x00\x01\x00\x08\x00\x03\x00\x00\x00",
+     "ports": (3389,), "fallback": False},
+    {"name": "RedisPing", "payload": b"*1\r\n$4\r\nPING\r\n", "ports": (6379,), "fallback": False},
+    {"name": "GetRequest", "payload": b"GET / HTTP/1.0\r\n\r\n",
+     "ports": (80, 81, 591, 3000, 5000, 8000, 8008, 8080, 8081, 8888), "fallback": True},
+]
+
+# Response signatures, most specific first. `version` and `product` name the
+# capture group holding that detail.
+SERVICE_MATCHES: List[Dict[str, Any]] = [
+    {"service": "ssh", "pattern": rb"^SSH-[\d.]+-([^\s\r\n]+)", "product": 1, "ports": (22,)},
+    {"service": "ftp", "pattern": rb"^220[ -](?:[^\r\n]*?(vsFTPd [\d.]+|ProFTPD [\d.]+|FileZilla Server[^\r\n]*|Pure-FTPd)|[^\r\n]*FTP)",
+     "product": 1, "ports": (21,)},
+    {"service": "smtp", "pattern": rb"^220[ -](?:[^\r\n]*?(Postfix|Exim [\d.]+|Sendmail[^\r\n;]*|Microsoft ESMTP[^\r\n]*)|[^\r\n]*SMTP)",
+     "product": 1, "ports": (25, 465, 587)},
+    {"service": "pop3", "pattern": rb"^\+OK[^\r\n]*", "ports": (110, 995)},
+    {"service": "imap", "pattern": rb"^\* OK[^\r\n]*", "ports": (143, 993)},
+    {"service": "http", "pattern": rb"^HTTP/1\.[01] \d{3}.*?(?:\r\nServer: ([^\r\n]+)|\r\n\r\n|$)",
+     "product": 1, "ports": (80, 8000, 8080)},
+    {"service": "mysql", "pattern": rb"^.\x00\x00\x00\x0a([\d.]+[^\x00]*)\x00", "version": 1, "ports": (3306,)},
+    {"service": "mysql", "pattern": rb"^.\x00\x00\x00\xffj\x04Host '", "ports": (3306,)},
+    {"service": "redis", "pattern": rb"^(?:\+PONG|-NOAUTH|-ERR|-DENIED)", "ports": (6379,)},
+    {"service": "vnc", "pattern": rb"^RFB (\d{3}\.\d{3})\n", "version": 1, "ports": (5900, 5901)},
+    {"service": "rdp", "pattern": rb"^\x03\x00..[\x06-\x13]\xd0", "ports": (3389,)},
+    {"service": "telnet", "pattern": rb"^\xff[\xfb-\xfe]", "ports": (23,)},
+    {"service": "https", "pattern": rb"^\x16\x03[\x00-\x04]..\x02", "ports": (443, 8443)},
+    {"service": "https", "pattern": rb"^\x15\x03[\x00-\x04]\x00\x02", "ports": (443, 8443)},
+]
+
+# Canonical port of each identified service, used to look up its rules
+SERVICE_PORTS: Dict[str, int] = {
+    "ftp": 21, "ssh": 22, "telnet": 23, "smtp": 25, "http": 80, "pop3": 110, "imap": 143,
+    "https": 443, "ms-sql": 1433, "mysql": 3306, "rdp": 3389, "postgresql": 5432,
+    "vnc": 5900, "redis": 6379
+}
+
+
+class ServiceMatcher:
+    """Precompiled banner matcher, indexed by port.
+
+    All signatures are compiled once into a single alternation so a banner
+    is classified in one regex pass; ports with hinted signatures get their
+    own smaller alternation that is tried first.
+    """
+
+    def __init__(self, matches: List[Dict[str, Any]], probes: List[Dict[str, Any]]):
+        self.matches = matches
+        self.probes = probes
+        self._compiled = [re.compile(match["pattern"], re.DOTALL) for match in matches]
+        self._all = self._combine(range(len(matches)))
+
+        port_matches: Dict[int, List[int]] = {}
+        for index, match in enumerate(matches):
+            for port in match.get("ports", ()):
+                port_matches.setdefault(port, []).append(index)
+        self._by_port = {port: self._combine(indexes) for port, indexes in port_matches.items()}
+
+        self._probes_by_port: Dict[int, List[Dict[str, Any]]] = {}
+        for probe in probes:
+            for port in probe["ports"]:
+                self._probes_by_port.setdefault(port, []).append(probe)
+        self._fallback_probes = [probe for probe in probes if probe["fallback"]]
+
+    def _combine(self, indexes: Iterable[int]) -> re.Pattern:
+        return re.compile(
+            b"|".join(b"(?P<m%d>%s)" % (index, self.matches[index]["pattern"]) for index in indexes),
+            re.DOTALL
+        )
+
+    def probes_for(self, port: int) -> List[Dict[str, Any]]:
+        """NULL first, then probes hinted for this port, then the generic fallbacks"""
+        ordered = [self.probes[0]] + self._probes_by_port.get(port, []) + self._fallback_probes[1:]
+        return list({probe["name"]: probe for probe in ordered}.values())
+
+    def match(self, banner: bytes, port: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Identify the service behind a banner, or None when nothing matches"""
+        if not banner:
+            return None
+
+        found = None
+        if port in self._by_port:
+            found = self._by_port[port].match(banner)
+        if found is None:
+            found = self._all.match(banner)
+        if found is None:
+            return None
+
+        index = int(found.lastgroup[1:])
+        rule = self.matches[index]
+        detail = self._compiled[index].match(banner)
+        result = {"service": rule["service"]}
+        for field in ("product", "version"):
+            group = rule.get(field)
+            if group and detail.group(group):
+                result[field] = detail.group(group).decode(errors="replace").strip()
+        return result
+
+
+MATCHER = ServiceMatcher(SERVICE_MATCHES, SERVICE_PROBES)
+
+
+def _printable_banner(banner: bytes, limit: int = 256) -> str:
+    return banner[:limit].decode("latin-1").encode("unicode_escape").decode("ascii")
+
+
+async def identify_service(scanner, ip: str, port: int, timeout: float = 1.0,
+                           max_probes: int = 3) -> Dict[str, Any]:
+    """Grab a banner and run probes on one open port until a signature matches"""
+    detection = {"service": None, "method": "port_lookup", "banner": None, "probe": None}
+    for probe in MATCHER.probes_for(port)[:max_probes]:
+        response = await scanner.exchange(ip, port, probe["payload"], timeout)
+        if not response:
+            continue
+        if detection["banner"] is None:
+            detection["banner"] = _printable_banner(response)
+        matched = MATCHER.match(response, port)
+        if matched:
+            detection.update(matched)
+            detection["method"] = "banner_match"
+            detection["probe"] = probe["name"]
+            detection["banner"] = _printable_banner(response)
+            break
+    return detection
+
+
+async def detect_services(scanner, ip: str, ports: Iterable[int], timeout: float = 1.0) -> Dict[int, Dict[str, Any]]:
+    """Fingerprint every open port on a host concurrently"""
+    ports = list(ports)
+    detections = await asyncio.gather(*(identify_service(scanner, ip, port, timeout) for port in ports))
+    return dict(zip(ports, detections))
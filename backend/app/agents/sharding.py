@@ -0,0 +1,155 @@
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import multiprocessing
+import os
+import time
+
+from .port_scanner import AsyncPortScanner, PORT_OPEN, PORT_CLOSED, PORT_FILTERED
+from .port_spec import PortSet
+from .timing import HostTiming
+from .rate_limiter import AgentRateLimit
+from .run_registry import RunTracker, current_run
+
+DEFAULT_SHARD_SIZE = 4096
+# How often workers look at the stop event, and the parent at the run's cancel flag, while shards run
+_STOP_POLL = 0.05
+
+# Set in each worker by the pool initializer; the parent sets it to end every running shard early
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+async def _watch_stop(progress: RunTracker):
+    while not _stop_event.is_set():
+        await asyncio.sleep(_STOP_POLL)
+    progress.cancelled = True
+
+
+def _scan_shard(ip: str, port_bits: bytes, concurrency: int, template: Dict[str, Any],
+                rtt: Optional[float], rate_budget: Optional[Dict[str, Any]]) -> Tuple[List[int], Dict[str, Any]]:
+    """Worker entry point: scan one chunk of ports on its own event loop"""
+    async def run():
+        timing = HostTiming(template)
+        if rtt is not None:
+            timing.record_rtt(rtt)
+        rate_limit = AgentRateLimit.from_budget(rate_budget) if rate_budget else None
+        scanner = AsyncPortScanner(concurrency=concurrency, timeout=timing.timeout, rate_limit=rate_limit)
+        # A stopped pool cancels the shard's own tracker, so the scan returns the ports found so far
+        scanner.progress = RunTracker()
+        scanner.progress.cancelled = _stop_event.is_set()
+        watcher = asyncio.ensure_future(_watch_stop(scanner.progress))
+        try:
+            open_ports = await scanner.scan(ip, PortSet.from_bytes(port_bits), timing=timing)
+        finally:
+            watcher.cancel()
+        return open_ports, scanner.stats
+
+    return asyncio.run(run())
+
+
+class ShardedPortScanner:
+    """Splits port scans into shards and runs them across a process pool.
+
+    One asyncio process tops out on socket bookkeeping long before the
+    network does, so large plans are cut into `shard_size` chunks and each
+    worker process scans its chunks with its own event loop and scanner.
+    The socket budget is divided between the workers so the whole pool
+    never holds more than `concurrency` sockets, and each worker gets an
+    equal share of the caller's rate limits. Shard results are merged
+    as they complete, and only a bounded number of shards are queued at a
+    time, so the full plan is never expanded up front.
+
+    Workers are spawned rather than forked: the parent runs an event loop
+    and resolver threads that must not be duplicated mid-flight. They
+    share a stop event with the parent, set when the run is cancelled or
+    the scanner closed, so running shards end mid-chunk instead of
+    scanning to the end.
+    """
+
+    def __init__(self, workers: Optional[int] = None, shard_size: int = DEFAULT_SHARD_SIZE,
+                 concurrency: int = 1000, rate_limit: Optional[AgentRateLimit] = None):
+        if shard_size < 1:
+            raise ValueError("Shard size must be positive")
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.shard_size = shard_size
+        self.concurrency = concurrency
+        self.worker_concurrency = max(1, concurrency // self.workers)
+        self.rate_budget = rate_limit.budget(1 / self.workers) if rate_limit is not None else None
+        context = multiprocessing.get_context("spawn")
+        self._stop = context.Event()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                         initializer=_init_worker, initargs=(self._stop,))
+        # Shards report to the run's progress as they complete; a cancelled run queues no more of them
+        self.progress = current_run()
+        self.stats = {PORT_OPEN: 0, PORT_CLOSED: 0, PORT_FILTERED: 0, "probes": 0, "retries": 0,
+                      "elapsed": 0.0, "shards": 0}
+
+    async def scan(self, ip: str, ports: PortSet, template: Dict[str, Any], rtt: Optional[float] = None) -> List[int]:
+        """Scan one host's ports across the pool and return the sorted open ports"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        shards = ports.chunks(self.shard_size)
+        pending = set()
+        open_ports: List[int] = []
+
+        try:
+            while True:
+                # Keep every worker busy with one shard queued behind it
+                while len(pending) < self.workers * 2 and not self.progress.cancelled:
+                    shard = next(shards, None)
+                    if shard is None:
+                        break
+                    pending.add(loop.run_in_executor(
+                        self._pool, _scan_shard, ip, shard.to_bytes(), self.worker_concurrency, template, rtt,
+                        self.rate_budget
+                    ))
+                if not pending:
+                    break
+
+                done, pending = await asyncio.wait(pending, timeout=_STOP_POLL, return_when=asyncio.FIRST_COMPLETED)
+                if self.progress.cancelled:
+                    self._stop.set()
+                for future in done:
+                    shard_open, shard_stats = future.result()
+                    open_ports.extend(shard_open)
+                    self.stats["shards"] += 1
+                    self.progress.advance(shard_stats["probes"])
+                    for key in (PORT_OPEN, PORT_CLOSED, PORT_FILTERED, "probes", "retries"):
+                        self.stats[key] += shard_stats[key]
+        except asyncio.CancelledError:
+            self._stop.set()
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+
+        self.stats["elapsed"] += time.perf_counter() - started
+        open_ports.sort()
+        return open_ports
+
+    def close(self):
+        """Stop running shards and drop queued ones without waiting for the workers to exit"""
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self) -> "ShardedPortScanner":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Merged probe counters for every shard scanned so far"""
+        elapsed = self.stats["elapsed"]
+        return {
+            **self.stats,
+            "concurrency": self.concurrency,
+            "workers": self.workers,
+            "shard_size": self.shard_size,
+            "ports_per_second": round(self.stats["probes"] / elapsed, 1) if elapsed else 0.0
+        }
@@ -0,0 +1,155 @@
+from typing import Iterator, List, Tuple, Union
+import ipaddress
+import re
+
+# A /16 is the largest sweep accepted in a single run
+MAX_TARGET_HOSTS = 65536
+
+_HOSTNAME_RE = re.compile(r"^(?=.{1,253}$)(?!-)[a-z0-9-]{1,63}(?<!-)(\.(?!-)[a-z0-9-]{1,63}(?<!-))*\.?$", re.IGNORECASE)
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+class TargetSet:
+    """Lazily expanded set of scan targets built from IPs, CIDR blocks, ranges and hostnames"""
+
+    def __init__(self):
+        self._networks: List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]] = []
+        self._ranges: List[Tuple[IPAddress, IPAddress]] = []
+        self._hostnames: List[str] = []
+
+    def add_network(self, network: Union[ipaddress.IPv4Network, ipaddress.IPv6Network]):
+        self._networks.append(network)
+
+    def add_range(self, start: IPAddress, end: IPAddress):
+        if start.version != end.version or int(start) > int(end):
+            raise ValueError(f"Invalid address range {start}-{end}")
+        self._ranges.append((start, end))
+
+    def add_hostname(self, hostname: str):
+        self._hostnames.append(hostname.rstrip(".").lower())
+
+    @staticmethod
+    def _network_size(network) -> int:
+        # hosts() skips the network and broadcast addresses on IPv4 blocks larger than /31
+        if network.version == 4 and network.prefixlen < 31:
+            return network.num_addresses - 2
+        return network.num_addresses
+
+    def __len__(self) -> int:
+        return (
+            sum(self._network_size(network) for network in self._networks)
+            + sum(int(end) - int(start) + 1 for start, end in self._ranges)
+            + len(self._hostnames)
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        """Yield every target as a string without materialising the whole sweep"""
+        yield from self.iter_addresses()
+        yield from self._hostnames
+
+    def iter_addresses(self) -> Iterator[str]:
+        """Yield the literal IP addresses only, leaving hostnames for the resolver"""
+        for network in self._networks:
+            if network.num_addresses == 1:
+                yield str(network.network_address)
+            else:
+                for address in network.hosts():
+                    yield str(address)
+        for start, end in self._ranges:
+            for value in range(int(start), int(end) + 1):
+                yield str(ipaddress.ip_address(value))
+
+    def contains_address(self, ip: str) -> bool:
+        """Check whether an address is already covered by the literal IP terms"""
+        address = ipaddress.ip_address(ip)
+        return any(address in network for network in self._networks) or any(
+            start.version == address.version and int(start) <= int(address) <= int(end)
+            for start, end in self._ranges
+        )
+
+    def __str__(self) -> str:
+        terms = [
+            str(network.network_address) if network.num_addresses == 1 else str(network)
+            for network in self._networks
+        ]
+        terms.extend(f"{start}-{end}" for start, end in self._ranges)
+        terms.extend(self._hostnames)
+        return ",".join(terms)
+
+    @property
+    def is_single_host(self) -> bool:
+        return len(self) == 1
+
+    @property
+    def hostnames(self) -> List[str]:
+        return list(self._hostnames)
+
+
+def _is_hostname(term: str) -> bool:
+    # A purely numeric last label is a malformed address, not a hostname
+    return bool(_HOSTNAME_RE.match(term)) and not term.rstrip(".").rsplit(".", 1)[-1].isdigit()
+
+
+def _is_address(term: str) -> bool:
+    try:
+        ipaddress.ip_address(term)
+    except ValueError:
+        return False
+    return True
+
+
+def address_sort_key(ip: str) -> Tuple[int, int]:
+    """Sort key ordering addresses numerically, IPv4 before IPv6"""
+    address = ipaddress.ip_address(ip)
+    return address.version, int(address)
+
+
+def _parse_range(term: str) -> Tuple[IPAddress, IPAddress]:
+    """Parse '10.0.0.1-10.0.0.50' or the short form '10.0.0.1-50'"""
+    first, _, last = term.partition("-")
+    start = ipaddress.ip_address(first)
+    if last.isdigit() and start.version == 4:
+        prefix = first.rsplit(".", 1)[0]
+        end = ipaddress.ip_address(f"{prefix}.{last}")
+    else:
+        end = ipaddress.ip_address(last)
+    return start, end
+
+
+def parse_target_spec(spec: str, max_hosts: int = MAX_TARGET_HOSTS) -> TargetSet:
+    """Parse a target specification into a TargetSet.
+
+    Accepts a comma, space or newline separated list of IP addresses,
+    CIDR blocks ('10.0.0.0/24'), address ranges ('10.0.0.1-10.0.0.50',
+    '10.0.0.1-50') and hostnames.
+    """
+    targets = TargetSet()
+    terms = [term.strip() for term in re.split(r"[,\s]+", str(spec)) if term.strip()]
+    if not terms:
+        raise ValueError("Empty target specification")
+
+    for term in terms:
+        try:
+            if "/" in term:
+                targets.add_network(ipaddress.ip_network(term, strict=False))
+                continue
+            try:
+                address = ipaddress.ip_address(term)
+                targets.add_network(ipaddress.ip_network(address))
+                continue
+            except ValueError:
+                pass
+            if "-" in term and _is_address(term.partition("-")[0]):
+                targets.add_range(*_parse_range(term))
+            elif _is_hostname(term):
+                targets.add_hostname(term)
+            else:
+                raise ValueError(term)
+        except ValueError:
+            raise ValueError(f"Invalid target '{term}'")
+
+    if len(targets) > max_hosts:
+        raise ValueError(f"Target specification expands to {len(targets)} hosts (maximum {max_hosts})")
+
+    return targets
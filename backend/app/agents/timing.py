@@ -0,0 +1,135 @@
+from typing import Dict, Any, Optional
+import time
+
+# Named timing templates, modelled on nmap's -T0..-T5. Timeouts and delays
+# are in seconds; parallelism bounds the per-host probe window.
+TIMING_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "paranoid": {
+        "initial_rtt_timeout": 5.0, "min_rtt_timeout": 1.0, "max_rtt_timeout": 10.0,
+        "max_retries": 10, "scan_delay": 5.0,
+        "min_parallelism": 1, "initial_parallelism": 1, "max_parallelism": 1
+    },
+    "sneaky": {
+        "initial_rtt_timeout": 5.0, "min_rtt_timeout": 1.0, "max_rtt_timeout": 10.0,
+        "max_retries": 10, "scan_delay": 1.0,
+        "min_parallelism": 1, "initial_parallelism": 1, "max_parallelism": 1
+    },
+    "polite": {
+        "initial_rtt_timeout": 1.0, "min_rtt_timeout": 0.1, "max_rtt_timeout": 10.0,
+        "max_retries": 10, "scan_delay": 0.4,
+        "min_parallelism": 1, "initial_parallelism": 1, "max_parallelism": 10
+    },
+    "normal": {
+        "initial_rtt_timeout": 1.0, "min_rtt_timeout": 0.1, "max_rtt_timeout": 10.0,
+        "max_retries": 6, "scan_delay": 0.0,
+        "min_parallelism": 10, "initial_parallelism": 100, "max_parallelism": 1000
+    },
+    "aggressive": {
+        "initial_rtt_timeout": 0.5, "min_rtt_timeout": 0.1, "max_rtt_timeout": 1.25,
+        "max_retries": 6, "scan_delay": 0.0,
+        "min_parallelism": 50, "initial_parallelism": 250, "max_parallelism": 2000
+    },
+    "insane": {
+        "initial_rtt_timeout": 0.25, "min_rtt_timeout": 0.05, "max_rtt_timeout": 0.3,
+        "max_retries": 2, "scan_delay": 0.0,
+        "min_parallelism": 100, "initial_parallelism": 500, "max_parallelism": 5000
+    }
+}
+
+DEFAULT_TIMING_TEMPLATE = "normal"
+
+
+def get_timing_template(name: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Return a copy of a named template, optionally pinning the initial probe timeout"""
+    name = (name or DEFAULT_TIMING_TEMPLATE).lower()
+    if name not in TIMING_TEMPLATES:
+        raise ValueError(f"Unknown timing template '{name}' (choose from {', '.join(TIMING_TEMPLATES)})")
+
+    template = dict(TIMING_TEMPLATES[name], name=name)
+    if timeout is not None:
+        template["initial_rtt_timeout"] = timeout
+        template["max_rtt_timeout"] = max(template["max_rtt_timeout"], timeout)
+    return template
+
+
+class HostTiming:
+    """Per-host RTT estimator and probe window.
+
+    Round-trip times are smoothed the way TCP does it (RFC 6298) and the
+    probe timeout tracks srtt + 4 * rttvar. The window grows by one per
+    answered probe until it hits the congestion threshold, then by
+    1/window, and is halved when a retransmission reveals a drop - at
+    most once per smoothed RTT, since one burst of loss usually costs
+    several probes at once.
+    """
+
+    def __init__(self, template: Dict[str, Any]):
+        self.template = template
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self.timeout = template["initial_rtt_timeout"]
+        self.cwnd = float(template["initial_parallelism"])
+        self.ssthresh = float(template["max_parallelism"])
+        self._last_backoff = 0.0
+        self.stats = {"rtt_samples": 0, "responses": 0, "timeouts": 0, "drops": 0, "retries": 0}
+
+    @property
+    def window(self) -> int:
+        return max(1, int(self.cwnd))
+
+    @property
+    def scan_delay(self) -> float:
+        return self.template["scan_delay"]
+
+    @property
+    def allowed_retries(self) -> int:
+        # Until a retransmission has been answered, timeouts most likely mean
+        # "filtered" rather than "lost", so only spend a single retry on them
+        return self.template["max_retries"] if self.stats["drops"] else min(1, self.template["max_retries"])
+
+    def record_rtt(self, rtt: float):
+        """Feed a round-trip sample from a definitive (open or closed) answer"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.stats["rtt_samples"] += 1
+
+        timeout = self.srtt + 4 * self.rttvar
+        self.timeout = min(max(timeout, self.template["min_rtt_timeout"]), self.template["max_rtt_timeout"])
+
+    def on_response(self):
+        self.stats["responses"] += 1
+        if self.cwnd < self.ssthresh:
+            self.cwnd += 1
+        else:
+            self.cwnd += 1 / self.cwnd
+        self.cwnd = min(self.cwnd, self.template["max_parallelism"])
+
+    def on_timeout(self):
+        self.stats["timeouts"] += 1
+
+    def on_retry(self):
+        self.stats["retries"] += 1
+
+    def on_drop(self):
+        """A retransmitted probe was answered, so the first one was lost: back off"""
+        self.stats["drops"] += 1
+        now = time.monotonic()
+        if now - self._last_backoff < (self.srtt or self.timeout):
+            return
+        self._last_backoff = now
+        self.ssthresh = max(self.cwnd / 2, self.template["min_parallelism"])
+        self.cwnd = self.ssthresh
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "template": self.template.get("name"),
+            "srtt": round(self.srtt, 6) if self.srtt is not None else None,
+            "rttvar": round(self.rttvar, 6) if self.rttvar is not None else None,
+            "timeout": round(self.timeout, 6),
+            "window": self.window
+        }
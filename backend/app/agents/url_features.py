@@ -0,0 +1,279 @@
+from typing import Dict, Any, List, Sequence, Tuple
+from functools import lru_cache
+import ipaddress
+import re
+
+import numpy as np
+import tldextract
+
+from .indicators import indicators
+
+# Lexical features per URL, in matrix column order
+FEATURES = (
+    "url_length", "host_length", "path_length", "query_length",
+    "host_dots", "subdomain_depth", "host_hyphens", "host_digits",
+    "url_digits", "url_special_chars", "url_entropy", "host_entropy",
+    "path_depth", "query_params", "percent_escapes",
+    "ip_host", "explicit_port", "userinfo", "plain_http", "punycode", "double_slash_path", "no_suffix",
+    "suspicious_tokens", "suspicious_tld", "shortener", "brand_outside_domain", "executable_download",
+    "kit_path",
+)
+COLUMN = {name: index for index, name in enumerate(FEATURES)}
+
+# Top-level domains that are cheap or free and over-represented in abuse feeds
+SUSPICIOUS_TLDS = frozenset({
+    "tk", "ml", "ga", "cf", "gq", "xyz", "top", "zip", "mov", "work", "click", "link", "country", "kim",
+    "loan", "men", "review", "stream", "download", "racing", "win", "bid", "rest", "icu", "buzz", "cam",
+})
+SHORTENERS = frozenset({
+    "bit.ly", "tinyurl.com", "t.co", "goo.gl", "ow.ly", "is.gd", "buff.ly", "cutt.ly", "rebrand.ly", "shorturl.at",
+    "tiny.cc", "rb.gy", "s.id", "t.ly",
+})
+EXECUTABLE_EXTENSIONS = (".exe", ".scr", ".msi", ".bat", ".cmd", ".ps1", ".vbs", ".jar", ".apk", ".dmg", ".hta")
+
+_URL = re.compile(r"^(?:([a-zA-Z][a-zA-Z0-9+.\-]*):)?(?://)?([^/?#]*)([^?#]*)(?:\?([^#]*))?")
+_SPECIAL = frozenset(b"@~-_=&%;+!$*,")
+_SPECIAL_TABLE = np.zeros(256, dtype=bool)
+_SPECIAL_TABLE[list(_SPECIAL)] = True
+
+# Columns filled from _lexical_row, in the order it returns them
+_ROW_COLUMNS = [COLUMN[name] for name in (
+    "path_length", "query_length", "path_depth", "query_params", "explicit_port", "userinfo", "plain_http",
+    "double_slash_path", "suspicious_tokens", "brand_outside_domain", "kit_path", "executable_download",
+    "ip_host", "punycode", "no_suffix", "suspicious_tld", "shortener", "subdomain_depth",
+)]
+
+# Wide enough for nearly every URL; longer ones are counted on their first MAX_WIDTH bytes
+MAX_WIDTH = 512
+CHUNK_SIZE = 8192
+
+# Bundled public suffix snapshot only: feature extraction never goes to the network
+_tld_extract = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+
+
+@lru_cache(maxsize=65536)
+def split_host(host: str) -> Tuple[str, str, str, bool]:
+    """(subdomain, registered domain, suffix, is an IP address) of a host"""
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return "", host, "", True
+    except ValueError:
+        pass
+    parts = _tld_extract(host)
+    registered = f"{parts.domain}.{parts.suffix}" if parts.suffix else parts.domain
+    return parts.subdomain, registered, parts.suffix, False
+
+
+def _byte_matrix(values: Sequence[str], width: int) -> np.ndarray:
+    """Strings as rows of UTF-8 bytes, zero-padded (or truncated) to `width`"""
+    encoded = np.array([value.encode("utf-8", "replace") for value in values], dtype=f"S{width}")
+    return encoded.view(np.uint8).reshape(len(values), width)
+
+
+def _entropy(matrix: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Shannon entropy in bits per character of every row: log2(n) - sum(c * log2(c)) / n"""
+    rows = matrix.shape[0]
+    flat = (np.arange(rows)[:, None] * 256 + matrix)[matrix != 0]
+    counts = np.bincount(flat, minlength=rows * 256)
+    # Only characters that occur contribute, so the rows x 256 table stays integer
+    present = np.flatnonzero(counts)
+    occurrences = counts[present].astype(np.float64)
+    weighted = np.bincount(present // 256, weights=occurrences * np.log2(occurrences), minlength=rows)
+    totals = np.maximum(np.minimum(lengths, matrix.shape[1]), 1)
+    return np.log2(totals) - weighted / totals
+
+
+@lru_cache(maxsize=65536)
+def _host_features(host: str) -> Tuple[str, str, Tuple[int, ...]]:
+    """Subdomain, registered domain and the features that depend on the host alone"""
+    subdomain, registered, suffix, is_ip = split_host(host)
+    punycode = host.count("xn--")
+    return subdomain, registered, (
+        int(is_ip), punycode, int(not suffix and not is_ip),
+        int(suffix.rsplit(".", 1)[-1] in SUSPICIOUS_TLDS), int(registered in SHORTENERS),
+        subdomain.count(".") + 1 if subdomain else 0,
+    )
+
+
+def _lexical_row(url: str) -> Tuple[str, Tuple]:
+    """Host and the per-URL string features that need Python string handling"""
+    stripped = url.strip()
+    match = _URL.match(stripped)
+    scheme, authority, path, query = match.group(1) or "", match.group(2), match.group(3), match.group(4) or ""
+    userinfo, at, hostport = authority.rpartition("@")
+    if hostport.startswith("["):
+        host, _, port = hostport[1:].partition("]")
+        port = port.lstrip(":")
+    else:
+        host, _, port = hostport.partition(":")
+    host = host.lower().rstrip(".")
+    subdomain, registered, host_values = _host_features(host)
+    # One pass of the URL indicator automaton gives the token, brand and kit path counts;
+    # brands only count before the query, where a link can't just be quoting them
+    before_query = match.end(3) if stripped.isascii() else len(stripped[:match.end(3)].encode("utf-8", "replace"))
+    tokens = kit_paths = 0
+    brand_outside = False
+    for start, group, pattern in indicators.find(stripped, "url"):
+        if group == "suspicious_token":
+            tokens += 1
+        elif group == "kit_path":
+            kit_paths += 1
+        elif group == "brand" and start < before_query and pattern not in registered:
+            brand_outside = True
+    return host, (
+        len(path), len(query),
+        path.count("/"), query.count("&") + 1 if query else 0,
+        int(bool(port)), int(bool(at)), int(scheme.lower() == "http"), int("//" in path),
+        tokens, int(brand_outside), kit_paths,
+        int(path.lower().endswith(EXECUTABLE_EXTENSIONS)),
+    ) + host_values
+
+
+def extract_features(urls: Sequence[str]) -> np.ndarray:
+    """Lexical feature matrix: one row per URL, one float32 column per FEATURES entry.
+
+    String parsing (one regex match and a cached public-suffix lookup per
+    URL) is the only per-URL Python work; lengths, character classes and
+    entropies are computed over byte matrices a chunk of URLs at a time.
+    """
+    matrix = np.zeros((len(urls), len(FEATURES)), dtype=np.float32)
+    for start in range(0, len(urls), CHUNK_SIZE):
+        chunk = urls[start:start + CHUNK_SIZE]
+        rows = [_lexical_row(url) for url in chunk]
+        hosts = [host for host, _ in rows]
+        block = matrix[start:start + len(chunk)]
+
+        block[:, _ROW_COLUMNS] = np.array([values for _, values in rows], dtype=np.float32)
+        url_lengths = np.fromiter((len(url.encode("utf-8", "replace")) for url in chunk), np.int64, len(chunk))
+        url_bytes = _byte_matrix(chunk, min(MAX_WIDTH, max(1, int(url_lengths.max()))))
+        host_lengths = np.fromiter((len(host) for host in hosts), np.int64, len(hosts))
+        host_bytes = _byte_matrix(hosts, max(1, int(host_lengths.max())))
+
+        block[:, COLUMN["url_length"]] = url_lengths
+        block[:, COLUMN["host_length"]] = host_lengths
+        block[:, COLUMN["host_dots"]] = (host_bytes == ord(".")).sum(axis=1)
+        # The "--" of punycode labels is not a hyphen anyone typed
+        block[:, COLUMN["host_hyphens"]] = ((host_bytes == ord("-")).sum(axis=1)
+                                            - 2 * block[:, COLUMN["punycode"]])
+        block[:, COLUMN["host_digits"]] = ((host_bytes >= ord("0")) & (host_bytes <= ord("9"))).sum(axis=1)
+        block[:, COLUMN["url_digits"]] = ((url_bytes >= ord("0")) & (url_bytes <= ord("9"))).sum(axis=1)
+        block[:, COLUMN["url_special_chars"]] = _SPECIAL_TABLE[url_bytes].sum(axis=1)
+        block[:, COLUMN["percent_escapes"]] = (url_bytes == ord("%")).sum(axis=1)
+        block[:, COLUMN["url_entropy"]] = _entropy(url_bytes, url_lengths)
+        block[:, COLUMN["host_entropy"]] = _entropy(host_bytes, host_lengths)
+    return matrix
+
+
+# (indicator, feature, threshold, weight): the indicator fires when feature >= threshold
+URL_RULES = (
+    ("ip_address_host", "ip_host", 1, 0.35),
+    ("credentials_in_url", "userinfo", 1, 0.30),
+    ("brand_impersonation", "brand_outside_domain", 1, 0.40),
+    ("punycode_host", "punycode", 1, 0.20),
+    ("suspicious_keywords", "suspicious_tokens", 1, 0.10),
+    ("many_suspicious_keywords", "suspicious_tokens", 3, 0.15),
+    ("suspicious_tld", "suspicious_tld", 1, 0.15),
+    ("deep_subdomains", "subdomain_depth", 3, 0.15),
+    ("many_hyphens", "host_hyphens", 3, 0.10),
+    ("digits_in_host", "host_digits", 5, 0.10),
+    ("random_looking_host", "host_entropy", 4.0, 0.10),
+    ("long_url", "url_length", 100, 0.10),
+    ("very_long_url", "url_length", 200, 0.10),
+    ("many_escapes", "percent_escapes", 6, 0.10),
+    ("double_slash_redirect", "double_slash_path", 1, 0.10),
+    ("non_standard_port", "explicit_port", 1, 0.10),
+    ("url_shortener", "shortener", 1, 0.15),
+    ("phishing_kit_path", "kit_path", 1, 0.25),
+    ("executable_download", "executable_download", 1, 0.25),
+    ("no_public_suffix", "no_suffix", 1, 0.10),
+    ("plain_http", "plain_http", 1, 0.05),
+)
+CLASSIFICATIONS = ("benign", "suspicious", "phishing")
+# Score at or above which a URL gets each classification after benign
+CLASSIFICATION_THRESHOLDS = (0.3, 0.6)
+
+
+class BatchUrlClassifier:
+    """Rule-based phishing scores for a whole feature matrix at once.
+
+    Each rule is a feature column, a threshold and a weight, so the rules
+    become a column selection, one comparison against the threshold vector
+    and one product with the weight vector for the entire batch. A single
+    URL goes through the same path as a one-row batch.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, str, float, float]] = URL_RULES,
+                 thresholds: Tuple[float, float] = CLASSIFICATION_THRESHOLDS):
+        self.indicators = [name for name, _, _, _ in rules]
+        self._columns = np.array([COLUMN[feature] for _, feature, _, _ in rules])
+        self._thresholds = np.array([threshold for _, _, threshold, _ in rules], dtype=np.float32)
+        self._weights = np.array([weight for _, _, _, weight in rules])
+        self.thresholds = np.array(thresholds)
+
+    def score(self, features: np.ndarray) -> Dict[str, np.ndarray]:
+        hits = features[:, self._columns] >= self._thresholds
+        score = np.minimum(hits @ self._weights, 1.0)
+        return {
+            "score": score,
+            "classification": np.searchsorted(self.thresholds, score, side="right"),
+            "indicator_hits": hits
+        }
+
+    def report(self, urls: Sequence[str], include_features: bool = False,
+               only_flagged: bool = False) -> Dict[str, Any]:
+        """JSON-ready per-URL classifications and a summary of the batch"""
+        features = extract_features(urls)
+        scores = self.score(features)
+        classification = scores["classification"]
+        rows = np.flatnonzero(classification > 0) if only_flagged else range(len(urls))
+
+        results: List[Dict[str, Any]] = []
+        for row in rows:
+            entry = {
+                "url": urls[row],
+                "classification": CLASSIFICATIONS[classification[row]],
+                "score": round(float(scores["score"][row]), 2),
+                "indicators": [self.indicators[index] for index in np.flatnonzero(scores["indicator_hits"][row])]
+            }
+            if include_features:
+                entry["features"] = {name: round(float(value), 3) for name, value in zip(FEATURES, features[row])}
+            results.append(entry)
+
+        return {
+            "results": results,
+            "summary": {
+                "urls": len(urls),
+                "classifications": {
+                    name: int((classification == index).sum()) for index, name in enumerate(CLASSIFICATIONS)
+                },
+                "indicators": {
+                    name: int(count)
+                    for name, count in zip(self.indicators, scores["indicator_hits"].sum(axis=0)) if count
+                }
+            }
+        }
+
+
+url_classifier = BatchUrlClassifier()
+
+
+def classify_url(url: str, include_features: bool = True) -> Dict[str, Any]:
+    """One URL, classified as a one-row batch"""
+    return url_classifier.report([url], include_features=include_features)["results"][0]
+
+
+def domain_signals(domain: str) -> Dict[str, Any]:
+    """Lexical facts about a domain on its own, without the rest of a URL"""
+    subdomain, registered, suffix, is_ip = split_host(domain.lower().rstrip("."))
+    row = extract_features([f"http://{domain}/"])[0]
+    return {
+        "domain": domain,
+        "registered_domain": registered,
+        "suffix": suffix,
+        "ip_address": is_ip,
+        "subdomain_depth": int(row[COLUMN["subdomain_depth"]]),
+        "entropy": round(float(row[COLUMN["host_entropy"]]), 3),
+        "punycode": bool(row[COLUMN["punycode"]]),
+        "suspicious_tld": bool(row[COLUMN["suspicious_tld"]]),
+        "shortener": bool(row[COLUMN["shortener"]])
+    }
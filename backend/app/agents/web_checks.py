@@ -0,0 +1,581 @@
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl
+import asyncio
+import re
+import secrets
+import ssl
+import time
+
+import httpx
+import lxml.html
+from lxml.etree import ParserError
+
+from .http_engine import HttpSession
+
+# OWASP Top 10 (2021) categories the checks report under
+OWASP_TOP10 = {
+    "A01": "Broken Access Control",
+    "A02": "Cryptographic Failures",
+    "A03": "Injection",
+    "A05": "Security Misconfiguration",
+    "A07": "Identification and Authentication Failures",
+}
+
+# Checks run by default, in the order they are reported
+WEB_CHECKS = ("headers", "cors", "tls", "redirects", "sql_injection", "xss", "authentication", "content")
+
+# Penalty per finding when grading security headers
+_GRADE_PENALTY = {"High": 30, "Medium": 15, "Low": 5}
+_GRADES = ((90, "A"), (80, "B"), (70, "C"), (60, "D"))
+
+# HSTS max-age below 180 days is too short to matter
+MIN_HSTS_MAX_AGE = 15552000
+
+# Response headers that advertise software versions
+DISCLOSURE_HEADERS = ("server", "x-powered-by", "x-aspnet-version", "x-aspnetmvc-version", "x-generator")
+
+# Query parameters commonly used for post-login and post-logout redirects
+REDIRECT_PARAMS = ("next", "url", "redirect", "redirect_uri", "return", "returnUrl", "continue", "dest")
+PROBE_HOST = "redirect-probe.invalid"
+CORS_PROBE_ORIGIN = "https://cors-probe.invalid"
+
+PROTECTED_PATHS = ("/admin", "/administrator", "/dashboard", "/manage", "/api/admin", "/console", "/private")
+# Header tricks that front-end proxies and frameworks have honoured to bypass path rules
+BYPASS_HEADERS = (
+    {"X-Forwarded-For": "127.0.0.1"},
+    {"X-Real-IP": "127.0.0.1"},
+    {"X-Custom-IP-Authorization": "127.0.0.1"},
+    {"X-Original-URL": "{path}"},
+    {"X-Rewrite-URL": "{path}"},
+)
+
+SQL_ERRORS = re.compile("|".join((
+    r"you have an error in your sql syntax",
+    r"warning: mysql",
+    r"sqlstate\[",
+    r"ora-\d{5}",
+    r"postgresql.*error|pg_query\(\)|syntax error at or near",
+    r"unterminated quoted string",
+    r"sqlite3?\.\w*error|sqlite error|near \"[^\"]*\": syntax error",
+    r"unclosed quotation mark",
+    r"microsoft ole db provider for sql server|odbc sql server driver",
+    r"quoted string not properly terminated",
+)), re.I)
+
+# Tautology / contradiction pairs for boolean-based injection, by parameter style
+BOOLEAN_PAYLOADS = {
+    "numeric": ((" AND 1=1", " AND 1=2"), (" AND 2=2", " AND 2=3")),
+    "string": (("' AND '1'='1", "' AND '1'='2"), ("' AND 'a'='a", "' AND 'a'='b")),
+}
+
+WEAK_CIPHERS = ("RC4", "3DES", "DES-CBC", "NULL", "EXPORT", "MD5")
+LEGACY_PROTOCOLS = (("TLSv1", ssl.TLSVersion.TLSv1), ("TLSv1.1", ssl.TLSVersion.TLSv1_1))
+
+
+def parse_checks(checks: Any) -> Tuple[str, ...]:
+    """Checks to run from a list of names or a comma separated string; raises ValueError if any is unknown"""
+    if isinstance(checks, str):
+        checks = checks.split(",")
+    elif not isinstance(checks, (list, tuple)) or not all(isinstance(check, str) for check in checks):
+        raise ValueError("checks must be a list of check names or a comma separated string")
+    checks = tuple(check.strip() for check in checks if check.strip())
+    unknown = sorted(set(checks) - set(WEB_CHECKS))
+    if unknown:
+        raise ValueError(f"Unknown checks: {', '.join(unknown)}")
+    return checks
+
+
+def finding(kind: str, severity: str, owasp: str, recommendation: str, url: str, evidence: str,
+            **details) -> Dict[str, Any]:
+    return {
+        "type": kind,
+        "severity": severity,
+        "owasp": owasp,
+        "url": url,
+        "evidence": evidence,
+        "recommendation": recommendation,
+        **details
+    }
+
+
+def _similar(first: httpx.Response, second: httpx.Response) -> bool:
+    """Same status and nearly the same body length"""
+    if first.status_code != second.status_code:
+        return False
+    size = max(len(first.content), len(second.content))
+    return abs(len(first.content) - len(second.content)) <= max(20, size * 0.02)
+
+
+def _is_html(response: httpx.Response) -> bool:
+    return "html" in response.headers.get("content-type", "")
+
+
+class WebChecks:
+    """Rule-based web application checks run over one HttpSession.
+
+    Every check takes the session and returns its details together with a
+    list of findings; each finding names its OWASP Top 10 category and a
+    recommendation catalogue ID. Pages several checks need are fetched
+    once thanks to the session's response cache.
+    """
+
+    @staticmethod
+    def analyze_security_headers(response: httpx.Response) -> Dict[str, Any]:
+        """Grade the response's security headers, cookies and version disclosure"""
+        url = str(response.url)
+        headers = response.headers
+        https = response.url.scheme == "https"
+        findings = []
+
+        def missing(header: str, severity: str, recommendation: str, owasp: str = "A05"):
+            findings.append(finding("missing_security_header", severity, owasp, recommendation, url,
+                                    f"{header} header is not set", header=header))
+
+        hsts = headers.get("strict-transport-security")
+        if https and hsts is None:
+            missing("Strict-Transport-Security", "Medium", "web.hsts", "A02")
+        elif https:
+            max_age = re.search(r"max-age\s*=\s*\"?(\d+)", hsts, re.I)
+            if not max_age or int(max_age.group(1)) < MIN_HSTS_MAX_AGE:
+                findings.append(finding("weak_security_header", "Low", "A02", "web.hsts", url,
+                                        f"HSTS max-age is shorter than 180 days: {hsts}",
+                                        header="Strict-Transport-Security"))
+
+        csp = headers.get("content-security-policy")
+        if csp is None:
+            missing("Content-Security-Policy", "Medium", "web.csp")
+        elif re.search(r"'unsafe-(inline|eval)'", csp):
+            findings.append(finding("weak_security_header", "Low", "A05", "web.csp", url,
+                                    "Content-Security-Policy allows unsafe-inline or unsafe-eval scripts",
+                                    header="Content-Security-Policy"))
+
+        if headers.get("x-frame-options") is None and "frame-ancestors" not in (csp or ""):
+            missing("X-Frame-Options", "Medium", "web.frame_options")
+        if headers.get("x-content-type-options", "").lower() != "nosniff":
+            missing("X-Content-Type-Options", "Low", "web.nosniff")
+        if headers.get("referrer-policy") is None:
+            missing("Referrer-Policy", "Low", "web.referrer_policy")
+        if headers.get("permissions-policy") is None:
+            missing("Permissions-Policy", "Low", "web.permissions_policy")
+
+        for header in DISCLOSURE_HEADERS:
+            value = headers.get(header)
+            # A bare product name is harmless; a version number helps attackers pick exploits
+            if value and (header != "server" or re.search(r"\d", value)):
+                findings.append(finding("information_disclosure", "Low", "A05", "web.hide_versions", url,
+                                        f"{header} header discloses {value}", header=header))
+
+        cookies = []
+        for cookie in headers.get_list("set-cookie"):
+            name = cookie.split("=", 1)[0].strip()
+            attributes = {part.strip().split("=", 1)[0].lower() for part in cookie.split(";")[1:]}
+            flags = {"secure": "secure" in attributes, "httponly": "httponly" in attributes,
+                     "samesite": "samesite" in attributes}
+            cookies.append({"name": name, **flags})
+            absent = [flag for flag, present in flags.items() if not present and (flag != "secure" or https)]
+            if absent:
+                findings.append(finding("insecure_cookie", "Medium" if "httponly" in absent else "Low", "A05",
+                                        "web.cookie_flags", url,
+                                        f"Cookie {name} is missing {', '.join(absent)}", cookie=name))
+
+        score = max(0, 100 - sum(_GRADE_PENALTY[item["severity"]] for item in findings))
+        return {
+            "present": {
+                name: headers[name] for name in (
+                    "strict-transport-security", "content-security-policy", "x-frame-options",
+                    "x-content-type-options", "referrer-policy", "permissions-policy"
+                ) if name in headers
+            },
+            "cookies": cookies,
+            "score": score,
+            "grade": next((grade for threshold, grade in _GRADES if score >= threshold), "F"),
+            "findings": findings
+        }
+
+    @staticmethod
+    async def check_cors(session: HttpSession, url: str) -> Dict[str, Any]:
+        """Does the site reflect arbitrary origins into Access-Control-Allow-Origin?"""
+        response = await session.get(url, headers={"Origin": CORS_PROBE_ORIGIN})
+        allowed = response.headers.get("access-control-allow-origin")
+        credentials = response.headers.get("access-control-allow-credentials", "").lower() == "true"
+        findings = []
+        if allowed in (CORS_PROBE_ORIGIN, "null"):
+            findings.append(finding(
+                "cors_misconfiguration", "High" if credentials else "Medium", "A01", "web.cors", url,
+                f"Access-Control-Allow-Origin reflects {allowed}"
+                + (" with credentials allowed" if credentials else "")
+            ))
+        return {"allow_origin": allowed, "allow_credentials": credentials, "findings": findings}
+
+    @staticmethod
+    async def _handshake(session: HttpSession, host: str, port: int, context: ssl.SSLContext,
+                         timeout: float) -> Dict[str, Any]:
+        # Raw handshakes bypass the HTTP client, so they take their token from the run's limit here
+        if session.rate_limit is not None:
+            await session.rate_limit.acquire(host)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context, server_hostname=host), timeout
+        )
+        try:
+            ssl_object = writer.get_extra_info("ssl_object")
+            cipher, _, bits = ssl_object.cipher()
+            return {
+                "protocol": ssl_object.version(),
+                "cipher": cipher,
+                "bits": bits,
+                "alpn": ssl_object.selected_alpn_protocol(),
+                "certificate": ssl_object.getpeercert()
+            }
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+
+    @classmethod
+    async def check_tls(cls, session: HttpSession, url: str, timeout: float = 10.0) -> Dict[str, Any]:
+        """Protocol, cipher and certificate of the site's TLS endpoint, and whether legacy TLS is accepted"""
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        https = parts.scheme == "https"
+        port = (parts.port or 443) if https else 443
+        result: Dict[str, Any] = {"host": host, "port": port, "enabled": False, "findings": []}
+
+        verified = ssl.create_default_context()
+        verified.set_alpn_protocols(["h2", "http/1.1"])
+        try:
+            handshake = await cls._handshake(session, host, port, verified, timeout)
+            result["certificate_valid"] = True
+        except ssl.SSLCertVerificationError as e:
+            result["certificate_valid"] = False
+            result["certificate_error"] = e.verify_message
+            result["findings"].append(finding("invalid_certificate", "High", "A02", "web.tls_cert", url,
+                                              f"Certificate verification failed: {e.verify_message}"))
+            unverified = ssl.create_default_context()
+            unverified.check_hostname = False
+            unverified.verify_mode = ssl.CERT_NONE
+            try:
+                handshake = await cls._handshake(session, host, port, unverified, timeout)
+            except (OSError, ssl.SSLError, asyncio.TimeoutError) as e:
+                result["error"] = str(e)
+                return result
+        except (OSError, ssl.SSLError, asyncio.TimeoutError) as e:
+            result["error"] = str(e) or type(e).__name__
+            # An http:// site without any HTTPS endpoint sends everything in the clear
+            result["findings"].append(finding("https_unavailable", "Medium" if not https else "High", "A02",
+                                              "web.https", url, f"No TLS endpoint on {host}:{port}"))
+            return result
+
+        certificate = handshake.pop("certificate") or {}
+        result.update(handshake, enabled=True)
+        if certificate:
+            expires = ssl.cert_time_to_seconds(certificate["notAfter"])
+            days_left = int((expires - time.time()) // 86400)
+            result["certificate"] = {
+                "subject": dict(item[0] for item in certificate.get("subject", ())),
+                "issuer": dict(item[0] for item in certificate.get("issuer", ())),
+                "not_after": certificate["notAfter"],
+                "days_left": days_left,
+                "san": [value for kind, value in certificate.get("subjectAltName", ()) if kind == "DNS"]
+            }
+            if days_left < 30:
+                result["findings"].append(finding("certificate_expiring", "Low", "A02", "web.tls_cert", url,
+                                                  f"Certificate expires in {days_left} days"))
+
+        if any(weak in handshake["cipher"] for weak in WEAK_CIPHERS) or handshake["bits"] < 128:
+            result["findings"].append(finding("weak_cipher", "Medium", "A02", "web.tls_ciphers", url,
+                                              f"Negotiated weak cipher {handshake['cipher']}"))
+
+        result["legacy_protocols"] = {}
+        for name, version in LEGACY_PROTOCOLS:
+            legacy = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            legacy.check_hostname = False
+            legacy.verify_mode = ssl.CERT_NONE
+            try:
+                legacy.minimum_version = legacy.maximum_version = version
+                legacy.set_ciphers("DEFAULT:@SECLEVEL=0")
+                await cls._handshake(session, host, port, legacy, timeout)
+            except ssl.SSLError as e:
+                # This OpenSSL build may refuse to speak the protocol at all
+                local = e.reason in ("NO_PROTOCOLS_AVAILABLE", "NO_CIPHERS_AVAILABLE", "UNSUPPORTED_PROTOCOL")
+                result["legacy_protocols"][name] = "untested" if local else "rejected"
+                continue
+            except ConnectionError:
+                # Servers that do not speak the version often just reset the handshake
+                result["legacy_protocols"][name] = "rejected"
+                continue
+            except (OSError, ValueError, asyncio.TimeoutError):
+                result["legacy_protocols"][name] = "untested"
+                continue
+            result["legacy_protocols"][name] = "accepted"
+            result["findings"].append(finding("legacy_tls", "Medium", "A02", "web.tls_legacy", url,
+                                              f"Server accepts {name}"))
+        return result
+
+    @staticmethod
+    async def check_redirects(session: HttpSession, url: str, inputs: Optional[List[Dict[str, Any]]] = None,
+                              max_hops: int = 10) -> Dict[str, Any]:
+        """Follow the redirect chain, check the HTTPS upgrade and probe for open redirects.
+
+        Redirect-style parameters are probed on the target URL and on every
+        discovered GET input point that already carries one.
+        """
+        findings = []
+        hops = []
+        current = url
+        for _ in range(max_hops):
+            response = await session.get(current)
+            location = response.headers.get("location")
+            hops.append({"url": current, "status": response.status_code, "location": location})
+            if not response.is_redirect or not location:
+                break
+            target = urljoin(current, location)
+            if urlsplit(current).scheme == "https" and urlsplit(target).scheme == "http":
+                findings.append(finding("https_downgrade", "Medium", "A02", "web.https_redirect", current,
+                                        f"Redirects from HTTPS to {target}"))
+            if any(hop["url"] == target for hop in hops):
+                findings.append(finding("redirect_loop", "Low", "A05", "web.https_redirect", current,
+                                        f"Redirect loop back to {target}"))
+                break
+            current = target
+
+        parts = urlsplit(url)
+        final_scheme = urlsplit(hops[-1]["url"]).scheme
+        if parts.scheme == "http" and final_scheme != "https":
+            findings.append(finding("no_https_redirect", "Medium", "A02", "web.https_redirect", url,
+                                    "Plain HTTP is served without redirecting to HTTPS"))
+        elif parts.scheme == "https" and parts.port is None:
+            # The http:// twin of an https site should only ever redirect
+            plain = urlunsplit(("http", parts.netloc, parts.path or "/", parts.query, ""))
+            try:
+                response = await session.get(plain)
+                location = urljoin(plain, response.headers.get("location", ""))
+                if not (response.is_redirect and urlsplit(location).scheme == "https"):
+                    findings.append(finding("no_https_redirect", "Medium", "A02", "web.https_redirect", plain,
+                                            f"HTTP answers {response.status_code} instead of redirecting to HTTPS"))
+            except httpx.HTTPError:
+                pass
+
+        async def probe(endpoint: str, params: Dict[str, str], parameter: str) -> Optional[Dict[str, Any]]:
+            try:
+                response = await session.get(endpoint, params={**params, parameter: f"https://{PROBE_HOST}/"})
+            except httpx.HTTPError:
+                return None
+            location = response.headers.get("location", "")
+            if response.is_redirect and urlsplit(urljoin(endpoint, location)).hostname == PROBE_HOST:
+                return finding("open_redirect", "Medium", "A01", "web.open_redirect", endpoint,
+                               f"Parameter {parameter} redirects to {location}", parameter=parameter)
+            return None
+
+        redirect_params = {name.lower() for name in REDIRECT_PARAMS}
+        probes = {(url, parameter): {} for parameter in REDIRECT_PARAMS}
+        for point in inputs or ():
+            for parameter in point["params"]:
+                if point["method"] == "GET" and parameter.lower() in redirect_params:
+                    probes[(point["url"], parameter)] = point["params"]
+        results = await asyncio.gather(*(probe(endpoint, params, parameter)
+                                         for (endpoint, parameter), params in probes.items()))
+        findings.extend(item for item in results if item)
+        return {"chain": hops, "final_url": hops[-1]["url"], "findings": findings}
+
+    @staticmethod
+    def collect_inputs(base: str, links: Iterable[str], forms: Iterable[Dict[str, Any]], max_inputs: int = 20,
+                       inputs: Optional[Dict[Tuple, Dict[str, Any]]] = None) -> Dict[Tuple, Dict[str, Any]]:
+        """Same-origin links with query strings and forms (method, action, params), keyed by endpoint.
+
+        Pass the returned dict back in to merge the inputs of several pages.
+        """
+        origin = urlsplit(base)[:2]
+        inputs = {} if inputs is None else inputs
+
+        def add(method: str, url: str, params: Dict[str, str]):
+            parts = urlsplit(url)
+            if parts[:2] != origin or not params:
+                return
+            endpoint = urlunsplit(parts[:3] + ("", ""))
+            key = (method, endpoint, tuple(sorted(params)))
+            if key not in inputs and len(inputs) < max_inputs:
+                inputs[key] = {"method": method, "url": endpoint, "params": params}
+
+        for href in links:
+            url = urljoin(base, href)
+            add("GET", url, dict(parse_qsl(urlsplit(url).query, keep_blank_values=True)))
+        for form in forms:
+            method = "POST" if form["method"].upper() == "POST" else "GET"
+            add(method, urljoin(base, form["action"] or base), form["params"])
+        return inputs
+
+    @classmethod
+    def crawled_inputs(cls, inputs: List[Dict[str, Any]], pages: Iterable[Dict[str, Any]],
+                       max_inputs: int = 20) -> List[Dict[str, Any]]:
+        """Add the query links and forms a crawl found to a page's input points"""
+        points = {(point["method"], point["url"], tuple(sorted(point["params"]))): point for point in inputs}
+        for page in pages:
+            cls.collect_inputs(page["url"], page.get("query_links", ()), page.get("forms", ()), max_inputs, points)
+        return list(points.values())
+
+    @staticmethod
+    def form_fields(form) -> Dict[str, str]:
+        """Submittable fields of an lxml form element with their default values"""
+        return {
+            field.get("name"): field.get("value") or "1"
+            for field in form.xpath(".//input|.//textarea|.//select")
+            if field.get("name") and (field.get("type") or "").lower() not in ("submit", "button", "file")
+        }
+
+    @classmethod
+    def discover_inputs(cls, response: httpx.Response, max_inputs: int = 20) -> List[Dict[str, Any]]:
+        """Same-origin links with query strings and forms on a page, as injectable input points"""
+        base = str(response.url)
+        inputs = cls.collect_inputs(base, [base], (), max_inputs)
+        if not _is_html(response) or not response.text.strip():
+            return list(inputs.values())
+        try:
+            document = lxml.html.fromstring(response.text)
+        except (ParserError, ValueError):
+            return list(inputs.values())
+
+        forms = [
+            {"method": form.get("method") or "GET", "action": form.get("action"), "params": cls.form_fields(form)}
+            for form in document.xpath("//form")
+        ]
+        return list(cls.collect_inputs(base, document.xpath("//a/@href"), forms, max_inputs, inputs).values())
+
+    @staticmethod
+    async def _send(session: HttpSession, point: Dict[str, Any], params: Dict[str, str]) -> httpx.Response:
+        if point["method"] == "POST":
+            return await session.request("POST", point["url"], data=params)
+        return await session.get(point["url"], params=params)
+
+    @classmethod
+    async def test_sql_injection(cls, session: HttpSession, inputs: List[Dict[str, Any]],
+                                 max_params: int = 30) -> Dict[str, Any]:
+        """Error-based and boolean-based SQL injection on every discovered parameter"""
+        async def test(point: Dict[str, Any], parameter: str) -> Optional[Dict[str, Any]]:
+            original = point["params"][parameter]
+
+            def inject(value: str) -> Dict[str, str]:
+                return {**point["params"], parameter: value}
+
+            baseline = await cls._send(session, point, point["params"])
+            for suffix in ("'", '"'):
+                response = await cls._send(session, point, inject(original + suffix))
+                error = SQL_ERRORS.search(response.text)
+                if error and not SQL_ERRORS.search(baseline.text):
+                    return finding("sql_injection", "High", "A03", "web.sqli", point["url"],
+                                   f"Database error after injecting {suffix}: {error.group(0)}",
+                                   parameter=parameter, method=point["method"], technique="error-based")
+
+            style = "numeric" if original.lstrip("-").isdigit() else "string"
+            for true_suffix, false_suffix in BOOLEAN_PAYLOADS[style]:
+                true_response = await cls._send(session, point, inject(original + true_suffix))
+                false_response = await cls._send(session, point, inject(original + false_suffix))
+                if not (_similar(true_response, baseline) and not _similar(false_response, true_response)):
+                    return None
+            return finding("sql_injection", "High", "A03", "web.sqli", point["url"],
+                           "True and false conditions change the response while the true one matches the original",
+                           parameter=parameter, method=point["method"], technique="boolean-based")
+
+        return await cls._run_per_parameter(test, inputs, max_params)
+
+    @classmethod
+    async def test_xss(cls, session: HttpSession, inputs: List[Dict[str, Any]],
+                       max_params: int = 30) -> Dict[str, Any]:
+        """Reflected XSS: a unique tag injected into each parameter must come back unescaped"""
+        async def test(point: Dict[str, Any], parameter: str) -> Optional[Dict[str, Any]]:
+            marker = f"<cyb{secrets.token_hex(4)}>"
+            response = await cls._send(session, point, {**point["params"], parameter: f"\"'>{marker}"})
+            if _is_html(response) and marker in response.text:
+                return finding("reflected_xss", "High", "A03", "web.xss", point["url"],
+                               f"Injected {marker} is reflected without encoding",
+                               parameter=parameter, method=point["method"])
+            return None
+
+        return await cls._run_per_parameter(test, inputs, max_params)
+
+    @staticmethod
+    async def _run_per_parameter(test, inputs: List[Dict[str, Any]], max_params: int) -> Dict[str, Any]:
+        targets = [(point, parameter) for point in inputs for parameter in point["params"]][:max_params]
+
+        async def guarded(point: Dict[str, Any], parameter: str) -> Optional[Dict[str, Any]]:
+            try:
+                return await test(point, parameter)
+            except httpx.HTTPError:
+                return None
+
+        results = await asyncio.gather(*(guarded(point, parameter) for point, parameter in targets))
+        return {"parameters_tested": len(targets), "findings": [result for result in results if result]}
+
+    @staticmethod
+    async def test_authentication_bypass(session: HttpSession, url: str,
+                                         paths: Tuple[str, ...] = PROTECTED_PATHS) -> Dict[str, Any]:
+        """Find paths that demand authentication and retry them with known path and header bypasses"""
+        parts = urlsplit(url)
+
+        def at(path: str) -> str:
+            return urlunsplit((parts.scheme, parts.netloc, path, "", ""))
+
+        async def status(path: str, **kwargs) -> Optional[httpx.Response]:
+            try:
+                return await session.get(at(path), **kwargs)
+            except httpx.HTTPError:
+                return None
+
+        baselines = await asyncio.gather(*(status(path) for path in paths))
+        protected = [(path, response) for path, response in zip(paths, baselines)
+                     if response is not None and response.status_code in (401, 403)]
+        root = await status("/")
+
+        findings = []
+        if parts.scheme == "http" and any(
+            "basic" in response.headers.get("www-authenticate", "").lower() for _, response in protected
+        ):
+            findings.append(finding("cleartext_basic_auth", "Medium", "A07", "web.https", url,
+                                    "HTTP Basic authentication is requested over plain HTTP"))
+
+        async def attempt(path: str, request_path: str, headers: Dict[str, str],
+                          technique: str) -> Optional[Dict[str, Any]]:
+            response = await status(request_path, headers=headers)
+            if response is None or not response.is_success:
+                return None
+            # Rewrite headers are sent to "/", so a plain copy of the home page proves nothing
+            if request_path == "/" and root is not None and _similar(response, root):
+                return None
+            return finding("authentication_bypass", "High", "A01", "web.access_control", at(path),
+                           f"{technique} returns {response.status_code} for a path that answers "
+                           f"{dict(protected)[path].status_code}", path=path, technique=technique)
+
+        attempts = []
+        for path, _ in protected:
+            for variant in (path + "/", path + "/.", "/" + path, "/%2e" + path, path + "..;/", path + ";",
+                            path.upper()):
+                attempts.append(attempt(path, variant, {}, f"path variant {variant}"))
+            for template in BYPASS_HEADERS:
+                headers = {name: value.format(path=path) for name, value in template.items()}
+                rewrite = "{path}" in next(iter(template.values()))
+                technique = "header " + ", ".join(f"{name}: {value}" for name, value in headers.items())
+                attempts.append(attempt(path, "/" if rewrite else path, headers, technique))
+
+        results = await asyncio.gather(*attempts)
+        # One bypass per path is enough to report it
+        reported = set()
+        for result in results:
+            if result and result["path"] not in reported:
+                reported.add(result["path"])
+                findings.append(result)
+        return {"protected_paths": [path for path, _ in protected], "attempts": len(attempts), "findings": findings}
+
+    @staticmethod
+    def summarize_owasp(findings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Findings counted per OWASP Top 10 category, with the worst severity seen"""
+        order = {"High": 3, "Medium": 2, "Low": 1}
+        summary: Dict[str, Any] = {}
+        for item in findings:
+            category = summary.setdefault(item["owasp"], {
+                "name": OWASP_TOP10[item["owasp"]], "findings": 0, "max_severity": item["severity"]
+            })
+            category["findings"] += 1
+            if order[item["severity"]] > order[category["max_severity"]]:
+                category["max_severity"] = item["severity"]
+        return dict(sorted(summary.items()))
@@ -1,8 +1,14 @@
-from typing import Dict, Any, List
-import requests
+from typing import Dict, Any, Tuple
+from bisect import bisect_right
 from urllib.parse import urlparse
 from .base import BaseAgent, AgentType
 from .rule_engine import RuleBasedEngine
+from .http_engine import http_engine
+from .crawler import crawler_from_options
+from .url_features import CLASSIFICATIONS, CLASSIFICATION_THRESHOLDS, url_classifier, domain_signals
+from .indicators import Matches, indicators
+from .reputation import domain_reputation
+from .recommendations import CLASSIFICATION_RECOMMENDATIONS
 
 class WebClassifierAgent(BaseAgent):
     """Web classification agent for phishing and malicious content detection"""
@@ -23,48 +29,70 @@ class WebClassifierAgent(BaseAgent):
         if not await self.validate_target(target):
             return {"error": "Invalid URL format"}
         
-        # Use rule engine placeholder
+        options = options or {}
         results = RuleBasedEngine.check_web_classification(target)
+        hostname = urlparse(target).hostname
+        results.update(await self.resolve_host(hostname))
+        results["domain_reputation"] = self._analyze_domain_reputation(hostname or "")
+        self._apply_reputation(results, results["domain_reputation"]["reputation"])
+        
+        if options.get("crawl"):
+            try:
+                crawler = crawler_from_options(http_engine.session(self.rate_limit), options, indicators)
+            except ValueError as e:
+                return {"error": str(e)}
+            crawl = await crawler.crawl(target)
+            results["crawl"] = crawl
+            # Every page the crawl reaches is classified in one batch
+            pages = url_classifier.report([page["url"] for page in crawl["pages"] if page.get("status") == 200])
+            content = {page["url"]: page["content_indicators"] for page in crawl["pages"] if page.get("content_indicators")}
+            hosts = [urlparse(page["url"]).hostname or "" for page in pages["results"]]
+            for page, reputation in zip(pages["results"], domain_reputation.lookup_many(hosts)):
+                if page["url"] in content:
+                    self._apply_content_indicators(page, content[page["url"]])
+                if reputation is not None:
+                    page["reputation"] = reputation
+                    self._apply_reputation(page, reputation)
+            pages["summary"]["classifications"] = {
+                name: sum(page["classification"] == name for page in pages["results"]) for name in CLASSIFICATIONS
+            }
+            results["pages"] = pages["results"]
+            results["pages_summary"] = pages["summary"]
         
-        # TODO: Implement comprehensive web classification rules
-        # This is where you'll add your web classification logic
         results.update({
             "classification_method": "rule_based",
-            "agent_version": "1.0",
-            "todo": [
-                "Implement phishing detection rules",
-                "Add malicious URL pattern matching", 
-                "Implement content analysis rules",
-                "Add domain reputation checking",
-                "Implement visual similarity analysis"
-            ]
+            "agent_version": "1.3"
         })
         
         return self.format_results(results)
     
-    def _generate_recommendations(self, results: Dict[str, Any]) -> List[str]:
-        """Generate web classification recommendations"""
-        return [
-            "Web classification rules need to be implemented",
-            "Consider implementing phishing detection algorithms",
-            "Add domain reputation checking",
-            "Implement content analysis for malicious indicators"
-        ]
-    
-    # TODO: Add your web classification methods here
-    # Example methods you might want to implement:
-    
-    def _check_phishing_indicators(self, url: str) -> Dict[str, Any]:
-        """Check for phishing indicators - TO BE IMPLEMENTED"""
-        # Add your phishing detection logic here
-        pass
+    def _generate_recommendations(self, results: Dict[str, Any]) -> Tuple[str, ...]:
+        """Recommendation IDs for the worst classification of the target and any crawled pages"""
+        seen = {results.get("classification")} | {page["classification"] for page in results.get("pages", ())}
+        worst = next((name for name in reversed(CLASSIFICATIONS) if name in seen), "benign")
+        return CLASSIFICATION_RECOMMENDATIONS[worst]
     
     def _analyze_domain_reputation(self, domain: str) -> Dict[str, Any]:
-        """Analyze domain reputation - TO BE IMPLEMENTED"""
-        # Add your domain reputation logic here
-        pass
-    
-    def _check_url_patterns(self, url: str) -> Dict[str, Any]:
-        """Check for malicious URL patterns - TO BE IMPLEMENTED"""
-        # Add your URL pattern analysis here
-        pass
\ No newline at end of file
+        """Lexical signals about the domain itself and its verdict from the local block- and allowlists"""
+        signals = domain_signals(domain)
+        signals["reputation"] = domain_reputation.lookup(domain)
+        return signals
+
+    @staticmethod
+    def _apply_content_indicators(entry: Dict[str, Any], matches: Matches):
+        """Add the weight of each indicator group found in a page's body to its URL score"""
+        entry["content_indicators"] = {group: sorted(found) for group, found in matches.items()}
+        entry["indicators"] = entry.get("indicators", []) + [f"content_{group}" for group in matches]
+        entry["score"] = round(min(1.0, entry["score"] + indicators.score(matches)), 2)
+        entry["classification"] = CLASSIFICATIONS[bisect_right(CLASSIFICATION_THRESHOLDS, entry["score"])]
+
+    @staticmethod
+    def _apply_reputation(entry: Dict[str, Any], reputation: Dict[str, Any]):
+        """A listed domain overrides the lexical classification: blocklisted is phishing, allowlisted benign"""
+        verdict = reputation.get("verdict")
+        if verdict not in ("block", "allow"):
+            return
+        entry["classification"] = CLASSIFICATIONS[-1] if verdict == "block" else CLASSIFICATIONS[0]
+        entry["indicators"] = entry.get("indicators", []) + [f"{verdict}listed_domain"]
+        if "confidence" in entry:
+            entry["confidence"] = 0.95
@@ -1,8 +1,13 @@
-from typing import Dict, Any, List
-import requests
+from typing import Dict, Any, Tuple
 from urllib.parse import urlparse
 from .base import BaseAgent, AgentType
 from .rule_engine import RuleBasedEngine
+from .http_engine import http_engine
+from .web_checks import WEB_CHECKS, parse_checks
+from .content_enum import iter_wordlist, resolve_wordlist, wordlist_size
+from .run_registry import current_run
+from .crawler import crawler_from_options
+from .recommendations import dedupe
 
 class WebPentesterAgent(BaseAgent):
     """Web application penetration testing agent"""
@@ -14,7 +19,7 @@ class WebPentesterAgent(BaseAgent):
         """Validate if target is a valid URL"""
         try:
             parsed = urlparse(target)
-            return bool(parsed.scheme and parsed.netloc)
+            return bool(parsed.scheme in ("http", "https") and parsed.netloc)
         except:
             return False
     
@@ -23,60 +28,58 @@ class WebPentesterAgent(BaseAgent):
         if not await self.validate_target(target):
             return {"error": "Invalid URL format"}
         
-        # Use rule engine placeholder
-        results = RuleBasedEngine.check_web_vulnerabilities(target)
+        options = options or {}
+        try:
+            checks = parse_checks(options.get("checks", WEB_CHECKS))
+        except ValueError as e:
+            return {"error": str(e)}
+        try:
+            max_inputs = int(options.get("max_inputs", 20))
+            max_params = int(options.get("max_params", 30))
+            content_concurrency = max(1, int(options.get("content_concurrency", 10)))
+        except (TypeError, ValueError):
+            return {"error": "max_inputs, max_params and content_concurrency must be integers"}
+        words = None
+        if "content" in checks:
+            try:
+                # Only wordlists from the configured directory, streamed from disk
+                wordlist = resolve_wordlist(options.get("wordlist"))
+                words = iter_wordlist(wordlist, options.get("extensions", ()))
+            except ValueError as e:
+                return {"error": str(e)}
+            # Each word is one request of the run's progress
+            current_run().add_total(wordlist_size(wordlist, options.get("extensions", ())))
+        
+        # Every request of this run shares the pooled client and one response cache
+        session = http_engine.session(self.rate_limit)
+        crawl = None
+        if options.get("crawl"):
+            try:
+                crawler = crawler_from_options(session, options)
+            except ValueError as e:
+                return {"error": str(e)}
+            # Pages found by the crawl widen the input points of the injection checks
+            crawl = await crawler.crawl(target)
+        results = await RuleBasedEngine.check_web_vulnerabilities(
+            target, session, checks=checks, max_inputs=max_inputs, max_params=max_params,
+            timeout=http_engine.timeout, words=words, content_concurrency=content_concurrency,
+            sink=self.result_sink, crawled_pages=crawl["pages"] if crawl else None
+        )
+        if crawl is not None:
+            results["crawl"] = crawl
+        results.update(await self.resolve_host(urlparse(target).hostname))
         
-        # TODO: Implement comprehensive web penetration testing
         results.update({
             "testing_method": "rule_based",
-            "agent_version": "1.0",
-            "todo": [
-                "Implement OWASP Top 10 testing",
-                "Add SQL injection detection",
-                "Implement XSS vulnerability testing",
-                "Add security header analysis",
-                "Implement authentication bypass testing",
-                "Add directory enumeration",
-                "Implement SSL/TLS configuration testing"
-            ]
+            "agent_version": "1.2",
+            "checks": list(checks),
+            "http": {**session.get_stats(), "http2_enabled": http_engine.http2}
         })
         
         return self.format_results(results)
     
-    def _generate_recommendations(self, results: Dict[str, Any]) -> List[str]:
-        """Generate web penetration testing recommendations"""
-        return [
-            "Web penetration testing rules need to be implemented",
-            "Implement OWASP Top 10 vulnerability checks",
-            "Add security header validation",
-            "Implement authentication and session testing",
-            "Add input validation testing"
-        ]
-    
-    # TODO: Add your web penetration testing methods here
-    # Example methods you might want to implement:
-    
-    def _check_owasp_top10(self, url: str) -> Dict[str, Any]:
-        """Check OWASP Top 10 vulnerabilities - TO BE IMPLEMENTED"""
-        # Add your OWASP Top 10 testing logic here
-        pass
-    
-    def _test_sql_injection(self, url: str) -> Dict[str, Any]:
-        """Test for SQL injection vulnerabilities - TO BE IMPLEMENTED"""
-        # Add your SQL injection testing logic here
-        pass
-    
-    def _test_xss_vulnerabilities(self, url: str) -> Dict[str, Any]:
-        """Test for XSS vulnerabilities - TO BE IMPLEMENTED"""
-        # Add your XSS testing logic here
-        pass
-    
-    def _analyze_security_headers(self, url: str) -> Dict[str, Any]:
-        """Analyze security headers - TO BE IMPLEMENTED"""
-        # Add your security header analysis here
-        pass
-    
-    def _test_authentication_bypass(self, url: str) -> Dict[str, Any]:
-        """Test for authentication bypass - TO BE IMPLEMENTED"""
-        # Add your authentication testing logic here
-        pass
\ No newline at end of file
+    def _generate_recommendations(self, results: Dict[str, Any]) -> Tuple[str, ...]:
+        """Recommendation IDs for the findings, most severe first"""
+        order = {"High": 0, "Medium": 1, "Low": 2}
+        findings = sorted(results.get("vulnerabilities", []), key=lambda item: order.get(item["severity"], 3))
+        return dedupe((item["recommendation"] for item in findings), ("web.testing",))
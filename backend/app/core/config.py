@@ -1,5 +1,5 @@
 # backend/app/core/config.py
-from typing import List, Union
+from typing import Dict, List, Union
 from pydantic import AnyHttpUrl, field_validator
 from pydantic_settings import BaseSettings
 
@@ -14,6 +14,109 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./app.db"  # Default to SQLite for development
     
+    # DNS resolution shared by all agents
+    DNS_CACHE_SIZE: int = 4096
+    DNS_CACHE_TTL: float = 300.0
+    DNS_NEGATIVE_CACHE_TTL: float = 30.0
+    DNS_RESOLVER_THREADS: int = 16
+
+    # Network scan results reused across identical requests
+    SCAN_CACHE_SIZE: int = 256
+    SCAN_CACHE_TTL: float = 600.0
+
+    # Outbound probe budgets in probes (or requests) per second; 0 disables a bucket
+    RATE_LIMIT_GLOBAL: float = 20000.0
+    RATE_LIMIT_PER_TARGET: float = 10000.0
+    RATE_LIMIT_AGENTS: Dict[str, float] = {
+        "network_scanner": 20000.0,
+        "web_pentester": 200.0,
+        "web_classifier": 50.0
+    }
+    RATE_LIMIT_BURST_SECONDS: float = 0.1
+
+    # MITRE rule file (empty for the bundled rules), checked for changes this often in seconds
+    MITRE_RULES_PATH: str = ""
+    MITRE_RULES_RELOAD_INTERVAL: float = 2.0
+
+    # Offline ATT&CK knowledge base: STIX bundle and the binary index built from it
+    # (empty for enterprise-attack.json / attack-index.bin in app/agents/data)
+    ATTACK_STIX_PATH: str = ""
+    ATTACK_INDEX_PATH: str = ""
+
+    # Shared HTTP client for the web agents; HTTP/2 also needs the h2 package
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_PER_HOST: int = 10
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_USER_AGENT: str = "Cyber-Agent/1.0"
+    HTTP_HTTP2: bool = True
+
+    # Directory the content enumeration wordlists are read from; runs may only
+    # name files inside it (empty for app/agents/data/wordlists)
+    CONTENT_WORDLIST_DIR: str = ""
+
+    # Crawl budgets for the web agents (runs may override the first five through options),
+    # and politeness per host: concurrent requests and seconds between requests
+    CRAWL_MAX_DEPTH: int = 2
+    CRAWL_MAX_PAGES: int = 100
+    CRAWL_MAX_BYTES: int = 20 * 2 ** 20
+    CRAWL_MAX_PAGE_BYTES: int = 2 * 2 ** 20
+    CRAWL_CONCURRENCY: int = 10
+    CRAWL_PER_HOST: int = 2
+    CRAWL_DELAY: float = 0.0
+
+    # Local domain block- and allowlists (blocklists/*.txt and allowlists/*.txt under the
+    # directory; empty for app/agents/data/reputation), the index compiled from them (empty
+    # for reputation-index.bin in that directory), its bloom filter's false-positive rate, and
+    # how often in seconds running workers look for a rebuilt index or journal updates
+    REPUTATION_LIST_DIR: str = ""
+    REPUTATION_INDEX_PATH: str = ""
+    REPUTATION_ERROR_RATE: float = 0.001
+    REPUTATION_RELOAD_INTERVAL: float = 5.0
+
+    # Where /agents/execute runs agents: "local" (worker threads in the API process; queued
+    # runs are lost on restart) or "celery" (worker processes fed through the broker, one
+    # queue per agent type, e.g. celery -A app.agents.job_queue worker -Q agents.network_scanner)
+    JOB_BACKEND: str = "local"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    JOB_BROKER_URL: str = ""  # empty for REDIS_URL
+    # Worker threads (concurrent runs) per agent type on the local backend, and how many
+    # runs may wait for one before /agents/execute turns new ones away; Celery workers
+    # take --concurrency instead
+    JOB_CONCURRENCY: Dict[str, int] = {
+        "network_scanner": 4,
+        "web_pentester": 8,
+        "web_classifier": 16
+    }
+    JOB_MAX_QUEUED: int = 1000
+    # Runs a Celery worker process reserves ahead of the one it is running
+    JOB_PREFETCH: int = 1
+    # Seconds before the broker hands an unacknowledged run to another worker; must be
+    # longer than the longest run, or long runs are started twice
+    JOB_VISIBILITY_TIMEOUT: float = 12 * 3600.0
+    # Live progress and cancel requests of agent runs: "local" (in the API process) or "redis"
+    # (shared with Celery workers; empty picks redis with the celery job backend), how often in
+    # seconds a run publishes its progress and looks for a cancel request, how long a cancelled
+    # run may take to wind down before it is stopped where it is, and how long progress is kept
+    RUN_REGISTRY_BACKEND: str = ""
+    RUN_PROGRESS_INTERVAL: float = 0.25
+    RUN_CANCEL_GRACE: float = 0.5
+    RUN_PROGRESS_TTL: float = 24 * 3600.0
+    # Runs of one /agents/execute/batch request against the same host that may be queued or
+    # running at once (requests may ask for fewer), and the most runs a batch may create
+    BATCH_PER_TARGET: int = 2
+    BATCH_MAX_RUNS: int = 10000
+
+    # Indicator strings the URL features, page-content scan and severity rules match
+    # (empty for app/agents/data/indicators.json)
+    INDICATORS_PATH: str = ""
+
+    # Largest URL feed the batch classification endpoint accepts per request
+    CLASSIFY_MAX_BATCH: int = 500000
+
+    # Most hosts the batch risk scoring endpoint accepts per request
+    RISK_MAX_BATCH: int = 100000
+
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -1,6 +1,9 @@
+from contextlib import contextmanager
+from typing import Iterator
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
 
 engine = create_engine(
@@ -18,4 +21,18 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """Session for work outside a request, such as an agent run: committed when the block
+    ends, rolled back if it raises, and closed either way"""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -1,7 +1,12 @@
 # backend/app/main.py
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .agents.http_engine import http_engine
+from .agents.job_queue import job_queue
+
 app = FastAPI(
     title="AI Cyber-Agent Platform",
     description="AI-powered penetration testing platform",
@@ -25,13 +30,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+async def shutdown():
+    # Running runs finish first, so wait for them off the loop; then close the API loop's own HTTP pools
+    await asyncio.get_running_loop().run_in_executor(None, job_queue.shutdown)
+    await http_engine.aclose()
+
 @app.get("/")
 async def root():
     return {"message": "AI Cyber-Agent Platform API", "version": "1.0.0", "status": "running"}
 
+# A plain def: with the celery backend the queue depths come from the broker
 @app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
+def health_check():
+    # Agent runs execute off the API's event loop, so this answers however many are queued
+    return {"status": "healthy", "jobs": job_queue.get_stats()}
 
 @app.get("/test-cors")
 async def test_cors():
@@ -13,10 +13,11 @@ class TestRun(Base):
     target_id = Column(UUID(as_uuid=True), ForeignKey("targets.id", ondelete="CASCADE"), nullable=False)
     agent_type = Column(String(50), nullable=False)  # 'web_classifier', 'web_pentester', 'network_scanner'
     engine_type = Column(String(50), nullable=False)  # 'rule_based', 'ml'
-    status = Column(String(50), default="running")  # 'running', 'completed', 'failed'
+    status = Column(String(50), default="running")  # 'queued', 'running', 'completed', 'failed', 'cancelled'
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True))
     duration_seconds = Column(Integer)
+    batch_id = Column(UUID(as_uuid=True), index=True)  # shared by the runs of one /agents/execute/batch request
     
     # Relationships
     project = relationship("Project", back_populates="test_runs")
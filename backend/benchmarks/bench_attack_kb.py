@@ -0,0 +1,130 @@
+"""
+Build the ATT&CK index from a STIX bundle and compare cold start and
+lookup cost against parsing the bundle.
+
+Uses --stix when given, otherwise generates a synthetic bundle shaped like
+enterprise ATT&CK (about 800 techniques, 300 mitigations, 14 tactics).
+
+Run from the backend directory:
+    python -m benchmarks.bench_attack_kb
+    python -m benchmarks.bench_attack_kb --stix enterprise-attack.json
+"""
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from app.agents.attack_kb import AttackIndex, AttackKnowledgeBase, build_index, parse_stix_bundle
+
+TACTICS = ["reconnaissance", "resource-development", "initial-access", "execution", "persistence",
+           "privilege-escalation", "defense-evasion", "credential-access", "discovery", "lateral-movement",
+           "collection", "command-and-control", "exfiltration", "impact"]
+
+
+def synthetic_bundle(techniques: int = 600, subtechniques: int = 200, mitigations: int = 300, seed: int = 3):
+    rng = random.Random(seed)
+    objects = []
+
+    def reference(external_id: str, path: str):
+        return [{"source_name": "mitre-attack", "external_id": external_id,
+                 "url": f"https://attack.mitre.org/{path}/{external_id.replace('.', '/')}"}]
+
+    for shortname in TACTICS:
+        objects.append({"type": "x-mitre-tactic", "id": f"x-mitre-tactic--{uuid.uuid4()}",
+                        "name": shortname.replace("-", " ").title(), "x_mitre_shortname": shortname,
+                        "external_references": reference(f"TA{len(objects):04d}", "tactics")})
+
+    pattern_ids = []
+    ids = [f"T{1000 + index}" for index in range(techniques)]
+    ids += [f"{rng.choice(ids[:200])}.{index:03d}" for index in range(1, subtechniques + 1)]
+    for external_id in ids:
+        stix_id = f"attack-pattern--{uuid.uuid4()}"
+        pattern_ids.append(stix_id)
+        objects.append({
+            "type": "attack-pattern", "id": stix_id, "name": f"Technique {external_id}",
+            "description": "Adversaries may " + " ".join(rng.choice(["abuse", "exploit", "harvest", "enumerate"])
+                                                         for _ in range(60)),
+            "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": tactic}
+                                  for tactic in rng.sample(TACTICS, rng.randint(1, 3))],
+            "external_references": reference(external_id, "techniques")
+        })
+
+    for index in range(mitigations):
+        stix_id = f"course-of-action--{uuid.uuid4()}"
+        objects.append({"type": "course-of-action", "id": stix_id, "name": f"Mitigation {index}",
+                        "description": "Configure " * 30,
+                        "external_references": reference(f"M{1000 + index}", "mitigations")})
+        for target in rng.sample(pattern_ids, rng.randint(1, 12)):
+            objects.append({"type": "relationship", "id": f"relationship--{uuid.uuid4()}",
+                            "relationship_type": "mitigates", "source_ref": stix_id, "target_ref": target})
+
+    return {"type": "bundle", "id": f"bundle--{uuid.uuid4()}", "objects": objects}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ATT&CK index benchmark")
+    parser.add_argument("--stix", default=None)
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    try:
+        stix_path = Path(args.stix) if args.stix else workdir / "enterprise-attack.json"
+        if not args.stix:
+            stix_path.write_text(json.dumps(synthetic_bundle()))
+        index_path = workdir / "attack-index.bin"
+
+        started = time.perf_counter()
+        summary = build_index(stix_path, index_path)
+        print(f"Built index in {time.perf_counter() - started:.2f}s: {summary} "
+              f"(bundle {stix_path.stat().st_size / 1e6:.1f} MB)")
+
+        started = time.perf_counter()
+        with open(stix_path, encoding="utf-8") as handle:
+            parsed = parse_stix_bundle(json.load(handle))
+        print(f"Parsing the bundle at startup: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        started = time.perf_counter()
+        index = AttackIndex(index_path)
+        print(f"Opening the mapped index:      {(time.perf_counter() - started) * 1000:.3f} ms")
+
+        # Every record in the index must match the parsed bundle
+        for technique_id, expected in parsed["techniques"].items():
+            technique = index.technique(technique_id)
+            assert technique["name"] == expected["name"] and technique["tactics"] == expected["tactics"]
+            assert {mitigation["id"] for mitigation in technique["mitigations"]} == expected["mitigations"]
+        for mitigation_id, expected in parsed["mitigations"].items():
+            assert set(index.mitigation(mitigation_id)["techniques"]) == expected["techniques"]
+        for shortname in parsed["tactics"]:
+            members = {tid for tid, record in parsed["techniques"].items() if shortname in record["tactics"]}
+            assert set(index.tactic_techniques(shortname)) == members
+        assert index.technique("T0000") is None and index.mitigation("M0000") is None
+        print(f"Index matches the bundle: {len(parsed['techniques'])} techniques, "
+              f"{len(parsed['mitigations'])} mitigations, {len(parsed['tactics'])} tactics")
+
+        ids = list(parsed["techniques"])
+        rng = random.Random(1)
+        keys = [rng.choice(ids) for _ in range(args.lookups)]
+        started = time.perf_counter()
+        for key in keys:
+            index.technique(key)
+        elapsed = time.perf_counter() - started
+        print(f"Uncached index lookups: {elapsed / len(keys) * 1e6:.1f} us each")
+
+        knowledge_base = AttackKnowledgeBase(index_path, workdir / "missing.json")
+        started = time.perf_counter()
+        for key in keys:
+            knowledge_base.enrich({"technique_id": key})
+        elapsed = time.perf_counter() - started
+        print(f"Memoised enrich():      {elapsed / len(keys) * 1e6:.1f} us each")
+        index.close()
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Batch execution: queue every agent against a whole project, once as the
+frontend does it (one /agents/execute request per target and agent) and
+once with a single /agents/execute/batch request. Compare the time spent
+submitting, how many runs hit the same host at once and how long hosts
+wait for their first run when many of the project's targets sit on one
+host. Then follow the batch to completion through /agents/batch/{id}, and
+send lanes through a real Celery worker on an in-memory broker to check
+that each lane's runs are chained in order.
+
+Uses a throwaway SQLite database and simulated agents (a short sleep per
+run), so no PostgreSQL, broker or targets are needed.
+
+Run from the backend directory:
+    python -m benchmarks.bench_batch [--targets 500] [--shared 100]
+"""
+import os
+import tempfile
+
+# Before the app is imported, so its engine is created on the throwaway database
+_db_dir = tempfile.mkdtemp(prefix="bench-batch-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import INET, JSONB, UUID
+from sqlalchemy.ext.compiler import compiles
+
+from app.core.database import Base, SessionLocal, engine
+from app.models import note, project, user  # noqa: F401, mapped classes the runs relate to
+from app.models.target import Target
+from app.models.test_result import TestRun, TestResult
+from app.agents import agents, job_queue as jobs
+from app.agents.batch import host_key, plan_lanes
+from app.agents.factory import AgentFactory
+from app.api.auth import get_current_user
+
+AGENT_TYPES = ["network_scanner", "web_pentester", "web_classifier"]
+CONCURRENCY = {"network_scanner": 4, "web_pentester": 8, "web_classifier": 16}
+SHARED_HOST = "shared.example"
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(element, compiler, **kw):
+    return "JSON"
+
+
+@compiles(UUID, "sqlite")
+def _uuid_as_char(element, compiler, **kw):
+    return "CHAR(32)"
+
+
+@compiles(INET, "sqlite")
+def _inet_as_varchar(element, compiler, **kw):
+    return "VARCHAR(45)"
+
+
+class HostLoad:
+    """Records how many runs are on each host at once and when each host's first run started"""
+
+    def __init__(self):
+        self.running = {}
+        self.peak = {}
+        self.first_start = {}
+        self.order = []
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    def reset(self):
+        self.__init__()
+
+    def enter(self, target: str):
+        host = host_key(target)
+        with self.lock:
+            self.running[host] = self.running.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.running[host])
+            self.first_start.setdefault(host, time.perf_counter() - self.started)
+            self.order.append(target)
+
+    def leave(self, target: str):
+        with self.lock:
+            self.running[host_key(target)] -= 1
+
+
+load = HostLoad()
+
+
+class SimulatedAgent:
+    def __init__(self, seconds: float = 0.02):
+        self.seconds = seconds
+        self.result_sink = None
+
+    async def execute(self, target: str, options=None):
+        load.enter(target)
+        try:
+            await asyncio.sleep(self.seconds)
+            await self.result_sink("finding", {"type": "simulated", "severity": "Low", "path": target})
+            return {"results": {"target": target}, "confidence_score": 0.5}
+        finally:
+            load.leave(target)
+
+
+def make_project(targets: int, shared: int):
+    """A project whose first `shared` targets are paths on one host and the rest hosts of their own"""
+    project_id = uuid.uuid4()
+    created = datetime(2026, 1, 1)
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "project_id": project_id,
+            "name": f"target {i}",
+            "target_url": f"http://{SHARED_HOST}/app{i}/" if i < shared else f"http://site{i}.example/",
+            "target_type": "website",
+            "created_at": created + timedelta(seconds=i)
+        }
+        for i in range(targets)
+    ]
+    db = SessionLocal()
+    try:
+        db.execute(insert(Target), rows)
+        db.commit()
+    finally:
+        db.close()
+    return project_id, rows
+
+
+def api_app(backend) -> FastAPI:
+    agents.job_queue = backend
+    api = FastAPI()
+    api.include_router(agents.router)
+    api.dependency_overrides[get_current_user] = lambda: None
+    return api
+
+
+def host_summary(label: str, submitted: float, elapsed: float, per_target: int = None):
+    others = [started for host, started in load.first_start.items() if host != SHARED_HOST]
+    print(f"{label}: submitted in {submitted * 1000:7.1f} ms, all done in {elapsed:5.2f}s; "
+          f"{SHARED_HOST} peaked at {load.peak[SHARED_HOST]} runs at once; other hosts waited "
+          f"p50 {statistics.median(others):.2f}s, max {max(others):.2f}s for their first run")
+    if per_target is not None:
+        assert max(load.peak.values()) <= per_target, max(load.peak.values())
+
+
+async def one_request_per_run(project_id, targets):
+    backend = jobs.LocalBackend(CONCURRENCY)
+    transport = httpx.ASGITransport(app=api_app(backend))
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        load.reset()
+        started = time.perf_counter()
+        for target in targets:
+            for agent_type in AGENT_TYPES:
+                response = await client.post("/agents/execute", json={
+                    "agent_type": agent_type, "target": target["target_url"],
+                    "project_id": str(project_id), "target_id": str(target["id"])
+                })
+                assert response.status_code == 200, response.text
+        submitted = time.perf_counter() - started
+    assert await asyncio.to_thread(backend.wait, 300)
+    host_summary("one request per run", submitted, time.perf_counter() - started)
+    db = SessionLocal()
+    try:
+        statuses = db.query(TestRun.status).filter(TestRun.batch_id.is_(None)).distinct().all()
+    finally:
+        db.close()
+    assert statuses == [("completed",)], statuses
+    return submitted
+
+
+async def one_batch(project_id, targets):
+    backend = jobs.LocalBackend(CONCURRENCY)
+    transport = httpx.ASGITransport(app=api_app(backend))
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        load.reset()
+        started = time.perf_counter()
+        response = await client.post("/agents/execute/batch", json={
+            "project_id": str(project_id), "agent_types": AGENT_TYPES
+        })
+        submitted = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+        batch = response.json()
+        assert batch["runs"] == len(targets) * len(AGENT_TYPES) == len(batch["test_runs"]), batch["runs"]
+
+        progress = []
+        while True:
+            status = (await client.get(f"/agents/batch/{batch['batch_id']}")).json()
+            progress.append(status["progress"])
+            if status["status"] == "completed":
+                break
+            await asyncio.sleep(0.25)
+        elapsed = time.perf_counter() - started
+        assert await asyncio.to_thread(backend.wait, 60)
+    assert status["counts"] == {"completed": batch["runs"]}, status["counts"]
+    assert all(counts == {"completed": len(targets)} for counts in status["agents"].values()), status["agents"]
+    assert progress == sorted(progress) and progress[-1] == 1.0
+    host_summary(f"one batch ({batch['lanes']} lanes)", submitted, elapsed, per_target=2)
+    print(f"  progress polled {len(progress)} times: "
+          f"{', '.join(f'{value:.0%}' for value in progress[:: max(1, len(progress) // 6)])} ... 100%")
+
+    db = SessionLocal()
+    try:
+        stored = db.query(TestRun).filter(TestRun.batch_id == uuid.UUID(batch["batch_id"])).count()
+        results = db.query(TestResult).join(TestRun).filter(TestRun.batch_id == uuid.UUID(batch["batch_id"])).count()
+    finally:
+        db.close()
+    assert stored == batch["runs"] and results == 2 * batch["runs"], (stored, results)
+    return submitted
+
+
+def celery_lanes():
+    from celery.contrib.testing.worker import start_worker
+
+    order = []
+    lock = threading.Lock()
+
+    async def simulated(test_run_id, agent_request):
+        load.enter(agent_request["target"])
+        await asyncio.sleep(0.01)
+        load.leave(agent_request["target"])
+        with lock:
+            order.append(test_run_id)
+
+    runs = [
+        (f"{host}-{agent_type}-{i}", {"agent_type": agent_type, "target": f"http://{host}/{i}"})
+        for host in ("a.example", "b.example", "c.example")
+        for i in range(4)
+        for agent_type in AGENT_TYPES
+    ]
+    lanes = plan_lanes(runs, per_target=2)
+    app = jobs.celery_app
+    app.conf.broker_url = "memory://"
+    jobs.run_agent, original = simulated, jobs.run_agent
+    load.reset()
+    try:
+        with start_worker(app, pool="threads", concurrency=8, perform_ping_check=False,
+                          queues=[jobs.queue_name(agent_type) for agent_type in AGENT_TYPES]):
+            queues = jobs.CeleryBackend(app).submit_lanes(lanes)
+            deadline = time.monotonic() + 60
+            while len(order) < len(runs) and time.monotonic() < deadline:
+                time.sleep(0.05)
+    finally:
+        jobs.run_agent = original
+    assert sorted(order) == sorted(run_id for run_id, _ in runs), len(order)
+    for lane in lanes:
+        positions = [order.index(run_id) for run_id, _ in lane]
+        assert positions == sorted(positions), lane
+    assert max(load.peak.values()) <= 2, load.peak
+    print(f"celery: {len(runs)} runs in {len(lanes)} chained lanes over {queues}, "
+          f"each lane in order, at most {max(load.peak.values())} runs per host at once")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", type=int, default=500)
+    parser.add_argument("--shared", type=int, default=100, help="targets on one host")
+    args = parser.parse_args()
+
+    # Just the tables the runs touch: SQLite has no column type for the ARRAY columns elsewhere
+    Base.metadata.create_all(engine, tables=[Target.__table__, TestRun.__table__, TestResult.__table__])
+    project_id, targets = make_project(args.targets, args.shared)
+    AgentFactory.create_agent = staticmethod(lambda agent_type: SimulatedAgent())
+
+    per_run = asyncio.run(one_request_per_run(project_id, targets))
+    batched = asyncio.run(one_batch(project_id, targets))
+    print(f"submitting the project as one batch is {per_run / batched:.0f}x faster")
+    celery_lanes()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Enumerate content on the local stand-in server: check that planted paths
+are found and nothing else is reported whether the site answers unknown
+paths with 404, a soft 200 or a login redirect, that hits stream to the
+sink as they are found, that a throttling site stops the run early, and
+measure throughput and memory with a large wordlist streamed from disk.
+
+Run from the backend directory:
+    python -m benchmarks.bench_content_enum [--words 20000] [--concurrency 10]
+"""
+import argparse
+import asyncio
+import os
+import random
+import string
+import tempfile
+import time
+import tracemalloc
+
+from app.agents.content_enum import ContentEnumerator, iter_wordlist, resolve_wordlist
+from app.agents.http_engine import HttpEngine
+from app.agents.rate_limiter import RateLimiter
+from benchmarks.lab import ContentServer
+
+PLANTED = {
+    "/.git/HEAD": (200, {}, b"ref: refs/heads/main\n"),
+    "/backup.zip": (200, {"Content-Type": "application/zip"}, b"PK\x03\x04" + bytes(512)),
+    "/admin/": (403, {}, b"<html><body>Forbidden</body></html>"),
+    "/uploads/": (200, {}, b"<html><head><title>Index of /uploads</title></head><body></body></html>"),
+    "/robots.txt": (200, {}, b"User-agent: *\nDisallow: /admin/\n"),
+    "/old": (301, {"Location": "/old/"}, b""),
+}
+EXPECTED_FINDINGS = {("sensitive_file_exposed", "/.git/HEAD"), ("sensitive_file_exposed", "/backup.zip"),
+                     ("directory_listing", "/uploads/")}
+
+
+def write_wordlist(path: str, count: int, seed: int = 0):
+    """The bundled list, the planted paths and `count` random words spread through them"""
+    rng = random.Random(seed)
+    words = [word for word in iter_wordlist(resolve_wordlist())]
+    words += [path.lstrip("/") for path in PLANTED]
+    words += ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) for _ in range(count)]
+    words = list(dict.fromkeys(words))
+    rng.shuffle(words)
+    with open(path, "w") as handle:
+        handle.write("\n".join(words) + "\n")
+    return len(words)
+
+
+async def enumerate_once(wordlist: str, missing: str, concurrency: int, throttle_after: int = 0):
+    server = ContentServer(PLANTED, missing=missing, throttle_after=throttle_after)
+    url = await server.start()
+    engine = HttpEngine(max_per_host=concurrency)
+    # The lab is local; no rate limit, so only the enumeration path is measured
+    session = engine.session(RateLimiter().for_agent("web_pentester"))
+    streamed = []
+
+    async def sink(result_type, data):
+        streamed.append((result_type, data))
+
+    try:
+        results = await ContentEnumerator(session, url, concurrency=concurrency).run(
+            iter_wordlist(wordlist), sink
+        )
+    finally:
+        await engine.aclose()
+        await server.stop()
+    return results, streamed
+
+
+def check(results, streamed, missing):
+    found = {hit["path"] for hit in results["discovered"]}
+    assert found == set(PLANTED), f"{missing}: expected {sorted(PLANTED)}, got {sorted(found)}"
+    findings = {(item["type"], "/" + item["url"].split("/", 3)[3]) for item in results["findings"]}
+    assert findings == EXPECTED_FINDINGS, f"{missing}: findings {sorted(findings)}"
+    hits = [data["path"] for kind, data in streamed if kind == "content_discovery"]
+    assert sorted(hits) == sorted(found), f"{missing}: streamed {sorted(hits)}"
+    assert sum(kind == "vulnerability" for kind, _ in streamed) == len(EXPECTED_FINDINGS)
+    assert results["stopped_early"] is None and results["errors"] == 0, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=20000, help="random words added to the bundled list")
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        wordlist = os.path.join(directory, "words.txt")
+        total = write_wordlist(wordlist, args.words)
+        size = os.path.getsize(wordlist)
+        print(f"wordlist: {total} words, {size / 1024:.0f} KiB")
+
+        for missing in ("404", "soft-200", "login-redirect"):
+            tracemalloc.start()
+            started = time.perf_counter()
+            results, streamed = asyncio.run(enumerate_once(wordlist, missing, args.concurrency))
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            check(results, streamed, missing)
+            # tracemalloc slows the run down, so time it again without tracing
+            started = time.perf_counter()
+            results, streamed = asyncio.run(enumerate_once(wordlist, missing, args.concurrency))
+            elapsed = time.perf_counter() - started
+            check(results, streamed, missing)
+            print(f"{missing:>15}: {results['requests']} requests in {elapsed:.2f}s "
+                  f"({results['requests'] / elapsed:.0f} req/s), {results['soft_404_filtered']} soft 404s "
+                  f"filtered, peak traced memory {peak / 1024:.0f} KiB")
+
+        results, _ = asyncio.run(enumerate_once(wordlist, "404", args.concurrency, throttle_after=1000))
+        assert results["stopped_early"] and results["requests"] < 1100, results
+        print(f"      throttled: stopped after {results['requests']} of {total} words "
+              f"({results['stopped_early']})")
+
+
+if __name__ == "__main__":
+    main()
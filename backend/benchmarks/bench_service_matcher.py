@@ -0,0 +1,63 @@
+"""
+Benchmark the compiled service fingerprint matcher and check live banner
+identification against fake services on unusual ports.
+
+Run from the backend directory:
+    python -m benchmarks.bench_service_matcher --banners 200000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.agents.port_scanner import AsyncPortScanner
+from app.agents.service_probes import MATCHER, detect_services
+from benchmarks.lab import FAKE_SERVICES, start_fake_services, stop_listeners
+
+# Deliberately mismatched: nothing here runs on its usual port
+LAB_LAYOUT = {22: "http", 2222: "ssh", 2121: "ftp", 2525: "smtp", 3307: "mysql",
+              5901: "vnc", 6380: "redis", 8081: "http", 9999: "silent"}
+
+
+def bench_matcher(count: int):
+    samples = [
+        (greeting or reply, port)
+        for greeting, reply in FAKE_SERVICES.values() if greeting or reply
+        for port in (22, 80, 2222, 31337)
+    ] + [(b"\x00\x01garbage banner that matches nothing", 4444)]
+    banners = [random.choice(samples) for _ in range(count)]
+
+    started = time.perf_counter()
+    matched = sum(1 for banner, port in banners if MATCHER.match(banner, port))
+    elapsed = time.perf_counter() - started
+    print(f"Matched {matched}/{count} banners in {elapsed:.3f}s ({count / elapsed:,.0f} banners/s)")
+
+
+async def bench_live(host: str):
+    servers = await start_fake_services(host, LAB_LAYOUT)
+    try:
+        scanner = AsyncPortScanner(concurrency=100, timeout=1.0)
+        started = time.perf_counter()
+        detections = await detect_services(scanner, host, LAB_LAYOUT, timeout=0.5)
+        elapsed = time.perf_counter() - started
+    finally:
+        await stop_listeners(servers)
+
+    print(f"Identified {len(LAB_LAYOUT)} ports on {host} in {elapsed:.2f}s")
+    for port, detection in sorted(detections.items()):
+        print(f"  {port:>5} expected={LAB_LAYOUT[port]:<7} got={detection['service']} "
+              f"product={detection.get('product')} version={detection.get('version')} probe={detection['probe']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service fingerprint matcher benchmark")
+    parser.add_argument("--host", default="127.0.0.3")
+    parser.add_argument("--banners", type=int, default=200000)
+    args = parser.parse_args()
+
+    bench_matcher(args.banners)
+    asyncio.run(bench_live(args.host))
+
+
+if __name__ == "__main__":
+    main()
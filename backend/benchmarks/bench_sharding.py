@@ -0,0 +1,80 @@
+"""
+Measure how sharded sweeps scale with the number of worker processes.
+
+Sweeps a block of loopback hosts (127.0.0.x) with fake services on a few
+random ports each, once per process count, and checks every run finds
+the same open ports.
+
+Run from the backend directory:
+    python -m benchmarks.bench_sharding --hosts 16 --ports 1-4096 --processes 1,2,4,8
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from app.agents.port_spec import parse_port_spec
+from app.agents.rule_engine import RuleBasedEngine
+from app.agents.target_spec import parse_target_spec
+from benchmarks.lab import start_listeners, listening_ports, stop_listeners
+
+
+async def run(hosts: int, spec: str, process_counts, shard_size: int, concurrency: int, listeners: int):
+    ports = parse_port_spec(spec)
+    addresses = [f"127.0.0.{10 + index}" for index in range(hosts)]
+    targets = parse_target_spec(",".join(addresses))
+
+    servers = []
+    expected = {}
+    for address in addresses:
+        host_servers = await start_listeners(address, random.sample(list(ports), min(listeners, len(ports))))
+        servers.extend(host_servers)
+        expected[address] = listening_ports(host_servers)
+
+    baseline = None
+    try:
+        for processes in process_counts:
+            started = time.perf_counter()
+            results = await RuleBasedEngine.check_network_range_security(
+                targets, ports, concurrency=concurrency, discovery=False, service_detection=False,
+                timing_template="aggressive", processes=processes, shard_size=shard_size
+            )
+            elapsed = time.perf_counter() - started
+            probes = hosts * len(ports)
+            baseline = baseline or elapsed
+            found = {host["target"]: host["open_ports"] for host in results["hosts"]}
+            status = "ok" if all(set(expected[h]) <= set(found.get(h, [])) for h in addresses) else "MISMATCH"
+            print(f"processes={processes:<3} {probes} probes in {elapsed:6.2f}s "
+                  f"({probes / elapsed:>9,.0f} ports/s, speedup {baseline / elapsed:4.2f}x) {status}")
+    finally:
+        await stop_listeners(servers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process-sharded sweep scaling benchmark")
+    parser.add_argument("--hosts", type=int, default=16)
+    parser.add_argument("--ports", default="1-4096")
+    parser.add_argument("--processes", default=None,
+                        help="Comma separated worker counts (default: 1 up to the CPU count, doubling)")
+    parser.add_argument("--shard-size", type=int, default=2048)
+    parser.add_argument("--concurrency", type=int, default=2000)
+    parser.add_argument("--listeners", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.processes:
+        process_counts = [int(count) for count in args.processes.split(",")]
+    else:
+        cpus = os.cpu_count() or 1
+        process_counts = [1]
+        while process_counts[-1] * 2 <= cpus:
+            process_counts.append(process_counts[-1] * 2)
+        if process_counts[-1] != cpus:
+            process_counts.append(cpus)
+
+    print(f"CPUs available: {os.cpu_count()}")
+    asyncio.run(run(args.hosts, args.ports, process_counts, args.shard_size, args.concurrency, args.listeners))
+
+
+if __name__ == "__main__":
+    main()
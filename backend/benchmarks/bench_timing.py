@@ -0,0 +1,65 @@
+"""
+Exercise the adaptive timing engine against local listeners behind an
+injected delay/loss link.
+
+Run from the backend directory:
+    python -m benchmarks.bench_timing --delay 0.05 --loss 0.05
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.agents.port_scanner import AsyncPortScanner
+from app.agents.timing import HostTiming, get_timing_template, TIMING_TEMPLATES
+from benchmarks.lab import start_listeners, listening_ports, stop_listeners, DelayInjectingConnector
+
+
+async def scan_once(host, ports, expected, template_name, delay, jitter, loss):
+    connector = DelayInjectingConnector(delay=delay, jitter=jitter, loss=loss, seed=1)
+    template = get_timing_template(template_name)
+    scanner = AsyncPortScanner(concurrency=2000, timeout=template["initial_rtt_timeout"], connector=connector)
+    timing = HostTiming(template)
+
+    started = time.perf_counter()
+    found = await scanner.scan(host, ports, timing=timing)
+    elapsed = time.perf_counter() - started
+
+    stats = timing.get_stats()
+    print(f"{template_name:>10}: {elapsed:6.2f}s  found {len(found)}/{len(expected)}  "
+          f"srtt={stats['srtt']}  timeout={stats['timeout']}  window={stats['window']}  "
+          f"retries={stats['retries']}  drops={stats['drops']}  (link dropped {connector.dropped})")
+
+
+async def run(host, start, end, listeners, delay, jitter, loss, templates):
+    candidates = random.sample(range(start, end + 1), min(listeners, end - start + 1))
+    servers = await start_listeners(host, candidates)
+    expected = listening_ports(servers)
+    ports = range(start, end + 1)
+
+    print(f"{end - start + 1} ports, {len(expected)} listeners, delay={delay}s jitter={jitter}s loss={loss:.0%}")
+    try:
+        for name in templates:
+            await scan_once(host, ports, expected, name, delay, jitter, loss)
+    finally:
+        await stop_listeners(servers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive timing engine benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--ports", default="20000-22999")
+    parser.add_argument("--listeners", type=int, default=30)
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--loss", type=float, default=0.05)
+    parser.add_argument("--templates", default="normal,aggressive,insane")
+    args = parser.parse_args()
+
+    templates = [name for name in args.templates.split(",") if name in TIMING_TEMPLATES]
+    start, end = map(int, args.ports.split("-"))
+    asyncio.run(run(args.host, start, end, args.listeners, args.delay, args.jitter, args.loss, templates))
+
+
+if __name__ == "__main__":
+    main()
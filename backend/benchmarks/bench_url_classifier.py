@@ -0,0 +1,115 @@
+"""
+Classify a synthetic URL feed: check that the batch path gives exactly the
+per-URL results and a reference entropy, report how the rules separate the
+planted phishing URLs from benign ones, and measure URLs per second for
+feature extraction, scoring and the full report against classifying one
+URL at a time.
+
+Run from the backend directory:
+    python -m benchmarks.bench_url_classifier [--urls 200000] [--hosts 20000]
+"""
+import argparse
+import math
+import random
+import string
+import time
+from collections import Counter
+
+import numpy as np
+
+from app.agents.url_features import FEATURES, COLUMN, extract_features, url_classifier, classify_url
+
+BENIGN_DOMAINS = ("example.com", "wikipedia.org", "github.com", "python.org", "bbc.co.uk", "gov.uk",
+                  "mozilla.org", "stackoverflow.com", "nytimes.com", "uni-heidelberg.de")
+WORDS = ("news", "docs", "blog", "about", "products", "2024", "article", "team", "search", "images", "help")
+
+
+def random_word(rng: random.Random, low: int = 4, high: int = 10) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+
+
+def benign_url(rng: random.Random, host: str) -> str:
+    path = "/".join(rng.choice(WORDS) for _ in range(rng.randint(0, 4)))
+    query = f"?id={rng.randint(1, 99999)}" if rng.random() < 0.3 else ""
+    return f"https://{host}/{path}{query}"
+
+
+def phishing_url(rng: random.Random, host: str) -> str:
+    kind = rng.randrange(5)
+    if kind == 0:
+        return f"http://paypal.com.{host}.tk/webscr/login/verify.php?cmd=update"
+    if kind == 1:
+        return f"http://{rng.randint(11, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" \
+               f":8080/secure/account/update.exe"
+    if kind == 2:
+        return f"http://support@{host}-secure-login-verify.xyz/signin/confirm"
+    if kind == 3:
+        return f"https://appleid.apple.com.{host}.top/account/verify?session={random_word(rng, 24, 32)}"
+    return f"http://xn--{random_word(rng)}-{random_word(rng, 3, 4)}.com//redirect/login?next=%2F%2F{host}.ml"
+
+
+def make_feed(count: int, hosts: int, phishing_share: float = 0.2, seed: int = 0):
+    rng = random.Random(seed)
+    benign_hosts = [f"{random_word(rng)}.{rng.choice(BENIGN_DOMAINS)}" for _ in range(hosts)]
+    phishing_hosts = [random_word(rng, 6, 14) for _ in range(max(1, hosts // 5))]
+    urls, labels = [], []
+    for _ in range(count):
+        if rng.random() < phishing_share:
+            urls.append(phishing_url(rng, rng.choice(phishing_hosts)))
+            labels.append(True)
+        else:
+            urls.append(benign_url(rng, rng.choice(benign_hosts)))
+            labels.append(False)
+    return urls, np.array(labels)
+
+
+def entropy(text: str) -> float:
+    counts = Counter(text.encode())
+    return -sum(count / len(text) * math.log2(count / len(text)) for count in counts.values()) if text else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=200000)
+    parser.add_argument("--hosts", type=int, default=20000, help="distinct benign hosts in the feed")
+    parser.add_argument("--sample", type=int, default=2000, help="URLs classified one at a time")
+    args = parser.parse_args()
+
+    urls, phishing = make_feed(args.urls, args.hosts)
+
+    # Batch results must not depend on what else is in the batch
+    features = extract_features(urls)
+    sample = random.Random(1).sample(range(len(urls)), min(args.sample, len(urls)))
+    for row in sample:
+        single = extract_features([urls[row]])[0]
+        assert np.array_equal(single, features[row]), (urls[row], dict(zip(FEATURES, single - features[row])))
+        assert abs(features[row, COLUMN["url_entropy"]] - entropy(urls[row])) < 1e-4, urls[row]
+
+    scores = url_classifier.score(features)
+    flagged = scores["classification"] > 0
+    recall = flagged[phishing].mean()
+    false_positives = flagged[~phishing].mean()
+    print(f"{len(urls)} URLs: {recall:.1%} of planted phishing flagged, {false_positives:.2%} of benign flagged")
+
+    started = time.perf_counter()
+    extract_features(urls)
+    extract_time = time.perf_counter() - started
+    started = time.perf_counter()
+    url_classifier.score(features)
+    score_time = time.perf_counter() - started
+    started = time.perf_counter()
+    report = url_classifier.report(urls)
+    report_time = time.perf_counter() - started
+    started = time.perf_counter()
+    singles = [classify_url(urls[row], include_features=False) for row in sample]
+    single_time = (time.perf_counter() - started) / len(sample)
+    assert singles == [report["results"][row] for row in sample]
+
+    print(f"extract features: {len(urls) / extract_time:>12,.0f} URLs/s")
+    print(f"score matrix:     {len(urls) / score_time:>12,.0f} URLs/s")
+    print(f"full report:      {len(urls) / report_time:>12,.0f} URLs/s")
+    print(f"one URL per call: {1 / single_time:>12,.0f} URLs/s ({single_time * len(urls) / report_time:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Local fake-service lab used by the benchmark scripts
+"""
+from typing import List
+import asyncio
+import random
+
+
+async def _close_immediately(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    writer.close()
+
+
+async def start_listeners(host: str, ports: List[int]) -> List[asyncio.AbstractServer]:
+    """Open a TCP listener on each requested port, skipping ports already in use"""
+    servers = []
+    for port in ports:
+        try:
+            servers.append(await asyncio.start_server(_close_immediately, host, port))
+        except OSError:
+            continue
+    return servers
+
+
+def listening_ports(servers: List[asyncio.AbstractServer]) -> List[int]:
+    """Return the ports the given servers are actually bound to"""
+    return sorted(server.sockets[0].getsockname()[1] for server in servers)
+
+
+async def stop_listeners(servers: List[asyncio.AbstractServer]):
+    """Close every listener started by start_listeners"""
+    for server in servers:
+        server.close()
+        await server.wait_closed()
+
+
+class DelayInjectingConnector:
+    """Connect hook for AsyncPortScanner that simulates a slow, lossy link without netem.
+
+    Every connect attempt is held for `delay` seconds (plus up to `jitter`)
+    before the real loopback connect runs, and `loss` is the probability
+    that an attempt is silently dropped so only a retransmission can
+    answer it.
+    """
+
+    def __init__(self, delay: float = 0.05, jitter: float = 0.0, loss: float = 0.0, seed: int = 0):
+        self.delay = delay
+        self.jitter = jitter
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.attempts = 0
+        self.dropped = 0
+
+    async def __call__(self, sock, address):
+        self.attempts += 1
+        if self.random.random() < self.loss:
+            self.dropped += 1
+            # A dropped SYN never gets an answer; the scanner's timeout fires
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delay + self.random.random() * self.jitter)
+        await asyncio.get_running_loop().sock_connect(sock, address)
+
+
+# Greeting sent on connect (None = wait for the client) and reply to any request
+FAKE_SERVICES = {
+    "ssh": (b"SSH-2.0-OpenSSH_8.9p1 Ubuntu-3ubuntu0.6\r\n", None),
+    "ftp": (b"220 (vsFTPd 3.0.5)\r\n", None),
+    "smtp": (b"220 mail.lab.local ESMTP Postfix (Ubuntu)\r\n", None),
+    "mysql": (b"J\x00\x00\x00\x0a8.0.36-0ubuntu0.22.04.1\x00\x08\x00\x00\x00abcdefgh\x00", None),
+    "vnc": (b"RFB 003.008\n", None),
+    "http": (None, b"HTTP/1.1 200 OK\r\nServer: nginx/1.24.0\r\nContent-Length: 2\r\n\r\nok"),
+    "redis": (None, b"-NOAUTH Authentication required.\r\n"),
+    "silent": (None, None),
+}
+
+
+def _fake_service_handler(greeting, reply):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            if greeting:
+                writer.write(greeting)
+                await writer.drain()
+            data = await asyncio.wait_for(reader.read(1024), 5)
+            if data and reply:
+                writer.write(reply)
+                await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    return handle
+
+
+async def start_fake_services(host: str, layout: dict) -> List[asyncio.AbstractServer]:
+    """Start fake services from a {port: service_name} layout, e.g. SSH on 2222 and HTTP on 22"""
+    servers = []
+    for port, name in layout.items():
+        greeting, reply = FAKE_SERVICES[name]
+        servers.append(await asyncio.start_server(_fake_service_handler(greeting, reply), host, port))
+    return servers
+
+
+class VulnerableWebApp:
+    """Deliberately vulnerable aiohttp site for the web pentester.
+
+    Plants one of each issue the checks look for: reflected XSS on
+    /search, SQL injection into a real SQLite query on /item, an open
+    redirect on /login, an /admin that only the exact path protects,
+    Basic auth over plain HTTP on /private, a reflected CORS origin and
+    weak headers and cookies. /lookup and /comment handle the same kind
+    of input safely and must not be reported. Every request and every
+    TCP connection is counted, so connection reuse can be checked, and
+    `handshake_delay` holds the first request on each new connection to
+    stand in for the TCP/TLS round trips loopback does not have.
+    """
+
+    def __init__(self, handshake_delay: float = 0.0):
+        import sqlite3
+        self.db = sqlite3.connect(":memory:")
+        self.db.executescript(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT);"
+            "INSERT INTO items (name) VALUES ('widget'), ('gadget'), ('gizmo');"
+        )
+        self.handshake_delay = handshake_delay
+        self.requests = 0
+        self.connections = set()
+        self.runner = None
+        self.url = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        from aiohttp import web
+
+        @web.middleware
+        async def track(request, handler):
+            self.requests += 1
+            if request.transport not in self.connections:
+                self.connections.add(request.transport)
+                if self.handshake_delay:
+                    await asyncio.sleep(self.handshake_delay)
+            response = await handler(request)
+            response.headers["Server"] = "Apache/2.4.1 (Unix)"
+            response.headers["X-Powered-By"] = "PHP/5.6.40"
+            origin = request.headers.get("Origin")
+            if origin:
+                response.headers["Access-Control-Allow-Origin"] = origin
+                response.headers["Access-Control-Allow-Credentials"] = "true"
+            return response
+
+        app = web.Application(middlewares=[track])
+        app.router.add_get("/", self.index)
+        app.router.add_get("/search", self.search)
+        app.router.add_get("/item", self.item)
+        app.router.add_get("/lookup", self.lookup)
+        app.router.add_post("/comment", self.comment)
+        app.router.add_get("/login", self.login)
+        app.router.add_get("/admin", self.admin)
+        app.router.add_get("/admin/", self.admin_panel)
+        app.router.add_get("/private", self.private)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{bound_port}/"
+        return self.url
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    @staticmethod
+    def _page(body: str, status: int = 200, **kwargs):
+        from aiohttp import web
+        return web.Response(text=f"<html><body>{body}</body></html>", status=status, content_type="text/html",
+                            **kwargs)
+
+    async def index(self, request):
+        response = self._page(
+            '<a href="/search?q=shoes">Search</a> <a href="/item?id=1">Item</a> '
+            '<a href="/login?next=/account">Log in</a> <a href="https://elsewhere.example/?ref=1">Partner</a>'
+            '<form action="/lookup"><input name="user" value="alice"><input type="submit"></form>'
+            '<form action="/comment" method="post"><textarea name="text"></textarea></form>'
+        )
+        response.set_cookie("session", "d41d8cd98f00b204")
+        return response
+
+    async def search(self, request):
+        return self._page(f"Results for {request.query.get('q', '')}")
+
+    async def item(self, request):
+        import sqlite3
+        try:
+            rows = self.db.execute(f"SELECT name FROM items WHERE id = {request.query.get('id', '0')}").fetchall()
+        except sqlite3.Error as e:
+            return self._page(f"sqlite3.OperationalError: {e}", status=500)
+        return self._page("Item: " + ", ".join(row[0] for row in rows) if rows else "No such item")
+
+    async def lookup(self, request):
+        import html
+        user = request.query.get("user", "")
+        rows = self.db.execute("SELECT name FROM items WHERE name = ?", (user,)).fetchall()
+        return self._page(f"{len(rows)} items owned by {html.escape(user)}")
+
+    async def comment(self, request):
+        import html
+        data = await request.post()
+        return self._page(f"Thanks for: {html.escape(data.get('text', ''))}")
+
+    async def login(self, request):
+        from aiohttp import web
+        raise web.HTTPFound(request.query.get("next", "/"))
+
+    async def admin(self, request):
+        return self._page("Forbidden", status=403)
+
+    async def admin_panel(self, request):
+        return self._page("Admin panel: 3 users, 12 orders, settings")
+
+    async def private(self, request):
+        return self._page("Authentication required", status=401,
+                          headers={"WWW-Authenticate": 'Basic realm="private"'})
+
+
+class ContentServer:
+    """Minimal keep-alive HTTP/1.1 server standing in for a site under content enumeration.
+
+    `paths` maps the paths that exist to (status, headers, body). Unknown
+    paths are answered according to `missing`: "404", "soft-200" (a 200
+    page that echoes the path and a random token, like many CMS error
+    pages) or "login-redirect" (302 to the login page). After
+    `throttle_after` requests every answer is a 429. Written on raw
+    asyncio protocols so the server is not the bottleneck on one core.
+    """
+
+    def __init__(self, paths: dict, missing: str = "404", throttle_after: int = 0):
+        self.paths = {
+            path: self._response(status, body, headers) for path, (status, headers, body) in paths.items()
+        }
+        self.missing = missing
+        self.throttle_after = throttle_after
+        self.requests = 0
+        self.server = None
+        self.url = None
+
+    @staticmethod
+    def _response(status: int, body: bytes, headers: dict = None) -> bytes:
+        lines = [f"HTTP/1.1 {status} X", f"Content-Length: {len(body)}", "Content-Type: text/html"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+    def respond(self, path: str) -> bytes:
+        self.requests += 1
+        if self.throttle_after and self.requests > self.throttle_after:
+            return self._response(429, b"slow down", {"Retry-After": "0"})
+        response = self.paths.get(path)
+        if response is not None:
+            return response
+        if self.missing == "soft-200":
+            token = "%016x" % random.getrandbits(64)
+            return self._response(200, f"<html><body>Sorry, {path} was not found. Request {token}</body></html>"
+                                  .encode())
+        if self.missing == "login-redirect":
+            return self._response(302, b"", {"Location": f"/login?next={path}"})
+        return self._response(404, b"<html><body>Not Found</body></html>")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        server = self
+
+        class Protocol(asyncio.Protocol):
+            def connection_made(self, transport):
+                self.transport = transport
+                self.buffer = b""
+
+            def data_received(self, data):
+                self.buffer += data
+                while b"\r\n\r\n" in self.buffer:
+                    head, self.buffer = self.buffer.split(b"\r\n\r\n", 1)
+                    path = head.split(b" ", 2)[1].decode()
+                    self.transport.write(server.respond(path))
+
+        self.server = await asyncio.get_running_loop().create_server(Protocol, host, port)
+        self.url = f"http://{host}:{self.server.sockets[0].getsockname()[1]}/"
+        return self.url
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class LinkFarm(ContentServer):
+    """A generated site for the crawler: `pages` HTML pages at /p/<n>, each linking to `fanout` others.
+
+    Links are written in the ways real sites spell the same URL (dot
+    segments, fragments, tracking parameters, absolute and relative, odd
+    escapes) and mixed with links to other hosts, so a crawler that does
+    not canonicalise fetches pages many times over. Page 0 also has a form
+    and a link with a query string.
+    """
+
+    def __init__(self, pages: int = 1000, fanout: int = 20, seed: int = 0):
+        super().__init__({})
+        self.pages = pages
+        self.fanout = fanout
+        self.seed = seed
+        self.fetched = {}
+
+    def links(self, page: int):
+        rng = random.Random(self.seed * 1000003 + page)
+        return [rng.randrange(self.pages) for _ in range(self.fanout)]
+
+    def _href(self, target: int, variant: int) -> str:
+        return (
+            f"/p/{target}",
+            f"/p/./{target}",
+            f"/p/x/../{target}#section",
+            f"{self.url}p/{target}?utm_source=farm",
+            f"/%70/{target}",
+            f"//127.0.0.1:{self.server.sockets[0].getsockname()[1]}/p/{target}",
+        )[variant % 6]
+
+    def respond(self, path: str) -> bytes:
+        self.requests += 1
+        if not path.startswith("/p/"):
+            return self._response(404, b"")
+        try:
+            page = int(path.split("?")[0][3:])
+        except ValueError:
+            return self._response(404, b"")
+        self.fetched[path] = self.fetched.get(path, 0) + 1
+        anchors = [
+            f'<a href="{self._href(target, i)}">page {target}</a>'
+            for i, target in enumerate(self.links(page))
+        ]
+        anchors.append('<a href="http://elsewhere.invalid/">elsewhere</a><a href="mailto:a@b.invalid">mail</a>')
+        if page == 0:
+            anchors.append('<a href="/p/0?view=full">full</a><form action="/p/0" method="post">'
+                           '<input name="q"><input type="submit"></form>')
+        body = f"<html><head><title>Page {page}</title></head><body>{''.join(anchors)}</body></html>"
+        return self._response(200, body.encode())
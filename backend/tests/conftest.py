@@ -0,0 +1,13 @@
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.ext.compiler import compiles
+
+
+# The tests run against SQLite: JSONB and UUID columns are stored as JSON and CHAR
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(element, compiler, **kw):
+    return "JSON"
+
+
+@compiles(UUID, "sqlite")
+def _uuid_as_char(element, compiler, **kw):
+    return "CHAR(32)"
@@ -0,0 +1,17 @@
+import logging
+
+from app.agents.attack_kb import AttackKnowledgeBase
+from app.agents.mitre_rules import rule_store
+
+
+def test_corrupt_index_falls_back_to_builtin_techniques(tmp_path, caplog):
+    index_path = tmp_path / "attack-index.bin"
+    index_path.write_bytes(b"not an index")
+    kb = AttackKnowledgeBase(index_path, tmp_path / "missing-stix.json")
+    technique_id = next(iter(rule_store.rules.techniques))
+    with caplog.at_level(logging.WARNING, logger="app.agents.attack_kb"):
+        assert kb.source == "builtin"
+        assert kb.technique(technique_id)["name"]
+    assert kb.error
+    record, = caplog.records
+    assert record.levelno == logging.WARNING and "using built-in techniques" in record.getMessage()
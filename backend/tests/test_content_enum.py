@@ -0,0 +1,98 @@
+import asyncio
+import random
+import string
+from urllib.parse import unquote, urlsplit
+
+import pytest
+
+from app.agents.content_enum import SoftNotFound, shape_of
+from app.agents.http_engine import BulkResponse
+
+BASE = "http://site.example/"
+
+
+class FakeSession:
+    """Answers bulk_get from `site(path)`, which returns (status, headers, body)"""
+
+    def __init__(self, site):
+        self.site = site
+        self.paths = []
+
+    async def bulk_get(self, url, max_body=65536):
+        path = urlsplit(url).path
+        self.paths.append(path)
+        status, headers, body = self.site(path)
+        return BulkResponse(url, status, headers, body[:max_body])
+
+
+def response(status, body=b"", **headers):
+    return BulkResponse(BASE, status, headers, body)
+
+
+def soft_404(path):
+    # Echoes the decoded path and a request id that differs every time
+    return 200, {}, b"<h1>Oops</h1><p>%s was not found (request %x)</p>" % (
+        unquote(path).encode(), random.getrandbits(64))
+
+
+def login_redirect(path):
+    return 302, {"Location": f"/login?next={path}"}, b""
+
+
+def unstable(path):
+    # Nothing in common between two answers but the status and roughly the size
+    return 200, {}, "".join(random.choices(string.ascii_letters, k=random.randint(990, 1010))).encode()
+
+
+def real_404(path):
+    return 404, {}, b"Not Found"
+
+
+def check(site, response, word):
+    return asyncio.run(SoftNotFound(FakeSession(site), BASE).matches(response, word))
+
+
+def test_echoed_path_template():
+    assert check(soft_404, response(200, b"<h1>Oops</h1><p>/admin was not found (request 1f2e3d4c5b6a7980)</p>"),
+                 "admin")
+    assert not check(soft_404, response(200, b"<h1>Admin</h1><form>...</form>"), "admin")
+    assert not check(soft_404, response(403, b"<h1>Oops</h1><p>/admin was not found (request 1)</p>"), "admin")
+
+
+def test_decoded_echo_matches():
+    body = b"<h1>Oops</h1><p>/old files/ was not found (request 42)</p>"
+    assert check(soft_404, response(200, body), "old files/")
+
+
+def test_redirect_template():
+    assert check(login_redirect, response(302, Location="/login?next=/backup"), "backup")
+    assert not check(login_redirect, response(302, Location="/backup/"), "backup")
+
+
+def test_length_fallback():
+    assert check(unstable, response(200, b"x" * 1000), "admin")
+    assert not check(unstable, response(200, b"x" * 5000), "admin")
+
+
+def test_real_404_site_has_no_baseline():
+    assert not check(real_404, response(200, b"Not Found"), "admin")
+
+
+@pytest.mark.parametrize("word, shape", [
+    ("admin", ""), ("admin/", "/"), ("backup.ZIP", ".zip"), ("a/b.tar.gz", ".gz"), (".htaccess", ""),
+])
+def test_shapes(word, shape):
+    assert shape_of(word) == shape
+
+
+def test_each_shape_is_calibrated_once():
+    session = FakeSession(soft_404)
+    soft = SoftNotFound(session, BASE)
+
+    async def main():
+        words = ["a", "b", "c/", "d/", "e.php", "f.php", "g.PHP"]
+        return await asyncio.gather(*(soft.matches(response(200, b"real page"), word) for word in words))
+
+    assert asyncio.run(main()) == [False] * 7
+    assert soft.probes == 6 and len(session.paths) == 6
+    assert sorted(path.endswith("/") for path in session.paths).count(True) == 2
@@ -0,0 +1,61 @@
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models import note, project, target, user  # noqa: F401, mapped classes the runs relate to
+# As a module, so pytest does not take the Test* models for test classes
+from app.models import test_result as models
+from app.agents.execution import ResultWriter
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/results.db")
+    Base.metadata.create_all(engine, tables=[models.TestRun.__table__, models.TestResult.__table__])
+    session = sessionmaker(bind=engine)()
+    run = models.TestRun(project_id=uuid.uuid4(), target_id=uuid.uuid4(), agent_type="web_pentester",
+                         engine_type="rule_based", status="running")
+    session.add(run)
+    session.commit()
+    session.statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: session.statements.append(statement))
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_rows_are_written_in_bulk(db):
+    run_id = db.query(models.TestRun.id).scalar()
+    writer = ResultWriter(db, str(run_id))
+    for index in range(1200):
+        writer.add("content_discovery", "medium", 0.7, f"Content Discovery: /backup/{index}.zip " + "x" * 300,
+                   f"200 OK, {index} bytes", {"path": f"/backup/{index}.zip", "status": 200})
+    assert writer.pending == 1200 and writer.written == 0
+    writer.flush()
+    db.commit()
+    assert writer.pending == 0 and writer.written == 1200
+    # One multi-row INSERT per batch of rows, not one round trip per row
+    inserts = [statement for statement in db.statements if statement.startswith("INSERT")]
+    assert 0 < len(inserts) <= 12
+
+    rows = db.query(models.TestResult).filter(models.TestResult.test_run_id == run_id).all()
+    assert len(rows) == 1200 and len({row.id for row in rows}) == 1200
+    row = next(row for row in rows if row.raw_data["path"] == "/backup/7.zip")
+    assert row.severity == "medium" and float(row.confidence_score) == 0.7 and row.description == "200 OK, 7 bytes"
+    assert len(row.title) == 255 and row.title.startswith("Content Discovery: /backup/7.zip")
+
+
+def test_flush_leaves_the_commit_to_the_caller(db):
+    run_id = db.query(models.TestRun.id).scalar()
+    writer = ResultWriter(db, str(run_id))
+    db.statements.clear()
+    writer.flush()
+    assert db.statements == []
+    writer.add("port_state", "info", 1.0, "Port state", "", {"hosts": {}})
+    writer.flush()
+    db.rollback()
+    assert db.query(models.TestResult).count() == 0 and writer.written == 1
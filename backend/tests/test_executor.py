@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.agents.executor import AgentPool, QueueFull
+
+
+def test_shutdown_runs_on_close_on_every_worker_loop():
+    closed = []
+    started = threading.Barrier(2)
+
+    async def run():
+        # Both workers are busy at once, so each gets a loop of its own
+        started.wait()
+        return asyncio.get_running_loop()
+
+    async def on_close():
+        closed.append(asyncio.get_running_loop())
+
+    pool = AgentPool("web_pentester", workers=2, on_close=on_close)
+    futures = [pool.submit(f"run-{index}", run) for index in range(2)]
+    loops = {future.result() for future in futures}
+    pool.shutdown()
+    assert set(closed) == loops and len(loops) == 2
+    assert all(loop.is_closed() for loop in loops)
+
+
+def test_queue_full_past_max_queued():
+    release = threading.Event()
+
+    async def run():
+        release.wait(5)
+
+    pool = AgentPool("web_pentester", workers=1, max_queued=2)
+    try:
+        futures = [pool.submit("running", run)]
+        # Wait for the worker to take the first run, so only the rest count as queued
+        while pool.get_stats()["running"] != 1:
+            time.sleep(0.001)
+        futures += [pool.submit(f"queued-{index}", run) for index in range(2)]
+        assert pool.room == 0
+        with pytest.raises(QueueFull):
+            pool.submit("rejected", run)
+        # Runs of an already admitted batch skip the limit
+        futures.append(pool.submit("admitted", run, admitted=True))
+        info = pool.run_info("queued-1")
+        assert info["state"] == "queued" and info["ahead"] == 1
+        assert pool.run_info("running")["state"] == "running"
+        assert pool.get_stats()["rejected"] == 1 and pool.get_stats()["queued"] == 3
+    finally:
+        release.set()
+    for future in futures:
+        future.result()
+    stats = pool.get_stats()
+    assert stats["completed"] == 4 and stats["queued"] == 0 and pool.room == 2
+    assert pool.run_info("running") is None
+    pool.shutdown()
@@ -0,0 +1,36 @@
+import asyncio
+
+from app.agents.http_engine import HttpEngine
+
+
+def test_idle_host_limits_are_evicted():
+    engine = HttpEngine(max_hosts=2)
+
+    async def main():
+        async with engine.host_limit("busy.example"):
+            for index in range(5):
+                async with engine.host_limit(f"host{index}.example"):
+                    pass
+            return list(engine._host_limits[asyncio.get_running_loop()])
+
+    # The busy host keeps its semaphore however old it is; idle ones go oldest first
+    assert asyncio.run(main()) == ["busy.example", "host4.example"]
+
+
+def test_host_limit_caps_concurrent_requests():
+    engine = HttpEngine(max_per_host=2, max_hosts=1)
+    running = peak = 0
+
+    async def request(host):
+        nonlocal running, peak
+        async with engine.host_limit(host):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    async def main():
+        await asyncio.gather(*(request("a.example") for _ in range(6)), *(request("b.example") for _ in range(2)))
+
+    asyncio.run(main())
+    assert peak == 4
@@ -0,0 +1,71 @@
+import pytest
+
+from app.agents.incremental import build_port_state, diff_port_states, plan_incremental_scan
+from app.agents.port_spec import PortSet, TOP_PORTS, parse_port_spec
+
+PORTS = parse_port_spec("1-10000")
+
+
+def baseline(hosts, **overrides):
+    plan, info = plan_incremental_scan(PORTS, None)
+    state = build_port_state(PORTS.to_spec(), hosts, info, len(plan))
+    state.update(overrides)
+    return state
+
+
+@pytest.mark.parametrize("previous, incremental, reason", [
+    (None, True, "no previous port state"),
+    ({"port_spec": "1-1024", "cycle": 3}, True, "port specification changed"),
+    ({"port_spec": "1-10000", "cycle": 3}, False, "full scan requested"),
+    ({"port_spec": "1-10000", "cycle": 3, "runs_since_full": 23}, True, "scheduled full sweep"),
+])
+def test_full_scan_fallbacks(previous, incremental, reason):
+    plan, info = plan_incremental_scan(PORTS, previous, incremental)
+    assert plan == PORTS and info["scan_mode"] == "full" and info["reason"] == reason
+    assert info["runs_since_full"] == 0
+
+
+def test_incremental_plan():
+    plan, info = plan_incremental_scan(PORTS, baseline({"10.0.0.1": [9001, 22], "10.0.0.2": [4444]}))
+    assert info["scan_mode"] == "incremental" and info["cycle"] == 1 and info["runs_since_full"] == 1
+    assert info["sample_slice"] == "1/24"
+    assert {9001, 22, 4444} <= set(plan)
+    assert all(port in plan for port in TOP_PORTS if port in PORTS)
+    assert 49152 not in plan
+    sampled = [port for port in plan if port % 24 == 1]
+    assert len(sampled) == len(range(1, 10001, 24))
+    # A fraction of the full plan
+    assert len(plan) < len(PORTS) // 10
+
+
+def test_slices_cover_every_port_within_a_stride():
+    state = baseline({})
+    covered = PortSet()
+    for _ in range(6):
+        plan, info = plan_incremental_scan(PORTS, state, sample_stride=6, full_scan_interval=100)
+        assert info["scan_mode"] == "incremental"
+        covered = covered | plan
+        state = build_port_state(PORTS.to_spec(), {}, info, len(plan))
+    assert covered == PORTS
+
+
+def test_invalid_plan_options():
+    with pytest.raises(ValueError):
+        plan_incremental_scan(PORTS, None, sample_stride=0)
+
+
+def test_diff_only_closes_probed_ports():
+    previous = {"10.0.0.1": [22, 80, 8443], "10.0.0.2": [443], "10.0.0.3": [3389]}
+    current = {"10.0.0.1": [22, 3306], "10.0.0.2": [443], "10.0.0.4": [80]}
+    # 8443 was not probed this cycle, so its absence says nothing
+    diff = diff_port_states(previous, current, parse_port_spec("1-1024,3306"))
+    assert diff["opened"] == {"10.0.0.1": [3306], "10.0.0.4": [80]}
+    assert diff["closed"] == {"10.0.0.1": [80]}
+    assert diff["new_hosts"] == ["10.0.0.4"] and diff["missing_hosts"] == ["10.0.0.3"]
+    assert diff["ports_opened"] == 2 and diff["ports_closed"] == 1
+
+
+def test_unchanged_hosts_diff_empty():
+    hosts = {"10.0.0.1": [22, 80]}
+    diff = diff_port_states(hosts, {"10.0.0.1": [80, 22]}, PORTS)
+    assert diff["opened"] == diff["closed"] == {} and diff["ports_opened"] == diff["ports_closed"] == 0
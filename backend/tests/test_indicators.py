@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from app.agents.aho_corasick import AhoCorasick
+from app.agents.indicators import IndicatorSet
+
+
+def naive_counts(patterns, text):
+    text = text.lower().encode()
+    counts = {}
+    for index, pattern in enumerate(patterns):
+        needle = pattern.lower().encode()
+        found = sum(1 for start in range(len(text)) if text.startswith(needle, start))
+        if found:
+            counts[index] = found
+    return counts
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_counts_match_a_naive_search(seed):
+    rng = random.Random(seed)
+    # A small alphabet forces overlapping and nested matches
+    patterns = list({"".join(rng.choices("abAB", k=rng.randint(1, 5))) for _ in range(30)})
+    text = "".join(rng.choices("abcAB", k=2000))
+    automaton = AhoCorasick(patterns)
+    assert automaton.counts(text) == naive_counts(patterns, text)
+    assert sorted(automaton.finditer(text)) == sorted(
+        (start, index) for index, pattern in enumerate(patterns)
+        for start in range(len(text)) if text.lower().startswith(pattern.lower(), start)
+    )
+
+
+def test_stream_matches_span_chunks():
+    automaton = AhoCorasick(["eval(atob(", "paypal", "pal"])
+    text = b"<script>EVAL(atob('x'))</script> secure-paypal.example"
+    scanner = automaton.scanner()
+    for start in range(0, len(text), 3):
+        scanner.feed(text[start:start + 3])
+    assert scanner.counts() == automaton.counts(text) == {0: 1, 1: 1, 2: 1}
+    assert scanner.bytes == len(text)
+
+
+def test_case_sensitive_matching():
+    automaton = AhoCorasick(["Login"], ignore_case=False)
+    assert automaton.search("login LOGIN") is None and automaton.search("a Login") == 0
+    with pytest.raises(ValueError):
+        AhoCorasick(["ok", ""])
+
+
+def test_indicator_groups_share_patterns():
+    indicators = IndicatorSet({"groups": {
+        "brand": {"scopes": ["url"], "weight": 0.4, "patterns": ["paypal", "Apple"]},
+        "token": {"scopes": ["url", "text"], "weight": 0.1, "patterns": ["login", "PayPal"]},
+        "kit": {"scopes": ["content"], "weight": 0.2, "patterns": ["eval(atob("]},
+    }})
+    matches = indicators.scan("http://paypal-login.example/APPLE/login", "url")
+    assert matches == {"brand": {"paypal": 1, "apple": 1}, "token": {"paypal": 1, "login": 2}}
+    assert indicators.score(matches) == pytest.approx(0.5)
+    assert indicators.scan("paypal", "text") == {"token": {"paypal": 1}}
+    assert list(indicators.find("x eval(atob(", "content")) == [(2, "kit", "eval(atob(")]
+    assert indicators.scanner("content") is not None
+
+
+def test_unknown_scope_is_rejected():
+    with pytest.raises(ValueError, match="unknown scopes"):
+        IndicatorSet({"groups": {"bad": {"scopes": ["headers"], "patterns": ["x"]}}})
@@ -0,0 +1,17 @@
+import logging
+
+from app.agents.job_queue import LocalBackend
+
+
+def test_runs_failing_outside_the_agent_are_logged(caplog):
+    async def broken(test_run_id, agent_request):
+        raise RuntimeError("database went away")
+
+    backend = LocalBackend({"web_pentester": 1}, runner=broken)
+    with caplog.at_level(logging.ERROR, logger="app.agents.job_queue"):
+        assert backend.submit("run-1", {"agent_type": "web_pentester"}) == "agents.web_pentester"
+        assert backend.wait(timeout=5)
+        backend.shutdown()
+    record, = caplog.records
+    assert "run-1 on agents.web_pentester failed" in record.getMessage()
+    assert isinstance(record.exc_info[1], RuntimeError)
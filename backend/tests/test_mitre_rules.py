@@ -0,0 +1,42 @@
+import json
+import logging
+import os
+
+import pytest
+
+from app.agents.mitre_rules import DEFAULT_RULES_PATH, RuleStore
+
+
+def write_rules(path, content, mtime_ns):
+    path.write_text(content)
+    # Coarse filesystem timestamps must not hide a rewrite from the mtime check
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def rule_file(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, DEFAULT_RULES_PATH.read_text(), 1_000_000_000)
+    return path
+
+
+def test_changed_file_is_reloaded(rule_file):
+    store = RuleStore(rule_file, check_interval=0)
+    rules = json.loads(rule_file.read_text())
+    rules["version"] = 3
+    write_rules(rule_file, json.dumps(rules), 2_000_000_000)
+    assert store.rules.version == 3 and store.get_stats()["reloads"] == 1
+
+
+@pytest.mark.parametrize("content", ["{not json", json.dumps({"version": 4, "services": "oops"}), json.dumps([])])
+def test_bad_file_keeps_the_old_rules(rule_file, content, caplog):
+    store = RuleStore(rule_file, check_interval=0)
+    old = store.rules
+    write_rules(rule_file, content, 2_000_000_000)
+    with caplog.at_level(logging.WARNING, logger="app.agents.mitre_rules"):
+        assert store.rules is old
+    stats = store.get_stats()
+    assert stats["reloads"] == 0 and stats["reload_errors"] == 1 and stats["last_error"]
+    assert "Keeping previous MITRE rules" in caplog.records[0].getMessage()
+    # The broken version is not retried until the file changes again
+    assert store.rules is old and store.get_stats()["reload_errors"] == 1
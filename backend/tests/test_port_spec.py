@@ -0,0 +1,76 @@
+import pytest
+
+from app.agents.port_spec import MAX_PORT, TOP_PORTS, PortSet, parse_port_spec
+
+
+@pytest.mark.parametrize("spec", ["-", "all", "*", "1-65535", "-65535", "1-"])
+def test_every_port(spec):
+    ports = parse_port_spec(spec)
+    assert len(ports) == MAX_PORT and ports.to_spec() == "1-65535"
+
+
+def test_open_ranges():
+    assert parse_port_spec("-1024").to_spec() == "1-1024"
+    assert parse_port_spec("60000-").to_spec() == "60000-65535"
+    assert parse_port_spec("-3, 65534-").to_spec() == "1-3,65534-65535"
+
+
+def test_top_ports():
+    assert list(parse_port_spec("top-10")) == sorted(TOP_PORTS[:10])
+    assert parse_port_spec("top100") == PortSet(TOP_PORTS)
+    # Overlapping terms are merged
+    assert parse_port_spec("top-5,80,20-25").to_spec() == "20-25,80,443"
+
+
+def test_mixed_terms_and_whitespace():
+    assert parse_port_spec(" 443 22,80 8000-8002 ").to_spec() == "22,80,443,8000-8002"
+
+
+@pytest.mark.parametrize("spec, message", [
+    ("0", "out of range"),
+    ("65536", "out of range"),
+    ("70000-", "out of range"),
+    ("-0", "out of range"),
+    ("100-10", "Invalid port range"),
+    ("1-2-3", "Invalid port"),
+    ("http", "Invalid port"),
+    ("--", "Invalid port"),
+    ("top-0", "Invalid top ports"),
+    (f"top-{len(TOP_PORTS) + 1}", "Invalid top ports"),
+    ("top-x", "Invalid top ports"),
+    (" , ", "Empty port specification"),
+])
+def test_invalid_specs(spec, message):
+    with pytest.raises(ValueError, match=message):
+        parse_port_spec(spec)
+
+
+def test_range_edges_fill_partial_bytes():
+    # Ranges starting and ending mid-byte exercise both bit-by-bit loops around the byte fill
+    for start, end in [(1, 1), (7, 9), (3, 60), (8, 15), (65530, 65535)]:
+        assert list(PortSet.from_range(start, end)) == list(range(start, end + 1))
+
+
+def test_set_operations_and_round_trip():
+    web = parse_port_spec("80,443,8000-8080")
+    common = parse_port_spec("top-20")
+    assert list(web & common) == [80, 443, 8080]
+    assert 8000 in web - common and 80 not in web - common
+    assert len(web | common) == len(web) + len(common) - 3
+    assert PortSet.from_bytes(web.to_bytes()) == web
+
+
+def test_out_of_range_ports_are_not_members():
+    ports = PortSet([1, MAX_PORT])
+    assert 0 not in ports and MAX_PORT + 1 not in ports and -1 not in ports
+    ports.discard(0)
+    assert len(ports) == 2
+
+
+def test_chunks_cover_the_set_in_order():
+    ports = parse_port_spec("1-10,100,200-205")
+    chunks = list(ports.chunks(4))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 4, 4, 1]
+    assert [port for chunk in chunks for port in chunk] == list(ports)
+    with pytest.raises(ValueError):
+        next(ports.chunks(0))
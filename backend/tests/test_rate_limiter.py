@@ -0,0 +1,17 @@
+from app.agents.rate_limiter import AgentRateLimit, RateLimiter
+
+
+def test_spent_credit_is_dropped():
+    limit = AgentRateLimit(RateLimiter(per_target_rate=100000.0), "network_scanner")
+    assert limit.batch > 1
+    for _ in range(limit.batch * 3):
+        limit.reserve("10.0.0.1")
+    assert "10.0.0.1" not in limit._credits
+
+
+def test_credits_stay_bounded_across_a_sweep():
+    limiter = RateLimiter(per_target_rate=100000.0, max_targets=256)
+    limit = AgentRateLimit(limiter, "network_scanner")
+    for i in range(5000):
+        limit.reserve(f"10.0.{i // 256}.{i % 256}")
+    assert len(limit._credits) <= limiter.max_targets
@@ -0,0 +1,15 @@
+import logging
+
+from app.agents.reputation import DomainReputation
+
+
+def test_corrupt_index_falls_back_to_the_journal(tmp_path, caplog):
+    index_path = tmp_path / "reputation.bin"
+    index_path.write_bytes(b"not an index")
+    reputation = DomainReputation(tmp_path / "lists", index_path)
+    with caplog.at_level(logging.WARNING, logger="app.agents.reputation"):
+        reputation.add("local", ["bad.example"])
+        verdict = reputation.lookup("www.bad.example")
+    assert verdict["listed"] and reputation.error
+    record, = caplog.records
+    assert record.levelno == logging.WARNING and "using the journal only" in record.getMessage()
@@ -0,0 +1,98 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+from app.agents.resolver import AsyncResolver
+
+
+def counting_resolver(answers=None, **options):
+    """A resolver whose lookups are counted and answered from `answers` instead of DNS"""
+    resolver = AsyncResolver(**options)
+    resolver.lookups = []
+    resolver.release = threading.Event()
+    resolver.release.set()
+
+    def lookup(hostname):
+        resolver.lookups.append(hostname)
+        resolver.release.wait(5)
+        addresses = (answers or {}).get(hostname)
+        if addresses is None:
+            raise socket.gaierror(socket.EAI_NONAME, hostname)
+        return addresses
+
+    resolver._lookup = lookup
+    return resolver
+
+
+def test_concurrent_lookups_are_coalesced():
+    resolver = counting_resolver({"example.com": ["192.0.2.1", "2001:db8::1"]})
+    resolver.release.clear()
+
+    async def main():
+        lookups = [asyncio.ensure_future(resolver.resolve_all(name))
+                   for name in ("example.com", "EXAMPLE.com.", "example.com")]
+        await asyncio.sleep(0.05)
+        resolver.release.set()
+        return await asyncio.gather(*lookups)
+
+    assert asyncio.run(main()) == [["192.0.2.1", "2001:db8::1"]] * 3
+    stats = resolver.get_stats()
+    assert resolver.lookups == ["example.com"]
+    assert stats["misses"] == 1 and stats["coalesced"] == 2 and stats["in_flight"] == 0
+
+
+def test_answers_expire_after_the_ttl():
+    resolver = counting_resolver({"example.com": ["192.0.2.1"]}, ttl=0.05)
+
+    async def main():
+        await resolver.resolve("example.com")
+        await resolver.resolve("example.com")
+        time.sleep(0.1)
+        await resolver.resolve("example.com")
+
+    asyncio.run(main())
+    assert resolver.lookups == ["example.com"] * 2
+    assert resolver.get_stats()["hits"] == 1
+
+
+def test_failures_are_cached_for_the_negative_ttl():
+    resolver = counting_resolver(negative_ttl=0.05)
+
+    async def fails():
+        with pytest.raises(socket.gaierror):
+            await resolver.resolve("missing.example")
+
+    async def main():
+        await fails()
+        await fails()
+        time.sleep(0.1)
+        await fails()
+
+    asyncio.run(main())
+    assert resolver.lookups == ["missing.example"] * 2
+    stats = resolver.get_stats()
+    assert stats["failures"] == 2 and stats["hits"] == 1
+
+
+def test_oldest_names_are_evicted():
+    answers = {f"host{index}.example": [f"192.0.2.{index}"] for index in range(3)}
+    resolver = counting_resolver(answers, max_entries=2)
+
+    async def main():
+        for name in ("host0.example", "host1.example", "host0.example", "host2.example", "host0.example"):
+            await resolver.resolve(name)
+
+    asyncio.run(main())
+    # host1 was the least recently used when host2 arrived
+    assert resolver.lookups == ["host0.example", "host1.example", "host2.example"]
+    assert resolver.get_stats()["evictions"] == 1 and resolver.get_stats()["entries"] == 2
+
+
+def test_addresses_skip_the_lookup():
+    resolver = counting_resolver()
+    assert asyncio.run(resolver.resolve_all("2001:DB8::1")) == ["2001:db8::1"]
+    assert asyncio.run(resolver.resolve("192.0.2.7")) == "192.0.2.7"
+    assert resolver.lookups == [] and resolver.get_stats()["misses"] == 0
@@ -0,0 +1,92 @@
+import json
+import random
+
+import pytest
+
+import app.agents.mitre_rules as mitre_rules
+from app.agents.mitre_rules import CompiledRules, DEFAULT_RULES_PATH
+from app.agents.port_spec import TOP_PORTS
+from app.agents.risk_scoring import BatchRiskScorer, RISK_LEVELS, SEVERITIES
+from app.agents.rule_engine import RuleBasedEngine
+from app.agents.service_probes import SERVICE_PORTS
+
+# Ports no risk table, rule or service probe names
+UNLISTED_PORTS = [1, 2222, 31337, 50000, 65535]
+
+EDGE_CASES = [
+    ("10.1.0.1", [], {}),
+    ("10.1.0.2", [80], {80: {"service": "unknown-product"}}),
+    ("10.1.0.3", [22, 443], {22: {"service": None}, 443: {"service": "jetdirect"}}),
+    ("10.1.0.4", UNLISTED_PORTS, {}),
+    ("10.1.0.5", UNLISTED_PORTS, {port: {"service": "unknown-product"} for port in UNLISTED_PORTS}),
+    ("10.1.0.6", [21, 23, 3389, 50000], {50000: {"service": "ssh"}}),
+]
+
+
+def rule_file():
+    with open(DEFAULT_RULES_PATH, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def random_hosts(count: int, seed: int):
+    rng = random.Random(seed)
+    names = list(SERVICE_PORTS) + ["unknown-product", "jetdirect"]
+    pool = list(TOP_PORTS[:200]) + UNLISTED_PORTS
+    hosts = []
+    for index in range(count):
+        open_ports = sorted(rng.sample(pool, rng.choice([0, 1, 2, 5, 10, 25])))
+        detections = {port: {"service": rng.choice(names) if rng.random() < 0.6 else None}
+                      for port in open_ports if rng.random() < 0.4}
+        hosts.append((f"10.0.{index // 256}.{index % 256}", open_ports, detections))
+    return hosts
+
+
+def per_host(target_ip, open_ports, detections):
+    results = {"target": target_ip, "open_ports": [], "services": {}, "vulnerabilities": [], "mitre_analysis": {}}
+    RuleBasedEngine._assess_open_ports(results, target_ip, open_ports, detections)
+    results["risk_score"] = RuleBasedEngine._calculate_network_risk_score(results)
+    return results
+
+
+def assert_batch_matches_per_host(hosts, rules: CompiledRules, monkeypatch):
+    monkeypatch.setattr(mitre_rules.rule_store, "_rules", rules)
+    expected = [per_host(*host) for host in hosts]
+
+    # Stored per-host results and the plain {port: service} form must score alike
+    plain = [{"target": ip, "open_ports": ports,
+              "services": {port: d["service"] for port, d in detections.items()}} for ip, ports, detections in hosts]
+    for batch in (expected, plain):
+        report = BatchRiskScorer(rules).report(batch)
+        assert len(report["hosts"]) == len(expected)
+        for result, scored in zip(expected, report["hosts"]):
+            analysis = result["mitre_analysis"]
+            severities = {severity: 0 for severity in SEVERITIES}
+            for vulnerability in result["vulnerabilities"]:
+                severities[vulnerability["severity"]] += 1
+            assert scored["risk_score"] == result["risk_score"], result["target"]
+            assert scored["overall_risk"] == analysis["risk_assessment"]["overall_risk"], result["target"]
+            assert scored["vulnerabilities"] == severities, result["target"]
+            assert scored["techniques"] == [t["technique_id"] for t in analysis["techniques_detected"]], result["target"]
+
+
+def test_edge_cases(monkeypatch):
+    assert_batch_matches_per_host(EDGE_CASES, CompiledRules(rule_file()), monkeypatch)
+
+
+def test_random_hosts(monkeypatch):
+    assert_batch_matches_per_host(random_hosts(2000, seed=11) + EDGE_CASES, CompiledRules(rule_file()), monkeypatch)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_shuffled_risk_levels(seed, monkeypatch):
+    # Shuffled risk levels exercise every overall-risk branch
+    rules = rule_file()
+    rng = random.Random(seed)
+    for detection in rules["detections"]:
+        detection["risk_level"] = rng.choice(RISK_LEVELS)
+    assert_batch_matches_per_host(random_hosts(500, seed) + EDGE_CASES, CompiledRules(rules), monkeypatch)
+
+
+def test_empty_batch():
+    report = BatchRiskScorer().report([])
+    assert report["hosts"] == [] and report["summary"]["hosts"] == 0
@@ -0,0 +1,14 @@
+import asyncio
+
+from app.agents.rule_engine import RuleBasedEngine
+from app.agents.target_spec import parse_target_spec
+
+
+def test_sweep_mixing_ipv4_and_ipv6():
+    # Loopback hosts answer the discovery ping with a reset, so all three are up
+    targets = parse_target_spec("::1, 127.0.0.2, 127.0.0.1")
+    results = asyncio.run(RuleBasedEngine.check_network_range_security(
+        targets, "1", timeout=0.5, service_detection=False
+    ))
+    assert [host["target"] for host in results["hosts"]] == ["127.0.0.1", "127.0.0.2", "::1"]
+    assert results["summary"]["hosts_up"] == 3
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, get_db
+from app.models import note, project, target, user  # noqa: F401, mapped classes the runs relate to
+# As a module, so pytest does not take the Test* models for test classes
+from app.models import test_result as models
+from app.agents import agents
+from app.agents.run_registry import (
+    LocalRunStore, RedisRunStore, RegistryUnavailable, RunRegistry, current_run
+)
+from app.api.auth import get_current_user
+
+# Nothing listens on port 1, so every command fails to connect
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+
+
+class InMemoryRedis:
+    """The few Redis commands the store uses, with expiry times recorded instead of enforced"""
+
+    def __init__(self):
+        self.values = {}
+        self.expiry = {}
+
+    def set(self, key, value, ex=None):
+        self.values[key] = str(value).encode()
+        self.expiry[key] = ex
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def ping(self):
+        return True
+
+
+def redis_store(ttl: float = 60.0) -> RedisRunStore:
+    store = RedisRunStore(UNREACHABLE_REDIS, ttl)
+    store.client = InMemoryRedis()
+    return store
+
+
+@pytest.mark.parametrize("make_store", [LocalRunStore, redis_store])
+def test_cancel_stops_a_supervised_run(make_store):
+    registry = RunRegistry(make_store(), interval=0.01, grace=1.0)
+
+    async def work():
+        progress = current_run()
+        progress.add_total(1000)
+        while not progress.cancelled:
+            progress.advance()
+            await asyncio.sleep(0.001)
+        return progress.done
+
+    async def main():
+        tracker = registry.track("run-1", "network_scanner")
+        task = asyncio.ensure_future(registry.supervise(tracker, work()))
+        await asyncio.sleep(0.05)
+        registry.cancel("run-1")
+        done = await task
+        return tracker, done
+
+    tracker, done = asyncio.run(main())
+    assert tracker.cancelled and tracker.state == "cancelled"
+    progress = registry.progress("run-1")
+    assert progress["state"] == "cancelled" and progress["total"] == 1000 and progress["done"] == done > 0
+
+
+def test_redis_store_keys_and_expiry():
+    store = redis_store(ttl=120.0)
+    store.publish("abc", {"state": "running", "done": 5})
+    store.request_cancel("abc")
+    assert store.get("abc") == {"state": "running", "done": 5}
+    assert store.get("missing") is None
+    assert store.cancel_requested("abc") and not store.cancel_requested("missing")
+    assert store.client.expiry == {"run:abc:progress": 120, "run:abc:cancel": 120}
+    assert store.get_stats() == {"backend": "redis"}
+
+
+def test_unreachable_redis(caplog):
+    store = RedisRunStore(UNREACHABLE_REDIS)
+    registry = RunRegistry(store)
+    with pytest.raises(RegistryUnavailable):
+        registry.cancel("abc")
+    # Runs keep going without progress reports, and status reads say why there are none
+    with caplog.at_level(logging.WARNING, logger="app.agents.run_registry"):
+        tracker = registry.track("abc", "web_pentester")
+    assert not tracker.cancelled
+    assert [record.levelno for record in caplog.records] == [logging.WARNING] * 2
+    assert "Could not check run abc for cancellation" in caplog.records[0].getMessage()
+    assert "Could not publish progress of run abc" in caplog.records[1].getMessage()
+    assert "error" in registry.progress("abc")
+    assert "error" in registry.get_stats()
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path}/runs.db")
+    Base.metadata.create_all(engine, tables=[models.TestRun.__table__, models.TestResult.__table__])
+    session = sessionmaker(bind=engine)
+
+    def get_test_db():
+        db = session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(agents.router)
+    app.dependency_overrides[get_current_user] = lambda: None
+    app.dependency_overrides[get_db] = get_test_db
+    monkeypatch.setattr(agents, "run_registry", RunRegistry(RedisRunStore(UNREACHABLE_REDIS)))
+
+    db = session()
+    run = models.TestRun(project_id=uuid.uuid4(), target_id=uuid.uuid4(), agent_type="network_scanner",
+                         engine_type="rule_based", status="running")
+    db.add(run)
+    db.commit()
+    run_id = str(run.id)
+    db.close()
+    yield TestClient(app), run_id
+    engine.dispose()
+
+
+def test_cancel_without_registry_is_503(api):
+    client, run_id = api
+    response = client.post(f"/agents/cancel/{run_id}")
+    assert response.status_code == 503, response.text
+    assert response.headers["Retry-After"]
+    # The status endpoint still answers, reporting the missing progress
+    status = client.get(f"/agents/status/{run_id}").json()
+    assert status["status"] == "running" and "error" in status["progress"]
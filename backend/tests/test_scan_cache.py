@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.agents.run_registry import RunCancelled
+from app.agents.scan_cache import ScanResultCache
+
+
+def test_hit_after_first_scan():
+    cache = ScanResultCache()
+    calls = []
+
+    async def scan():
+        calls.append(1)
+        return {"open_ports": [22]}
+
+    async def main():
+        first = await cache.get_or_run("host", scan)
+        second = await cache.get_or_run("host", scan)
+        return first, second
+
+    (result, info), (cached, cached_info) = asyncio.run(main())
+    assert result == cached == {"open_ports": [22]} and len(calls) == 1
+    assert not info["hit"] and cached_info["hit"]
+
+
+def test_cancelled_follower_leaves_the_shared_scan_alone():
+    cache = ScanResultCache()
+    release = None
+
+    async def scan():
+        await release.wait()
+        return {"open_ports": [80]}
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.ensure_future(cache.get_or_run("host", scan))
+        await asyncio.sleep(0)
+        cancelled = asyncio.ensure_future(cache.get_or_run("host", scan))
+        follower = asyncio.ensure_future(cache.get_or_run("host", scan))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        return await leader, await follower, cancelled
+
+    (result, info), (shared, shared_info), cancelled = asyncio.run(main())
+    assert cancelled.cancelled()
+    assert result == shared == {"open_ports": [80]}
+    assert not info["coalesced"] and shared_info["coalesced"]
+    stats = cache.get_stats()
+    assert stats["coalesced"] == 2 and stats["in_flight"] == 0 and stats["entries"] == 1
+
+
+@pytest.mark.parametrize("stop", [asyncio.CancelledError, RunCancelled])
+def test_followers_rescan_when_the_leader_is_abandoned(stop):
+    cache = ScanResultCache()
+    started = None
+    scans = []
+
+    async def abandoned():
+        started.set()
+        await asyncio.sleep(0.01)
+        raise stop()
+
+    async def scan():
+        scans.append(1)
+        return {"open_ports": [443]}
+
+    async def main():
+        nonlocal started
+        started = asyncio.Event()
+        leader = asyncio.ensure_future(cache.get_or_run("host", abandoned))
+        await started.wait()
+        follower = await cache.get_or_run("host", scan)
+        with pytest.raises((asyncio.CancelledError, RunCancelled)):
+            await leader
+        return follower
+
+    result, info = asyncio.run(main())
+    assert result == {"open_ports": [443]} and not info["coalesced"] and len(scans) == 1
+    assert cache.get_stats()["coalesced"] == 1
+
+
+def test_failures_are_not_cached():
+    cache = ScanResultCache()
+
+    async def broken():
+        raise OSError("unreachable")
+
+    with pytest.raises(OSError):
+        asyncio.run(cache.get_or_run("host", broken))
+    assert cache.get_stats()["entries"] == 0 and cache.get_stats()["failures"] == 1
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.agents.service_probes import MATCHER, identify_service
+
+MYSQL_GREETING = b"J\x00\x00\x00\x0a8.0.36-0ubuntu0.22.04.1\x00\x08\x00\x00\x00"
+TLS_SERVER_HELLO = b"\x16\x03\x03\x00\x4a\x02\x00\x00\x46\x03\x03"
+
+
+class FakeScanner:
+    """Answers exchange() from per-port services: a greeting, and replies to known payloads"""
+
+    def __init__(self, services):
+        self.services = services
+        self.sent = []
+
+    async def exchange(self, ip, port, payload, timeout):
+        self.sent.append((port, payload))
+        greeting, replies = self.services.get(port, (b"", {}))
+        if not payload:
+            return greeting
+        return next((reply for prefix, reply in replies.items() if payload.startswith(prefix)), b"")
+
+
+SERVICES = {
+    22: (b"SSH-2.0-OpenSSH_8.9p1 Ubuntu-3ubuntu0.6\r\n", {}),
+    21: (b"220 (vsFTPd 3.0.5)\r\n", {}),
+    25: (b"220 mail.example.com ESMTP Postfix (Ubuntu)\r\n", {}),
+    3306: (MYSQL_GREETING, {}),
+    5900: (b"RFB 003.008\n", {}),
+    6379: (b"", {b"*1\r\n$4\r\nPING": b"+PONG\r\n"}),
+    443: (b"", {b"\x16\x03\x01": TLS_SERVER_HELLO}),
+    # An HTTP server on an unusual port, found by the GET fallback probe
+    31337: (b"", {b"GET ": b"HTTP/1.1 200 OK\r\nServer: nginx/1.24.0\r\nContent-Length: 0\r\n\r\n"}),
+    9999: (b"", {}),
+}
+
+
+@pytest.mark.parametrize("port, service, details, probe", [
+    (22, "ssh", {"product": "OpenSSH_8.9p1"}, "NULL"),
+    (21, "ftp", {"product": "vsFTPd 3.0.5"}, "NULL"),
+    (25, "smtp", {"product": "Postfix"}, "NULL"),
+    (3306, "mysql", {"version": "8.0.36-0ubuntu0.22.04.1"}, "NULL"),
+    (5900, "vnc", {"version": "003.008"}, "NULL"),
+    (6379, "redis", {}, "RedisPing"),
+    (443, "https", {}, "TLSSessionReq"),
+    (31337, "http", {"product": "nginx/1.24.0"}, "GetRequest"),
+])
+def test_identify_service(port, service, details, probe):
+    detection = asyncio.run(identify_service(FakeScanner(SERVICES), "192.0.2.1", port, timeout=0.1))
+    assert detection["service"] == service and detection["method"] == "banner_match"
+    assert detection["probe"] == probe
+    for field, value in details.items():
+        assert detection[field] == value
+
+
+def test_silent_port_is_left_to_the_port_lookup():
+    scanner = FakeScanner(SERVICES)
+    detection = asyncio.run(identify_service(scanner, "192.0.2.1", 9999, timeout=0.1))
+    assert detection == {"service": None, "method": "port_lookup", "banner": None, "probe": None}
+    assert [payload[:4] for _, payload in scanner.sent] == [b"", b"GET "]
+
+
+def test_unmatched_banner_is_kept_printable():
+    scanner = FakeScanner({4444: (b"\x00\x01garbage\r\n", {})})
+    detection = asyncio.run(identify_service(scanner, "192.0.2.1", 4444, timeout=0.1))
+    assert detection["service"] is None and detection["banner"] == "\\x00\\x01garbage\\r\\n"
+
+
+def test_banner_beats_the_port_hint():
+    # An SSH banner on the HTTP port is still SSH
+    assert MATCHER.match(SERVICES[22][0], 80)["service"] == "ssh"
+    assert MATCHER.match(b"", 22) is None
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from app.agents.port_spec import parse_port_spec
+from app.agents.rate_limiter import RateLimiter
+from app.agents.run_registry import RunTracker
+from app.agents.sharding import ShardedPortScanner
+from app.agents.timing import get_timing_template
+
+
+async def listen():
+    server = await asyncio.start_server(lambda reader, writer: writer.close(), "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_shards_find_the_open_ports():
+    async def main():
+        server, port = await listen()
+        try:
+            with ShardedPortScanner(workers=2, shard_size=64, concurrency=64) as sharder:
+                open_ports = await sharder.scan("127.0.0.1", parse_port_spec(f"{port - 100}-{port + 100}"),
+                                                get_timing_template("aggressive"))
+                return port, open_ports, sharder.get_stats()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    port, open_ports, stats = asyncio.run(main())
+    assert port in open_ports and stats["probes"] == 201 and stats["shards"] == 4
+
+
+def test_cancelled_run_stops_running_shards():
+    # Throttled to 2000 probes a second, the full plan would take over half a minute
+    rate_limit = RateLimiter(per_target_rate=2000.0).for_agent("network_scanner")
+
+    async def main():
+        sharder = ShardedPortScanner(workers=2, shard_size=8192, concurrency=64, rate_limit=rate_limit)
+        sharder.progress = RunTracker()
+        try:
+            scan = asyncio.ensure_future(sharder.scan("127.0.0.1", parse_port_spec("1-65535"),
+                                                      get_timing_template("aggressive")))
+            await asyncio.sleep(1.0)
+            sharder.progress.cancelled = True
+            cancelled_at = time.perf_counter()
+            await asyncio.wait_for(scan, timeout=10)
+            stopped_in = time.perf_counter() - cancelled_at
+        finally:
+            started = time.perf_counter()
+            sharder.close()
+            closed_in = time.perf_counter() - started
+        return sharder.get_stats(), stopped_in, closed_in
+
+    stats, stopped_in, closed_in = asyncio.run(main())
+    assert stopped_in < 3 and closed_in < 1
+    assert stats["probes"] < 65535
@@ -0,0 +1,41 @@
+import pytest
+
+from app.agents.target_spec import address_sort_key, parse_target_spec
+
+
+def test_address_range():
+    targets = parse_target_spec("10.0.0.1-10.0.0.5")
+    assert list(targets) == [f"10.0.0.{i}" for i in range(1, 6)]
+
+
+def test_short_address_range():
+    assert len(parse_target_spec("10.0.0.1-50")) == 50
+
+
+def test_cidr_and_list():
+    targets = parse_target_spec("192.168.1.0/30, 10.0.0.1 example.com")
+    assert list(targets) == ["192.168.1.1", "192.168.1.2", "10.0.0.1", "example.com"]
+
+
+def test_mixed_address_families():
+    targets = parse_target_spec("::1, 10.0.0.2, 2001:db8::/127, 10.0.0.1")
+    assert len(targets) == 5
+    assert sorted(targets, key=address_sort_key) == ["10.0.0.1", "10.0.0.2", "::1", "2001:db8::", "2001:db8::1"]
+
+
+@pytest.mark.parametrize("hostname", ["my-site.com", "www.eu.api.my-site.com", "a-b.c-d.e-f.g-h.example"])
+def test_hyphenated_hostname_is_not_a_range(hostname):
+    targets = parse_target_spec(hostname)
+    assert targets.hostnames == [hostname]
+    assert targets.is_single_host
+
+
+@pytest.mark.parametrize("spec", ["10.0.0.5-10.0.0.1", "10.0.0.1-::1", "10.0.0.1-300", "300.1.1.1", "-bad-.com"])
+def test_invalid_targets(spec):
+    with pytest.raises(ValueError, match="Invalid target"):
+        parse_target_spec(spec)
+
+
+def test_sweep_size_limit():
+    with pytest.raises(ValueError, match="maximum"):
+        parse_target_spec("10.0.0.0/15")
@@ -0,0 +1,73 @@
+import pytest
+
+from app.agents.timing import HostTiming, get_timing_template
+
+
+def small_template(**overrides):
+    template = dict(get_timing_template("normal"), initial_parallelism=2, min_parallelism=1, max_parallelism=4)
+    template.update(overrides)
+    return template
+
+
+def test_rto_follows_rfc6298():
+    timing = HostTiming(get_timing_template("normal"))
+    assert timing.timeout == 1.0 and timing.srtt is None
+    timing.record_rtt(0.1)
+    assert timing.srtt == pytest.approx(0.1) and timing.rttvar == pytest.approx(0.05)
+    assert timing.timeout == pytest.approx(0.3)
+    timing.record_rtt(0.2)
+    assert timing.rttvar == pytest.approx(0.75 * 0.05 + 0.25 * 0.1)
+    assert timing.srtt == pytest.approx(0.875 * 0.1 + 0.125 * 0.2)
+    assert timing.timeout == pytest.approx(timing.srtt + 4 * timing.rttvar)
+
+
+def test_rto_is_clamped_to_the_template():
+    fast = HostTiming(get_timing_template("normal"))
+    for _ in range(50):
+        fast.record_rtt(0.0001)
+    assert fast.timeout == 0.1
+    slow = HostTiming(get_timing_template("aggressive"))
+    slow.record_rtt(5.0)
+    assert slow.timeout == 1.25
+
+
+def test_pinned_timeout_raises_the_ceiling():
+    template = get_timing_template("aggressive", timeout=3.0)
+    assert template["initial_rtt_timeout"] == 3.0 and template["max_rtt_timeout"] == 3.0
+    assert get_timing_template("aggressive")["max_rtt_timeout"] == 1.25
+    with pytest.raises(ValueError, match="Unknown timing template"):
+        get_timing_template("warp")
+
+
+def test_window_slow_start_then_cap():
+    timing = HostTiming(small_template())
+    assert timing.window == 2
+    timing.on_response()
+    timing.on_response()
+    assert timing.cwnd == 4
+    timing.on_response()
+    assert timing.cwnd == 4 and timing.stats["responses"] == 3
+
+
+def test_drop_halves_the_window_once_per_rtt():
+    timing = HostTiming(small_template())
+    timing.record_rtt(10.0)
+    timing.cwnd = 4.0
+    assert timing.allowed_retries == 1
+    timing.on_drop()
+    assert timing.ssthresh == 2 and timing.cwnd == 2
+    # A second drop from the same burst of loss does not back off again
+    timing.on_drop()
+    assert timing.cwnd == 2 and timing.stats["drops"] == 2
+    # Past the threshold the window grows by 1/window per answer
+    timing.on_response()
+    assert timing.cwnd == pytest.approx(2.5) and timing.window == 2
+    # Once a retransmission has been answered, timeouts get the template's full retries
+    assert timing.allowed_retries == timing.template["max_retries"]
+
+
+def test_backoff_never_goes_below_min_parallelism():
+    timing = HostTiming(small_template(min_parallelism=3))
+    timing.cwnd = 4.0
+    timing.on_drop()
+    assert timing.cwnd == 3
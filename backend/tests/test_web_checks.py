@@ -0,0 +1,24 @@
+import asyncio
+
+from app.agents.http_engine import HttpEngine
+from app.agents.rate_limiter import AgentRateLimit, RateLimiter
+from app.agents.web_checks import WebChecks
+
+
+class RecordingRateLimit(AgentRateLimit):
+    def __init__(self):
+        super().__init__(RateLimiter(), "web_pentester")
+        self.acquired = []
+
+    async def acquire(self, target: str, count: float = 1.0):
+        self.acquired.append(target)
+        await super().acquire(target, count)
+
+
+def test_tls_handshakes_take_a_rate_limit_token():
+    rate_limit = RecordingRateLimit()
+    session = HttpEngine().session(rate_limit)
+    # Nothing listens on port 1, so the first handshake fails and the check stops there
+    result = asyncio.run(WebChecks.check_tls(session, "https://127.0.0.1:1/", timeout=1.0))
+    assert not result["enabled"] and result["findings"][0]["type"] == "https_unavailable"
+    assert rate_limit.acquired == ["127.0.0.1"]
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from app.agents.web_checks import WEB_CHECKS, parse_checks
+from app.agents.web_pentester import WebPentesterAgent
+
+
+@pytest.mark.parametrize("checks, expected", [
+    ("tls", ("tls",)),
+    ("headers, cors,tls", ("headers", "cors", "tls")),
+    (["xss", "sql_injection"], ("xss", "sql_injection")),
+    (WEB_CHECKS, WEB_CHECKS),
+])
+def test_parse_checks(checks, expected):
+    assert parse_checks(checks) == expected
+
+
+@pytest.mark.parametrize("checks, message", [
+    ("headers,nope", "Unknown checks: nope"),
+    (["tls", "bogus"], "Unknown checks: bogus"),
+    (5, "must be a list"),
+    ({"tls": True}, "must be a list"),
+    (["tls", 1], "must be a list"),
+])
+def test_invalid_checks(checks, message):
+    with pytest.raises(ValueError, match=message):
+        parse_checks(checks)
+
+
+def test_invalid_checks_are_reported_before_any_request():
+    result = asyncio.run(WebPentesterAgent().execute("http://127.0.0.1:1/", {"checks": 5}))
+    assert "must be a list" in result["error"]
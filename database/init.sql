@@ -11,4 +11,17 @@ CREATE EXTENSION IF NOT EXISTS "pgcrypto";
 -- Example: Index for frequently queried fields
 -- CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(status);
 -- CREATE INDEX IF NOT EXISTS idx_test_runs_agent_type ON test_runs(agent_type);
--- CREATE INDEX IF NOT EXISTS idx_test_results_severity ON test_results(severity);
\ No newline at end of file
+-- CREATE INDEX IF NOT EXISTS idx_test_results_severity ON test_results(severity);
+
+-- Schema changes for databases created before the model gained the column.
+-- Safe to run again, and a no-op before the tables exist:
+--   psql cyber_agent -f database/init.sql
+
+-- test_runs.batch_id: shared by the runs of one /agents/execute/batch request
+DO $$
+BEGIN
+    IF to_regclass('public.test_runs') IS NOT NULL THEN
+        ALTER TABLE test_runs ADD COLUMN IF NOT EXISTS batch_id UUID;
+        CREATE INDEX IF NOT EXISTS ix_test_runs_batch_id ON test_runs(batch_id);
+    END IF;
+END $$;
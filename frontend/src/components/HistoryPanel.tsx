@@ -1,11 +1,12 @@
 import React, { useState } from 'react';
-import { History, Calendar, Target, Clock, CheckCircle, XCircle } from 'lucide-react';
+import { History, Calendar, Target, Clock, CheckCircle, XCircle, Ban, Hourglass } from 'lucide-react';
+import type { TestRun } from '../types/api';
 
 interface TestResult {
   id: string;
   target: string;
   type: string;
-  status: 'completed' | 'failed' | 'running';
+  status: TestRun['status'];
   timestamp: Date;
   duration: string;
   findings: number;
@@ -44,23 +45,31 @@ export const HistoryPanel: React.FC = () => {
 
   const [selectedTest, setSelectedTest] = useState<TestResult | null>(null);
 
-  const getStatusIcon = (status: string) => {
+  const getStatusIcon = (status: TestResult['status']) => {
     switch (status) {
       case 'completed':
         return <CheckCircle className="h-5 w-5 text-red-400" />;
       case 'failed':
         return <XCircle className="h-5 w-5 text-red-400" />;
+      case 'cancelled':
+        return <Ban className="h-5 w-5 text-gray-400" />;
+      case 'queued':
+        return <Hourglass className="h-5 w-5 text-blue-400" />;
       default:
         return <Clock className="h-5 w-5 text-yellow-400" />;
     }
   };
 
-  const getStatusColor = (status: string) => {
+  const getStatusColor = (status: TestResult['status']) => {
     switch (status) {
       case 'completed':
         return 'text-green-400';
       case 'failed':
         return 'text-red-400';
+      case 'cancelled':
+        return 'text-gray-400';
+      case 'queued':
+        return 'text-blue-400';
       default:
         return 'text-yellow-400';
     }
@@ -21,7 +21,10 @@ export const API_ENDPOINTS = {
   },
   AGENTS: {
     EXECUTE: `${API_BASE_URL}/api/v1/agents/execute`,
+    EXECUTE_BATCH: `${API_BASE_URL}/api/v1/agents/execute/batch`,
+    BATCH: (id: string) => `${API_BASE_URL}/api/v1/agents/batch/${id}`,
     STATUS: (id: string) => `${API_BASE_URL}/api/v1/agents/status/${id}`,
+    CANCEL: (id: string) => `${API_BASE_URL}/api/v1/agents/cancel/${id}`,
     RESULTS: (id: string) => `${API_BASE_URL}/api/v1/agents/results/${id}`,
   },
   WEBSOCKET: {
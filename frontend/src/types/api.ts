@@ -99,18 +99,61 @@ export interface AgentExecuteResponse {
   message: string;
 }
 
+export interface AgentBatchRequest {
+  agent_types: string[];
+  project_id?: string;
+  target_ids?: string[];
+  per_target?: number;
+  options?: Record<string, any>;
+}
+
+export interface AgentBatchResponse {
+  batch_id: string;
+  status: string;
+  targets: number;
+  runs: number;
+  lanes: number;
+  queues: Record<string, number>;
+  test_runs: { test_run_id: string; target_id: string; agent_type: string }[];
+  message: string;
+}
+
+export interface AgentBatchStatus {
+  batch_id: string;
+  status: 'queued' | 'running' | 'completed';
+  total: number;
+  finished: number;
+  progress: number;
+  counts: Record<string, number>;
+  agents: Record<string, Record<string, number>>;
+  started_at?: string;
+  completed_at?: string;
+}
+
 export interface TestRun {
   id: string;
   project_id: string;
   target_id: string;
   agent_type: string;
   engine_type: string;
-  status: 'running' | 'completed' | 'failed';
+  status: 'queued' | 'running' | 'completed' | 'failed' | 'cancelled';
   started_at: string;
   completed_at?: string;
   duration_seconds?: number;
 }
 
+export interface RunProgress {
+  state: 'running' | 'cancelling' | 'completed' | 'failed' | 'cancelled';
+  agent_type: string;
+  done: number;
+  total: number;
+  percent?: number;
+  rate: number;
+  eta_seconds?: number;
+  elapsed: number;
+  updated_at: number;
+}
+
 export interface TestResult {
   id: string;
   test_run_id: string;